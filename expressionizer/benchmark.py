@@ -0,0 +1,1635 @@
+"""Micro-benchmarks for the expression engine's hot paths.
+
+Run ``python -m expressionizer.benchmark`` for every suite, or name suites
+explicitly (``python -m expressionizer.benchmark hashing``).
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import math
+import itertools
+import json
+import pickle
+import random
+import sys
+import time
+import tracemalloc
+import types
+from collections import Counter
+from typing import Any, Callable
+
+import numpy as np
+
+from .expression import (
+    Derivative,
+    ExpressionBuilder,
+    FunctionCall,
+    Integral,
+    InternTable,
+    Power,
+    Product,
+    Sum,
+    Symbol,
+    numerical_sort_key,
+    sum as expression_sum,
+)
+from . import evaluator as evaluator_module
+from . import expression as expression_module
+from .evaluator import (
+    EvaluatorContext,
+    EvaluatorOptions,
+    _differentiate_once,
+    _substitute_symbol,
+    contains,
+    evaluate,
+    prepare,
+    replace_sub,
+    replace_symbols,
+)
+from . import codec
+from . import procedural as procedural_module
+from .dag import to_dag
+from .language_packs import supported_locales, supported_style_types
+from .localization import build_explanation_profile
+from .numeric import evaluate_numeric
+from .parser import Parser
+from .polynomial import expand, to_polynomial
+from .expression import product as expression_product
+from .render import render, render_latex
+from .result_cache import ResultCache
+from .procedural import (
+    FUNCTIONS,
+    ExpressionContext,
+    generate_random_expression,
+    seed_generation,
+)
+
+
+FUNCTIONS_BY_NAME = {function.name: function for function in FUNCTIONS}
+
+
+def _best_of(callable_: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        started_at = time.perf_counter()
+        callable_()
+        best = min(best, time.perf_counter() - started_at)
+    return best
+
+
+@contextlib.contextmanager
+def _uncached_hashing():
+    """Temporarily restore the original, recomputed-on-every-call node hashes."""
+
+    def product_hash(self):
+        return hash(tuple(sorted(self.factors, key=numerical_sort_key)))
+
+    def sum_hash(self):
+        return hash(tuple(sorted(self.terms, key=numerical_sort_key)))
+
+    def power_hash(self):
+        return hash((self.base, self.exponent))
+
+    def function_call_hash(self):
+        return hash(
+            (
+                self.function,
+                tuple(self.functional_arguments),
+                tuple(self.subscript_arguments),
+                tuple(self.superscript_arguments),
+            )
+        )
+
+    replacements = {
+        Product: product_hash,
+        Sum: sum_hash,
+        Power: power_hash,
+        FunctionCall: function_call_hash,
+    }
+    originals = {cls: cls.__dict__["__hash__"] for cls in replacements}
+    try:
+        for cls, replacement in replacements.items():
+            cls.__hash__ = replacement
+        yield
+    finally:
+        for cls, original in originals.items():
+            cls.__hash__ = original
+
+
+@contextlib.contextmanager
+def _uncached_metadata():
+    """Temporarily restore the full-walk ``_contains_symbol`` used before metadata caching."""
+
+    def contains_symbol(expr, variable):
+        match expr:
+            case Symbol():
+                return expr.name == variable.name
+            case Sum(children) | Product(children):
+                return any(contains_symbol(child, variable) for child in children)
+            case Power(base, exponent):
+                return contains_symbol(base, variable) or contains_symbol(
+                    exponent, variable
+                )
+            case FunctionCall(_, functional, subscript, superscript):
+                return any(
+                    contains_symbol(arg, variable)
+                    for arg in functional + subscript + superscript
+                )
+            case Derivative(inner, _):
+                return contains_symbol(inner, variable)
+            case Integral(inner, bound_variable, lower, upper):
+                if bound_variable.name == variable.name:
+                    return False
+                return any(
+                    contains_symbol(item, variable)
+                    for item in (inner, lower, upper)
+                    if item is not None
+                )
+        return False
+
+    original = evaluator_module._contains_symbol
+    evaluator_module._contains_symbol = contains_symbol
+    try:
+        yield
+    finally:
+        evaluator_module._contains_symbol = original
+
+
+@contextlib.contextmanager
+def _uncached_commutative():
+    """Temporarily recompute normalized child lists on every comparison, as before."""
+
+    def remove_sub_multiset(items, target_items):
+        pending = list(target_items)
+        leftover = []
+        for item in items:
+            for candidate in pending:
+                if item == candidate:
+                    pending.remove(candidate)
+                    break
+            else:
+                leftover.append(item)
+        return leftover, not pending
+
+    original_cached_slot = expression_module._cached_slot
+    original_remove = evaluator_module._remove_sub_multiset
+    expression_module._cached_slot = lambda node, slot, compute: compute()
+    evaluator_module._remove_sub_multiset = remove_sub_multiset
+    try:
+        yield
+    finally:
+        expression_module._cached_slot = original_cached_slot
+        evaluator_module._remove_sub_multiset = original_remove
+
+
+def _hashing_terms(size: int) -> list[Product]:
+    symbols = [Symbol(f"x_{i}") for i in range(50)]
+    return [
+        Product(
+            [
+                i % 7 + 2,
+                symbols[i % 50],
+                Power(Sum([symbols[(i * 7) % 50], i % 11 + 1]), i % 5 + 2),
+            ]
+        )
+        for i in range(size)
+    ]
+
+
+def _hashing_workload(size: int) -> None:
+    terms = _hashing_terms(size)
+    combined = expression_sum(terms)
+    combined = expression_sum(combined.terms + terms)
+    Counter(combined.terms)
+    Sum(terms[: size // 2]) in Sum(terms)
+
+
+def bench_distribution(args) -> list[dict[str, Any]]:
+    """Products of k binomials multiplied out first-sum vs pairwise, with trace sizes.
+
+    Binomials in one symbol collapse to k + 1 terms when like terms are
+    collected; binomials in distinct symbols expand to 2^k terms.
+    """
+    results = []
+    ceiling = 200
+    strategies = {
+        "first_sum": EvaluatorOptions(),
+        f"first_sum, {ceiling}-node ceiling": EvaluatorOptions(max_distribution_nodes=ceiling),
+        "pairwise": EvaluatorOptions(product_distribution="pairwise"),
+        f"pairwise, {ceiling}-node ceiling": EvaluatorOptions(
+            product_distribution="pairwise", max_distribution_nodes=ceiling
+        ),
+    }
+    for k in args.sizes or [4, 6, 8]:
+        families = {
+            "one symbol": Product([Sum([Symbol("x"), index + 1]) for index in range(k)]),
+            "distinct symbols": Product(
+                [Sum([Symbol(f"x_{index}"), index + 1]) for index in range(k)]
+            ),
+        }
+        for family, expression in families.items():
+            expected = to_polynomial(expression)
+            for name, options in strategies.items():
+                outcome = {}
+
+                def run():
+                    outcome["result"], outcome["context"] = evaluate(
+                        expression, {}, options=options
+                    )
+
+                seconds = _best_of(run, args.repeat)
+                context = outcome["context"]
+                results.append(
+                    {
+                        "suite": "distribution",
+                        "case": f"{k} binomials in {family}, {name}",
+                        "seconds": round(seconds, 6),
+                        "snapshots": len(context.snapshots),
+                        "trace_chars": len(context.render()),
+                        "correct": to_polynomial(outcome["result"]) == expected,
+                    }
+                )
+    return results
+
+
+def bench_hashing(args) -> list[dict[str, Any]]:
+    """Dict-heavy construction of large sums with cached vs recomputed hashes."""
+    results = []
+    for size in args.sizes or [10_000]:
+        with _uncached_hashing():
+            before = _best_of(lambda: _hashing_workload(size), args.repeat)
+        after = _best_of(lambda: _hashing_workload(size), args.repeat)
+        results.append(
+            {
+                "suite": "hashing",
+                "case": f"sum of {size} terms",
+                "uncached_seconds": round(before, 6),
+                "cached_seconds": round(after, 6),
+                "speedup": round(before / after, 2) if after else None,
+            }
+        )
+    return results
+
+
+def _commutative_workloads(size: int) -> dict[str, Callable[[], Any]]:
+    terms = _hashing_terms(size)
+    factors = [Power(term.factors[2].base, i % 5 + 2) for i, term in enumerate(terms)]
+    left = Product(factors)
+    right = Product(
+        [Power(term.factors[2].base, i % 5 + 2) for i, term in enumerate(_hashing_terms(size))]
+    )
+    half_product = Product(factors[: size // 2])
+    whole_sum, half_sum = Sum(terms), Sum(terms[::2])
+    return {
+        "product ==": lambda: [left == right for _ in range(20)],
+        "sub-product in": lambda: [half_product in left for _ in range(20)],
+        "sub-sum in": lambda: [half_sum in whole_sum for _ in range(20)],
+        "replace_sub sub-sum": lambda: replace_sub(whole_sum, half_sum, Symbol("s")),
+    }
+
+
+def bench_commutative(args) -> list[dict[str, Any]]:
+    """Equality, sub-multiset checks and sub-sum replacement on 1k+ children."""
+    results = []
+    for size in args.sizes or [1_000, 5_000]:
+        with _uncached_commutative():
+            before = {
+                name: _best_of(workload, args.repeat)
+                for name, workload in _commutative_workloads(size).items()
+            }
+        after = {
+            name: _best_of(workload, args.repeat)
+            for name, workload in _commutative_workloads(size).items()
+        }
+        for name in before:
+            results.append(
+                {
+                    "suite": "commutative",
+                    "case": f"{name} with {size} children",
+                    "uncached_seconds": round(before[name], 6),
+                    "cached_seconds": round(after[name], 6),
+                    "speedup": (
+                        round(before[name] / after[name], 2) if after[name] else None
+                    ),
+                }
+            )
+    return results
+
+
+def _nested_chain(size: int) -> Any:
+    x = Symbol("x")
+    sin = FUNCTIONS_BY_NAME["sin"]
+    expression: Any = x
+    for i in range(size):
+        expression = FunctionCall(sin, [Sum([Product([i % 3 + 2, expression]), 1])])
+    return expression
+
+
+def bench_metadata(args) -> list[dict[str, Any]]:
+    """Chain-rule differentiation of nested calls with cached vs walked symbol checks."""
+    results = []
+    x = Symbol("x")
+    for size in args.sizes or [20, 40, 80]:
+        with _uncached_metadata():
+            before = _best_of(
+                lambda: _differentiate_once(_nested_chain(size), x), args.repeat
+            )
+        after = _best_of(lambda: _differentiate_once(_nested_chain(size), x), args.repeat)
+        results.append(
+            {
+                "suite": "metadata",
+                "case": f"d/dx of {size} nested calls",
+                "walk_seconds": round(before, 6),
+                "cached_seconds": round(after, 6),
+                "speedup": round(before / after, 2) if after else None,
+            }
+        )
+    return results
+
+
+def _generated_corpus(size: int, seed: int = 1337) -> list[Any]:
+    seed_generation(seed)
+    return [
+        generate_random_expression(
+            max_depth=4,
+            allow_calculus=True,
+            complexity=0.5,
+            context=ExpressionContext(),
+        )
+        for _ in range(size)
+    ]
+
+
+def _retained_bytes(build: Callable[[], Any]) -> tuple[int, Any]:
+    tracemalloc.start()
+    try:
+        retained = build()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return current, retained
+
+
+def bench_interning(args) -> list[dict[str, Any]]:
+    """Memory retained by a generated corpus with and without hash-consing."""
+    results = []
+    for size in args.sizes or [2_000]:
+        plain_bytes, _ = _retained_bytes(lambda: _generated_corpus(size))
+        table = InternTable()
+        interned_bytes, corpus = _retained_bytes(
+            lambda: [table.intern_tree(expr) for expr in _generated_corpus(size)]
+        )
+        stats = table.stats()
+        results.append(
+            {
+                "suite": "interning",
+                "case": f"{size} generated expressions",
+                "plain_bytes": plain_bytes,
+                "interned_bytes": interned_bytes,
+                "shared_nodes": stats["size"],
+                "hit_rate": round(stats["hit_rate"], 3),
+            }
+        )
+        del corpus
+    return results
+
+
+def _count_nodes(expression: Any) -> int:
+    count = 0
+    stack = [expression]
+    while stack:
+        node = stack.pop()
+        count += 1
+        match node:
+            case Power(base, exponent):
+                stack.extend((base, exponent))
+            case Product(factors):
+                stack.extend(factors)
+            case Sum(terms):
+                stack.extend(terms)
+            case FunctionCall(_, functional, subscript, superscript):
+                stack.extend(functional + subscript + superscript)
+            case Derivative(inner, _):
+                stack.append(inner)
+            case Integral(inner, _, lower, upper):
+                stack.extend(
+                    item for item in (inner, lower, upper) if item is not None
+                )
+    return count
+
+
+def bench_memory(args) -> list[dict[str, Any]]:
+    """Bytes per tree node and tracemalloc peak per verbose evaluation."""
+    results = []
+    for size in args.sizes or [10_000]:
+        retained, terms = _retained_bytes(lambda: _hashing_terms(size))
+        nodes = _count_nodes(Sum(terms))
+        results.append(
+            {
+                "suite": "memory",
+                "case": f"tree of {nodes} nodes",
+                "bytes_per_node": round(retained / nodes, 1),
+            }
+        )
+        del terms
+
+    seed_generation(2024)
+    cases = []
+    for _ in range(args.cases):
+        context = ExpressionContext()
+        expression = generate_random_expression(
+            max_depth=4, allow_calculus=True, complexity=0.5, context=context
+        )
+        substitutions = context.substitutions.copy()
+        substitutions.update(FUNCTIONS)
+        cases.append((expression, substitutions))
+
+    peaks = []
+    retained_sizes = []
+    snapshot_counts = []
+    tracemalloc.start()
+    try:
+        for expression, substitutions in cases:
+            baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            _, context = evaluate(expression, substitutions, error_on_invalid_snap=False)
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - baseline)
+            retained_sizes.append(current - baseline)
+            snapshot_counts.append(len(context.snapshots))
+            del context
+    finally:
+        tracemalloc.stop()
+    peaks.sort()
+    results.append(
+        {
+            "suite": "memory",
+            "case": f"{len(cases)} generated evaluations",
+            "median_peak_bytes": peaks[len(peaks) // 2],
+            "max_peak_bytes": peaks[-1],
+            "mean_retained_bytes": round(sum(retained_sizes) / len(cases)),
+            "mean_snapshots": round(sum(snapshot_counts) / len(cases), 1),
+        }
+    )
+    return results
+
+
+def _linear_chain(depth: int) -> Any:
+    # ``2(...) - 1`` nested ``depth`` times; evaluates to 1 at x = 1.
+    expression: Any = Symbol("x")
+    for _ in range(depth):
+        expression = Sum([Product([2, expression]), -1])
+    return expression
+
+
+# Every explained step rescans the whole tree, so evaluation time grows
+# quadratically with depth; deeper chains only time the walkers.
+TRAVERSAL_EVALUATE_MAX_DEPTH = 200
+
+
+def bench_traversal(args) -> list[dict[str, Any]]:
+    """Tree walkers on deep chains under the default recursion limit."""
+    results = []
+    x, y = Symbol("x"), Symbol("y")
+    for depth in args.sizes or [50, 500, 5_000]:
+        chain = _linear_chain(depth)
+        context = EvaluatorContext(chain, {"x": 1})
+        walkers: dict[str, Callable[[], Any]] = {
+            "render": lambda: render(chain),
+            "render_latex": lambda: render_latex(chain),
+            "contains": lambda: contains(chain, x),
+            "replace_sub": lambda: replace_sub(chain, x, y),
+            "replace_symbols": lambda: replace_symbols(chain, context),
+            "substitute_symbol": lambda: _substitute_symbol(chain, x, 1),
+        }
+        if depth <= TRAVERSAL_EVALUATE_MAX_DEPTH:
+            walkers["evaluate"] = lambda: evaluate(
+                chain, {"x": 1}, error_on_invalid_snap=False
+            )
+        nodes = chain.node_count
+        for name, walker in walkers.items():
+            try:
+                seconds = _best_of(walker, args.repeat)
+            except RecursionError:
+                seconds = None
+            results.append(
+                {
+                    "suite": "traversal",
+                    "case": f"{name} depth {depth}",
+                    "seconds": round(seconds, 6) if seconds is not None else None,
+                    "us_per_node": (
+                        round(seconds / nodes * 1e6, 3) if seconds is not None else None
+                    ),
+                    "recursion_limit": sys.getrecursionlimit(),
+                }
+            )
+    return results
+
+
+def _repeated_corpus(
+    cases: int, copies: int, seed: int = 2024, in_derivatives: bool = False
+) -> list[Any]:
+    # Each generated expression appears ``copies`` times, scaled differently;
+    # with ``in_derivatives`` each copy sits in its own derivative body.
+    seed_generation(seed)
+    t = Symbol("t")
+    corpus = []
+    for _ in range(cases):
+        context = ExpressionContext()
+        base = generate_random_expression(
+            max_depth=3, allow_calculus=False, complexity=0.4, context=context
+        )
+        if in_derivatives:
+            repeated = Sum(
+                [
+                    Derivative(Product([base, Power(t, index + 1)]), [(t, 1)])
+                    for index in range(copies)
+                ]
+            )
+        else:
+            repeated = Sum([Product([base, index + 2]) for index in range(copies)])
+        corpus.append((repeated, dict(context.substitutions)))
+    return corpus
+
+
+def _evaluate_corpus(corpus: list[Any], options: EvaluatorOptions) -> dict[str, int]:
+    totals = Counter()
+    for expression, substitutions in corpus:
+        _, context = evaluate(
+            expression, substitutions, error_on_invalid_snap=False, options=options
+        )
+        totals["snapshots"] += len(context.snapshots)
+        totals["invalid_snaps"] += context.error_count
+    return totals
+
+
+def bench_dag(args) -> list[dict[str, Any]]:
+    """Evaluation of repeated subtrees with and without common-subexpression sharing."""
+    results = []
+    cases = max(1, args.cases // 10)
+    for in_derivatives, copies in itertools.product(
+        (False, True), args.sizes or [2, 4, 8]
+    ):
+        corpus = _repeated_corpus(cases, copies, in_derivatives=in_derivatives)
+        stats = Counter()
+        for expression, _ in corpus:
+            stats.update(to_dag(expression).stats())
+        plain_options = EvaluatorOptions()
+        shared_options = EvaluatorOptions(share_common_subexpressions=True)
+        plain = _best_of(lambda: _evaluate_corpus(corpus, plain_options), args.repeat)
+        shared = _best_of(lambda: _evaluate_corpus(corpus, shared_options), args.repeat)
+        plain_totals = _evaluate_corpus(corpus, plain_options)
+        shared_totals = _evaluate_corpus(corpus, shared_options)
+        results.append(
+            {
+                "suite": "dag",
+                "case": f"{cases} expressions x {copies} copies"
+                + (" in derivative bodies" if in_derivatives else ""),
+                "tree_nodes": stats["tree_nodes"],
+                "unique_nodes": stats["unique_nodes"],
+                "plain_seconds": round(plain, 6),
+                "shared_seconds": round(shared, 6),
+                "speedup": round(plain / shared, 2) if shared else None,
+                "plain_snapshots": plain_totals["snapshots"],
+                "shared_snapshots": shared_totals["snapshots"],
+                "plain_invalid_snaps": plain_totals["invalid_snaps"],
+                "shared_invalid_snaps": shared_totals["invalid_snaps"],
+            }
+        )
+    return results
+
+
+@contextlib.contextmanager
+def _explained_generator():
+    """Temporarily make the generator's ``evaluate`` calls explain every step."""
+
+    def explained(*args, explain=False, **kwargs):
+        return evaluate(*args, **kwargs)
+
+    procedural_module.evaluate = explained
+    try:
+        yield
+    finally:
+        procedural_module.evaluate = evaluate
+
+
+def bench_answer(args) -> list[dict[str, Any]]:
+    """Answer-only evaluation (``explain=False``) vs full explanations."""
+    results = []
+    for profile in ("realistic", "stress"):
+        def generate():
+            seed_generation(1337)
+            return [
+                generate_random_expression(
+                    max_depth=4,
+                    allow_calculus=True,
+                    complexity=0.5,
+                    generation_profile=profile,
+                    context=ExpressionContext(),
+                )
+                for _ in range(args.cases)
+            ]
+
+        with _explained_generator():
+            explained = _best_of(generate, args.repeat)
+            explained_corpus = generate()
+        answer_only = _best_of(generate, args.repeat)
+        results.append(
+            {
+                "suite": "answer",
+                "case": f"generate {args.cases} {profile} expressions",
+                "explained_seconds": round(explained, 6),
+                "answer_only_seconds": round(answer_only, 6),
+                "speedup": round(explained / answer_only, 2) if answer_only else None,
+                "same_expressions": explained_corpus == generate(),
+            }
+        )
+
+    corpus = []
+    seed_generation(2024)
+    for _ in range(args.cases):
+        context = ExpressionContext()
+        expression = generate_random_expression(
+            max_depth=4, allow_calculus=True, complexity=0.5, context=context
+        )
+        substitutions = context.substitutions.copy()
+        substitutions.update(FUNCTIONS)
+        corpus.append((expression, substitutions))
+
+    def evaluate_all(explain):
+        outcomes = []
+        for expression, substitutions in corpus:
+            result, context = evaluate(
+                expression, substitutions, error_on_invalid_snap=False, explain=explain
+            )
+            outcomes.append((result, context.solve_status, context.reason_code))
+        return outcomes
+
+    explained = _best_of(lambda: evaluate_all(True), args.repeat)
+    answer_only = _best_of(lambda: evaluate_all(False), args.repeat)
+    results.append(
+        {
+            "suite": "answer",
+            "case": f"evaluate {args.cases} generated expressions",
+            "explained_seconds": round(explained, 6),
+            "answer_only_seconds": round(answer_only, 6),
+            "speedup": round(explained / answer_only, 2) if answer_only else None,
+            "same_outcomes": evaluate_all(True) == evaluate_all(False),
+        }
+    )
+    return results
+
+
+@contextlib.contextmanager
+def _eager_wording():
+    """Temporarily format every explanation when it is recorded, as before wording was deferred."""
+    original_init = EvaluatorContext.__init__
+    original_format = evaluator_module._format_explanation
+
+    def eager_init(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        self.defer_wording = False
+
+    def eager_format(explanation, snapshot):
+        fields = {
+            "snapshot": render_latex(snapshot.full_tree),
+            "previous": render_latex(snapshot.previous_tree),
+            "original": render_latex(snapshot.original),
+            "simplified": render_latex(snapshot.portion),
+        }
+        try:
+            return explanation.format(**fields)
+        except (KeyError, ValueError, IndexError):
+            return explanation
+
+    EvaluatorContext.__init__ = eager_init
+    evaluator_module._format_explanation = eager_format
+    try:
+        yield
+    finally:
+        EvaluatorContext.__init__ = original_init
+        evaluator_module._format_explanation = original_format
+
+
+def _decimal_products(size: int) -> Sum:
+    # Each product is approximated and explained, so every step carries text
+    # that refers to trees of ``size`` terms.
+    return Sum(
+        [
+            Product([0.123456789 + index * 1e-9, 1234.567 + index])
+            for index in range(size)
+        ]
+    )
+
+
+def bench_wording(args) -> list[dict[str, Any]]:
+    """Deferred vs eager explanation wording, with and without rendering."""
+    corpus = []
+    seed_generation(2024)
+    for _ in range(args.cases):
+        context = ExpressionContext()
+        expression = generate_random_expression(
+            max_depth=4, allow_calculus=True, complexity=0.5, context=context
+        )
+        substitutions = context.substitutions.copy()
+        substitutions.update(FUNCTIONS)
+        corpus.append((expression, substitutions))
+    workloads = [(f"{args.cases} generated expressions", corpus)]
+    for size in args.sizes or [20, 40, 80]:
+        workloads.append((f"{size} decimal products", [(_decimal_products(size), {})]))
+
+    results = []
+    for name, cases in workloads:
+        def evaluate_all(rendered):
+            texts = []
+            for expression, substitutions in cases:
+                _, context = evaluate(expression, substitutions, error_on_invalid_snap=False)
+                if rendered:
+                    texts.append(context.render())
+            return texts
+
+        for rendered in (False, True):
+            with _eager_wording():
+                eager = _best_of(lambda: evaluate_all(rendered), args.repeat)
+                eager_texts = evaluate_all(True)
+            lazy = _best_of(lambda: evaluate_all(rendered), args.repeat)
+            results.append(
+                {
+                    "suite": "wording",
+                    "case": f"evaluate {name}" + (" and render" if rendered else ""),
+                    "eager_seconds": round(eager, 6),
+                    "lazy_seconds": round(lazy, 6),
+                    "speedup": round(eager / lazy, 2) if lazy else None,
+                    "same_render": eager_texts == evaluate_all(True),
+                }
+            )
+    return results
+
+
+def bench_locales(args) -> list[dict[str, Any]]:
+    """One evaluation rendered for every profile vs one evaluation per profile."""
+    profiles = [
+        build_explanation_profile(locale=locale, style_type=style_type)
+        for locale in supported_locales()
+        for style_type in supported_style_types()
+    ]
+    corpus = []
+    seed_generation(2024)
+    for _ in range(args.cases):
+        context = ExpressionContext()
+        expression = generate_random_expression(
+            max_depth=4, allow_calculus=True, complexity=0.5, context=context
+        )
+        substitutions = context.substitutions.copy()
+        substitutions.update(FUNCTIONS)
+        corpus.append((expression, substitutions))
+
+    def evaluate_per_profile():
+        texts = []
+        for expression, substitutions in corpus:
+            for profile in profiles:
+                _, context = evaluate(
+                    expression,
+                    substitutions,
+                    error_on_invalid_snap=False,
+                    options=EvaluatorOptions(explanation_profile=profile),
+                )
+                texts.append(context.render())
+        return texts
+
+    def render_per_profile():
+        texts = []
+        for expression, substitutions in corpus:
+            _, context = evaluate(expression, substitutions, error_on_invalid_snap=False)
+            for profile in profiles:
+                texts.append(context.render(profile=profile))
+        return texts
+
+    per_profile = _best_of(evaluate_per_profile, args.repeat)
+    shared = _best_of(render_per_profile, args.repeat)
+    return [
+        {
+            "suite": "locales",
+            "case": f"{args.cases} generated expressions x {len(profiles)} profiles",
+            "evaluate_per_profile_seconds": round(per_profile, 6),
+            "render_per_profile_seconds": round(shared, 6),
+            "speedup": round(per_profile / shared, 2) if shared else None,
+            "same_render": evaluate_per_profile() == render_per_profile(),
+        }
+    ]
+
+
+@contextlib.contextmanager
+def _content_addressed_snaps():
+    """Temporarily make every snap search the whole tree, as before paths were tracked."""
+    original = EvaluatorContext.locate
+    EvaluatorContext.locate = lambda self, expression: None
+    try:
+        yield
+    finally:
+        EvaluatorContext.locate = original
+
+
+def _wide_sum(size: int) -> Sum:
+    # Every term multiplies out a small numeric coefficient, so each term's
+    # snaps land in a tree of ``size`` terms.
+    x = Symbol("x")
+    return Sum(
+        [Product([i % 9 + 2, i % 7 + 3, Power(x, i % 50 + 1)]) for i in range(size)]
+    )
+
+
+def bench_snap(args) -> list[dict[str, Any]]:
+    """Evaluation with path-addressed snaps vs whole-tree search per snap."""
+    results = []
+    for size in args.sizes or [100, 200, 400]:
+        expression = _wide_sum(size)
+        workload = lambda: evaluate(expression, error_on_invalid_snap=False)
+        path_seconds = _best_of(workload, args.repeat)
+        with _content_addressed_snaps():
+            search_seconds = _best_of(workload, args.repeat)
+        _, context = workload()
+        results.append(
+            {
+                "suite": "snap",
+                "case": f"sum of {size} terms",
+                "tree_nodes": expression.node_count,
+                "snapshots": len(context.snapshots),
+                "path_seconds": round(path_seconds, 6),
+                "search_seconds": round(search_seconds, 6),
+                "speedup": round(search_seconds / path_seconds, 2) if path_seconds else None,
+            }
+        )
+    return results
+
+
+@contextlib.contextmanager
+def _unindexed_containment():
+    """Temporarily answer every containment query by walking the tree."""
+    occurrences = EvaluatorContext.occurrences
+    render_contains = EvaluatorContext._render_contains
+    EvaluatorContext.occurrences = lambda self, target: contains(
+        self.current_tree, target
+    )
+    EvaluatorContext._render_contains = lambda self, tree, target: contains(
+        tree, target
+    )
+    try:
+        yield
+    finally:
+        EvaluatorContext.occurrences = occurrences
+        EvaluatorContext._render_contains = render_contains
+
+
+def _evaluate_and_render(corpus: list[Any]) -> list[Any]:
+    contexts = []
+    for expression, substitutions in corpus:
+        _, context = evaluate(expression, substitutions, error_on_invalid_snap=False)
+        context.render()
+        context.render_document()
+        contexts.append(context)
+    return contexts
+
+
+def bench_index(args) -> list[dict[str, Any]]:
+    """Containment queries from the subtree index vs walking the tree."""
+    results = []
+    corpus = []
+    seed_generation(11)
+    for _ in range(args.cases):
+        context = ExpressionContext()
+        expression = generate_random_expression(
+            max_depth=4, allow_calculus=True, complexity=0.6, context=context
+        )
+        substitutions = dict(context.substitutions)
+        substitutions.update(FUNCTIONS_BY_NAME)
+        corpus.append((expression, substitutions))
+    indexed = _best_of(lambda: _evaluate_and_render(corpus), args.repeat)
+    with _unindexed_containment():
+        walked = _best_of(lambda: _evaluate_and_render(corpus), args.repeat)
+    stats = Counter()
+    for context in _evaluate_and_render(corpus):
+        stats.update(context.index_stats())
+    results.append(
+        {
+            "suite": "index",
+            "case": f"evaluate + render + render_document, {len(corpus)} generated expressions",
+            "indexed_seconds": round(indexed, 6),
+            "walked_seconds": round(walked, 6),
+            "speedup": round(walked / indexed, 2) if indexed else None,
+            "index_hits": stats["hits"],
+            "index_misses": stats["misses"],
+            "render_hits": stats["render_hits"],
+            "render_misses": stats["render_misses"],
+        }
+    )
+    # Without path tracking every snap asks the index whether its original
+    # is in the tree.
+    for size in args.sizes or [100, 200, 400]:
+        expression = _wide_sum(size)
+        workload = lambda: evaluate(expression, error_on_invalid_snap=False)
+        with _content_addressed_snaps():
+            indexed = _best_of(workload, args.repeat)
+            _, context = workload()
+            with _unindexed_containment():
+                walked = _best_of(workload, args.repeat)
+        stats = context.index_stats()
+        results.append(
+            {
+                "suite": "index",
+                "case": f"content-addressed snaps, sum of {size} terms",
+                "indexed_seconds": round(indexed, 6),
+                "walked_seconds": round(walked, 6),
+                "speedup": round(walked / indexed, 2) if indexed else None,
+                "index_hits": stats["hits"],
+                "index_misses": stats["misses"],
+                "index_visited": stats["visited"],
+            }
+        )
+    return results
+
+
+@contextlib.contextmanager
+def _eager_blocks():
+    """Temporarily rewrite every open block's trees on each snap, as before handles."""
+    log_rewrite = EvaluatorContext._log_rewrite
+
+    def rewrite_open_blocks(self, path, original, simplified):
+        rewrite = evaluator_module._Rewrite(path, original, simplified)
+        for block in self.blocks:
+            if rewrite.reaches(block.path):
+                for index, tree in enumerate(block.trees):
+                    block[index] = replace_sub(tree, original, simplified)
+
+    EvaluatorContext._log_rewrite = rewrite_open_blocks
+    try:
+        yield
+    finally:
+        EvaluatorContext._log_rewrite = log_rewrite
+
+
+def _nested_calls(depth: int) -> Any:
+    # ``floor(floor(...(x + 0.5)... + 1.5) + 1.5)``: every level keeps three
+    # argument blocks open while the levels below it are evaluated.
+    floor = FUNCTIONS_BY_NAME["floor"]
+    expression: Any = Sum([Symbol("x"), 0.5])
+    for _ in range(depth):
+        expression = Sum([FunctionCall(floor, [expression]), 1.5])
+    return expression
+
+
+def bench_blocks(args) -> list[dict[str, Any]]:
+    """Evaluation of nested function calls with lazy vs eagerly rewritten blocks."""
+    results = []
+    modes = {
+        "path-addressed snaps": contextlib.nullcontext,
+        "content-addressed snaps": _content_addressed_snaps,
+    }
+    for depth in args.sizes or [25, 50, 100]:
+        expression = _nested_calls(depth)
+        substitutions = {"x": 2, **FUNCTIONS}
+        workload = lambda: evaluate(
+            expression, substitutions, error_on_invalid_snap=False
+        )
+        for mode, snaps in modes.items():
+            with snaps():
+                lazy = _best_of(workload, args.repeat)
+                with _eager_blocks():
+                    eager = _best_of(workload, args.repeat)
+                _, context = workload()
+            snapshots = len(context.snapshots)
+            results.append(
+                {
+                    "suite": "blocks",
+                    "case": f"nested calls depth {depth}, {mode}",
+                    "snapshots": snapshots,
+                    "lazy_seconds": round(lazy, 6),
+                    "eager_seconds": round(eager, 6),
+                    "lazy_us_per_snapshot": round(lazy / snapshots * 1e6, 2),
+                    "eager_us_per_snapshot": round(eager / snapshots * 1e6, 2),
+                }
+            )
+    return results
+
+
+def _reachable_bytes(root: Any) -> int:
+    # ``sys.getsizeof`` summed over every distinct object reachable from
+    # ``root``; unlike tracemalloc this is cheap enough for long traces.
+    seen = set()
+    stack = [root]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(
+            obj, (type, types.ModuleType, types.FunctionType)
+        ):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return total
+
+
+@contextlib.contextmanager
+def _full_tree_snapshots():
+    """Temporarily store both trees in every snapshot, as before delta encoding."""
+    delta = evaluator_module.Snapshot.__dict__["_delta"]
+
+    def full_trees(cls, trace, original, portion, previous, full, *args, **kwargs):
+        return cls(original, portion, previous, full, *args, **kwargs)
+
+    evaluator_module.Snapshot._delta = classmethod(full_trees)
+    try:
+        yield
+    finally:
+        evaluator_module.Snapshot._delta = delta
+
+
+def bench_trace(args) -> list[dict[str, Any]]:
+    """Memory retained by long snapshot traces, delta-encoded vs full trees."""
+    results = []
+    for size in args.sizes or [100, 200, 400]:
+        expression = _wide_sum(size)
+        _, context = evaluate(expression, {"x": 2})
+        snapshots = context.snapshots
+        del context
+        delta_bytes = _reachable_bytes(snapshots)
+        deltas = [
+            snapshot
+            for snapshot in snapshots[1:]
+            if isinstance(snapshot, evaluator_module.Snapshot)
+        ]
+        checkpoints = sum(
+            1 for snapshot in deltas if snapshot._previous_tree is not None
+        )
+        # Drop the memoized trees so every ``full_tree`` is replayed.
+        for snapshot in deltas:
+            expression_module._set_slot(snapshot, "_full_tree", None)
+        start = time.perf_counter()
+        for snapshot in reversed(deltas):
+            snapshot.full_tree
+        replay = time.perf_counter() - start
+        with _full_tree_snapshots():
+            _, context = evaluate(expression, {"x": 2})
+        full_bytes = _reachable_bytes(context.snapshots)
+        del context
+        results.append(
+            {
+                "suite": "trace",
+                "case": f"wide sum of {size} terms",
+                "snapshots": len(snapshots),
+                "checkpoints": checkpoints,
+                "delta_bytes": delta_bytes,
+                "full_tree_bytes": full_bytes,
+                "delta_bytes_per_snapshot": round(delta_bytes / len(snapshots)),
+                "full_tree_bytes_per_snapshot": round(full_bytes / len(snapshots)),
+                "replay_us_per_snapshot": round(replay / len(snapshots) * 1e6, 2),
+            }
+        )
+    return results
+
+
+def _stream_dump(corpus: list[Any]) -> bytes:
+    buffer = io.BytesIO()
+    codec.ExpressionWriter(buffer).write_all(corpus)
+    return buffer.getvalue()
+
+
+def _stream_load(data: bytes) -> list[Any]:
+    return list(codec.ExpressionReader(io.BytesIO(data)))
+
+
+def bench_cache(args) -> list[dict[str, Any]]:
+    """Repeated evaluate + render_document calls through a ResultCache vs uncached."""
+    results = []
+    for repeats in args.sizes or [1, 5, 20]:
+        seed_generation(2024)
+        problems = []
+        for _ in range(max(1, args.cases // repeats)):
+            context = ExpressionContext()
+            expression = generate_random_expression(
+                max_depth=4, allow_calculus=True, complexity=0.5, context=context
+            )
+            substitutions = context.substitutions.copy()
+            substitutions.update(FUNCTIONS)
+            problems.append((expression, substitutions))
+        # Interleave the repeats, as traffic from many students would.
+        traffic = [
+            problems[(index * 7) % len(problems)] for index in range(len(problems) * repeats)
+        ]
+
+        def uncached():
+            documents = []
+            for expression, substitutions in traffic:
+                _, context = evaluate(expression, substitutions, error_on_invalid_snap=False)
+                documents.append(context.render_document())
+            return documents
+
+        def cached():
+            cache = ResultCache()
+            documents = [
+                cache.evaluate(expression, substitutions, error_on_invalid_snap=False).document
+                for expression, substitutions in traffic
+            ]
+            return documents, cache
+
+        plain = _best_of(uncached, args.repeat)
+        with_cache = _best_of(cached, args.repeat)
+        documents, cache = cached()
+        results.append(
+            {
+                "suite": "cache",
+                "case": f"{len(traffic)} calls, {len(problems)} problems x {repeats}",
+                "uncached_seconds": round(plain, 6),
+                "cached_seconds": round(with_cache, 6),
+                "speedup": round(plain / with_cache, 2) if with_cache else None,
+                "hit_rate": round(cache.stats()["hit_rate"], 3),
+                "cache_bytes": cache.bytes,
+                "same_documents": documents == uncached(),
+            }
+        )
+    return results
+
+
+def bench_codec(args) -> list[dict[str, Any]]:
+    """Size and throughput of the binary codec against pickle, one record per tree."""
+    results = []
+    for size in args.sizes or [2_000]:
+        corpus = _generated_corpus(size)
+        formats: dict[str, tuple[Callable[[], Any], Callable[[Any], Any]]] = {
+            "pickle": (
+                lambda: [pickle.dumps(expr, pickle.HIGHEST_PROTOCOL) for expr in corpus],
+                lambda blobs: [pickle.loads(blob) for blob in blobs],
+            ),
+            "codec": (
+                lambda: [codec.dumps(expr) for expr in corpus],
+                lambda blobs: [codec.loads(blob) for blob in blobs],
+            ),
+            "codec stream": (
+                lambda: [_stream_dump(corpus)],
+                lambda blobs: _stream_load(blobs[0]),
+            ),
+        }
+        pickle_bytes = None
+        for name, (dump, load) in formats.items():
+            blobs = dump()
+            total = sum(len(blob) for blob in blobs)
+            pickle_bytes = pickle_bytes or total
+            encode = _best_of(dump, args.repeat)
+            decode = _best_of(lambda: load(blobs), args.repeat)
+            results.append(
+                {
+                    "suite": "codec",
+                    "case": f"{name}, {size} generated expressions",
+                    "bytes": total,
+                    "bytes_per_tree": round(total / size, 1),
+                    "vs_pickle_size": round(total / pickle_bytes, 3),
+                    "encode_mb_per_s": round(total / encode / 1e6, 2) if encode else None,
+                    "decode_mb_per_s": round(total / decode / 1e6, 2) if decode else None,
+                    "encode_trees_per_s": round(size / encode) if encode else None,
+                    "decode_trees_per_s": round(size / decode) if decode else None,
+                }
+            )
+    return results
+
+
+def bench_parser(args) -> list[dict[str, Any]]:
+    """Lines per second for tokenizing and parsing ``render()`` output."""
+    results = []
+    parser = Parser()
+    for size in args.sizes or [2_000]:
+        lines = [render(expr) for expr in _generated_corpus(size)]
+        characters = sum(len(line) for line in lines)
+        tokenize = _best_of(lambda: [parser.tokenize(line) for line in lines], args.repeat)
+        parse = _best_of(lambda: list(parser.parse_lines(lines, errors="none")), args.repeat)
+        parsed = list(parser.parse_lines(lines, errors="none"))
+        results.append(
+            {
+                "suite": "parser",
+                "case": f"{size} rendered expressions",
+                "characters": characters,
+                "tokenize_lines_per_s": round(size / tokenize) if tokenize else None,
+                "parse_lines_per_s": round(size / parse) if parse else None,
+                "parse_mb_per_s": round(characters / parse / 1e6, 3) if parse else None,
+                "round_trips": sum(
+                    1
+                    for line, expr in zip(lines, parsed)
+                    if expr is not None and render(expr) == line
+                ),
+            }
+        )
+    return results
+
+
+def _tree_expand(factors: list[Any]) -> list[Any]:
+    """Distribute with tree helpers, grouping like terms the way Stage 4 does."""
+    terms: list[Any] = [1]
+    for factor in factors:
+        grouped: dict[Any, list] = {}
+        for left in terms:
+            for right in factor.terms:
+                coefficient, variable_part = evaluator_module._get_term_parts(
+                    expression_product([left, right])
+                )
+                entry = grouped.setdefault(variable_part, [0, variable_part])
+                entry[0] += coefficient
+        terms = [
+            expression_product([coefficient, variable_part])
+            for coefficient, variable_part in grouped.values()
+            if coefficient != 0
+        ]
+    return terms
+
+
+@contextlib.contextmanager
+def _two_pass_constructors():
+    """Temporarily restore the two-pass ``product`` that rounds after every multiply."""
+    clean = expression_module._clean_numeric
+    power = expression_module.power
+
+    def product(factors):
+        expanded_factors = []
+        coefficient = 1
+        for factor in factors:
+            if isinstance(factor, (int, float)):
+                coefficient = clean(coefficient * factor)
+                if coefficient == 0:
+                    return 0
+            elif isinstance(factor, Product):
+                expanded_factors.extend(factor.factors)
+            else:
+                expanded_factors.append(factor)
+        powers: dict = {}
+        others: dict = {}
+        for factor in expanded_factors:
+            if isinstance(factor, (int, float)):
+                coefficient = clean(coefficient * factor)
+                if coefficient == 0:
+                    return 0
+            elif isinstance(factor, Symbol):
+                powers[factor] = powers.get(factor, 0) + 1
+            elif isinstance(factor, Power):
+                powers[factor.base] = powers.get(factor.base, 0) + factor.exponent
+            else:
+                others[factor] = others.get(factor, 0) + 1
+        coefficient = clean(coefficient)
+        new_factors = [coefficient] if coefficient != 1 else []
+        new_factors += [power(base, exponent) for base, exponent in powers.items()]
+        new_factors += [power(factor, count) for factor, count in others.items()]
+        if not new_factors:
+            return coefficient
+        return new_factors[0] if len(new_factors) == 1 else Product(new_factors)
+
+    original = expression_module.product
+    expression_module.product = product
+    try:
+        yield
+    finally:
+        expression_module.product = original
+
+
+def _polynomial_terms(size: int) -> list[Any]:
+    x, y = Symbol("x"), Symbol("y")
+    return [
+        Product([(i % 9 + 1) * 0.5, Power(x, i % 40 + 1), Power(y, i // 40 + 1)])
+        for i in range(size)
+    ]
+
+
+def _builder_workloads(size: int) -> dict[str, Callable[[], Any]]:
+    terms = _polynomial_terms(size)
+    factors = [0.1 * (i % 7 + 1) if i % 3 else Symbol(f"x_{i % 50}") for i in range(size)]
+
+    def add_in_loop():
+        expression = terms[0]
+        for term in terms[1:]:
+            expression = expression + term
+        return expression
+
+    def build_sum():
+        builder = ExpressionBuilder()
+        for term in terms:
+            builder.add_term(term)
+        return builder.build()
+
+    def build_product():
+        builder = ExpressionBuilder()
+        for factor in factors:
+            builder.mul_factor(factor)
+        return builder.build()
+
+    return {
+        "+ in a loop": add_in_loop,
+        "sum(terms)": lambda: expression_sum(terms),
+        "ExpressionBuilder.add_term": build_sum,
+        "product(factors)": lambda: expression_module.product(factors),
+        "ExpressionBuilder.mul_factor": build_product,
+    }
+
+
+def bench_budget(args) -> list[dict[str, Any]]:
+    """Latency of long evaluations under ``deadline_seconds`` and ``max_snapshots``."""
+    results = []
+    rng = random.Random(1)
+    for terms in args.sizes or [200, 600]:
+        expression = Sum(
+            [
+                Product([round(rng.uniform(1, 99), 3), round(rng.uniform(1, 99), 2)])
+                for _ in range(terms)
+            ]
+        )
+        budgets = {
+            "unbounded": EvaluatorOptions(),
+            "deadline 0.05s": EvaluatorOptions(deadline_seconds=0.05),
+            "deadline 0.2s": EvaluatorOptions(deadline_seconds=0.2),
+            "1000 snapshots": EvaluatorOptions(max_snapshots=1000),
+        }
+        for name, options in budgets.items():
+            outcome = {}
+
+            def run():
+                outcome["context"] = evaluate(expression, {}, options=options)[1]
+
+            seconds = _best_of(run, args.repeat)
+            context = outcome["context"]
+            results.append(
+                {
+                    "suite": "budget",
+                    "case": f"{terms}-term decimal sum, {name}",
+                    "seconds": round(seconds, 6),
+                    "overshoot_seconds": round(seconds - options.deadline_seconds, 6)
+                    if options.deadline_seconds is not None
+                    else None,
+                    "snapshots": len(context.snapshots),
+                    "solve_status": context.solve_status,
+                    "reason_code": context.reason_code,
+                }
+            )
+    return results
+
+
+def bench_builder(args) -> list[dict[str, Any]]:
+    """Building large sums and products term by term and in one call."""
+    results = []
+    for size in args.sizes or [500, 2_000]:
+        workloads = _builder_workloads(size)
+        with _two_pass_constructors():
+            two_pass_product = _best_of(workloads["product(factors)"], args.repeat)
+        for name, workload in workloads.items():
+            seconds = _best_of(workload, args.repeat)
+            row = {
+                "suite": "builder",
+                "case": f"{name}, {size} items",
+                "seconds": round(seconds, 6),
+                "items_per_s": round(size / seconds) if seconds else None,
+            }
+            if name == "product(factors)":
+                row["two_pass_seconds"] = round(two_pass_product, 6)
+            results.append(row)
+    return results
+
+
+def bench_polynomial(args) -> list[dict[str, Any]]:
+    """Expanding products of binomials with ``Polynomial`` against tree rebuilding."""
+    results = []
+    x, y = Symbol("x"), Symbol("y")
+    for size in args.sizes or [8, 16, 32]:
+        factors = [Sum([x, Product([i % 5 + 1, y]), i - size // 2]) for i in range(size)]
+        expression = Product(factors)
+        tree = _best_of(lambda: _tree_expand(factors), args.repeat)
+        polynomial = _best_of(lambda: expand(expression), args.repeat)
+        results.append(
+            {
+                "suite": "polynomial",
+                "case": f"product of {size} trinomials in x, y",
+                "terms": len(to_polynomial(expression)),
+                "tree_seconds": round(tree, 6),
+                "polynomial_seconds": round(polynomial, 6),
+                "speedup": round(tree / polynomial, 2) if polynomial else None,
+            }
+        )
+    return results
+
+
+def bench_prepare(args) -> list[dict[str, Any]]:
+    """One expression evaluated with many substitution sets: ``prepare`` vs ``evaluate``."""
+    results = []
+    x, y, t = Symbol("x"), Symbol("y"), Symbol("t")
+    templates = {
+        "calculus template": (
+            Sum(
+                [
+                    Product([x, Derivative(Product([Power(t, 3), Sum([t, 4])]), [(t, 1)])]),
+                    Product([y, Integral(Product([2, t]), t, 0, 1)]),
+                    Derivative(Product([Power(t, 2), y]), [(t, 1)]),
+                ]
+            ),
+            {"x": 0, "y": 0},
+        )
+    }
+    seed_generation(2024)
+    for index in range(5):
+        context = ExpressionContext()
+        expression = generate_random_expression(
+            max_depth=4, allow_calculus=True, complexity=0.5, context=context
+        )
+        templates[f"generated template {index}"] = (expression, context.substitutions)
+    for count in args.sizes or [100, 1000]:
+        rng = random.Random(count)
+        for name, (expression, names) in templates.items():
+            substitution_sets = [
+                {key: rng.randint(1, 20) for key in names} for _ in range(count)
+            ]
+
+            def plain():
+                return [
+                    evaluate(expression, substitutions, error_on_invalid_snap=False)
+                    for substitutions in substitution_sets
+                ]
+
+            def prepared():
+                once = prepare(expression)
+                return [
+                    once.evaluate(substitutions, error_on_invalid_snap=False)
+                    for substitutions in substitution_sets
+                ]
+
+            plain_seconds = _best_of(plain, args.repeat)
+            prepared_seconds = _best_of(prepared, args.repeat)
+            results.append(
+                {
+                    "suite": "prepare",
+                    "case": f"{name} x {count} substitution sets",
+                    "plain_seconds": round(plain_seconds, 6),
+                    "prepared_seconds": round(prepared_seconds, 6),
+                    "speedup": round(plain_seconds / prepared_seconds, 2)
+                    if prepared_seconds
+                    else None,
+                    "same_steps": [context.render() for _, context in plain()]
+                    == [context.render() for _, context in prepared()],
+                }
+            )
+    return results
+
+
+def bench_numeric(args) -> list[dict[str, Any]]:
+    """Values over large grids: ``evaluate_numeric`` vs a loop over ``evaluate``.
+
+    The loop is timed on the first ``--cases`` points and scaled to the full
+    grid.
+    """
+    results = []
+    x, y, t = Symbol("x"), Symbol("y"), Symbol("t")
+    sin, ln, sqrt, erf = (FUNCTIONS_BY_NAME[name] for name in ("sin", "ln", "sqrt", "erf"))
+    cases = {
+        "polynomial and trig": Sum(
+            [
+                Product([3, Power(x, 3)]),
+                Product([-2, x, y]),
+                FunctionCall(sin, [Product([2, x])]),
+                7,
+            ]
+        ),
+        "rational with domain errors": Sum(
+            [
+                Power(Sum([x, -1]), -1),
+                FunctionCall(ln, [x]),
+                FunctionCall(sqrt, [Sum([y, -0.5])]),
+            ]
+        ),
+        "derivative and definite integral": Sum(
+            [
+                Derivative(Product([Power(x, 2), FunctionCall(sin, [x])]), [(x, 1)]),
+                Integral(Product([y, Power(t, 2)]), t, 0, x),
+            ]
+        ),
+        "scalar fallback (erf)": FunctionCall(erf, [Product([x, y])]),
+    }
+    for size in args.sizes or [1_000_000]:
+        sample_size = min(size, args.cases)
+        rng = np.random.default_rng(size)
+        grid = {"x": rng.uniform(-2, 2, size), "y": rng.uniform(-2, 2, size)}
+        for name, expression in cases.items():
+            vectorized = _best_of(lambda: evaluate_numeric(expression, grid), args.repeat)
+            outcome = evaluate_numeric(expression, grid)
+            sample = [
+                {"x": float(grid["x"][index]), "y": float(grid["y"][index]), **FUNCTIONS}
+                for index in range(sample_size)
+            ]
+
+            def loop():
+                values = []
+                for substitutions in sample:
+                    try:
+                        result, _ = evaluate(
+                            expression, substitutions, error_on_invalid_snap=False, explain=False
+                        )
+                    except Exception:
+                        result = None
+                    values.append(result)
+                return values
+
+            loop_seconds = _best_of(loop, args.repeat) * size / sample_size
+            difference = max(
+                (
+                    abs(value - float(outcome.values[index]))
+                    for index, value in enumerate(loop())
+                    if isinstance(value, (int, float))
+                    and math.isfinite(value)
+                    and outcome.errors[index] == 0
+                ),
+                default=0.0,
+            )
+            results.append(
+                {
+                    "suite": "numeric",
+                    "case": f"{name} x {size} points",
+                    "numeric_seconds": round(vectorized, 6),
+                    "points_per_second": round(size / vectorized) if vectorized else None,
+                    "loop_seconds_estimated": round(loop_seconds, 3),
+                    "speedup": round(loop_seconds / vectorized, 1) if vectorized else None,
+                    "errors": outcome.error_counts(),
+                    "max_sample_difference": difference,
+                }
+            )
+    return results
+
+
+SUITES: dict[str, Callable[[Any], list[dict[str, Any]]]] = {
+    "answer": bench_answer,
+    "blocks": bench_blocks,
+    "budget": bench_budget,
+    "builder": bench_builder,
+    "cache": bench_cache,
+    "codec": bench_codec,
+    "commutative": bench_commutative,
+    "dag": bench_dag,
+    "distribution": bench_distribution,
+    "hashing": bench_hashing,
+    "index": bench_index,
+    "interning": bench_interning,
+    "locales": bench_locales,
+    "memory": bench_memory,
+    "metadata": bench_metadata,
+    "numeric": bench_numeric,
+    "parser": bench_parser,
+    "polynomial": bench_polynomial,
+    "prepare": bench_prepare,
+    "snap": bench_snap,
+    "trace": bench_trace,
+    "traversal": bench_traversal,
+    "wording": bench_wording,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run micro-benchmarks for expressionizer hot paths."
+    )
+    parser.add_argument(
+        "suites",
+        nargs="*",
+        help=f"Suites to run (default: all). Available: {', '.join(sorted(SUITES))}.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Repetitions per measurement; the best time is reported.",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=lambda s: [int(p.strip()) for p in s.split(",") if p.strip()],
+        default=None,
+        help="Comma-separated problem sizes overriding each suite's defaults.",
+    )
+    parser.add_argument(
+        "--cases",
+        type=int,
+        default=200,
+        help="Generated problems per suite that samples evaluations.",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        default=False,
+        help="Emit one JSON object per result line instead of a table.",
+    )
+    args = parser.parse_args()
+    unknown = sorted(set(args.suites) - set(SUITES))
+    if unknown:
+        parser.error(f"Unknown suites: {', '.join(unknown)}")
+
+    for name in args.suites or sorted(SUITES):
+        for row in SUITES[name](args):
+            if args.json:
+                print(json.dumps(row, sort_keys=True))
+            else:
+                print("  ".join(f"{key}={value}" for key, value in row.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
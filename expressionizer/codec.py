@@ -0,0 +1,501 @@
+"""Compact, versioned binary serialization of expression trees.
+
+A payload starts with ``MAGIC`` and the format version, followed by values in
+prefix order: a tag byte, the tag's fixed fields, then child values.
+
+* Integers in ``0..127`` are a single tag byte; other integers are zigzag
+  varints. Floats and complex numbers are little-endian IEEE doubles.
+* Symbol names and functions go through per-payload tables: the first use
+  carries the definition, later uses are a varint reference.
+
+``dumps``/``loads`` handle one value. ``ExpressionWriter``/``ExpressionReader``
+stream many values through one file object; the tables are shared by every
+record of the stream, so repeated names are stored once.
+"""
+
+import struct
+from typing import Any, BinaryIO, Iterator, Optional
+
+from .expression import (
+    Derivative,
+    Equation,
+    FunctionCall,
+    InEquality,
+    Integral,
+    MathFunction,
+    Power,
+    Product,
+    Sum,
+    Symbol,
+    SystemOfEquations,
+    _intern,
+)
+
+MAGIC = b"EXZ"
+VERSION = 1
+
+_TAG_NONE = 0x00
+_TAG_FALSE = 0x01
+_TAG_TRUE = 0x02
+_TAG_INT = 0x03
+_TAG_FLOAT = 0x04
+_TAG_COMPLEX = 0x05
+_TAG_SYMBOL = 0x10
+_TAG_FUNCTION = 0x11
+_TAG_POWER = 0x12
+_TAG_PRODUCT = 0x13
+_TAG_SUM = 0x14
+_TAG_CALL = 0x15
+_TAG_DERIVATIVE = 0x16
+_TAG_INTEGRAL = 0x17
+_TAG_EQUATION = 0x20
+_TAG_INEQUALITY = 0x21
+_TAG_SYSTEM = 0x22
+# Tags 0x80-0xFF are the integers 0-127.
+_SMALL_INT = 0x80
+
+_DOUBLE = struct.Struct("<d")
+_COMPLEX = struct.Struct("<dd")
+
+
+class CodecError(ValueError):
+    """Raised for payloads that are truncated, corrupt or from a newer version."""
+
+
+def _write_uvarint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _write_svarint(out: bytearray, value: int) -> None:
+    _write_uvarint(out, (value << 1) if value >= 0 else ((-value << 1) - 1))
+
+
+def _write_optional(out: bytearray, value: Optional[int]) -> None:
+    _write_uvarint(out, 0 if value is None else value + 1)
+
+
+class _Tables:
+    """String and function tables shared by the records of one payload or stream."""
+
+    __slots__ = ("strings", "functions")
+
+    def __init__(self):
+        self.strings: dict[str, int] = {}
+        self.functions: dict[tuple, int] = {}
+
+    def write_string(self, out: bytearray, text: str) -> None:
+        index = self.strings.get(text)
+        if index is not None:
+            _write_uvarint(out, index)
+            return
+        index = len(self.strings)
+        self.strings[text] = index
+        _write_uvarint(out, index)
+        data = text.encode("utf-8", "surrogatepass")
+        _write_uvarint(out, len(data))
+        out += data
+
+    def write_function(self, out: bytearray, function: MathFunction) -> None:
+        # Functions compare by name and arity only, so key on every field.
+        key = (
+            function.name,
+            function.functional_parameters,
+            function.subscript_parameters,
+            function.superscript_parameters,
+            function.functional_min_parameters,
+            function.subscript_min_parameters,
+            function.superscript_min_parameters,
+        )
+        index = self.functions.get(key)
+        if index is not None:
+            _write_uvarint(out, index)
+            return
+        index = len(self.functions)
+        self.functions[key] = index
+        _write_uvarint(out, index)
+        self.write_string(out, function.name)
+        for count in key[1:4]:
+            _write_uvarint(out, count)
+        for minimum in key[4:]:
+            _write_optional(out, minimum)
+
+
+def _encode(out: bytearray, value: Any, tables: _Tables) -> None:
+    # Prefix order on an explicit stack, so tree depth is not limited by the
+    # recursion limit.
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        kind = type(item)
+        if kind is int:
+            if 0 <= item < 0x80:
+                out.append(_SMALL_INT | item)
+            else:
+                out.append(_TAG_INT)
+                _write_svarint(out, item)
+        elif kind is float:
+            out.append(_TAG_FLOAT)
+            out += _DOUBLE.pack(item)
+        elif kind is Symbol:
+            out.append(_TAG_SYMBOL)
+            tables.write_string(out, item.name)
+        elif kind is Product or kind is Sum:
+            children = item.factors if kind is Product else item.terms
+            out.append(_TAG_PRODUCT if kind is Product else _TAG_SUM)
+            _write_uvarint(out, len(children))
+            stack.extend(reversed(children))
+        elif kind is Power:
+            out.append(_TAG_POWER)
+            stack.append(item.exponent)
+            stack.append(item.base)
+        elif kind is FunctionCall:
+            out.append(_TAG_CALL)
+            tables.write_function(out, item.function)
+            _write_uvarint(out, len(item.functional_arguments))
+            _write_uvarint(out, len(item.subscript_arguments))
+            _write_uvarint(out, len(item.superscript_arguments))
+            stack.extend(reversed(item.superscript_arguments))
+            stack.extend(reversed(item.subscript_arguments))
+            stack.extend(reversed(item.functional_arguments))
+        elif kind is Derivative:
+            out.append(_TAG_DERIVATIVE)
+            _write_uvarint(out, len(item.variables))
+            for variable, order in reversed(item.variables):
+                stack.append(order)
+                stack.append(variable)
+            stack.append(item.expression)
+        elif kind is Integral:
+            out.append(_TAG_INTEGRAL)
+            stack.append(item.upper)
+            stack.append(item.lower)
+            stack.append(item.variable)
+            stack.append(item.expression)
+        elif item is None:
+            out.append(_TAG_NONE)
+        elif kind is bool:
+            out.append(_TAG_TRUE if item else _TAG_FALSE)
+        elif kind is complex:
+            out.append(_TAG_COMPLEX)
+            out += _COMPLEX.pack(item.real, item.imag)
+        elif kind is MathFunction:
+            out.append(_TAG_FUNCTION)
+            tables.write_function(out, item)
+        elif kind is Equation:
+            out.append(_TAG_EQUATION)
+            _write_uvarint(out, len(item.expressions))
+            stack.extend(reversed(item.expressions))
+        elif kind is InEquality:
+            out.append(_TAG_INEQUALITY)
+            _write_svarint(out, item.sign)
+            out.append(1 if item.inclusive else 0)
+            stack.append(item.expression2)
+            stack.append(item.expression1)
+        elif kind is SystemOfEquations:
+            out.append(_TAG_SYSTEM)
+            _write_uvarint(out, len(item.equations))
+            stack.extend(reversed(item.equations))
+        else:
+            raise TypeError(f"Cannot encode {kind.__name__} values.")
+
+
+class _Decoder:
+    __slots__ = ("data", "position", "strings", "functions")
+
+    def __init__(self):
+        self.data = b""
+        self.position = 0
+        self.strings: list[str] = []
+        self.functions: list[MathFunction] = []
+
+    def read_byte(self) -> int:
+        try:
+            byte = self.data[self.position]
+        except IndexError:
+            raise CodecError("Truncated payload.") from None
+        self.position += 1
+        return byte
+
+    def read_bytes(self, size: int) -> bytes:
+        end = self.position + size
+        if end > len(self.data):
+            raise CodecError("Truncated payload.")
+        chunk = self.data[self.position : end]
+        self.position = end
+        return chunk
+
+    def read_uvarint(self) -> int:
+        value = 0
+        shift = 0
+        while True:
+            byte = self.read_byte()
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def read_svarint(self) -> int:
+        raw = self.read_uvarint()
+        return (raw >> 1) if not raw & 1 else -((raw + 1) >> 1)
+
+    def read_optional(self) -> Optional[int]:
+        raw = self.read_uvarint()
+        return None if raw == 0 else raw - 1
+
+    def read_string(self) -> str:
+        index = self.read_uvarint()
+        if index < len(self.strings):
+            return self.strings[index]
+        if index != len(self.strings):
+            raise CodecError(f"String reference {index} is not defined.")
+        raw = self.read_bytes(self.read_uvarint())
+        try:
+            text = raw.decode("utf-8", "surrogatepass")
+        except UnicodeDecodeError as e:
+            raise CodecError("String is not valid UTF-8.") from e
+        self.strings.append(text)
+        return text
+
+    def read_function(self) -> MathFunction:
+        index = self.read_uvarint()
+        if index < len(self.functions):
+            return self.functions[index]
+        if index != len(self.functions):
+            raise CodecError(f"Function reference {index} is not defined.")
+        name = self.read_string()
+        counts = [self.read_uvarint() for _ in range(3)]
+        minimums = [self.read_optional() for _ in range(3)]
+        function = _intern(MathFunction(name, *counts, *minimums))
+        self.functions.append(function)
+        return function
+
+    def decode(self) -> Any:
+        # Composite values wait on the stack as [tag, fields, needed, children]
+        # until ``needed`` children have been decoded.
+        stack: list[list] = []
+        while True:
+            tag = self.read_byte()
+            if tag >= _SMALL_INT:
+                value = tag - _SMALL_INT
+            elif tag == _TAG_INT:
+                value = self.read_svarint()
+            elif tag == _TAG_FLOAT:
+                value = _DOUBLE.unpack(self.read_bytes(8))[0]
+            elif tag == _TAG_SYMBOL:
+                value = _intern(Symbol(self.read_string()))
+            elif tag == _TAG_NONE:
+                value = None
+            elif tag == _TAG_FALSE or tag == _TAG_TRUE:
+                value = tag == _TAG_TRUE
+            elif tag == _TAG_COMPLEX:
+                real, imag = _COMPLEX.unpack(self.read_bytes(16))
+                value = complex(real, imag)
+            elif tag == _TAG_FUNCTION:
+                value = self.read_function()
+            else:
+                value = self._open(tag, stack)
+            while value is not _OPEN:
+                if not stack:
+                    return value
+                frame = stack[-1]
+                frame[3].append(value)
+                if len(frame[3]) < frame[2]:
+                    break
+                stack.pop()
+                value = _build(frame[0], frame[1], frame[3])
+
+    def _open(self, tag: int, stack: list[list]) -> Any:
+        fields: Any = None
+        if tag == _TAG_PRODUCT or tag == _TAG_SUM or tag == _TAG_EQUATION or tag == _TAG_SYSTEM:
+            needed = self.read_uvarint()
+        elif tag == _TAG_POWER:
+            needed = 2
+        elif tag == _TAG_CALL:
+            fields = (self.read_function(), self.read_uvarint(), self.read_uvarint())
+            needed = fields[1] + fields[2] + self.read_uvarint()
+        elif tag == _TAG_DERIVATIVE:
+            fields = self.read_uvarint()
+            needed = 1 + 2 * fields
+        elif tag == _TAG_INTEGRAL:
+            needed = 4
+        elif tag == _TAG_INEQUALITY:
+            fields = (self.read_svarint(), self.read_byte() == 1)
+            needed = 2
+        else:
+            raise CodecError(f"Unknown tag 0x{tag:02x}.")
+        if needed == 0:
+            return _build(tag, fields, [])
+        stack.append([tag, fields, needed, []])
+        return _OPEN
+
+
+_OPEN = object()
+
+
+def _build(tag: int, fields: Any, children: list) -> Any:
+    if tag == _TAG_SUM:
+        return _intern(Sum(children))
+    if tag == _TAG_PRODUCT:
+        return _intern(Product(children))
+    if tag == _TAG_POWER:
+        return _intern(Power(children[0], children[1]))
+    if tag == _TAG_CALL:
+        function, functional, subscript = fields
+        return _intern(
+            FunctionCall(
+                function,
+                children[:functional],
+                children[functional : functional + subscript],
+                children[functional + subscript :],
+            )
+        )
+    if tag == _TAG_DERIVATIVE:
+        variables = [
+            (children[index], children[index + 1])
+            for index in range(1, len(children), 2)
+        ]
+        return _intern(Derivative(children[0], variables))
+    if tag == _TAG_INTEGRAL:
+        return _intern(Integral(*children))
+    if tag == _TAG_EQUATION:
+        return Equation(children)
+    if tag == _TAG_INEQUALITY:
+        return InEquality(children[0], children[1], *fields)
+    return SystemOfEquations(children)
+
+
+def _header() -> bytearray:
+    out = bytearray(MAGIC)
+    _write_uvarint(out, VERSION)
+    return out
+
+
+def _check_version(version: int) -> None:
+    if version > VERSION:
+        raise CodecError(
+            f"Payload uses codec version {version}; this build reads up to {VERSION}."
+        )
+
+
+def dumps(value: Any) -> bytes:
+    """Encode an expression, equation, inequality or system as bytes."""
+    out = _header()
+    _encode(out, value, _Tables())
+    return bytes(out)
+
+
+def loads(data: bytes) -> Any:
+    """Decode bytes produced by ``dumps``."""
+    data = bytes(data)
+    if data[: len(MAGIC)] != MAGIC:
+        raise CodecError("Not an expressionizer payload.")
+    decoder = _Decoder()
+    decoder.data = data
+    decoder.position = len(MAGIC)
+    _check_version(decoder.read_uvarint())
+    value = decoder.decode()
+    if decoder.position != len(data):
+        raise CodecError("Trailing bytes after payload.")
+    return value
+
+
+class ExpressionWriter:
+    """Append many values to a binary stream as length-prefixed records.
+
+    ``with ExpressionWriter(open(path, "wb")) as writer: writer.write(expr)``
+    """
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.count = 0
+        self._tables = _Tables()
+        self._started = False
+
+    def write(self, value: Any) -> None:
+        record = bytearray()
+        _encode(record, value, self._tables)
+        out = bytearray() if self._started else _header()
+        self._started = True
+        _write_uvarint(out, len(record))
+        out += record
+        self.stream.write(out)
+        self.count += 1
+
+    def write_all(self, values) -> None:
+        for value in values:
+            self.write(value)
+
+    def close(self) -> None:
+        if not self._started:
+            self.stream.write(_header())
+            self._started = True
+        self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ExpressionReader:
+    """Iterate over the values of a stream written by ``ExpressionWriter``."""
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self._decoder = _Decoder()
+        self._started = False
+
+    def _read_stream_uvarint(self, allow_eof: bool = False) -> Optional[int]:
+        value = 0
+        shift = 0
+        while True:
+            chunk = self.stream.read(1)
+            if not chunk:
+                if allow_eof and shift == 0:
+                    return None
+                raise CodecError("Truncated stream.")
+            byte = chunk[0]
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def read(self) -> Any:
+        """Return the next value, or raise ``EOFError`` at the end of the stream."""
+        if not self._started:
+            if self.stream.read(len(MAGIC)) != MAGIC:
+                raise CodecError("Not an expressionizer stream.")
+            _check_version(self._read_stream_uvarint())
+            self._started = True
+        size = self._read_stream_uvarint(allow_eof=True)
+        if size is None:
+            raise EOFError
+        record = self.stream.read(size)
+        if len(record) != size:
+            raise CodecError("Truncated stream.")
+        decoder = self._decoder
+        decoder.data = record
+        decoder.position = 0
+        value = decoder.decode()
+        if decoder.position != size:
+            raise CodecError("Trailing bytes in record.")
+        return value
+
+    def __iter__(self) -> Iterator[Any]:
+        while True:
+            try:
+                yield self.read()
+            except EOFError:
+                return
+
+    def close(self) -> None:
+        self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,187 @@
+"""Shared-node (DAG) view of an expression tree.
+
+Generated expressions often repeat a subtree several times. ``to_dag`` folds a
+tree into a table holding each structurally distinct subtree once, with the
+number of places that refer to it. The evaluator uses the table to compute a
+repeated subtree once and reuse the result (see
+``EvaluatorOptions.share_common_subexpressions``).
+"""
+
+from typing import Any
+
+from .expression import Numerical, fingerprint
+from .traversal import DESCEND, children, fold, iter_preorder
+
+
+class ExpressionDAG:
+    """Unique subtrees of one expression, children before parents.
+
+    * ``nodes[i]`` is the first occurrence of the ``i``-th distinct subtree.
+    * ``children[i]`` holds the ids of its direct subexpressions.
+    * ``refcounts[i]`` counts the references to it from other entries, plus one
+      for the root.
+    * ``root`` is the id of the whole expression.
+    """
+
+    __slots__ = ("nodes", "children", "refcounts", "fingerprints", "root", "_ids")
+
+    def __init__(self):
+        self.nodes: list[Numerical] = []
+        self.children: list[tuple[int, ...]] = []
+        self.refcounts: list[int] = []
+        self.fingerprints: list[bytes] = []
+        self.root: int = -1
+        self._ids: dict[bytes, int] = {}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def id_of(self, expression: Any) -> int:
+        """The id of a subtree, or ``-1`` when it is not part of the expression."""
+        return self._ids.get(fingerprint(expression), -1)
+
+    def shared(self) -> list[int]:
+        """Ids of the subtrees referenced from more than one place."""
+        return [i for i, count in enumerate(self.refcounts) if count > 1]
+
+    def shared_fingerprints(self) -> set[bytes]:
+        """Fingerprints of the repeated subtrees that have children of their own."""
+        return {
+            self.fingerprints[i]
+            for i in self.shared()
+            if len(self.children[i]) > 0
+        }
+
+    def to_tree(self) -> Numerical:
+        """Rebuild the expression so that repeated subtrees are the same object."""
+        built: list[Any] = []
+        for node, kids in zip(self.nodes, self.children):
+            if kids:
+                node = node._with_children([built[k] for k in kids])
+            built.append(node)
+        return built[self.root]
+
+    def stats(self) -> dict[str, int]:
+        tree_size = _tree_size(self)
+        return {
+            "tree_nodes": tree_size,
+            "unique_nodes": len(self.nodes),
+            "shared_nodes": len(self.shared()),
+            "saved_nodes": tree_size - len(self.nodes),
+        }
+
+
+class SubtreeIndex:
+    """Occurrence counts, by fingerprint, of every subtree of a changing tree.
+
+    ``update(tree)`` moves the index to a new version of the tree. Positions
+    where both versions hold the same object are skipped, so a rewrite that
+    rebuilt one path costs that path rather than the whole tree. Lookups are
+    dictionary reads; ``stats()`` reports how many found an occurrence.
+    """
+
+    __slots__ = ("tree", "counts", "nodes", "updates", "visited", "hits", "misses")
+
+    def __init__(self, tree: Numerical):
+        self.tree = tree
+        self.counts: dict[bytes, int] = {}
+        self.nodes = 0
+        self.updates = 0
+        self.visited = 0
+        self.hits = 0
+        self.misses = 0
+        self._add_subtree(tree, 1)
+
+    def occurrences(self, *values: Any) -> int:
+        """Total number of exact copies of ``values`` in the tree."""
+        counts = self.counts
+        total = 0
+        for value in values:
+            total += counts.get(fingerprint(value), 0)
+        if total:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return total
+
+    def update(self, tree: Numerical) -> None:
+        if tree is self.tree:
+            return
+        self.updates += 1
+        stack = [(self.tree, tree)]
+        while stack:
+            old, new = stack.pop()
+            if old is new:
+                continue
+            old_kids = children(old)
+            new_kids = children(new)
+            if old_kids and type(old) is type(new) and len(old_kids) == len(new_kids):
+                self._add_node(old, -1)
+                self._add_node(new, 1)
+                stack.extend(zip(old_kids, new_kids))
+            else:
+                self._add_subtree(old, -1)
+                self._add_subtree(new, 1)
+        self.tree = tree
+
+    def _add_subtree(self, tree: Numerical, sign: int) -> None:
+        for node in iter_preorder(tree):
+            self._add_node(node, sign)
+
+    def _add_node(self, node: Numerical, sign: int) -> None:
+        key = fingerprint(node)
+        count = self.counts.get(key, 0) + sign
+        if count:
+            self.counts[key] = count
+        else:
+            del self.counts[key]
+        self.nodes += sign
+        self.visited += 1
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.counts),
+            "nodes": self.nodes,
+            "updates": self.updates,
+            "visited": self.visited,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+def _tree_size(dag: ExpressionDAG) -> int:
+    sizes: list[int] = []
+    for kids in dag.children:
+        sizes.append(1 + sum(sizes[k] for k in kids))
+    return sizes[dag.root]
+
+
+def to_dag(expression: Numerical) -> ExpressionDAG:
+    """Fold ``expression`` into an ``ExpressionDAG``.
+
+    Subtrees are identified by ``fingerprint``, so ``2`` and ``2.0`` stay
+    distinct. A repeated subtree is only walked the first time it is seen.
+    """
+    dag = ExpressionDAG()
+
+    def enter(node):
+        existing = dag._ids.get(fingerprint(node))
+        if existing is None:
+            return DESCEND
+        dag.refcounts[existing] += 1
+        return existing
+
+    def combine(node, child_ids):
+        key = fingerprint(node)
+        node_id = len(dag.nodes)
+        dag._ids[key] = node_id
+        dag.nodes.append(node)
+        dag.children.append(tuple(child_ids))
+        dag.refcounts.append(1)
+        dag.fingerprints.append(key)
+        return node_id
+
+    dag.root = fold(expression, combine, enter)
+    return dag
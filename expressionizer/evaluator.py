@@ -1,10 +1,11 @@
 import builtins
-import inspect
 import json
 import math
 import sys
+import time
+from collections import Counter, deque
 from dataclasses import dataclass, field
-from typing import Any, Callable, Literal, Optional, Union
+from typing import Any, Callable, Hashable, Literal, Optional, Union
 
 from .expression import (
     FunctionCall,
@@ -17,26 +18,53 @@ from .expression import (
     Sum,
     Symbol,
     is_int_or_float,
+    math_function,
     numerical_sort_key,
     numerical_sort_key_reverse,
     power,
     product,
     sum,
     derivative,
+    fingerprint,
+    _ImmutableSlots,
+    _StructuralNode,
+    _set_slot,
 )
 from .number_format import to_trimmed_decimal_string
 from .localization import ExplanationProfile, Localizer
 from .render import render_latex, render_type
+from .dag import SubtreeIndex, to_dag
+from .polynomial import to_polynomial
+from .traversal import (
+    DESCEND,
+    SKIP,
+    children,
+    fold,
+    iter_postorder,
+    node_at,
+    replace_at,
+    rewrite,
+    trampoline,
+)
 
 
 class MathDomainError(ValueError):
     """Custom exception for math domain errors that stores the problematic expression."""
 
     def __init__(self, message, expression):
-        super().__init__(message)
+        super().__init__(str(message))
         self.expression = expression
 
 
+class EvaluationBudgetExceeded(Exception):
+    """Raised inside the evaluator when a budget set in ``EvaluatorOptions``
+    runs out; ``evaluate`` catches it and returns a partial result."""
+
+    def __init__(self, reason_code: str):
+        super().__init__(reason_code)
+        self.reason_code = reason_code
+
+
 from expressionizer.expression import (
     Product,
     Sum,
@@ -54,12 +82,6 @@ from expressionizer.expression import (
     derivative,
 )
 from expressionizer.render import render_latex, render_type
-import inspect
-
-
-def get_caller_line():
-
-    return frame.f_lineno, frame.f_code.co_filename
 
 
 def round_sig(x, sig=2):
@@ -90,7 +112,7 @@ class CalculatorModeOptions:
     concise_operation_templates: dict[str, str] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ExplanationEvent:
     rule_id: str
     category: str
@@ -101,6 +123,15 @@ class ExplanationEvent:
     quality_flags: list[str] = field(default_factory=list)
 
 
+@dataclass(frozen=True, slots=True)
+class CallSite:
+    """Where in the evaluator a snapshot was taken (see ``EvaluatorOptions.trace_hook``)."""
+
+    filename: str
+    lineno: int
+    function: str
+
+
 @dataclass
 class CalculusRule:
     rule_id: str
@@ -109,27 +140,212 @@ class CalculusRule:
     apply: Callable[[Numerical, Symbol], Numerical]
 
 
+class _Latex:
+    # A message payload value that is rendered with ``render_latex`` only when
+    # the message is formatted.
+    __slots__ = ("expression",)
+
+    def __init__(self, expression: Numerical):
+        self.expression = expression
+
+    def __format__(self, spec: str) -> str:
+        return format(render_latex(self.expression), spec)
+
+    def __str__(self) -> str:
+        return render_latex(self.expression)
+
+
+def _same_payload_value(a: Any, b: Any) -> bool:
+    # True only when both values certainly format to the same text.
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, _Latex):
+        a, b = a.expression, b.expression
+        if type(a) is not type(b):
+            return False
+    if isinstance(a, _StructuralNode):
+        return a is b or a.fingerprint == b.fingerprint
+    return a == b and repr(a) == repr(b)
+
+
+class _SeparatedList:
+    # A message payload value joined with the localizer's substitution
+    # separators when the message is formatted.
+    __slots__ = ("items",)
+
+    def __init__(self, items: list[str]):
+        self.items = items
+
+    def localize(self, localizer: Localizer) -> str:
+        items = self.items
+        separator_pair = localizer.template(
+            "substitution.separator_pair", " [[substitution.separator_pair]] "
+        )
+        separator_many = localizer.template(
+            "substitution.separator_many", " [[substitution.separator_many]] "
+        )
+        if len(items) <= 1:
+            return "".join(items)
+        if len(items) == 2:
+            return separator_pair.join(items)
+        return separator_many.join(items[:-1]) + separator_pair + items[-1]
+
+
+def _fill_template(template: str, payload: dict[str, Any]) -> str:
+    try:
+        return template.format(**payload)
+    except (KeyError, IndexError, ValueError, AttributeError):
+        return template
+
+
+class LazyMessage:
+    """Explanation text kept as the arguments of a ``wording`` call.
+
+    ``str(message)`` formats it the way ``wording`` formats eagerly and keeps
+    the text, so messages that are never rendered are never formatted.
+    ``localized(localizer)`` words the same message for another locale or
+    style. Adding a string before or after it gives another ``LazyMessage``.
+    """
+
+    __slots__ = ("localizer", "key", "template", "payload", "fill", "prefix", "suffix", "_text")
+
+    def __init__(
+        self,
+        localizer: Localizer,
+        key: str,
+        template: str,
+        payload: dict[str, Any],
+        fill: bool = True,
+        prefix: str = "",
+        suffix: str = "",
+    ):
+        self.localizer = localizer
+        self.key = key
+        # The code default, filled from ``payload`` before the localizer looks
+        # the key up when ``fill`` is set; templates from ``WordingOptions``
+        # are passed through as they are.
+        self.template = template
+        self.payload = payload
+        self.fill = fill
+        self.prefix = prefix
+        self.suffix = suffix
+        self._text = None
+
+    def __str__(self) -> str:
+        text = self._text
+        if text is None:
+            text = self._text = self._format(self.localizer)
+        return text
+
+    def localized(self, localizer: Localizer) -> str:
+        """The text as ``localizer`` words it."""
+        if localizer is self.localizer:
+            return str(self)
+        return self._format(localizer)
+
+    def _format(self, localizer: Localizer) -> str:
+        payload = self.payload
+        for name, value in payload.items():
+            if isinstance(value, _SeparatedList):
+                payload = {
+                    name: value.localize(localizer)
+                    if isinstance(value, _SeparatedList)
+                    else value
+                    for name, value in payload.items()
+                }
+                break
+        default = self.template
+        if self.fill and payload:
+            default = _fill_template(default, payload)
+        return self.prefix + localizer.format(self.key, default, payload) + self.suffix
+
+    def __format__(self, spec: str) -> str:
+        return format(str(self), spec)
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.prefix
+            or self.suffix
+            or self.localizer.template(self.key, self.template)
+        )
+
+    def _with(self, prefix: str, suffix: str) -> "LazyMessage":
+        return LazyMessage(
+            self.localizer, self.key, self.template, self.payload, self.fill, prefix, suffix
+        )
+
+    def __add__(self, other):
+        if not isinstance(other, str):
+            return NotImplemented
+        return self._with(self.prefix, self.suffix + other)
+
+    def __radd__(self, other):
+        if not isinstance(other, str):
+            return NotImplemented
+        return self._with(other + self.prefix, self.suffix)
+
+    def same_text(self, other: "LazyMessage") -> bool:
+        """Whether both messages certainly format to the same text."""
+        if self._text is not None and other._text is not None:
+            return self._text == other._text
+        return (
+            self.localizer is other.localizer
+            and self.key == other.key
+            and self.template == other.template
+            and self.fill == other.fill
+            and self.prefix == other.prefix
+            and self.suffix == other.suffix
+            and self.payload.keys() == other.payload.keys()
+            and all(
+                _same_payload_value(value, other.payload[name])
+                for name, value in self.payload.items()
+            )
+        )
+
+
 def wording(
     context: "EvaluatorContext",
     key: str,
     verbose: str,
     concise: Optional[str] = None,
     **kwargs,
-) -> str:
+) -> Union[str, LazyMessage]:
+    """Explanation text for ``key`` in the context's style and locale.
+
+    ``verbose`` and ``concise`` are ``str.format`` templates filled from
+    ``kwargs``; wrap trees in ``_Latex`` so they are only rendered if the
+    text is. The ``LazyMessage`` is already formatted when the localizer
+    collects diagnostics or raises on missing keys, which must happen at
+    call time.
+    """
+    if not context.explain:
+        return ""
     style = context.options.wording_style
     concise = concise if concise is not None else verbose
     template = verbose if style == "verbose" else concise
+    fill = True
     options = context.options.wording_options
     if options is not None:
         if style == "concise":
-            template = (
-                options.concise_templates.get(key)
-                or options.templates.get(key)
-                or template
-            )
-        else:
-            template = options.templates.get(key, template)
-    return context.localizer.format(key, template, kwargs)
+            override = options.concise_templates.get(key) or options.templates.get(key)
+            if override:
+                template, fill = override, False
+        elif key in options.templates:
+            template, fill = options.templates[key], False
+    return _message(context, key, template, kwargs, fill)
+
+
+def _message(
+    context: "EvaluatorContext",
+    key: str,
+    template: str,
+    payload: dict[str, Any],
+    fill: bool = True,
+) -> LazyMessage:
+    message = LazyMessage(context.localizer, key, template, payload, fill)
+    if not context.defer_wording:
+        str(message)
+    return message
 
 
 @dataclass
@@ -139,6 +355,14 @@ class EvaluatorOptions:
     slow_step_addition: bool = True
     expand_powers: bool = True
     expand_power_limit: Optional[int] = None
+    # How products of several sums are multiplied out: "first_sum" distributes
+    # over the first sum and evaluates the whole result again; "pairwise"
+    # multiplies the two sums with the fewest terms, collects like terms, and
+    # repeats. Polynomial products whose written-out distribution would exceed
+    # ``max_distribution_nodes`` (the full expansion for "first_sum", the next
+    # pairwise product for "pairwise") are expanded in one compact step.
+    product_distribution: Literal["first_sum", "pairwise"] = "first_sum"
+    max_distribution_nodes: Optional[int] = None
     max_precision: int = 5
     max_exponent: int = 100
     min_value: float = 1e-6
@@ -162,6 +386,24 @@ class EvaluatorOptions:
     order_of_magnitude_threshold: Optional[int] = 28
     calculator_mode: CalculatorModeOptions = field(default_factory=CalculatorModeOptions)
     explanation_profile: Optional[ExplanationProfile] = None
+    # Evaluate each repeated subtree once (see ``expressionizer.dag``) and reuse
+    # the result wherever it appears again.
+    share_common_subexpressions: bool = False
+    explain_shared_subexpressions: bool = True
+    # Called as ``trace_hook(call_site, original, simplified, timestamp)`` for
+    # every rewrite ``snap`` applies; ``timestamp`` is ``time.perf_counter()``.
+    # The caller's frame is only inspected when a hook is set.
+    trace_hook: Optional[
+        Callable[[CallSite, Numerical, Numerical, float], None]
+    ] = None
+    # Cooperative budgets, checked at every snap and every node evaluated;
+    # ``max_snapshots`` counts tree rewrites, not text steps. Running out stops
+    # the evaluation with ``solve_status="partial"`` and the tree reached so
+    # far as the result (see ``EvaluationBudgetExceeded``), with or without
+    # ``explain``.
+    max_snapshots: Optional[int] = None
+    max_tree_nodes: Optional[int] = None
+    deadline_seconds: Optional[float] = None
 
 
 def compact_evaluator_options(
@@ -247,7 +489,7 @@ def _format_calculator_message(
     expression: Numerical,
     result: Numerical,
     operands: Optional[list[int | float]] = None,
-) -> str:
+) -> Union[str, LazyMessage]:
     calculator = context.options.calculator_mode
     style = context.options.wording_style
     operation_templates = (
@@ -271,10 +513,12 @@ def _format_calculator_message(
     try:
         return template.format(**payload)
     except Exception:
-        return context.localizer.format(
+        return _message(
+            context,
             "calculator.fallback",
             "$$ {expression} = {result} $$",
             payload,
+            fill=False,
         )
 
 
@@ -329,13 +573,101 @@ def _should_use_calculator_for_power(
     return False
 
 
-class Snapshot:
+# A snapshot whose previous tree is the tree the snapshot before it produced
+# stores only its rewrite; every this many chained rewrites the previous tree
+# is kept instead, so materializing a tree replays a bounded number of them.
+SNAPSHOT_CHECKPOINT_INTERVAL = 64
+# Materialized trees each trace keeps memoized; older ones are dropped and
+# replayed again if asked for.
+SNAPSHOT_MEMO_SIZE = 8
+
+
+class _ExplanationFields(dict):
+    # ``str.format_map`` fields of a snap explanation; each tree is rendered
+    # only if the explanation refers to it.
+    def __init__(self, snapshot: "Snapshot"):
+        super().__init__()
+        self.snapshot = snapshot
+
+    def __missing__(self, name: str) -> str:
+        snapshot = self.snapshot
+        if name == "snapshot":
+            tree = snapshot.full_tree
+        elif name == "previous":
+            tree = snapshot.previous_tree
+        elif name == "original":
+            tree = snapshot.original
+        elif name == "simplified":
+            tree = snapshot.portion
+        else:
+            raise KeyError(name)
+        value = self[name] = render_latex(tree)
+        return value
+
+
+def _localized(text: Union[str, LazyMessage], localizer: Localizer) -> str:
+    if isinstance(text, LazyMessage):
+        return text.localized(localizer)
+    return text
+
+
+def _format_explanation(explanation: str, snapshot: "Snapshot") -> str:
+    try:
+        return explanation.format_map(_ExplanationFields(snapshot))
+    except (KeyError, ValueError, IndexError):
+        # Explanations often contain literal braces from LaTeX.
+        # If formatting fails, keep original text instead of crashing.
+        return explanation
+
+
+class _SnapshotTrace:
+    # Shared by the snapshots of one context: the newest recorded snapshot and
+    # its tree, the rewrites chained since the last checkpoint and the
+    # snapshots currently holding a memoized tree.
+    __slots__ = ("last", "last_tree", "chained", "memoized")
+
+    def __init__(self, snapshot: "Snapshot"):
+        self.last = snapshot
+        self.last_tree = snapshot.full_tree
+        self.chained = 0
+        self.memoized = deque()
+
+    def remember(self, snapshot: "Snapshot", tree: Numerical):
+        _set_slot(snapshot, "_full_tree", tree)
+        memoized = self.memoized
+        memoized.append(snapshot)
+        if len(memoized) > SNAPSHOT_MEMO_SIZE:
+            _set_slot(memoized.popleft(), "_full_tree", None)
+
+
+class Snapshot(_ImmutableSlots):
+    """One rewrite step: ``original`` became ``portion``.
+
+    Snapshots built by ``EvaluatorContext.snap`` are deltas: they keep the
+    rewrite and either the snapshot they follow or, at checkpoints, the
+    previous tree itself. ``previous_tree`` and ``full_tree`` are replayed
+    from there when read, and the last few are memoized.
+    """
+
+    __slots__ = (
+        "original",
+        "portion",
+        "approximate",
+        "path",
+        "_explanation",
+        "_localizer",
+        "_text",
+        "_base",
+        "_previous_tree",
+        "_full_tree",
+        "_trace",
+    )
     portion: Numerical
     original: Numerical
-    previous_tree: Numerical
-    full_tree: Numerical
-    explanation: Optional[str]
-    approximate: bool = False
+    approximate: bool
+    # Where in ``previous_tree`` the rewrite was applied; ``None`` when every
+    # occurrence of ``original`` was replaced.
+    path: Optional[tuple[int, ...]]
 
     def __init__(
         self,
@@ -345,13 +677,111 @@ class Snapshot:
         full_tree,
         explanation=None,
         approximate=False,
+        path=None,
     ):
-        self.original = original
-        self.portion = portion
-        self.previous_tree = previous_tree
-        self.full_tree = full_tree
-        self.explanation = explanation
-        self.approximate = approximate
+        _set_slot(self, "original", original)
+        _set_slot(self, "portion", portion)
+        _set_slot(self, "approximate", approximate)
+        _set_slot(self, "path", path)
+        _set_slot(self, "_explanation", explanation)
+        _set_slot(self, "_localizer", None)
+        _set_slot(self, "_text", None)
+        _set_slot(self, "_base", None)
+        _set_slot(self, "_previous_tree", previous_tree)
+        _set_slot(self, "_full_tree", full_tree)
+        _set_slot(self, "_trace", None)
+
+    @classmethod
+    def _delta(
+        cls,
+        trace: _SnapshotTrace,
+        original,
+        portion,
+        previous_tree,
+        full_tree,
+        explanation=None,
+        approximate=False,
+        path=None,
+        localizer: Optional[Localizer] = None,
+    ) -> "Snapshot":
+        # With a ``localizer``, ``explanation`` is a template (or
+        # ``LazyMessage``) formatted with the trees when it is first read;
+        # the template is kept so it can be worded for other localizers.
+        snapshot = cls(original, portion, None, None, explanation, approximate, path)
+        _set_slot(snapshot, "_localizer", localizer)
+        if (
+            previous_tree is trace.last_tree
+            and trace.chained < SNAPSHOT_CHECKPOINT_INTERVAL
+        ):
+            _set_slot(snapshot, "_base", trace.last)
+            trace.chained += 1
+        else:
+            _set_slot(snapshot, "_previous_tree", previous_tree)
+            trace.chained = 0
+        _set_slot(snapshot, "_trace", trace)
+        trace.remember(snapshot, full_tree)
+        trace.last = snapshot
+        trace.last_tree = full_tree
+        return snapshot
+
+    @property
+    def explanation(self) -> Optional[str]:
+        localizer = self._localizer
+        if localizer is None:
+            return self._explanation
+        text = self._text
+        if text is None:
+            text = localizer.transform_text(
+                _format_explanation(str(self._explanation), self)
+            )
+            _set_slot(self, "_text", text)
+        return text
+
+    def localized_explanation(self, localizer: Localizer) -> Optional[str]:
+        """``explanation`` as ``localizer`` words it."""
+        if self._localizer is None or localizer is self._localizer:
+            return self.explanation
+        return localizer.transform_text(
+            _format_explanation(_localized(self._explanation, localizer), self)
+        )
+
+    @property
+    def previous_tree(self) -> Numerical:
+        previous = self._previous_tree
+        if previous is None:
+            previous = self._base.full_tree
+        return previous
+
+    @property
+    def full_tree(self) -> Numerical:
+        tree = self._full_tree
+        if tree is None:
+            tree = self._materialize()
+        return tree
+
+    def _materialize(self) -> Numerical:
+        # Walk back to the nearest memoized tree or checkpoint, then replay
+        # forward, memoizing each tree on the way.
+        pending = []
+        snapshot = self
+        while snapshot._full_tree is None:
+            pending.append(snapshot)
+            if snapshot._previous_tree is not None:
+                break
+            snapshot = snapshot._base
+        tree = snapshot._full_tree
+        for snapshot in reversed(pending):
+            previous = snapshot._previous_tree
+            if previous is None:
+                previous = tree
+            if snapshot.path is not None:
+                tree = replace_sub_at(
+                    previous, snapshot.path, snapshot.original, snapshot.portion
+                )
+            else:
+                tree = replace_sub(previous, snapshot.original, snapshot.portion)
+            snapshot._trace.remember(snapshot, tree)
+        return tree
 
     def __eq__(self, other):
         if isinstance(other, Snapshot):
@@ -368,13 +798,49 @@ class Snapshot:
         return True
 
 
-class TextSnapshot:
-    text: str
+class TextSnapshot(_ImmutableSlots):
+    __slots__ = ("_text", "breakpoint", "_localizer", "_rendered")
     breakpoint: bool
 
-    def __init__(self, text: str, breakpoint: bool = False):
-        self.text = text
-        self.breakpoint = breakpoint
+    def __init__(
+        self,
+        text: Union[str, LazyMessage],
+        breakpoint: bool = False,
+        localizer: Optional[Localizer] = None,
+    ):
+        # With a ``localizer`` the text is formatted and transformed when it
+        # is first read, and kept as given for ``localized``.
+        _set_slot(self, "_text", text)
+        _set_slot(self, "breakpoint", breakpoint)
+        _set_slot(self, "_localizer", localizer)
+        _set_slot(self, "_rendered", None)
+
+    @property
+    def text(self) -> str:
+        localizer = self._localizer
+        if localizer is None:
+            return self._text
+        text = self._rendered
+        if text is None:
+            text = localizer.transform_text(str(self._text))
+            _set_slot(self, "_rendered", text)
+        return text
+
+    def localized(self, localizer: Localizer) -> str:
+        """``text`` as ``localizer`` words it."""
+        if self._localizer is None or localizer is self._localizer:
+            return self.text
+        return localizer.transform_text(_localized(self._text, localizer))
+
+    def same_text(self, other: "TextSnapshot") -> bool:
+        """Whether both snapshots certainly show the same text."""
+        if self._localizer is not other._localizer:
+            return False
+        if isinstance(self._text, str) and isinstance(other._text, str):
+            return self._text == other._text
+        if isinstance(self._text, LazyMessage) and isinstance(other._text, LazyMessage):
+            return self._text.same_text(other._text)
+        return False
 
     def __str__(self):
         return self.text
@@ -383,42 +849,195 @@ class TextSnapshot:
         return self.text
 
 
+class _Rewrite:
+    # One entry of ``EvaluatorContext.rewrites``: ``original`` became
+    # ``simplified`` inside the subtree at ``path`` (everywhere when ``None``).
+    __slots__ = ("path", "original", "simplified", "_negated")
+
+    def __init__(self, path, original, simplified):
+        self.path = path
+        self.original = original
+        self.simplified = simplified
+        self._negated = None
+
+    def reaches(self, block_path: Optional[tuple[int, ...]]) -> bool:
+        path = self.path
+        if path is None or block_path is None:
+            return True
+        return len(block_path) >= len(path) and block_path[: len(path)] == path
+
+    def apply(self, tree: Numerical) -> Numerical:
+        if isinstance(tree, _StructuralNode) and children(tree):
+            return replace_sub(tree, self.original, self.simplified)
+        # Leaves only match the original or its negation, as in ``replace_sub``.
+        if tree == self.original:
+            return self.simplified
+        if self._negated is None:
+            self._negated = (-self.original,)
+        if tree == self._negated[0]:
+            return -self.simplified
+        return tree
+
+
+class _SharedResult:
+    # One entry of ``EvaluatorContext.shared_results``: the result of a subtree
+    # and what its evaluation did to the context that computed it, so a reuse
+    # in another context of the same evaluation can apply the same status.
+    # ``snapshots[start:end]`` are the steps of that first evaluation.
+    __slots__ = ("result", "context", "start", "end", "status", "approximate", "tags")
+
+    def __init__(self, result, context, start, end, status, approximate, tags):
+        self.result = result
+        self.context = context
+        self.start = start
+        self.end = end
+        self.status = status
+        self.approximate = approximate
+        self.tags = tags
+
+
+# Steps recorded while a prepared subtree is evaluated (``_Replay.ops``).
+_SNAP, _ENTER, _LEAVE, _EVENT, _STATUS, _TAG = range(6)
+
+
+class _Replay:
+    # One entry of ``PreparedExpression.replays``: the result of a subtree and
+    # the calls its evaluation made on the context. ``root`` is the subtree's
+    # path when it was recorded; the recorded paths are rebased on replay.
+    __slots__ = ("result", "ops", "root", "pinned")
+
+    def __init__(self, result, ops, root, pinned):
+        self.result = result
+        self.ops = ops
+        self.root = root
+        self.pinned = pinned
+
+
+class _Budget:
+    # The budgets of one ``evaluate`` call, shared with its inner contexts.
+    # ``snaps`` counts the rewrites recorded so far.
+    __slots__ = ("max_snapshots", "max_tree_nodes", "deadline", "snaps")
+
+    def __init__(self, options: EvaluatorOptions):
+        self.max_snapshots = options.max_snapshots
+        self.max_tree_nodes = options.max_tree_nodes
+        self.deadline = (
+            None
+            if options.deadline_seconds is None
+            else time.perf_counter() + options.deadline_seconds
+        )
+        self.snaps = 0
+
+    @classmethod
+    def from_options(cls, options: EvaluatorOptions) -> Optional["_Budget"]:
+        if (
+            options.max_snapshots is None
+            and options.max_tree_nodes is None
+            and options.deadline_seconds is None
+        ):
+            return None
+        return cls(options)
+
+    def check(self, tree: Any = None):
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise EvaluationBudgetExceeded("deadline_exceeded")
+        if (
+            self.max_tree_nodes is not None
+            and isinstance(tree, _StructuralNode)
+            and tree.node_count > self.max_tree_nodes
+        ):
+            raise EvaluationBudgetExceeded("tree_node_budget_exceeded")
+
+    def count_snap(self, is_text: bool = False):
+        # Text steps depend on ``explain``, so only rewrites are charged; that
+        # keeps ``explain=False`` stopping at the same step.
+        if not is_text:
+            if self.max_snapshots is not None and self.snaps >= self.max_snapshots:
+                raise EvaluationBudgetExceeded("snapshot_budget_exceeded")
+            self.snaps += 1
+        self.check()
+
+
 class BlockContext:
-    trees: list[Numerical]
+    """Trees the evaluator will read later, kept in step with ``snap`` lazily.
+
+    Each tree is a handle: its last known value and the position in
+    ``context.rewrites`` it has caught up to. Reading a tree replays only the
+    rewrites logged since then that reach this block, so a snap costs the same
+    however many blocks are open.
+    """
+
     context: "EvaluatorContext"
+    path: Optional[tuple[int, ...]]
 
     def __init__(self, trees: list[Numerical], context: "EvaluatorContext"):
         # Work on a private list copy to avoid mutating AST argument lists in-place.
         # In-place mutation can retroactively alter previously saved snapshots.
-        self.trees = list(trees)
+        self._values = list(trees)
+        start = len(context.rewrites)
+        self._positions = [start] * len(self._values)
+        # Rewrites logged after the block closed never reach it.
+        self._end = None
         self.context = context
+        # The trees are pieces of the node being evaluated when the block opened;
+        # only snaps at or above that node can reach them.
+        self.path = context.focus
+
+    @property
+    def trees(self) -> list[Numerical]:
+        return [self[index] for index in range(len(self._values))]
+
+    def _resolve(self, index: int) -> Numerical:
+        rewrites = self.context.rewrites
+        end = len(rewrites) if self._end is None else self._end
+        position = self._positions[index]
+        value = self._values[index]
+        if position < end:
+            for rewrite in rewrites[position:end]:
+                if rewrite.reaches(self.path):
+                    value = rewrite.apply(value)
+            self._values[index] = value
+            self._positions[index] = end
+        return value
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self._end = len(self.context.rewrites)
         self.context.blocks.remove(self)
 
     def __iter__(self):
-        return iter(self.trees)
+        # Each tree is resolved when the iteration reaches it, so it sees the
+        # rewrites made while the earlier ones were being used.
+        index = 0
+        while index < len(self._values):
+            yield self._resolve(index)
+            index += 1
 
     def __len__(self):
-        return len(self.trees)
+        return len(self._values)
 
     def __getitem__(self, index):
-        return self.trees[index]
+        return self._resolve(range(len(self._values))[index])
 
     def __setitem__(self, index, value):
-        self.trees[index] = value
+        index = range(len(self._values))[index]
+        self._values[index] = value
+        self._positions[index] = len(self.context.rewrites)
 
     def __delitem__(self, index):
-        del self.trees[index]
+        del self._values[index]
+        del self._positions[index]
 
     def __contains__(self, item):
         return item in self.trees
 
 
 class EvaluatorContext:
+    # False for ``NullEvaluatorContext``: callers can skip building text that
+    # would only be passed to ``snap`` or ``wording``.
+    explain = True
     substitutions: dict[str, int | float]
     steps: list[str]
     snapshots: list[Numerical]
@@ -434,6 +1053,11 @@ class EvaluatorContext:
     coverage_tags: set[str]
     localizer: Localizer
     localization_diagnostics: dict[str, Any]
+    shared_subexpressions: Optional[set[bytes]]
+    shared_results: dict[tuple[bytes, Hashable], _SharedResult]
+    focus_stack: list[list]
+    rewrites: list[_Rewrite]
+    render_containment: dict[tuple[bytes, bytes], int]
 
     def __init__(
         self,
@@ -441,14 +1065,24 @@ class EvaluatorContext:
         substitutions: Optional[dict[str, int | float]] = None,
         options: Optional[EvaluatorOptions] = None,
         error_on_invalid_snap: bool = True,
+        localizer: Optional[Localizer] = None,
     ):
         self.substitutions = substitutions or {}
         self.snapshots = [Snapshot(tree, tree, tree, tree)]
+        self._trace = _SnapshotTrace(self.snapshots[0])
         self.blocks = []
         self.current_tree = tree
         self.original_tree = tree
         self.options = options or EvaluatorOptions()
-        self.localizer = Localizer.from_profile(self.options.explanation_profile)
+        self.localizer = localizer or Localizer.from_profile(
+            self.options.explanation_profile
+        )
+        # Wording is formatted when rendered, unless the localizer has to see
+        # every lookup as it happens.
+        self.defer_wording = not (
+            self.localizer.collect_diagnostics
+            or self.localizer.missing_key_policy == "error"
+        )
         self.error_on_invalid_snap = error_on_invalid_snap
         self.error_count = 0
         self.is_approximate = False
@@ -457,8 +1091,168 @@ class EvaluatorContext:
         self.reason_code = None
         self.coverage_tags = set()
         self.localization_diagnostics = {}
+        self._rendered_expressions = {}
+        self.shared_subexpressions = None
+        # Keyed by ``(fingerprint, substitution_scope)`` and shared with the
+        # contexts made by ``inner_context``.
+        self.shared_results = {}
+        self._substitution_scope = None
+        # Set by ``PreparedExpression``: subtrees it has seen evaluated are
+        # replayed from the recorded steps instead of evaluated again. The
+        # substituted objects keyed by identity, and that key, belong to this
+        # evaluation, so concurrent calls never see each other's.
+        self.prepared = None
+        self._prepared_pins = None
+        self._prepared_scope = None
+        # While a subtree is being recorded: the steps taken so far, the paths
+        # of the subtrees being recorded, and a count of the lookups that
+        # depended on the tree outside them.
+        self._ops = None
+        self._recording_roots = []
+        self._taints = 0
+        # One ``[path, next_child_index]`` entry per node being evaluated; the
+        # path is ``None`` when the node could not be located in ``current_tree``.
+        self.focus_stack = []
+        # Rewrites made while blocks were open, replayed by ``BlockContext``.
+        self.rewrites = []
+        self._subtree_index = None
+        # ``contains`` results for pairs of snapshot trees, shared by every
+        # render of this context.
+        self.render_containment = {}
+        self._render_hits = 0
+        # ``None`` unless the options set a budget.
+        self._budget = _Budget.from_options(self.options)
+
+    @property
+    def focus(self) -> Optional[tuple[int, ...]]:
+        """Path in ``current_tree`` of the node being evaluated, if known."""
+        return self.focus_stack[-1][0] if self.focus_stack else None
+
+    @property
+    def subtree_index(self) -> SubtreeIndex:
+        """Occurrence index over ``current_tree``, built on first use."""
+        index = self._subtree_index
+        if index is None:
+            index = self._subtree_index = SubtreeIndex(self.current_tree)
+        else:
+            index.update(self.current_tree)
+        return index
+
+    @property
+    def substitution_scope(self) -> Hashable:
+        """Hashable form of ``substitutions``: the same subtree can only be
+        reused between contexts with the same scope."""
+        scope = self._substitution_scope
+        if scope is None:
+            scope = self._substitution_scope = frozenset(
+                (
+                    key,
+                    fingerprint(value)
+                    if isinstance(value, (int, float, complex, _StructuralNode))
+                    else id(value),
+                )
+                for key, value in self.substitutions.items()
+            )
+        return scope
+
+    def inner_context(
+        self,
+        tree: Numerical,
+        substitutions: dict,
+        error_on_invalid_snap: bool = False,
+    ) -> "EvaluatorContext":
+        """Context for a separate evaluation inside this one, such as a
+        derivative body, sharing this evaluation's subexpression memo."""
+        inner = type(self)(
+            tree,
+            substitutions,
+            options=self.options,
+            error_on_invalid_snap=error_on_invalid_snap,
+        )
+        inner.shared_subexpressions = self.shared_subexpressions
+        inner.shared_results = self.shared_results
+        inner._budget = self._budget
+        return inner
+
+    def occurrences(self, target: Numerical) -> int:
+        """``contains(self.current_tree, target)``, by index lookup when possible.
+
+        Exact copies of ``target`` or its negation are counted from the index.
+        Otherwise the tree is walked, since ``==`` also matches looser forms and
+        sums and products can hold ``target`` as a sub-multiset.
+        """
+        if self._ops is not None:
+            # The count depends on the rest of the tree, so the subtrees being
+            # recorded might not take the same steps elsewhere.
+            self._taints += 1
+        count = self.subtree_index.occurrences(target, -target)
+        if count:
+            return count
+        return contains(self.current_tree, target)
+
+    def appears(self, target: Numerical) -> bool:
+        """Whether ``target`` occurs anywhere in ``current_tree``."""
+        roots = self._recording_roots
+        if roots and roots[-1] is not None:
+            node = node_at(self.current_tree, roots[-1])
+            if node is not None and contains(node, target) > 0:
+                return True
+        return self.occurrences(target) > 0
+
+    def _render_contains(self, tree: Numerical, target: Numerical) -> int:
+        key = (fingerprint(tree), fingerprint(target))
+        count = self.render_containment.get(key)
+        if count is None:
+            count = self.render_containment[key] = contains(tree, target)
+        else:
+            self._render_hits += 1
+        return count
+
+    def index_stats(self) -> dict[str, Any]:
+        """Hit statistics of the subtree index and of the render containment cache."""
+        stats = self.subtree_index.stats()
+        stats["render_hits"] = self._render_hits
+        stats["render_misses"] = len(self.render_containment)
+        return stats
+
+    def locate(self, expression: Numerical) -> Optional[tuple[int, ...]]:
+        """Path of ``expression`` as the focused node or one of its children.
+
+        Children are usually evaluated left to right, so the search starts
+        just after the child located last.
+        """
+        if not self.focus_stack:
+            tree = self.current_tree
+            return () if expression is tree or expression == tree else None
+        entry = self.focus_stack[-1]
+        path = entry[0]
+        if path is None:
+            return None
+        node = node_at(self.current_tree, path)
+        if node is None:
+            return None
+        if node is expression:
+            return path
+        kids = children(node)
+        count = len(kids)
+        start = entry[1]
+        for offset in range(count):
+            index = (start + offset) % count
+            if kids[index] is expression:
+                entry[1] = index + 1
+                return path + (index,)
+        if node == expression:
+            return path
+        for offset in range(count):
+            index = (start + offset) % count
+            if kids[index] == expression:
+                entry[1] = index + 1
+                return path + (index,)
+        return None
 
     def add_coverage_tag(self, tag: str):
+        if self._ops is not None:
+            self._ops.append((_TAG, tag))
         if tag:
             self.coverage_tags.add(tag)
 
@@ -467,6 +1261,8 @@ class EvaluatorContext:
         status: Literal["exact", "partial", "unsolved"],
         reason_code: Optional[str] = None,
     ):
+        if self._ops is not None:
+            self._ops.append((_STATUS, status, reason_code))
         rank = {"exact": 0, "partial": 1, "unsolved": 2}
         if rank[status] > rank[self.solve_status]:
             self.solve_status = status
@@ -495,6 +1291,8 @@ class EvaluatorContext:
             quality_flags=quality_flags or [],
         )
         self.explanation_events.append(event)
+        if self._ops is not None:
+            self._ops.append((_EVENT, event))
         self.add_coverage_tag(rule_id)
         if emit_text and message:
             prefix = f"[{rule_id}] " if self.options.show_rule_name else ""
@@ -506,38 +1304,126 @@ class EvaluatorContext:
         simplified: Union[Numerical, bool] = None,
         explanation: Optional[str] = None,
         approximate=False,
+        path: Optional[tuple[int, ...]] = None,
     ):
+        """Record the rewrite of ``original`` into ``simplified``.
+
+        The rewrite is applied inside the subtree at ``path`` (by default the
+        node being evaluated), rebuilding only its ancestors; an ancestor that
+        holds ``original`` among its own terms or factors is rewritten as a
+        whole, as the whole-tree search would. When there is no path, or
+        ``original`` is not inside that subtree, every occurrence in the whole
+        tree is replaced instead.
+        """
+        is_text = isinstance(original, (str, LazyMessage))
+        budget = self._budget
+        if budget is not None:
+            budget.count_snap(is_text)
+        if self._ops is not None:
+            self._ops.append((_SNAP, original, simplified, explanation, approximate, path))
         if approximate:
             self.is_approximate = True
-        if isinstance(original, str):
-            rendered_text = self.localizer.transform_text(original)
-            text_snapshot = TextSnapshot(rendered_text, bool(simplified))
+        if is_text:
+            text_snapshot = TextSnapshot(original, bool(simplified), self.localizer)
+            if not self.defer_wording:
+                text_snapshot.text
+        else:
+            text_snapshot = None
+        if text_snapshot is not None:
             if (
                 len(self.snapshots) > 0
                 and isinstance(self.snapshots[-1], TextSnapshot)
-                and str(self.snapshots[-1]) == str(text_snapshot)
+                and self.snapshots[-1].same_text(text_snapshot)
             ):
                 return
             self.snapshots.append(text_snapshot)
             return
-        if contains(self.current_tree, original) <= 0:
+        previous = self.current_tree
+        rewritten = self._rewrite_tree(original, simplified, path)
+        if rewritten is None:
+            return
+        new_tree, path = rewritten
+        # Equality normalizes (``x * 10^0 == x * 1``), so only the whole trees
+        # decide whether the step shows; subtrees off the path are shared and
+        # compare by identity.
+        changed = new_tree != previous
+
+        trace_hook = self.options.trace_hook
+        if trace_hook is not None:
+            caller = sys._getframe(1)
+            if caller.f_code is EvaluatorContext.replace.__code__:
+                caller = caller.f_back
+            trace_hook(
+                CallSite(
+                    caller.f_code.co_filename, caller.f_lineno, caller.f_code.co_name
+                ),
+                original,
+                simplified,
+                time.perf_counter(),
+            )
+
+        if explanation:
+            snapshot = Snapshot._delta(
+                self._trace,
+                original,
+                simplified,
+                previous,
+                new_tree,
+                explanation,
+                approximate,
+                path,
+                localizer=self.localizer,
+            )
+            if not self.defer_wording:
+                snapshot.explanation
+            self.snapshots.append(snapshot)
+        elif changed or len(self.snapshots) == 0:
+            self.snapshots.append(
+                Snapshot._delta(
+                    self._trace,
+                    original,
+                    simplified,
+                    previous,
+                    new_tree,
+                    approximate=approximate,
+                    path=path,
+                )
+            )
+        self.current_tree = new_tree
+
+    def _rewrite_tree(self, original: Numerical, simplified: Numerical, path):
+        # The tree after the snap and the path it was applied at (``None`` for
+        # the whole-tree fallback), or ``None`` when nothing matched.
+        if path is None:
+            path = self.focus
+        new_tree = None
+        if path is not None:
+            path = match_path(self.current_tree, path, original)
+            new_tree = replace_sub_at(self.current_tree, path, original, simplified)
+        if new_tree is not None:
+            self._log_rewrite(path, original, simplified)
+        else:
+            path = None
+            new_tree = self._replace_everywhere(original, simplified)
+            if new_tree is None:
+                return None
+        if self._budget is not None:
+            self._budget.check(new_tree)
+        return new_tree, path
+
+    def _replace_everywhere(self, original: Numerical, simplified: Numerical):
+        # Content-addressed fallback: every occurrence in the tree and in the
+        # open blocks is rewritten. Returns ``None`` when nothing matched.
+        if self.occurrences(original) <= 0:
             if self.error_on_invalid_snap:
                 raise ValueError(
                     f"Original {render_latex(original)} not found in current tree {render_latex(self.current_tree)}.\n{render_type(self.original_tree)}"
                 )
             else:
                 self.error_count += 1
-                return
-        previous = self.current_tree
-
+                return None
         new_tree = replace_sub(self.current_tree, original, simplified)
 
-        snapshot = Snapshot(
-            original, simplified, previous, new_tree, approximate=approximate
-        )
-        frame = inspect.currentframe().f_back
-        line = frame.f_lineno
-
         # print(f"Called from line {line}.")
         # print("Old tree:", render_type(previous))
         # print("Original:", render_type(original))
@@ -545,33 +1431,13 @@ class EvaluatorContext:
         # print("New tree:", render_type(new_tree))
         # print("\n")
 
-        for i, block in enumerate(self.blocks):
-            for j, tree in enumerate(block.trees):
+        self._log_rewrite(None, original, simplified)
+        return new_tree
 
-                block.trees[j] = replace_sub(tree, original, simplified)
-                # print(
-                #     "block tree convert from to",
-                #     render_latex(tree),
-                #     render_latex(block.trees[j]),
-                # )
-
-        if explanation:
-            try:
-                snapshot.explanation = explanation.format(
-                    snapshot=render_latex(new_tree),
-                    previous=render_latex(previous),
-                    original=render_latex(original),
-                    simplified=render_latex(simplified),
-                )
-            except (KeyError, ValueError, IndexError):
-                # Explanations often contain literal braces from LaTeX.
-                # If formatting fails, keep original text instead of crashing.
-                snapshot.explanation = explanation
-            snapshot.explanation = self.localizer.transform_text(snapshot.explanation)
-            self.snapshots.append(snapshot)
-        elif snapshot != previous or len(self.snapshots) == 0:
-            self.snapshots.append(snapshot)
-        self.current_tree = new_tree
+    def _log_rewrite(self, path, original, simplified):
+        # Open blocks pick the rewrite up when their trees are next read.
+        if self.blocks:
+            self.rewrites.append(_Rewrite(path, original, simplified))
 
     def replace(self, state: Numerical, *args, **kwargs):
         self.current_tree = state
@@ -583,6 +1449,19 @@ class EvaluatorContext:
     def render_expressions(self, snapshots: list[Snapshot]):
         if len(snapshots) == 0:
             return ""
+        # The text does not depend on the localizer, so renders for several
+        # profiles share it. The entry keeps the snapshots, and so their ids,
+        # alive.
+        key = tuple(map(id, snapshots))
+        cached = self._rendered_expressions.get(key)
+        if cached is None:
+            cached = self._rendered_expressions[key] = (
+                tuple(snapshots),
+                self._render_expressions(snapshots),
+            )
+        return cached[1]
+
+    def _render_expressions(self, snapshots: list[Snapshot]) -> str:
 
         # Split into coherent rewrite chains so each displayed "=" transition is valid.
         chains: list[list[Snapshot]] = [[snapshots[0]]]
@@ -620,15 +1499,56 @@ class EvaluatorContext:
 
         return "\n".join(rendered_chains) + ("\n" if rendered_chains else "")
 
-    def render(self):
+    def _localized_snapshots(self, localizer: Localizer):
+        # Pairs each snapshot with its text as ``localizer`` words it (``None``
+        # for rewrites), dropping a text step that repeats the one before it,
+        # as ``snap`` does when the text is known to repeat.
+        previous_text = None
+        for snapshot in self.snapshots:
+            if isinstance(snapshot, Snapshot):
+                previous_text = None
+                yield snapshot, None
+                continue
+            text = snapshot.localized(localizer)
+            if text == previous_text:
+                continue
+            previous_text = text
+            yield snapshot, text
+
+    def _explanation_texts(self, localizer: Localizer):
+        if localizer is self.localizer:
+            return lambda snapshot: snapshot.explanation
+        texts = {}
+
+        def explanation_of(snapshot: Snapshot) -> Optional[str]:
+            key = id(snapshot)
+            if key not in texts:
+                texts[key] = snapshot.localized_explanation(localizer)
+            return texts[key]
+
+        return explanation_of
+
+    def _render_localizer(self, profile: Optional[ExplanationProfile]) -> Localizer:
+        if profile is None:
+            return self.localizer
+        return Localizer.from_profile(profile)
+
+    def render(self, profile: Optional[ExplanationProfile] = None):
+        """Render the explanation as text.
+
+        With a ``profile`` the same trace is worded for that profile's locale
+        and style type, exactly as an evaluation under that profile renders.
+        """
+        localizer = self._render_localizer(profile)
+
         def _step_heading(step_number: int) -> str:
-            template = self.localizer.template("step.heading", "## {number}")
+            template = localizer.template("step.heading", "## {number}")
             options = self.options.wording_options
             prefer_default = False
             if options is not None and getattr(options, "step_heading_template", None):
                 template = options.step_heading_template
                 prefer_default = True
-            template = self.localizer.template(
+            template = localizer.template(
                 "step.heading",
                 template,
                 prefer_default=prefer_default,
@@ -638,11 +1558,11 @@ class EvaluatorContext:
             except Exception:
                 return f"## {step_number}"
 
-        newline = self.localizer.template("render.newline", "\n")
-        substep_joiner = self.localizer.template("render.substep.joiner", newline)
-        step_joiner = self.localizer.template("render.step.joiner", newline + newline)
-        document_prefix = self.localizer.template("render.document.prefix", "")
-        document_suffix = self.localizer.template("render.document.suffix", "")
+        newline = localizer.template("render.newline", "\n")
+        substep_joiner = localizer.template("render.substep.joiner", newline)
+        step_joiner = localizer.template("render.step.joiner", newline + newline)
+        document_prefix = localizer.template("render.document.prefix", "")
+        document_suffix = localizer.template("render.document.suffix", "")
 
         steps = [[]]
         consecutive = []
@@ -652,17 +1572,18 @@ class EvaluatorContext:
         previous = None
         previous_is_snapshot = False
         previous_snapshot = None
-        for snapshot in self.snapshots:
+        explanation_of = self._explanation_texts(localizer)
+        for snapshot, text in self._localized_snapshots(localizer):
             is_snapshot = isinstance(snapshot, Snapshot)
             if (
                 previous_snapshot
                 and is_snapshot
-                and contains(previous_snapshot.portion, snapshot.original) > 0
+                and self._render_contains(previous_snapshot.portion, snapshot.original) > 0
             ):
                 if (
                     current_portion
                     and current_portion != previous_snapshot.portion
-                    and contains(current_portion, snapshot.original) > 0
+                    and self._render_contains(current_portion, snapshot.original) > 0
                 ):
                     current_portion = replace_sub(
                         current_portion,
@@ -682,8 +1603,10 @@ class EvaluatorContext:
             elif (
                 previous_snapshot
                 and is_snapshot
-                and contains(snapshot.full_tree, previous_snapshot.portion)
-                < contains(previous_snapshot.full_tree, previous_snapshot.original)
+                and self._render_contains(snapshot.full_tree, previous_snapshot.portion)
+                < self._render_contains(
+                    previous_snapshot.full_tree, previous_snapshot.original
+                )
             ):
                 current_portion = snapshot.portion
                 if not consecutive_portion:
@@ -707,7 +1630,7 @@ class EvaluatorContext:
 
                 consecutive_portion = []
                 consecutive = []
-            if isinstance(snapshot, TextSnapshot) or snapshot.explanation:
+            if not is_snapshot or explanation_of(snapshot):
                 if last_consecutive_last and len(consecutive) > 0:
                     steps[-1].append(
                         self.render_expressions([last_consecutive_last, *consecutive])
@@ -718,9 +1641,7 @@ class EvaluatorContext:
                     consecutive[-1] if len(consecutive) > 0 else None
                 )
                 steps[-1].append(
-                    str(snapshot)
-                    if isinstance(snapshot, TextSnapshot)
-                    else snapshot.explanation + "\n"
+                    text if not is_snapshot else explanation_of(snapshot) + "\n"
                 )
                 consecutive = []
             else:
@@ -732,8 +1653,8 @@ class EvaluatorContext:
                 is_final = snapshot == self.current_tree
                 if (
                     is_duplicate
-                    and snapshot.explanation
-                    and not consecutive[-1].explanation
+                    and explanation_of(snapshot)
+                    and not explanation_of(consecutive[-1])
                 ):
                     # Take the last element off of consecutive and replace it with the new one
                     consecutive.pop()
@@ -758,7 +1679,7 @@ class EvaluatorContext:
                 filtered_steps.append(step)
         if len(filtered_steps) == 1:
             body = substep_joiner.join(filtered_steps[0])
-            block = self.localizer.format(
+            block = localizer.format(
                 "render.single_step.block",
                 "{body}",
                 {
@@ -769,13 +1690,14 @@ class EvaluatorContext:
                 },
             )
             rendered = document_prefix + block + document_suffix
-            self.localization_diagnostics = self.localizer.diagnostics()
+            if localizer is self.localizer:
+                self.localization_diagnostics = localizer.diagnostics()
             return rendered
         blocks: list[str] = []
         for i, step in enumerate(filtered_steps):
             body = substep_joiner.join(step)
             blocks.append(
-                self.localizer.format(
+                localizer.format(
                     "render.step.block",
                     "{heading}{newline}{body}",
                     {
@@ -787,18 +1709,23 @@ class EvaluatorContext:
                 )
             )
         rendered = document_prefix + step_joiner.join(blocks) + document_suffix
-        self.localization_diagnostics = self.localizer.diagnostics()
+        if localizer is self.localizer:
+            self.localization_diagnostics = localizer.diagnostics()
         return rendered
 
-    def render_document(self) -> dict[str, Any]:
+    def render_document(
+        self, profile: Optional[ExplanationProfile] = None
+    ) -> dict[str, Any]:
+        localizer = self._render_localizer(profile)
+
         def _step_heading(step_number: int) -> str:
-            template = self.localizer.template("step.heading", "## {number}")
+            template = localizer.template("step.heading", "## {number}")
             options = self.options.wording_options
             prefer_default = False
             if options is not None and getattr(options, "step_heading_template", None):
                 template = options.step_heading_template
                 prefer_default = True
-            template = self.localizer.template(
+            template = localizer.template(
                 "step.heading",
                 template,
                 prefer_default=prefer_default,
@@ -808,7 +1735,7 @@ class EvaluatorContext:
             except Exception:
                 return f"## {step_number}"
 
-        newline = self.localizer.template("render.newline", "\n")
+        newline = localizer.template("render.newline", "\n")
         steps = [[]]
         consecutive = []
         consecutive_portion = []
@@ -817,17 +1744,18 @@ class EvaluatorContext:
         previous = None
         previous_is_snapshot = False
         previous_snapshot = None
-        for snapshot in self.snapshots:
+        explanation_of = self._explanation_texts(localizer)
+        for snapshot, text in self._localized_snapshots(localizer):
             is_snapshot = isinstance(snapshot, Snapshot)
             if (
                 previous_snapshot
                 and is_snapshot
-                and contains(previous_snapshot.portion, snapshot.original) > 0
+                and self._render_contains(previous_snapshot.portion, snapshot.original) > 0
             ):
                 if (
                     current_portion
                     and current_portion != previous_snapshot.portion
-                    and contains(current_portion, snapshot.original) > 0
+                    and self._render_contains(current_portion, snapshot.original) > 0
                 ):
                     current_portion = replace_sub(
                         current_portion,
@@ -847,8 +1775,10 @@ class EvaluatorContext:
             elif (
                 previous_snapshot
                 and is_snapshot
-                and contains(snapshot.full_tree, previous_snapshot.portion)
-                < contains(previous_snapshot.full_tree, previous_snapshot.original)
+                and self._render_contains(snapshot.full_tree, previous_snapshot.portion)
+                < self._render_contains(
+                    previous_snapshot.full_tree, previous_snapshot.original
+                )
             ):
                 current_portion = snapshot.portion
                 if not consecutive_portion:
@@ -870,7 +1800,7 @@ class EvaluatorContext:
                 current_portion = None
                 consecutive_portion = []
                 consecutive = []
-            if isinstance(snapshot, TextSnapshot) or snapshot.explanation:
+            if not is_snapshot or explanation_of(snapshot):
                 if last_consecutive_last and len(consecutive) > 0:
                     steps[-1].append(
                         self.render_expressions([last_consecutive_last, *consecutive])
@@ -881,9 +1811,7 @@ class EvaluatorContext:
                     consecutive[-1] if len(consecutive) > 0 else None
                 )
                 steps[-1].append(
-                    str(snapshot)
-                    if isinstance(snapshot, TextSnapshot)
-                    else snapshot.explanation + "\n"
+                    text if not is_snapshot else explanation_of(snapshot) + "\n"
                 )
                 consecutive = []
             else:
@@ -893,9 +1821,9 @@ class EvaluatorContext:
                 )
                 if (
                     is_duplicate
-                    and snapshot.explanation
+                    and explanation_of(snapshot)
                     and len(consecutive) > 0
-                    and not consecutive[-1].explanation
+                    and not explanation_of(consecutive[-1])
                 ):
                     consecutive.pop()
                     is_duplicate = False
@@ -929,7 +1857,7 @@ class EvaluatorContext:
                     "body": body,
                 }
             )
-        rendered = self.render()
+        rendered = self.render(profile)
         return {
             "schema_version": "explanation_document_v1",
             "solve_status": self.solve_status,
@@ -961,6 +1889,53 @@ class EvaluatorContext:
         return self.blocks[-1]
 
 
+class NullEvaluatorContext(EvaluatorContext):
+    """Context for ``evaluate(..., explain=False)``.
+
+    ``snap``, ``emit_event`` and ``wording`` do nothing, so no snapshots,
+    explanation text or events are built. The result, ``solve_status`` and
+    ``reason_code`` are the ones a full evaluation produces. When the options
+    set a budget, ``snap`` still applies each rewrite to ``current_tree`` so
+    that an evaluation cut short returns the same partial tree.
+    """
+
+    explain = False
+
+    def snap(
+        self,
+        original,
+        simplified=None,
+        explanation=None,
+        approximate=False,
+        path=None,
+    ):
+        is_text = isinstance(original, (str, LazyMessage))
+        budget = self._budget
+        if budget is not None:
+            budget.count_snap(is_text)
+        if self._ops is not None:
+            self._ops.append((_SNAP, original, simplified, explanation, approximate, path))
+        if approximate:
+            self.is_approximate = True
+        if budget is not None and not is_text:
+            # A budget can stop the evaluation at any step, and the tree
+            # reached by then is the result, so it is kept as a full
+            # evaluation keeps it.
+            rewritten = self._rewrite_tree(original, simplified, path)
+            if rewritten is not None:
+                self.current_tree = rewritten[0]
+
+    def emit_event(self, rule_id: str, category: str, *args, **kwargs):
+        self.add_coverage_tag(rule_id)
+
+    def locate(self, expression: Numerical) -> Optional[tuple[int, ...]]:
+        # Without a budget ``current_tree`` never changes, so there is
+        # nothing to focus on.
+        if self._budget is None:
+            return None
+        return super().locate(expression)
+
+
 def pad(iterable, size, value=None, side="left"):
     if isinstance(iterable, str):
         pad_value = value if isinstance(value, str) else " "
@@ -1187,7 +2162,7 @@ def solve_sum(components, context: EvaluatorContext):
             p = i  # replicate original integer behavior
 
         # keep your step text shape
-        if p is not None:
+        if p is not None and context.explain:
             if sum_values == 0 and carry == 0 and len(values) > 1:
                 continue
             if len(values) > 1:
@@ -1198,16 +2173,16 @@ def solve_sum(components, context: EvaluatorContext):
                 step += wording(
                     context,
                     "addition_carry_suffix",
-                    f", so carry {carry} to the next column.",
-                    f", carry {carry}.",
+                    ", so carry {carry} to the next column.",
+                    ", carry {carry}.",
                     carry=carry,
                 )
             elif carry < 0:
                 step += wording(
                     context,
                     "addition_borrow_suffix",
-                    f", so borrow {-carry} from the next column and write {digit} here.",
-                    f", borrow {-carry}; digit becomes {digit}.",
+                    ", so borrow {borrow} from the next column and write {digit} here.",
+                    ", borrow {borrow}; digit becomes {digit}.",
                     borrow=-carry,
                     digit=digit,
                 )
@@ -1223,8 +2198,8 @@ def solve_sum(components, context: EvaluatorContext):
                 wording(
                     context,
                     "addition_carry_row",
-                    f"$10^{{{p+1}}}$: {carry} (carry from the previous column)",
-                    f"$10^{{{p+1}}}$: carry {carry}",
+                    "$10^{{{power}}}$: {carry} (carry from the previous column)",
+                    "$10^{{{power}}}$: carry {carry}",
                     power=p + 1,
                     carry=carry,
                 ),
@@ -1241,8 +2216,8 @@ def solve_sum(components, context: EvaluatorContext):
         wording(
             context,
             "addition_put_together",
-            f"Combine the place-value columns to obtain ${result}$.",
-            f"Result: ${result}$.",
+            "Combine the place-value columns to obtain ${result}$.",
+            "Result: ${result}$.",
             result=result,
         ),
         False,
@@ -1292,8 +2267,8 @@ def add(a, b, context: EvaluatorContext):
             wording(
                 context,
                 "addition_decompose_intro",
-                f"Decompose ${a}$ and ${b}$ into place-value components.",
-                f"Use place-value decomposition for ${a}$ and ${b}$.",
+                "Decompose ${a}$ and ${b}$ into place-value components.",
+                "Use place-value decomposition for ${a}$ and ${b}$.",
                 a=a,
                 b=b,
             ),
@@ -1454,8 +2429,8 @@ def multiply(a, b, context: EvaluatorContext, quick_compute=True):
             wording(
                 context,
                 "multiply_complex_intro",
-                f"Compute ${a} \\cdot {b}$ by place-value decomposition: form partial products, then add them.",
-                f"Use place-value decomposition for ${a} \\cdot {b}$ and add the partial products.",
+                "Compute ${a} \\cdot {b}$ by place-value decomposition: form partial products, then add them.",
+                "Use place-value decomposition for ${a} \\cdot {b}$ and add the partial products.",
                 a=a,
                 b=b,
             ),
@@ -1476,8 +2451,8 @@ def multiply(a, b, context: EvaluatorContext, quick_compute=True):
             wording(
                 context,
                 "multiply_approximate_a",
-                f"Approximate ${a}$ as ${a_approx}$ to control intermediate precision during multiplication.",
-                f"Approximate ${a}$ as ${a_approx}$ for multiplication.",
+                "Approximate ${a}$ as ${approximate}$ to control intermediate precision during multiplication.",
+                "Approximate ${a}$ as ${approximate}$ for multiplication.",
                 a=a,
                 approximate=a_approx,
             ),
@@ -1502,8 +2477,8 @@ def multiply(a, b, context: EvaluatorContext, quick_compute=True):
                     wording(
                         context,
                         "multiply_approximate_b",
-                        f"Approximate ${b}$ as ${b_approx}$ to control intermediate precision during multiplication.",
-                        f"Approximate ${b}$ as ${b_approx}$ for multiplication.",
+                        "Approximate ${b}$ as ${approximate}$ to control intermediate precision during multiplication.",
+                        "Approximate ${b}$ as ${approximate}$ for multiplication.",
                         b=b,
                         approximate=b_approx,
                     )
@@ -1525,8 +2500,8 @@ def multiply(a, b, context: EvaluatorContext, quick_compute=True):
                 wording(
                     context,
                     "multiply_decimal_shift_a",
-                    f"Rewrite ${a}$ as an integer-scaled value times $10^{{{a_exponent}}}$.",
-                    f"Rewrite ${a}$ using $10^{{{a_exponent}}}$ scaling.",
+                    "Rewrite ${a}$ as an integer-scaled value times $10^{{{exponent}}}$.",
+                    "Rewrite ${a}$ using $10^{{{exponent}}}$ scaling.",
                     a=a,
                     exponent=a_exponent,
                 ),
@@ -1541,8 +2516,8 @@ def multiply(a, b, context: EvaluatorContext, quick_compute=True):
                     wording(
                         context,
                         "multiply_decimal_shift_b",
-                        f"Rewrite ${b}$ as an integer-scaled value times $10^{{{b_exponent}}}$.",
-                        f"Rewrite ${b}$ using $10^{{{b_exponent}}}$ scaling.",
+                        "Rewrite ${b}$ as an integer-scaled value times $10^{{{exponent}}}$.",
+                        "Rewrite ${b}$ using $10^{{{exponent}}}$ scaling.",
                         b=b,
                         exponent=b_exponent,
                     ),
@@ -1651,97 +2626,102 @@ def multiply(a, b, context: EvaluatorContext, quick_compute=True):
 
 
 def replace_symbols(expression: Numerical, context: EvaluatorContext):
-    match expression:
-        case Symbol():
-            if expression.name in context.substitutions:
-                return context.substitutions[expression.name]
-            else:
-                return expression
-        case Product():
-            return Product(
-                [replace_symbols(factor, context) for factor in expression.factors]
-            )
-        case Sum():
-            return Sum([replace_symbols(term, context) for term in expression.terms])
-        case Power():
-            return Power(
-                replace_symbols(expression.base, context),
-                replace_symbols(expression.exponent, context),
-            )
-        case FunctionCall():
-            return expression.function(
-                [
-                    replace_symbols(arg, context)
-                    for arg in expression.functional_arguments
-                ],
-                [
-                    replace_symbols(arg, context)
-                    for arg in expression.subscript_arguments
-                ],
-                [
-                    replace_symbols(arg, context)
-                    for arg in expression.superscript_arguments
-                ],
-            )
-        case Derivative():
-            bound_names = {v.name for v, _ in expression.variables}
-            filtered = {
-                k: v
-                for k, v in context.substitutions.items()
-                if not (isinstance(k, str) and k in bound_names)
-            }
-            inner_context = EvaluatorContext(
-                expression.expression,
-                filtered,
-                options=context.options,
-                error_on_invalid_snap=False,
-            )
-            return Derivative(
-                replace_symbols(expression.expression, inner_context),
-                expression.variables,
-            )
-        case Integral():
-            filtered = {
-                k: v
-                for k, v in context.substitutions.items()
-                if not (isinstance(k, str) and k == expression.variable.name)
-            }
-            inner_context = EvaluatorContext(
-                expression.expression,
-                filtered,
-                options=context.options,
-                error_on_invalid_snap=False,
-            )
-            return Integral(
-                replace_symbols(expression.expression, inner_context),
-                expression.variable,
-                replace_symbols(expression.lower, context)
-                if expression.lower is not None
-                else None,
-                replace_symbols(expression.upper, context)
-                if expression.upper is not None
-                else None,
+    def enter(node, substitutions):
+        if isinstance(node, Symbol):
+            return substitutions.get(node.name, node)
+        return DESCEND
+
+    def child_scope(node, index, substitutions):
+        # Differentiation and integration variables are bound inside their
+        # own node; the bounds of an integral still see the outer scope.
+        match node:
+            case Derivative():
+                if index > 0:
+                    return SKIP
+                bound_names = {v.name for v, _ in node.variables}
+            case Integral():
+                if index == 1:
+                    return SKIP
+                if index > 1:
+                    return substitutions
+                bound_names = {node.variable.name}
+            case _:
+                return substitutions
+        return {
+            k: v
+            for k, v in substitutions.items()
+            if not (isinstance(k, str) and k in bound_names)
+        }
+
+    def leave(original, rebuilt, substitutions):
+        if isinstance(rebuilt, FunctionCall):
+            # Calling the function re-validates the argument counts.
+            return rebuilt.function(
+                list(rebuilt.functional_arguments),
+                list(rebuilt.subscript_arguments),
+                list(rebuilt.superscript_arguments),
             )
-        case _:
-            return expression
+        return rebuilt
+
+    return rewrite(
+        expression,
+        enter=enter,
+        leave=leave,
+        scope=context.substitutions,
+        child_scope=child_scope,
+    )
+
+
+def _remove_sub_multiset(items: list, target_items: list) -> tuple[list, bool]:
+    """Remove one equal item from ``items`` per target item.
+
+    Returns the items left over and whether every target item was matched.
+    """
+    unmatched = Counter(target_items)
+    leftover = []
+    for item in items:
+        if unmatched[item] > 0:
+            unmatched[item] -= 1
+        else:
+            leftover.append(item)
+    if unmatched.total() == 0:
+        return leftover, True
+    # Some equalities disagree with hashing (a one-factor product equals its
+    # factor), so fall back to pairwise comparison before giving up.
+    pending = list(target_items)
+    leftover = []
+    for item in items:
+        for candidate in pending:
+            if item == candidate:
+                pending.remove(candidate)
+                break
+        else:
+            leftover.append(item)
+    return leftover, not pending
 
 
 def replace_sub(expr, target, replacement):
     """
     Return a *new* expression obtained by replacing `target`
     (a subtree) with `replacement` inside `expr`.
-    Works recursively for all node types.
+    Works for all node types; subtrees without a match are shared.
     """
+    negated_target = -target
+
+    def enter(expr, _):
+        return _replace_whole(expr, target, negated_target, replacement)
+
+    return rewrite(expr, enter=enter)
+
+
+def _replace_whole(expr, target, negated_target, replacement):
+    # The replacement for `expr` itself when it matches `target` (or its
+    # negation, or holds it as a sub-multiset), else DESCEND.
     if expr == target:
         return replacement
-    elif expr == -target:
+    elif expr == negated_target:
         return -replacement
     match expr:
-        case Power():
-            return Power(
-                replace_sub(expr.base, target, replacement),
-                replace_sub(expr.exponent, target, replacement),
-            )
         case Product():
             if isinstance(target, Product) and target in expr:
                 if isinstance(replacement, Product):
@@ -1774,27 +2754,23 @@ def replace_sub(expr, target, replacement):
                             target_factors.append(abs(factor))
                     else:
                         target_factors.append(factor)
-                for factor in expr_factors:
-                    for target_factor in target_factors:
-                        if factor == target_factor:
-                            target_factors.remove(target_factor)
-                            break
-                    else:
-                        new_factors.append(factor)
+                leftover, matched = _remove_sub_multiset(
+                    expr_factors, target_factors
+                )
+                new_factors.extend(leftover)
                 new_sign = expr_sign * target_sign
                 if new_sign < 0:
                     new_factors.append(-1)
-                if len(target_factors) == 0:
+                if matched:
                     if len(new_factors) == 1:
                         return new_factors[0]
                     return Product(new_factors)
             elif (
                 len(expr.factors) == 2
                 and -1 in expr.factors
-                and -target in expr.factors
+                and negated_target in expr.factors
             ):
                 return replacement
-            return Product([replace_sub(f, target, replacement) for f in expr.factors])
         case Sum():
             if (
                 isinstance(target, Sum) and target in expr
@@ -1831,107 +2807,97 @@ def replace_sub(expr, target, replacement):
                         target_terms.append(product([term.factors[0], term.factors[1]]))
                     else:
                         target_terms.append(term)
-                for term in expr_terms:
-                    for target_term in target_terms:
-                        if term == target_term:
-                            target_terms.remove(target_term)
-                            break
-                    else:
-                        new_terms.append(term)
-                if len(target_terms) == 0:
+                leftover, matched = _remove_sub_multiset(expr_terms, target_terms)
+                new_terms.extend(leftover)
+                if matched:
                     if len(new_terms) == 1:
                         return new_terms[0]
                     return Sum(new_terms)
-            return Sum([replace_sub(t, target, replacement) for t in expr.terms])
-        case FunctionCall():
-            return FunctionCall(
-                expr.function,
-                [
-                    replace_sub(a, target, replacement)
-                    for a in expr.functional_arguments
-                ],
-                [replace_sub(a, target, replacement) for a in expr.subscript_arguments],
-                [
-                    replace_sub(a, target, replacement)
-                    for a in expr.superscript_arguments
-                ],
-            )
-        case Derivative():
-            return Derivative(
-                replace_sub(expr.expression, target, replacement),
-                [
-                    (replace_sub(v, target, replacement), o)
-                    for v, o in expr.variables
-                ],
-            )
-        case Integral():
-            return Integral(
-                replace_sub(expr.expression, target, replacement),
-                replace_sub(expr.variable, target, replacement),
-                replace_sub(expr.lower, target, replacement)
-                if expr.lower is not None
-                else None,
-                replace_sub(expr.upper, target, replacement)
-                if expr.upper is not None
-                else None,
-            )
-        case _:
-            return expr  # atom
+    return DESCEND
+
+
+def replace_sub_at(expr, path, target, replacement):
+    """
+    Like `replace_sub`, but only inside the subtree of `expr` at `path`;
+    the rest of the tree is shared and only the path's ancestors are rebuilt.
+    Returns None when `target` does not occur in that subtree.
+    """
+    node = node_at(expr, path)
+    if node is None:
+        return None
+    if node is target or node == target:
+        return replace_at(expr, path, replacement)
+    if contains(node, target) > 0:
+        return replace_at(expr, path, replace_sub(node, target, replacement))
+    return None
+
+
+def match_path(expr, path, target):
+    """
+    The prefix of `path` that `replace_sub_at` should rewrite at: the
+    outermost node on the path that `replace_sub` would rewrite as a whole
+    (a sum or product holding `target` among its terms or factors), or
+    `path` itself. Rewriting there renormalizes that ancestor exactly as a
+    search of the whole tree does.
+    """
+    negated_target = -target
+    node = expr
+    for depth, index in enumerate(path):
+        if _replace_whole(node, target, negated_target, node) is not DESCEND:
+            return path[:depth]
+        kids = children(node)
+        if index >= len(kids):
+            return path
+        node = kids[index]
+    return path
 
 
 def contains(expr, target):
     """
-    Return a *new* expression obtained by replacing `target`
-    (a subtree) with `replacement` inside `expr`.
-    Works recursively for all node types.
+    Count the occurrences of `target` (or its negation) inside `expr`.
+    Sums and products containing `target` as a sub-multiset count as one.
     """
-    if expr == target:
-        return 1
-    elif expr == -target:
-        return 1
-    match expr:
-        case Power():
-            return contains(expr.base, target) + contains(expr.exponent, target)
-        case Product():
-            if isinstance(target, Product) and target in expr:
-                return 1
-            return any([contains(f, target) for f in expr.factors])
-        case Sum():
-            if isinstance(target, Sum) and target in expr:
-                return 1
-            return any([contains(t, target) for t in expr.terms])
-        case FunctionCall():
-            return sum(
-                [contains(a, target) for a in expr.functional_arguments]
-                + [contains(a, target) for a in expr.subscript_arguments]
-                + [contains(a, target) for a in expr.superscript_arguments]
-            )
-        case Derivative():
-            return contains(expr.expression, target) + sum(
-                [contains(v, target) for v, _ in expr.variables]
-            )
-        case Integral():
-            return (
-                contains(expr.expression, target)
-                + contains(expr.variable, target)
-                + (
-                    contains(expr.lower, target)
-                    if expr.lower is not None
-                    else 0
-                )
-                + (
-                    contains(expr.upper, target)
-                    if expr.upper is not None
-                    else 0
-                )
-            )
-        case _:
-            return 0
+    negated_target = -target
+
+    def enter(expr):
+        if expr == target:
+            return 1
+        elif expr == negated_target:
+            return 1
+        match expr:
+            case Product():
+                if isinstance(target, Product) and target in expr:
+                    return 1
+            case Sum():
+                if isinstance(target, Sum) and target in expr:
+                    return 1
+        return DESCEND
+
+    def combine(expr, values):
+        match expr:
+            case Product() | Sum():
+                return any(values)
+            case Power() | FunctionCall() | Derivative() | Integral():
+                return builtins.sum(values)
+            case _:
+                return 0
+
+    return fold(expr, combine, enter=enter)
 
 
 def _contains_node_type(expr: Numerical, node_types: tuple[type, ...]) -> bool:
     if isinstance(expr, node_types):
         return True
+    if not isinstance(
+        expr, (Sum, Product, Power, FunctionCall, Derivative, Integral)
+    ):
+        return False
+    if all(issubclass(t, (Derivative, Integral)) for t in node_types):
+        # Answered from the cached subtree flag instead of a full walk.
+        if not expr.contains_calculus:
+            return False
+        if Derivative in node_types and Integral in node_types:
+            return True
     match expr:
         case Sum():
             return any(_contains_node_type(term, node_types) for term in expr.terms)
@@ -2040,94 +3006,36 @@ def get_fraction(expr):
 
 def _contains_symbol(expr: Numerical, variable: Symbol) -> bool:
     match expr:
-        case int() | float():
-            return False
         case Symbol():
             return expr.name == variable.name
-        case Sum():
-            return any(_contains_symbol(term, variable) for term in expr.terms)
-        case Product():
-            return any(_contains_symbol(factor, variable) for factor in expr.factors)
-        case Power():
-            return _contains_symbol(expr.base, variable) or _contains_symbol(
-                expr.exponent, variable
-            )
-        case FunctionCall():
-            return any(_contains_symbol(arg, variable) for arg in expr.functional_arguments) or any(
-                _contains_symbol(arg, variable) for arg in expr.subscript_arguments
-            ) or any(_contains_symbol(arg, variable) for arg in expr.superscript_arguments)
-        case Derivative():
-            return _contains_symbol(expr.expression, variable)
-        case Integral():
-            if expr.variable.name == variable.name:
-                return False
-            in_bounds = (
-                (expr.lower is not None and _contains_symbol(expr.lower, variable))
-                or (expr.upper is not None and _contains_symbol(expr.upper, variable))
-            )
-            return _contains_symbol(expr.expression, variable) or in_bounds
+        case Sum() | Product() | Power() | FunctionCall() | Derivative() | Integral():
+            return variable in expr.free_symbols
         case _:
             return False
 
 
 def _substitute_symbol(expr: Numerical, variable: Symbol, value: Numerical) -> Numerical:
-    match expr:
-        case Symbol():
-            return value if expr.name == variable.name else expr
-        case Sum():
-            return Sum([_substitute_symbol(term, variable, value) for term in expr.terms])
-        case Product():
-            return Product(
-                [_substitute_symbol(factor, variable, value) for factor in expr.factors]
-            )
-        case Power():
-            return Power(
-                _substitute_symbol(expr.base, variable, value),
-                _substitute_symbol(expr.exponent, variable, value),
-            )
-        case FunctionCall():
-            return FunctionCall(
-                expr.function,
-                [
-                    _substitute_symbol(arg, variable, value)
-                    for arg in expr.functional_arguments
-                ],
-                [_substitute_symbol(arg, variable, value) for arg in expr.subscript_arguments],
-                [
-                    _substitute_symbol(arg, variable, value)
-                    for arg in expr.superscript_arguments
-                ],
-            )
-        case Derivative():
-            if any(v.name == variable.name for v, _ in expr.variables):
-                return expr
-            return Derivative(
-                _substitute_symbol(expr.expression, variable, value), expr.variables
-            )
-        case Integral():
-            if expr.variable.name == variable.name:
-                return Integral(
-                    expr.expression,
-                    expr.variable,
-                    _substitute_symbol(expr.lower, variable, value)
-                    if expr.lower is not None
-                    else None,
-                    _substitute_symbol(expr.upper, variable, value)
-                    if expr.upper is not None
-                    else None,
-                )
-            return Integral(
-                _substitute_symbol(expr.expression, variable, value),
-                expr.variable,
-                _substitute_symbol(expr.lower, variable, value)
-                if expr.lower is not None
-                else None,
-                _substitute_symbol(expr.upper, variable, value)
-                if expr.upper is not None
-                else None,
-            )
-        case _:
-            return expr
+    def enter(node, _):
+        match node:
+            case Symbol():
+                return value if node.name == variable.name else node
+            case Derivative() if any(
+                v.name == variable.name for v, _ in node.variables
+            ):
+                return node
+        return DESCEND
+
+    def child_scope(node, index, _):
+        match node:
+            case Derivative() if index > 0:
+                return SKIP
+            case Integral() if index == 1 or (
+                index == 0 and node.variable.name == variable.name
+            ):
+                return SKIP
+        return None
+
+    return rewrite(expr, enter=enter, child_scope=child_scope)
 
 
 def _diff_match_numeric(expr: Numerical, _: Symbol) -> bool:
@@ -2191,7 +3099,7 @@ def _diff_apply_power(expr: Numerical, variable: Symbol) -> Numerical:
                     product(
                         [
                             d_exponent,
-                            FunctionCall(MathFunction("ln", functional_parameters=1), [base]),
+                            math_function("ln", 1)([base]),
                         ]
                     ),
                     product([exponent, d_base, power(base, -1)]),
@@ -2214,13 +3122,13 @@ def _diff_apply_function(expr: Numerical, variable: Symbol) -> Numerical:
         return 0
     name = expr.function.name
     if name == "sin":
-        return product([FunctionCall(MathFunction("cos", 1), [arg]), d_arg])
+        return product([math_function("cos", 1)([arg]), d_arg])
     if name == "cos":
-        return product([-1, FunctionCall(MathFunction("sin", 1), [arg]), d_arg])
+        return product([-1, math_function("sin", 1)([arg]), d_arg])
     if name == "tan":
-        return product([power(FunctionCall(MathFunction("sec", 1), [arg]), 2), d_arg])
+        return product([power(math_function("sec", 1)([arg]), 2), d_arg])
     if name == "exp":
-        return product([FunctionCall(MathFunction("exp", 1), [arg]), d_arg])
+        return product([math_function("exp", 1)([arg]), d_arg])
     if name == "ln":
         return product([d_arg, power(arg, -1)])
     if name == "sqrt":
@@ -2228,7 +3136,7 @@ def _diff_apply_function(expr: Numerical, variable: Symbol) -> Numerical:
             [
                 d_arg,
                 power(2, -1),
-                power(FunctionCall(MathFunction("sqrt", 1), [arg]), -1),
+                power(math_function("sqrt", 1)([arg]), -1),
             ]
         )
     if name == "log" and len(expr.subscript_arguments) == 1:
@@ -2239,7 +3147,7 @@ def _diff_apply_function(expr: Numerical, variable: Symbol) -> Numerical:
                     d_arg,
                     power(arg, -1),
                     power(
-                        FunctionCall(MathFunction("ln", functional_parameters=1), [base]),
+                        math_function("ln", 1)([base]),
                         -1,
                     ),
                 ]
@@ -2320,7 +3228,7 @@ def _int_apply_power(expr: Numerical, variable: Symbol) -> Numerical:
         expr.exponent
     ):
         if expr.exponent == -1:
-            return FunctionCall(MathFunction("ln", functional_parameters=1), [variable])
+            return math_function("ln", 1)([variable])
         return product(
             [
                 power(variable, expr.exponent + 1),
@@ -2344,15 +3252,15 @@ def _int_apply_function(expr: Numerical, variable: Symbol) -> Numerical:
     inv = power(d_arg, -1)
     name = expr.function.name
     if name == "sin":
-        return product([-1, FunctionCall(MathFunction("cos", 1), [arg]), inv])
+        return product([-1, math_function("cos", 1)([arg]), inv])
     if name == "cos":
-        return product([FunctionCall(MathFunction("sin", 1), [arg]), inv])
+        return product([math_function("sin", 1)([arg]), inv])
     if name == "exp":
-        return product([FunctionCall(MathFunction("exp", 1), [arg]), inv])
+        return product([math_function("exp", 1)([arg]), inv])
     if name == "ln" and isinstance(arg, Symbol) and arg.name == variable.name:
         return sum(
             [
-                product([variable, FunctionCall(MathFunction("ln", 1), [variable])]),
+                product([variable, math_function("ln", 1)([variable])]),
                 product([-1, variable]),
             ]
         )
@@ -2471,7 +3379,248 @@ def _integrate_once(expr: Numerical, variable: Symbol, context: Optional[Evaluat
     return fallback
 
 
+def _expansion_node_count(factors: list[Numerical]) -> int:
+    # Nodes in the sum that distributing ``factors`` over all of their sums
+    # writes out before like terms are collected: each term's product holds
+    # one term of every sum and all the other factors.
+    sums = [factor for factor in factors if isinstance(factor, Sum)]
+    others = builtins.sum(
+        factor.node_count if isinstance(factor, _StructuralNode) else 1
+        for factor in factors
+        if not isinstance(factor, Sum)
+    )
+    products = math.prod(len(factor.terms) for factor in sums)
+    count = 1 + products * (1 + others)
+    for factor in sums:
+        count += (products // len(factor.terms)) * builtins.sum(
+            term.node_count if isinstance(term, _StructuralNode) else 1
+            for term in factor.terms
+        )
+    return count
+
+
+def _compact_distribution(
+    expression: Product, size: int, context: EvaluatorContext
+) -> Optional[Numerical]:
+    # When the distribution about to be written out has more than
+    # ``max_distribution_nodes`` nodes, multiplies out the whole product as a
+    # polynomial and snaps it as one step. Products that are not polynomials
+    # are distributed as usual.
+    ceiling = context.options.max_distribution_nodes
+    if ceiling is None or size <= ceiling:
+        return None
+    polynomial = to_polynomial(expression)
+    if polynomial is None:
+        return None
+    expanded = polynomial.to_expression()
+    context.add_coverage_tag("product_distribution_compact")
+    context.snap(
+        expression,
+        expanded,
+        wording(
+            context,
+            "distribution_compact",
+            "Multiply out the product and collect like terms in one step; written out term by term it would exceed {nodes} nodes.",
+            "Expand and collect like terms.",
+            nodes=ceiling,
+        ),
+    )
+    return expanded
+
+
 def evaluate_expression(expression: Numerical, context: EvaluatorContext):
+    return trampoline(_evaluate_steps, expression, context)
+
+
+def _evaluate_steps(expression: Numerical, context: EvaluatorContext):
+    # Returns the generator ``trampoline`` runs for ``expression``. Repeated
+    # subtrees go through ``_evaluate_shared_steps`` when sharing is enabled.
+    if context._budget is not None:
+        context._budget.check(expression)
+    path = context.locate(expression)
+    shared = context.shared_subexpressions
+    prepared = context.prepared
+    if (
+        shared
+        and isinstance(expression, _StructuralNode)
+        and expression.fingerprint in shared
+    ):
+        steps = _evaluate_shared_steps(expression, context)
+    elif (
+        prepared is not None
+        and isinstance(expression, _StructuralNode)
+        and expression.fingerprint in prepared.symbol_names
+        and (path is not None or not context.explain)
+    ):
+        steps = _prepared_steps(expression, context, path)
+    else:
+        steps = _evaluate_node_steps(expression, context)
+    if context._ops is not None:
+        context._ops.append((_ENTER, path))
+    return _focused_steps(steps, context, path)
+
+
+def _focused_steps(steps, context: EvaluatorContext, path):
+    # Keeps ``context.focus`` on ``expression``'s path while ``steps`` runs, so
+    # its snaps rewrite that subtree instead of searching the whole tree.
+    context.focus_stack.append([path, 0])
+    try:
+        return (yield from steps)
+    finally:
+        context.focus_stack.pop()
+        if context._ops is not None:
+            context._ops.append((_LEAVE,))
+
+
+def _prepared_steps(expression: Numerical, context: EvaluatorContext, path):
+    # Replays ``expression``'s recorded evaluation, or evaluates and records
+    # it. A recording is kept only if no step depended on the tree outside
+    # the subtree, so replaying it anywhere takes the steps evaluating would.
+    prepared = context.prepared
+    key = prepared._replay_key(expression, context)
+    replay = prepared.replays.get(key)
+    if replay is not None:
+        prepared.hits += 1
+        return _replay(replay, context, path)
+    prepared.misses += 1
+    owner = context._ops is None
+    if owner:
+        context._ops = []
+    ops = context._ops
+    start = len(ops)
+    taints = context._taints
+    context._recording_roots.append(path)
+    try:
+        result = yield _evaluate_node_steps, expression, context
+    finally:
+        context._recording_roots.pop()
+        if owner:
+            context._ops = None
+    if context._taints == taints or not context.explain:
+        prepared.replays[key] = _Replay(
+            result, ops[start:], path, context._prepared_pins
+        )
+    return result
+
+
+def _replay(replay: _Replay, context: EvaluatorContext, path):
+    ops = context._ops
+    offset = None if replay.root is None else len(replay.root)
+    for op in replay.ops:
+        kind = op[0]
+        if kind == _SNAP:
+            step_path = op[5]
+            if step_path is not None and path is not None:
+                step_path = path + step_path[offset:]
+            context.snap(op[1], op[2], op[3], op[4], step_path)
+        elif kind == _ENTER:
+            step_path = op[1]
+            if step_path is not None:
+                step_path = None if path is None else path + step_path[offset:]
+            if ops is not None:
+                ops.append((_ENTER, step_path))
+            context.focus_stack.append([step_path, 0])
+        elif kind == _LEAVE:
+            context.focus_stack.pop()
+            if ops is not None:
+                ops.append(op)
+        elif kind == _EVENT:
+            context.explanation_events.append(op[1])
+            if ops is not None:
+                ops.append(op)
+        elif kind == _STATUS:
+            context.set_status(op[1], op[2])
+        else:
+            context.add_coverage_tag(op[1])
+    return replay.result
+
+
+def _evaluate_shared_steps(expression: Numerical, context: EvaluatorContext):
+    # The first evaluation of a subtree in a substitution scope is recorded;
+    # every later one reuses its result.
+    key = (expression.fingerprint, context.substitution_scope)
+    entry = context.shared_results.get(key)
+    if entry is None:
+        start = len(context.snapshots)
+        status = (context.solve_status, context.reason_code)
+        approximate = context.is_approximate
+        tags = frozenset(context.coverage_tags)
+        result = yield _evaluate_node_steps, expression, context
+        context.shared_results[key] = _SharedResult(
+            result,
+            context,
+            start,
+            len(context.snapshots),
+            (context.solve_status, context.reason_code)
+            if (context.solve_status, context.reason_code) != status
+            else None,
+            context.is_approximate and not approximate,
+            context.coverage_tags - tags,
+        )
+        return result
+    result = entry.result
+    if entry.context is not context:
+        # Computed by another context of this evaluation (a derivative body,
+        # a preview): carry over what that evaluation reported.
+        if entry.status is not None:
+            context.set_status(*entry.status)
+        if entry.approximate:
+            context.is_approximate = True
+        context.coverage_tags.update(entry.tags)
+    context.add_coverage_tag("shared_subexpression_reuse")
+    if not context.explain and context._budget is None:
+        return result
+    # The first evaluation usually rewrote every copy already. A copy that is
+    # still visible is left either untouched or in one of the intermediate
+    # forms the first evaluation went through; finish it in a single step.
+    remaining = None
+    focus = context.focus
+    if focus is not None and node_at(context.current_tree, focus) == expression:
+        remaining = expression
+    elif context.occurrences(expression) > 0:
+        remaining = expression
+    elif entry.context is context:
+        snapshots = context.snapshots[entry.start : entry.end]
+        for form in reversed(_intermediate_forms(expression, snapshots)):
+            if context.occurrences(form) > 0:
+                remaining = form
+                break
+    if remaining is not None and remaining != result:
+        explanation = None
+        if context.options.explain_shared_subexpressions:
+            explanation = wording(
+                context,
+                "shared_subexpression_reuse",
+                "${expression}$ was already computed above, so it equals ${result}$ here too.",
+                "${expression} = {result}$ (as computed above).",
+                expression=_Latex(remaining),
+                result=_Latex(result),
+            )
+        # Only traces show this step, so it is not charged to the budget.
+        budget, context._budget = context._budget, None
+        try:
+            context.snap(remaining, result, explanation)
+        finally:
+            context._budget = budget
+    return result
+
+
+def _intermediate_forms(expression: Numerical, snapshots: list) -> list[Numerical]:
+    # Replays the rewrites recorded while ``expression`` was first evaluated.
+    forms = []
+    form = expression
+    for snapshot in snapshots:
+        if not isinstance(snapshot, Snapshot):
+            continue
+        form = replace_sub(form, snapshot.original, snapshot.portion)
+        if isinstance(form, _StructuralNode) and (not forms or forms[-1] != form):
+            forms.append(form)
+    return forms
+
+
+def _evaluate_node_steps(expression: Numerical, context: EvaluatorContext):
+    # Generator form of ``evaluate_expression``: every recursive evaluation is
+    # ``yield``ed to ``trampoline`` so deep trees do not grow the Python stack.
 
     result = None
     match expression:
@@ -2495,16 +3644,11 @@ def evaluate_expression(expression: Numerical, context: EvaluatorContext):
                 context.snap(expression, result)
         case Power():
             with context.block([expression.exponent]) as block:
-                base = evaluate_expression(expression.base, context)
+                base = yield _evaluate_steps, expression.base, context
                 exponent = block[0]
             if base == 0:
-                preview_context = EvaluatorContext(
-                    exponent,
-                    context.substitutions,
-                    options=context.options,
-                    error_on_invalid_snap=False,
-                )
-                preview_exponent = evaluate_expression(exponent, preview_context)
+                preview_context = context.inner_context(exponent, context.substitutions)
+                preview_exponent = yield _evaluate_steps, exponent, preview_context
                 if is_int_or_float(preview_exponent):
                     if preview_exponent == 0:
                         match context.options.zero_power_zero_policy:
@@ -2574,17 +3718,18 @@ def evaluate_expression(expression: Numerical, context: EvaluatorContext):
                     wording(
                         context,
                         "zero_power_symbolic",
-                        f"Keep ${render_latex(symbolic_zero_power)}$ symbolic because the exponent's sign is unknown.",
+                        "Keep ${expression}$ symbolic because the exponent's sign is unknown.",
                         "Keep 0^x symbolic when exponent sign is unknown.",
-                        expression=render_latex(symbolic_zero_power),
+                        expression=_Latex(symbolic_zero_power),
                     ),
                 )
                 return symbolic_zero_power
             exponent_fraction = get_fraction(exponent)
             if exponent_fraction and exponent_fraction[0] == 1:
-                new_exponent = evaluate_expression(
+                new_exponent = yield (
+                    _evaluate_steps,
                     exponent,
-                    EvaluatorContext(exponent),
+                    type(context)(exponent),
                 )  # Fake context so we don't get intermediate steps on roots.
                 result = base**new_exponent
                 context.snap(
@@ -2593,7 +3738,7 @@ def evaluate_expression(expression: Numerical, context: EvaluatorContext):
                 )
                 return result
             else:
-                exponent = evaluate_expression(exponent, context)
+                exponent = yield _evaluate_steps, exponent, context
             expression = Power(base, exponent)
             if base == 0 and exponent == 0:
                 match context.options.zero_power_zero_policy:
@@ -2665,13 +3810,13 @@ def evaluate_expression(expression: Numerical, context: EvaluatorContext):
                     wording(
                         context,
                         "minus_one_power_parity",
-                        f"When $-1$ is raised to an even power, the result is $1$. When $-1$ is raised to an odd power, the result is $-1$. "
+                        "When $-1$ is raised to an even power, the result is $1$. When $-1$ is raised to an odd power, the result is $-1$. "
                         + (
-                            f"Since in this case, our power is {exponent}, which is even, the result is $1$."
+                            "Since in this case, our power is {exponent}, which is even, the result is $1$."
                             if exponent % 2 == 0
-                            else f"Since in this case, our power is {exponent}, which is odd, the result is $-1$."
+                            else "Since in this case, our power is {exponent}, which is odd, the result is $-1$."
                         ),
-                        f"$-1^{{{exponent}}}$ depends on parity; result is ${result}$.",
+                        "$-1^{{{exponent}}}$ depends on parity; result is ${result}$.",
                         exponent=exponent,
                         result=result,
                     ),
@@ -2713,9 +3858,9 @@ def evaluate_expression(expression: Numerical, context: EvaluatorContext):
                         wording(
                             context,
                             "overflow_symbolic",
-                            f"${render_latex(expression)}$ is outside the configured numeric exponent limit, so we'll keep it in symbolic form.",
-                            f"Keep ${render_latex(expression)}$ symbolic due to exponent limit.",
-                            expression=render_latex(expression),
+                            "${expression}$ is outside the configured numeric exponent limit, so we'll keep it in symbolic form.",
+                            "Keep ${expression}$ symbolic due to exponent limit.",
+                            expression=_Latex(expression),
                         ),
                         False,
                     )
@@ -2789,9 +3934,9 @@ def evaluate_expression(expression: Numerical, context: EvaluatorContext):
                             wording(
                                 context,
                                 "overflow_python_symbolic",
-                                f"${render_latex(expression)}$ overflowed during numeric evaluation, so we'll keep it in symbolic form.",
-                                f"Keep ${render_latex(expression)}$ symbolic due to numeric overflow.",
-                                expression=render_latex(expression),
+                                "${expression}$ overflowed during numeric evaluation, so we'll keep it in symbolic form.",
+                                "Keep ${expression}$ symbolic due to numeric overflow.",
+                                expression=_Latex(expression),
                             ),
                             False,
                         )
@@ -2831,11 +3976,11 @@ def evaluate_expression(expression: Numerical, context: EvaluatorContext):
                         expression,
                         new_expression,
                     )
-                    result = evaluate_expression(new_expression, context)
+                    result = yield _evaluate_steps, new_expression, context
                 else:
                     try:
                         result = base**exponent
-                        if contains(context.current_tree, expression) > 0:
+                        if context.appears(expression):
                             context.snap(
                                 expression,
                                 result,
@@ -2875,9 +4020,9 @@ def evaluate_expression(expression: Numerical, context: EvaluatorContext):
                             wording(
                                 context,
                                 "overflow_python_symbolic",
-                                f"${render_latex(expression)}$ overflowed during numeric evaluation, so we'll keep it in symbolic form.",
-                                f"Keep ${render_latex(expression)}$ symbolic due to numeric overflow.",
-                                expression=render_latex(expression),
+                                "${expression}$ overflowed during numeric evaluation, so we'll keep it in symbolic form.",
+                                "Keep ${expression}$ symbolic due to numeric overflow.",
+                                expression=_Latex(expression),
                             ),
                             False,
                         )
@@ -2892,11 +4037,10 @@ def evaluate_expression(expression: Numerical, context: EvaluatorContext):
             if 0 in expression.factors:
                 context.snap(expression, 0)
                 return 0
-            factors = [
-                evaluate_expression(factor, context)
-                for factor in expression.factors
-                if factor != 1
-            ]
+            factors = []
+            for factor in expression.factors:
+                if factor != 1:
+                    factors.append((yield _evaluate_steps, factor, context))
             current_expression = Product(factors)
             if len(factors) == 1:
                 context.snap(current_expression, factors[0])
@@ -2909,6 +4053,26 @@ def evaluate_expression(expression: Numerical, context: EvaluatorContext):
             if 0 in factors:
                 context.snap(current_expression, 0)
                 return 0
+            sums = [factor for factor in factors if isinstance(factor, Sum)]
+            if len(sums) > 1 and context.options.product_distribution == "pairwise":
+                first, second = sorted(sums, key=lambda factor: len(factor.terms))[:2]
+                pair = Sum(
+                    [product([left, right]) for left in first.terms for right in second.terms]
+                )
+                remaining = [
+                    pair if factor is first else factor
+                    for factor in factors
+                    if factor is not second
+                ]
+                # The last pair leaves the sum itself, not a one-factor product.
+                distributed = pair if len(remaining) == 1 else Product(remaining)
+                compact = _compact_distribution(
+                    current_expression, distributed.node_count, context
+                )
+                if compact is not None:
+                    return (yield _evaluate_steps, compact, context)
+                context.snap(current_expression, distributed)
+                return (yield _evaluate_steps, distributed, context)
             # Check for a Sum to distribute
             sum_to_distribute = None
             for i, factor in enumerate(factors):
@@ -2931,8 +4095,13 @@ def evaluate_expression(expression: Numerical, context: EvaluatorContext):
 
                 # The new expression is a sum of these new products
                 distributed_sum = Sum(new_terms)
+                compact = _compact_distribution(
+                    current_expression, _expansion_node_count(factors), context
+                )
+                if compact is not None:
+                    return (yield _evaluate_steps, compact, context)
                 context.snap(current_expression, distributed_sum)
-                return evaluate_expression(distributed_sum, context)
+                return (yield _evaluate_steps, distributed_sum, context)
             # Original logic if no distribution is needed
             factors = sorted(factors, key=numerical_sort_key)
             if all(is_int_or_float(factor) for factor in factors):
@@ -2949,7 +4118,9 @@ def evaluate_expression(expression: Numerical, context: EvaluatorContext):
                 return new_expression
         case Sum():
             # Stage 1: Recursively evaluate all terms first.
-            terms = [evaluate_expression(term, context) for term in expression.terms]
+            terms = []
+            for term in expression.terms:
+                terms.append((yield _evaluate_steps, term, context))
             expression = Sum(terms)
 
             # Stage 2: Flatten nested Sums.
@@ -3030,14 +4201,11 @@ def evaluate_expression(expression: Numerical, context: EvaluatorContext):
                 for k, v in context.substitutions.items()
                 if not (isinstance(k, str) and k in bound_names)
             }
-            inner_context = EvaluatorContext(
-                expression.expression,
-                filtered,
-                options=context.options,
-                error_on_invalid_snap=False,
-            )
-            inner = evaluate_expression(
-                replace_symbols(expression.expression, inner_context), inner_context
+            inner_context = context.inner_context(expression.expression, filtered)
+            inner = yield (
+                _evaluate_steps,
+                replace_symbols(expression.expression, inner_context),
+                inner_context,
             )
             derivative_expr = Derivative(inner, expression.variables)
             result_expr = inner
@@ -3058,8 +4226,9 @@ def evaluate_expression(expression: Numerical, context: EvaluatorContext):
                     wording(
                         context,
                         "derivative_result",
-                        f"Differentiate with respect to "
-                        + ", ".join(
+                        "Differentiate with respect to {variables} using the applicable differentiation rules.",
+                        "Applied differentiation rules.",
+                        variables=", ".join(
                             [
                                 (
                                     f"${v.name}$"
@@ -3068,12 +4237,10 @@ def evaluate_expression(expression: Numerical, context: EvaluatorContext):
                                 )
                                 for v, o in expression.variables
                             ]
-                        )
-                        + " using the applicable differentiation rules.",
-                        "Applied differentiation rules.",
+                        ),
                     ),
                 )
-                return evaluate_expression(result_expr, context)
+                return (yield _evaluate_steps, result_expr, context)
             context.set_status("partial", "derivative_unsolved_rule")
             return derivative_expr
         case Integral():
@@ -3082,22 +4249,19 @@ def evaluate_expression(expression: Numerical, context: EvaluatorContext):
                 for k, v in context.substitutions.items()
                 if not (isinstance(k, str) and k == expression.variable.name)
             }
-            inner_context = EvaluatorContext(
-                expression.expression,
-                filtered,
-                options=context.options,
-                error_on_invalid_snap=False,
-            )
-            inner = evaluate_expression(
-                replace_symbols(expression.expression, inner_context), inner_context
+            inner_context = context.inner_context(expression.expression, filtered)
+            inner = yield (
+                _evaluate_steps,
+                replace_symbols(expression.expression, inner_context),
+                inner_context,
             )
             lower = (
-                evaluate_expression(expression.lower, context)
+                (yield _evaluate_steps, expression.lower, context)
                 if expression.lower is not None
                 else None
             )
             upper = (
-                evaluate_expression(expression.upper, context)
+                (yield _evaluate_steps, expression.upper, context)
                 if expression.upper is not None
                 else None
             )
@@ -3120,11 +4284,12 @@ def evaluate_expression(expression: Numerical, context: EvaluatorContext):
                     wording(
                         context,
                         "integral_indefinite_result",
-                        f"Compute an antiderivative with respect to ${expression.variable.name}$.",
+                        "Compute an antiderivative with respect to ${variable}$.",
                         "Applied integration rules.",
+                        variable=expression.variable.name,
                     ),
                 )
-                return evaluate_expression(antiderivative, context)
+                return (yield _evaluate_steps, antiderivative, context)
 
             if isinstance(antiderivative, Integral):
                 context.set_status("partial", "definite_integral_unsolved_antiderivative")
@@ -3146,11 +4311,13 @@ def evaluate_expression(expression: Numerical, context: EvaluatorContext):
                 wording(
                     context,
                     "integral_definite_result",
-                    f"Apply the Fundamental Theorem of Calculus: evaluate the antiderivative at the bounds and subtract, $F({render_latex(upper)}) - F({render_latex(lower)})$.",
+                    "Apply the Fundamental Theorem of Calculus: evaluate the antiderivative at the bounds and subtract, $F({upper}) - F({lower})$.",
                     "Evaluate antiderivative at bounds and subtract.",
+                    upper=_Latex(upper),
+                    lower=_Latex(lower),
                 ),
             )
-            return evaluate_expression(difference, context)
+            return (yield _evaluate_steps, difference, context)
 
         case FunctionCall():
             with context.block(
@@ -3160,15 +4327,18 @@ def evaluate_expression(expression: Numerical, context: EvaluatorContext):
             ) as subscript_arguments, context.block(
                 expression.superscript_arguments
             ) as superscript_arguments:
-                functional_arguments = [
-                    evaluate_expression(arg, context) for arg in functional_arguments
-                ]
-                subscript_arguments = [
-                    evaluate_expression(arg, context) for arg in subscript_arguments
-                ]
-                superscript_arguments = [
-                    evaluate_expression(arg, context) for arg in superscript_arguments
-                ]
+                evaluated_arguments = ([], [], [])
+                for arguments, evaluated in zip(
+                    (functional_arguments, subscript_arguments, superscript_arguments),
+                    evaluated_arguments,
+                ):
+                    for arg in arguments:
+                        evaluated.append((yield _evaluate_steps, arg, context))
+                (
+                    functional_arguments,
+                    subscript_arguments,
+                    superscript_arguments,
+                ) = evaluated_arguments
             if (
                 expression.function in context.substitutions
                 and all(is_int_or_float(arg) for arg in functional_arguments)
@@ -3223,19 +4393,24 @@ def evaluate_expression(expression: Numerical, context: EvaluatorContext):
                 [arg for arg in subscript_arguments],
                 [arg for arg in superscript_arguments],
             )
-            eval_occurrences = contains(context.current_tree, evaluated_call)
-            expr_occurrences = contains(context.current_tree, expression)
-            if isinstance(eval_occurrences, bool):
-                eval_occurrences = int(eval_occurrences)
-            if isinstance(expr_occurrences, bool):
-                expr_occurrences = int(expr_occurrences)
-
-            # Avoid globally replacing duplicate identical calls in unrelated subtrees.
-            # This can corrupt nested-derivative/integral branches that should be evaluated separately.
-            if eval_occurrences == 1:
-                context.snap(evaluated_call, result)
-            elif expr_occurrences == 1:
-                context.snap(expression, result)
+            focus = context.focus
+            focused = None if focus is None else node_at(context.current_tree, focus)
+            if focused is not None and focused in (evaluated_call, expression):
+                context.snap(focused, result)
+            else:
+                eval_occurrences = context.occurrences(evaluated_call)
+                expr_occurrences = context.occurrences(expression)
+                if isinstance(eval_occurrences, bool):
+                    eval_occurrences = int(eval_occurrences)
+                if isinstance(expr_occurrences, bool):
+                    expr_occurrences = int(expr_occurrences)
+
+                # Avoid globally replacing duplicate identical calls in unrelated subtrees.
+                # This can corrupt nested-derivative/integral branches that should be evaluated separately.
+                if eval_occurrences == 1:
+                    context.snap(evaluated_call, result)
+                elif expr_occurrences == 1:
+                    context.snap(expression, result)
         case Symbol():
             if expression.name in context.substitutions:
                 result = context.substitutions[expression.name]
@@ -3249,17 +4424,68 @@ def evaluate(
     substitutions: Optional[dict[str, int | float]] = None,
     error_on_invalid_snap: bool = True,
     options: Optional[EvaluatorOptions] = None,
+    explain: bool = True,
 ):
+    """Evaluate ``expression`` and return ``(result, context)``.
+
+    With ``explain=False`` the context is a ``NullEvaluatorContext``: it
+    records no steps, so only the result and the status fields are set.
+    """
     substitutions = substitutions or {}
-    context = EvaluatorContext(
+    context_type = EvaluatorContext if explain else NullEvaluatorContext
+    context = context_type(
         expression,
         substitutions,
         options=options or EvaluatorOptions(),
         error_on_invalid_snap=error_on_invalid_snap,
     )
+    return _evaluate_in(expression, substitutions, context)
+
+
+def _evaluate_in(expression: Numerical, substitutions: dict, context: EvaluatorContext):
+    try:
+        result = _evaluate_substituted(expression, substitutions, context)
+    except EvaluationBudgetExceeded as e:
+        result = _budget_exceeded(context, e)
+
+    if _contains_node_type(result, (Integral, Derivative)):
+        context.set_status("partial", "symbolic_calculus_remaining")
+
+    return result, context
+
+
+_BUDGET_NAMES = {
+    "snapshot_budget_exceeded": "step",
+    "tree_node_budget_exceeded": "tree size",
+    "deadline_exceeded": "time",
+}
+
+
+def _budget_exceeded(context: EvaluatorContext, error: EvaluationBudgetExceeded):
+    # The tree reached so far is the result. The status is set directly: the
+    # budget's reason replaces any earlier partial reason.
+    context._budget = None
+    result = replace_symbols(context.current_tree, context)
+    if isinstance(result, float) and result.is_integer():
+        result = int(result)
+    context.solve_status = "partial"
+    context.reason_code = error.reason_code
+    context.snap(
+        wording(
+            context,
+            "evaluation_budget_exceeded",
+            "Stop here: the evaluation ran out of its {budget} budget, so the expression is only simplified this far.",
+            "Stopped: {budget} budget exceeded.",
+            budget=_BUDGET_NAMES[error.reason_code],
+        )
+    )
+    return result
+
+
+def _evaluate_substituted(expression: Numerical, substitutions: dict, context: EvaluatorContext):
     # context.snap(f"Given the expression:\n$${render_latex(expression)}$$")
     new_expression = replace_symbols(expression, context)
-    if new_expression != expression:
+    if new_expression != expression and context.explain:
         variable_substitutions = {
             k: v
             for (k, v) in substitutions.items()
@@ -3284,25 +4510,13 @@ def evaluate(
         substitutions = []
         for k, v in variable_substitutions.items():
             substitutions.append(f"${k} = {render_latex(v)}$")
-        separator_pair = context.localizer.template(
-            "substitution.separator_pair", " [[substitution.separator_pair]] "
-        )
-        separator_many = context.localizer.template(
-            "substitution.separator_many", " [[substitution.separator_many]] "
-        )
-        if len(substitutions) <= 1:
-            substitutions_text = "".join(substitutions)
-        elif len(substitutions) == 2:
-            substitutions_text = separator_pair.join(substitutions)
-        else:
-            substitutions_text = separator_many.join(substitutions[:-1]) + separator_pair + substitutions[-1]
         context.snap(
             wording(
                 context,
                 "substitution_intro",
-                f"Substitute the given values: {substitutions_text}.",
-                f"Substitute values: {substitutions_text}.",
-                substitutions=substitutions_text,
+                "Substitute the given values: {substitutions}.",
+                "Substitute values: {substitutions}.",
+                substitutions=_SeparatedList(substitutions),
             ),
             False,
         )
@@ -3312,6 +4526,8 @@ def evaluate(
         )
     else:
         context.snap(expression, new_expression)
+    if context.options.share_common_subexpressions:
+        context.shared_subexpressions = to_dag(new_expression).shared_fingerprints()
     try:
         result = evaluate_expression(new_expression, context)
         if isinstance(result, float) and result.is_integer():
@@ -3325,22 +4541,124 @@ def evaluate(
             error_message = wording(
                 context,
                 "domain_error_function",
-                f"Stop here: ${render_latex(e.expression)}$ is undefined for {e.expression.function.name}, so the expression is outside its domain.",
-                f"${render_latex(e.expression)}$ is undefined for {e.expression.function.name}.",
-                expression=render_latex(e.expression),
+                "Stop here: ${expression}$ is undefined for {function_name}, so the expression is outside its domain.",
+                "${expression}$ is undefined for {function_name}.",
+                expression=_Latex(e.expression),
                 function_name=e.expression.function.name,
             )
         else:
             error_message = wording(
                 context,
                 "domain_error_generic",
-                f"Stop here: ${render_latex(e.expression)}$ is undefined in the real-number domain used by this evaluator.",
-                f"${render_latex(e.expression)}$ is undefined.",
-                expression=render_latex(e.expression),
+                "Stop here: ${expression}$ is undefined in the real-number domain used by this evaluator.",
+                "${expression}$ is undefined.",
+                expression=_Latex(e.expression),
             )
         context.snap(error_message)
+    return result
 
-    if _contains_node_type(result, (Integral, Derivative)):
-        context.set_status("partial", "symbolic_calculus_remaining")
 
-    return result, context
+class PreparedExpression:
+    """``evaluate`` for one expression and many substitution sets.
+
+    Made by ``prepare``. The options and localizer are built once, and each
+    subtree whose evaluation does not depend on the substituted values (such
+    as a derivative or integral with no free symbols) is evaluated once: its
+    steps are recorded and replayed into later evaluations. ``evaluate``
+    returns the same result and context contents as the plain ``evaluate``.
+
+    Replays are turned off when the options share common subexpressions, set
+    a ``trace_hook`` or collect localization diagnostics, since those need
+    every step to be evaluated as it happens.
+    """
+
+    def __init__(self, expression: Numerical, options: Optional[EvaluatorOptions] = None):
+        self.expression = expression
+        self.options = options or EvaluatorOptions()
+        localizer = Localizer.from_profile(self.options.explanation_profile)
+        # A localizer that records diagnostics is per evaluation.
+        self._localizer = None if localizer.collect_diagnostics else localizer
+        self.replays: dict[tuple, _Replay] = {}
+        self.hits = 0
+        self.misses = 0
+        # Names of the symbols in each composite subtree, by fingerprint: the
+        # values substituted for them are part of the subtree's replay key.
+        self.symbol_names: dict[bytes, tuple[str, ...]] = {}
+        if not (
+            self.options.share_common_subexpressions
+            or self.options.trace_hook is not None
+            or localizer.collect_diagnostics
+            or localizer.missing_key_policy == "error"
+        ):
+            names = {}
+            for node in iter_postorder(expression):
+                if isinstance(node, Symbol):
+                    names[id(node)] = frozenset((node.name,))
+                    continue
+                kids = children(node)
+                names[id(node)] = frozenset().union(
+                    *(names.get(id(kid), frozenset()) for kid in kids)
+                )
+                if kids and isinstance(node, _StructuralNode):
+                    self.symbol_names[node.fingerprint] = tuple(sorted(names[id(node)]))
+
+    def evaluate(
+        self,
+        substitutions: Optional[dict[str, int | float]] = None,
+        error_on_invalid_snap: bool = True,
+        explain: bool = True,
+    ):
+        """``evaluate(expression, substitutions, error_on_invalid_snap, options,
+        explain)`` with the prepared expression and options."""
+        substitutions = substitutions or {}
+        context_type = EvaluatorContext if explain else NullEvaluatorContext
+        context = context_type(
+            self.expression,
+            substitutions,
+            options=self.options,
+            error_on_invalid_snap=error_on_invalid_snap,
+            localizer=self._localizer,
+        )
+        if self.symbol_names:
+            context.prepared = self
+            # Functions and other substituted objects are keyed by identity,
+            # and kept alive by the replays recorded with them.
+            pins = [
+                (key, value)
+                for key, value in substitutions.items()
+                if not isinstance(key, str)
+                or not isinstance(value, (int, float, complex, _StructuralNode))
+            ]
+            context._prepared_pins = pins
+            context._prepared_scope = frozenset(
+                (key if isinstance(key, str) else id(key), id(value))
+                for key, value in pins
+            )
+        return _evaluate_in(self.expression, substitutions, context)
+
+    def _replay_key(self, expression: Numerical, context: EvaluatorContext) -> tuple:
+        substitutions = context.substitutions
+        values = []
+        for name in self.symbol_names[expression.fingerprint]:
+            value = substitutions.get(name)
+            if isinstance(value, (int, float, complex, _StructuralNode)):
+                values.append(fingerprint(value))
+            else:
+                values.append(None)
+        return (
+            expression.fingerprint,
+            context.explain,
+            context.error_on_invalid_snap,
+            tuple(values),
+            context._prepared_scope,
+        )
+
+    def stats(self) -> dict[str, Any]:
+        return {"replays": len(self.replays), "hits": self.hits, "misses": self.misses}
+
+
+def prepare(
+    expression: Numerical, options: Optional[EvaluatorOptions] = None
+) -> PreparedExpression:
+    """Prepare ``expression`` for evaluation with many substitution sets."""
+    return PreparedExpression(expression, options)
@@ -98,12 +98,14 @@ def _build_eval_options(payload: dict[str, Any]) -> EvaluatorOptions:
             step_heading_template=step_heading_template,
         )
         options.explanation_profile = explanation_profile
-        return options
-    return EvaluatorOptions(
-        wording_style=wording_style,
-        wording_options=WordingOptions(step_heading_template=step_heading_template),
-        explanation_profile=explanation_profile,
-    )
+    else:
+        options = EvaluatorOptions(
+            wording_style=wording_style,
+            wording_options=WordingOptions(step_heading_template=step_heading_template),
+            explanation_profile=explanation_profile,
+        )
+    options.deadline_seconds = payload.get("eval_deadline_seconds")
+    return options
 
 
 def _audit_worker(payload: dict[str, Any], output_queue: Any):
@@ -384,6 +386,13 @@ def main() -> int:
         default="expressions",
     )
     parser.add_argument("--timeout-seconds", type=float, default=10.0)
+    parser.add_argument(
+        "--eval-deadline-seconds",
+        type=float,
+        default=None,
+        help="In-process evaluator deadline (EvaluatorOptions.deadline_seconds); "
+        "cases over it finish as partial instead of hanging.",
+    )
     parser.add_argument("--report-every", type=int, default=20)
     parser.add_argument(
         "--wording-style",
@@ -491,6 +500,7 @@ def main() -> int:
             "unsolvable_probability": args.unsolvable_probability,
             "hard_problem_probability": args.hard_problem_probability,
             "wording_style": args.wording_style,
+            "eval_deadline_seconds": args.eval_deadline_seconds,
             "compact_explanations": args.compact_explanations,
             "step_heading_template": args.step_heading_template,
             "locale": args.locale,
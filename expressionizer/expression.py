@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import contextlib
+import hashlib
+import sys
+import weakref
 from dataclasses import dataclass
 from typing import *
 from collections import Counter
+from fractions import Fraction
 
 
 def _clean_numeric(value):
@@ -29,12 +34,280 @@ def numerical_sort_key_reverse(numerical: Numerical):
         return (0, str(numerical))
 
 
-class Symbol:
+def _atom_fingerprint(value) -> bytes:
+    if value is None:
+        return b"N"
+    if isinstance(value, bool):
+        return b"b1" if value else b"b0"
+    if isinstance(value, int):
+        return b"i" + format(value, "x").encode()
+    if isinstance(value, float):
+        return b"f" + value.hex().encode()
+    if isinstance(value, complex):
+        return b"c" + value.real.hex().encode() + b"," + value.imag.hex().encode()
+    if isinstance(value, str):
+        return b"s" + value.encode("utf-8", "surrogatepass")
+    if isinstance(value, tuple):
+        return _digest([b"tuple"] + [fingerprint(item) for item in value])
+    return b"r" + repr(value).encode("utf-8", "surrogatepass")
+
+
+def _digest(parts: Iterable[bytes]) -> bytes:
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        hasher.update(len(part).to_bytes(4, "little"))
+        hasher.update(part)
+    return hasher.digest()
+
+
+def fingerprint(value) -> bytes:
+    """Canonical structural fingerprint of a node or numeric atom.
+
+    Two values share a fingerprint exactly when they have the same node types,
+    child order and atom values (``2`` and ``2.0`` differ). Node fingerprints
+    are 16-byte digests computed once per node and cached.
+    """
+    if isinstance(value, _StructuralNode):
+        return value.fingerprint
+    return _atom_fingerprint(value)
+
+
+_set_slot = object.__setattr__
+_slot_names_cache: dict[type, tuple[str, ...]] = {}
+
+
+def _slot_names(cls: type) -> tuple[str, ...]:
+    names = _slot_names_cache.get(cls)
+    if names is None:
+        names = tuple(
+            name
+            for klass in reversed(cls.__mro__)
+            for name in klass.__dict__.get("__slots__", ())
+            if name != "__weakref__"
+        )
+        _slot_names_cache[cls] = names
+    return names
+
+
+class _ImmutableSlots:
+    """Base for compact, immutable objects that store their fields in ``__slots__``.
+
+    Fields are assigned once in ``__init__`` through ``_set_slot``; any later
+    assignment raises ``AttributeError``.
+    """
+
+    __slots__ = ()
+    _transient_slots: tuple[str, ...] = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} objects are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} objects are immutable")
+
+    def __getstate__(self):
+        return {
+            name: getattr(self, name)
+            for name in _slot_names(type(self))
+            if name not in self._transient_slots and hasattr(self, name)
+        }
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            _set_slot(self, name, value)
+
+
+class _StructuralNode(_ImmutableSlots):
+    # The structural hash, fingerprint and subtree metadata are computed lazily
+    # on first use and kept on the instance. Hashes of strings are salted per
+    # process, so the cached values never travel through pickle.
+    __slots__ = ("_hash", "_fingerprint", "_metadata", "__weakref__")
+    _transient_slots = ("_hash", "_fingerprint", "_metadata")
+
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            _fill_bottom_up(self, "_hash", _compute_hash, _has_cached_hash)
+            return self._hash
+
+    def _structural_hash(self) -> int:
+        raise NotImplementedError
+
+    @property
+    def fingerprint(self) -> bytes:
+        try:
+            return self._fingerprint
+        except AttributeError:
+            _fill_bottom_up(self, "_fingerprint", _compute_fingerprint)
+            return self._fingerprint
+
+    def _fingerprint_parts(self) -> list[bytes]:
+        raise NotImplementedError
+
+    def _child_nodes(self) -> tuple:
+        """Direct subexpressions, in rendering order (``None`` bounds omitted)."""
+        return ()
+
+    def _with_children(self, children: list) -> "_StructuralNode":
+        """A node of the same type whose ``_child_nodes()`` are ``children``."""
+        return self
+
+    def _equality_pairs(self, other) -> bool | list[tuple[Any, Any]]:
+        """Decide ``self == other`` locally, or list the pairs that must all be equal."""
+        return self == other
+
+    def _combine_metadata(self, children: list[_NodeMetadata]) -> _NodeMetadata:
+        free_symbols = frozenset()
+        node_count = 1
+        depth = 0
+        contains_calculus = False
+        leaf_count = 0
+        for child in children:
+            if child.free_symbols:
+                free_symbols = free_symbols | child.free_symbols
+            node_count += child.node_count
+            depth = max(depth, child.depth)
+            contains_calculus = contains_calculus or child.contains_calculus
+            leaf_count += child.leaf_count
+        return _NodeMetadata(
+            free_symbols, node_count, depth + 1, contains_calculus, leaf_count
+        )
+
+    def _get_metadata(self) -> _NodeMetadata:
+        try:
+            return self._metadata
+        except AttributeError:
+            _fill_bottom_up(self, "_metadata", _compute_metadata)
+            return self._metadata
+
+    @property
+    def free_symbols(self) -> frozenset[Symbol]:
+        """Symbols occurring free in the subtree (integration variables are bound)."""
+        return self._get_metadata().free_symbols
+
+    @property
+    def node_count(self) -> int:
+        """Number of nodes in the subtree, counting numeric leaves."""
+        return self._get_metadata().node_count
+
+    @property
+    def depth(self) -> int:
+        """Height of the subtree; a leaf has depth 1."""
+        return self._get_metadata().depth
+
+    @property
+    def contains_calculus(self) -> bool:
+        """Whether a ``Derivative`` or ``Integral`` occurs in the subtree."""
+        return self._get_metadata().contains_calculus
+
+
+class _NodeMetadata(NamedTuple):
+    free_symbols: frozenset
+    node_count: int
+    depth: int
+    contains_calculus: bool
+    # Number of leaves (numbers and symbols); this is what ``len(node)`` reports.
+    leaf_count: int
+
+
+_LEAF_METADATA = _NodeMetadata(frozenset(), 1, 1, False, 1)
+
+
+def _compute_metadata(node: _StructuralNode) -> _NodeMetadata:
+    return node._combine_metadata(
+        [
+            child._metadata if isinstance(child, _StructuralNode) else _LEAF_METADATA
+            for child in node._child_nodes()
+        ]
+    )
+
+
+def _compute_hash(node: _StructuralNode) -> int:
+    return node._structural_hash()
+
+
+def _compute_fingerprint(node: _StructuralNode) -> bytes:
+    return _digest(node._fingerprint_parts())
+
+
+def _has_cached_hash(node: _StructuralNode) -> bool:
+    # Symbols and functions hash their name directly and never fill ``_hash``.
+    return type(node).__hash__ is _StructuralNode.__hash__
+
+
+def _fill_bottom_up(
+    root: _StructuralNode,
+    slot: str,
+    compute: Callable[[_StructuralNode], Any],
+    applies: Callable[[_StructuralNode], bool] = lambda node: True,
+) -> None:
+    # Children are filled before their parent so that ``compute`` only ever
+    # reads cached child values; deep trees never recurse.
+    stack = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if hasattr(node, slot):
+            continue
+        if not expanded:
+            stack.append((node, True))
+            for child in node._child_nodes():
+                if (
+                    isinstance(child, _StructuralNode)
+                    and applies(child)
+                    and not hasattr(child, slot)
+                ):
+                    stack.append((child, False))
+            continue
+        _set_slot(node, slot, compute(node))
+
+
+def _structurally_equal(left, right) -> bool:
+    # Compares pairs from an explicit stack instead of recursing through each
+    # child's ``__eq__``. The left operand's rules apply, as with ``==``.
+    stack = [(left, right)]
+    while stack:
+        a, b = stack.pop()
+        if a is b:
+            continue
+        if isinstance(a, _StructuralNode):
+            pairs = a._equality_pairs(b)
+        elif isinstance(b, _StructuralNode):
+            pairs = b._equality_pairs(a)
+        elif a == b:
+            continue
+        else:
+            return False
+        if pairs is True:
+            continue
+        if pairs is False:
+            return False
+        stack.extend(reversed(pairs))
+    return True
+
+
+def _cached_slot(node: _StructuralNode, slot: str, compute: Callable[[], Any]) -> Any:
+    try:
+        return getattr(node, slot)
+    except AttributeError:
+        value = compute()
+        _set_slot(node, slot, value)
+        return value
+
+
+def _is_sub_multiset(part: Counter, part_size: int, whole: Counter, whole_size: int) -> bool:
+    if part_size > whole_size:
+        return False
+    return all(count <= whole[item] for item, count in part.items())
+
+
+class Symbol(_StructuralNode):
+    __slots__ = ("name",)
     __match_args__ = ("name",)
     name: str
 
     def __init__(self, name: str):
-        self.name = name
+        _set_slot(self, "name", name)
 
     def __str__(self):
         return self.name
@@ -45,7 +318,12 @@ class Symbol:
     def __hash__(self):
         return hash(self.name)
 
+    def _fingerprint_parts(self):
+        return [b"Symbol", self.name.encode("utf-8", "surrogatepass")]
+
     def __eq__(self, other):
+        if self is other:
+            return True
         if isinstance(other, Symbol):
             return self.name == other.name
         return False
@@ -89,8 +367,20 @@ class Symbol:
     def __len__(self):
         return 1
 
+    def _combine_metadata(self, children):
+        return _NodeMetadata(frozenset((self,)), 1, 1, False, 1)
 
-class MathFunction:
+
+class MathFunction(_StructuralNode):
+    __slots__ = (
+        "name",
+        "functional_parameters",
+        "subscript_parameters",
+        "superscript_parameters",
+        "functional_min_parameters",
+        "subscript_min_parameters",
+        "superscript_min_parameters",
+    )
     __match_args__ = (
         "name",
         "functional_parameters",
@@ -118,27 +408,41 @@ class MathFunction:
         subscript_min_parameters: Optional[int] = None,
         superscript_min_parameters: Optional[int] = None,
     ):
-        self.name = name
-        self.functional_parameters = functional_parameters
-        self.subscript_parameters = subscript_parameters
-        self.superscript_parameters = superscript_parameters
-        self.functional_min_parameters = (
-            functional_min_parameters
-            if functional_min_parameters is not None
-            else functional_parameters
+        _set_slot(self, "name", name)
+        _set_slot(self, "functional_parameters", functional_parameters)
+        _set_slot(self, "subscript_parameters", subscript_parameters)
+        _set_slot(self, "superscript_parameters", superscript_parameters)
+        _set_slot(
+            self,
+            "functional_min_parameters",
+            (
+                functional_min_parameters
+                if functional_min_parameters is not None
+                else functional_parameters
+            ),
         )
-        self.subscript_min_parameters = (
-            subscript_min_parameters
-            if subscript_min_parameters is not None
-            else subscript_parameters
+        _set_slot(
+            self,
+            "subscript_min_parameters",
+            (
+                subscript_min_parameters
+                if subscript_min_parameters is not None
+                else subscript_parameters
+            ),
         )
-        self.superscript_min_parameters = (
-            superscript_min_parameters
-            if superscript_min_parameters is not None
-            else superscript_parameters
+        _set_slot(
+            self,
+            "superscript_min_parameters",
+            (
+                superscript_min_parameters
+                if superscript_min_parameters is not None
+                else superscript_parameters
+            ),
         )
 
     def __eq__(self, other: "MathFunction"):
+        if self is other:
+            return True
         return (
             self.name == other.name
             and self.functional_parameters == other.functional_parameters
@@ -180,8 +484,10 @@ class MathFunction:
                 f"Too many superscript arguments: expected at most {self.superscript_parameters}, got {len(superscript_arguments)}"
             )
 
-        return FunctionCall(
-            self, functional_arguments, subscript_arguments, superscript_arguments
+        return _intern(
+            FunctionCall(
+                self, functional_arguments, subscript_arguments, superscript_arguments
+            )
         )
 
     def __hash__(self):
@@ -194,18 +500,31 @@ class MathFunction:
             )
         )
 
+    def _fingerprint_parts(self):
+        return [
+            b"MathFunction",
+            self.name.encode("utf-8", "surrogatepass"),
+            _atom_fingerprint(self.functional_parameters),
+            _atom_fingerprint(self.subscript_parameters),
+            _atom_fingerprint(self.superscript_parameters),
+            _atom_fingerprint(self.functional_min_parameters),
+            _atom_fingerprint(self.subscript_min_parameters),
+            _atom_fingerprint(self.superscript_min_parameters),
+        ]
+
     def __bool__(self):
         return True
 
 
-class Power:
+class Power(_StructuralNode):
+    __slots__ = ("base", "exponent")
     __match_args__ = ("base", "exponent")
     base: Numerical
     exponent: Numerical
 
     def __init__(self, base: Numerical, exponent: Numerical = 1):
-        self.base = base
-        self.exponent = exponent
+        _set_slot(self, "base", base)
+        _set_slot(self, "exponent", exponent)
 
     def __str__(self) -> str:
         return f"{self.base}^{self.exponent}"
@@ -213,13 +532,23 @@ class Power:
     def __repr__(self):
         return str(self)
 
-    def __hash__(self):
+    __hash__ = _StructuralNode.__hash__
+
+    def _structural_hash(self):
         return hash((self.base, self.exponent))
 
+    def _fingerprint_parts(self):
+        return [b"Power", fingerprint(self.base), fingerprint(self.exponent)]
+
     def render_group(self):
         return f"{self}"
 
     def __eq__(self, other: Numerical) -> bool:
+        if self is other:
+            return True
+        return _structurally_equal(self, other)
+
+    def _equality_pairs(self, other):
         factor = None
         match other:
             case Power():
@@ -231,12 +560,10 @@ class Power:
             case Sum() if len(other.terms) == 1 and isinstance(other.terms[0], Power):
                 factor = other.terms[0]
             case int() | float():
-                return self.base == other and self.exponent == 1
-        return (
-            isinstance(factor, Power)
-            and factor.base == self.base
-            and factor.exponent == self.exponent
-        )
+                return [(self.base, other), (self.exponent, 1)]
+        if not isinstance(factor, Power):
+            return False
+        return [(factor.base, self.base), (factor.exponent, self.exponent)]
 
     def __ne__(self, other) -> bool:
         return not self == other
@@ -284,12 +611,22 @@ class Power:
         return True
 
     def __len__(self):
-        return (1 if is_int_or_float(self.base) else len(self.base)) + (
-            1 if is_int_or_float(self.exponent) else len(self.exponent)
-        )
+        return self._get_metadata().leaf_count
 
+    def _child_nodes(self):
+        return (self.base, self.exponent)
 
-class FunctionCall:
+    def _with_children(self, children):
+        return Power(children[0], children[1])
+
+
+class FunctionCall(_StructuralNode):
+    __slots__ = (
+        "function",
+        "functional_arguments",
+        "subscript_arguments",
+        "superscript_arguments",
+    )
     __match_args__ = (
         "function",
         "functional_arguments",
@@ -308,10 +645,10 @@ class FunctionCall:
         subscript_arguments: list[Numerical] = [],
         superscript_arguments: list[Numerical] = [],
     ):
-        self.function = function
-        self.functional_arguments = functional_arguments
-        self.subscript_arguments = subscript_arguments
-        self.superscript_arguments = superscript_arguments
+        _set_slot(self, "function", function)
+        _set_slot(self, "functional_arguments", functional_arguments)
+        _set_slot(self, "subscript_arguments", subscript_arguments)
+        _set_slot(self, "superscript_arguments", superscript_arguments)
 
     def __str__(self):
         if len(self.subscript_arguments) == 0:
@@ -336,7 +673,9 @@ class FunctionCall:
     def render_group(self):
         return f"{self}"
 
-    def __hash__(self):
+    __hash__ = _StructuralNode.__hash__
+
+    def _structural_hash(self):
         return hash(
             (
                 self.function,
@@ -346,10 +685,27 @@ class FunctionCall:
             )
         )
 
+    def _fingerprint_parts(self):
+        return [
+            b"FunctionCall",
+            self.function.fingerprint,
+            _atom_fingerprint(len(self.functional_arguments)),
+            *map(fingerprint, self.functional_arguments),
+            _atom_fingerprint(len(self.subscript_arguments)),
+            *map(fingerprint, self.subscript_arguments),
+            _atom_fingerprint(len(self.superscript_arguments)),
+            *map(fingerprint, self.superscript_arguments),
+        ]
+
     def __bool__(self):
         return True
 
     def __eq__(self, other: Numerical):
+        if self is other:
+            return True
+        return _structurally_equal(self, other)
+
+    def _equality_pairs(self, other):
         if (
             isinstance(other, FunctionCall)
             and self.function == other.function
@@ -357,40 +713,46 @@ class FunctionCall:
             and len(self.subscript_arguments) == len(other.subscript_arguments)
             and len(self.superscript_arguments) == len(other.superscript_arguments)
         ):
-            for i in range(len(self.functional_arguments)):
-                if self.functional_arguments[i] != other.functional_arguments[i]:
-                    return False
-            for i in range(len(self.subscript_arguments)):
-                if self.subscript_arguments[i] != other.subscript_arguments[i]:
-                    return False
-            for i in range(len(self.superscript_arguments)):
-                if self.superscript_arguments[i] != other.superscript_arguments[i]:
-                    return False
-            return True
+            return [
+                *zip(self.functional_arguments, other.functional_arguments),
+                *zip(self.subscript_arguments, other.subscript_arguments),
+                *zip(self.superscript_arguments, other.superscript_arguments),
+            ]
         return False
 
     def __neg__(self):
         return Product([self, -1])
 
     def __len__(self):
-        total = 0
-        for arg in (
-            self.functional_arguments
-            + self.subscript_arguments
-            + self.superscript_arguments
-        ):
-            total += 1 if is_int_or_float(arg) else len(arg)
-        return total
+        return self._get_metadata().leaf_count
+
+    def _child_nodes(self):
+        return (
+            *self.functional_arguments,
+            *self.subscript_arguments,
+            *self.superscript_arguments,
+        )
+
+    def _with_children(self, children):
+        functional_end = len(self.functional_arguments)
+        subscript_end = functional_end + len(self.subscript_arguments)
+        return FunctionCall(
+            self.function,
+            list(children[:functional_end]),
+            list(children[functional_end:subscript_end]),
+            list(children[subscript_end:]),
+        )
 
 
-class Derivative:
+class Derivative(_StructuralNode):
+    __slots__ = ("expression", "variables")
     __match_args__ = ("expression", "variables")
     expression: Numerical
     variables: list[tuple[Symbol, int]]
 
     def __init__(self, expression: Numerical, variables: list[tuple[Symbol, int]]):
-        self.expression = expression
-        self.variables = variables
+        _set_slot(self, "expression", expression)
+        _set_slot(self, "variables", variables)
 
     def __str__(self):
         pieces = []
@@ -404,30 +766,62 @@ class Derivative:
     def __repr__(self):
         return str(self)
 
-    def __hash__(self):
+    __hash__ = _StructuralNode.__hash__
+
+    def _structural_hash(self):
         return hash((self.expression, tuple(self.variables)))
 
+    def _fingerprint_parts(self):
+        parts = [b"Derivative", fingerprint(self.expression)]
+        for variable, order in self.variables:
+            parts.append(fingerprint(variable))
+            parts.append(_atom_fingerprint(order))
+        return parts
+
     def __eq__(self, other):
-        return (
-            isinstance(other, Derivative)
-            and self.expression == other.expression
-            and self.variables == other.variables
-        )
+        if self is other:
+            return True
+        return _structurally_equal(self, other)
+
+    def _equality_pairs(self, other):
+        if not isinstance(other, Derivative):
+            return False
+        return [
+            (self.expression, other.expression),
+            (self.variables, other.variables),
+        ]
 
     def __bool__(self):
         return True
 
     def __len__(self):
-        total = 1 if is_int_or_float(self.expression) else len(self.expression)
-        for variable, _ in self.variables:
-            total += 1 if is_int_or_float(variable) else len(variable)
-        return total
+        return self._get_metadata().leaf_count
+
+    def _child_nodes(self):
+        return (self.expression, *(variable for variable, _ in self.variables))
+
+    def _with_children(self, children):
+        return Derivative(
+            children[0],
+            [
+                (variable, order)
+                for variable, (_, order) in zip(children[1:], self.variables)
+            ],
+        )
+
+    def _combine_metadata(self, children):
+        metadata = super()._combine_metadata(children)
+        # Differentiation variables are not free occurrences of their own.
+        return metadata._replace(
+            free_symbols=children[0].free_symbols, contains_calculus=True
+        )
 
     def __neg__(self):
         return Product([-1, self])
 
 
-class Integral:
+class Integral(_StructuralNode):
+    __slots__ = ("expression", "variable", "lower", "upper")
     __match_args__ = ("expression", "variable", "lower", "upper")
     expression: Numerical
     variable: Symbol
@@ -441,10 +835,10 @@ class Integral:
         lower: Optional[Numerical] = None,
         upper: Optional[Numerical] = None,
     ):
-        self.expression = expression
-        self.variable = variable
-        self.lower = lower
-        self.upper = upper
+        _set_slot(self, "expression", expression)
+        _set_slot(self, "variable", variable)
+        _set_slot(self, "lower", lower)
+        _set_slot(self, "upper", upper)
 
     def __str__(self):
         if self.lower is None or self.upper is None:
@@ -454,40 +848,82 @@ class Integral:
     def __repr__(self):
         return str(self)
 
-    def __hash__(self):
+    __hash__ = _StructuralNode.__hash__
+
+    def _structural_hash(self):
         return hash((self.expression, self.variable, self.lower, self.upper))
 
+    def _fingerprint_parts(self):
+        return [
+            b"Integral",
+            fingerprint(self.expression),
+            fingerprint(self.variable),
+            fingerprint(self.lower),
+            fingerprint(self.upper),
+        ]
+
     def __eq__(self, other):
-        return (
-            isinstance(other, Integral)
-            and self.expression == other.expression
-            and self.variable == other.variable
-            and self.lower == other.lower
-            and self.upper == other.upper
-        )
+        if self is other:
+            return True
+        return _structurally_equal(self, other)
+
+    def _equality_pairs(self, other):
+        if not isinstance(other, Integral):
+            return False
+        return [
+            (self.expression, other.expression),
+            (self.variable, other.variable),
+            (self.lower, other.lower),
+            (self.upper, other.upper),
+        ]
 
     def __bool__(self):
         return True
 
     def __len__(self):
-        total = 1 if is_int_or_float(self.expression) else len(self.expression)
-        total += 1 if is_int_or_float(self.variable) else len(self.variable)
-        if self.lower is not None:
-            total += 1 if is_int_or_float(self.lower) else len(self.lower)
-        if self.upper is not None:
-            total += 1 if is_int_or_float(self.upper) else len(self.upper)
-        return total
+        return self._get_metadata().leaf_count
+
+    def _child_nodes(self):
+        return tuple(
+            child
+            for child in (self.expression, self.variable, self.lower, self.upper)
+            if child is not None
+        )
+
+    def _with_children(self, children):
+        remaining = iter(children[2:])
+        return Integral(
+            children[0],
+            children[1],
+            next(remaining) if self.lower is not None else None,
+            next(remaining) if self.upper is not None else None,
+        )
+
+    def _combine_metadata(self, children):
+        metadata = super()._combine_metadata(children)
+        # The integration variable is bound, including inside the bounds.
+        return metadata._replace(
+            free_symbols=metadata.free_symbols - {self.variable},
+            contains_calculus=True,
+        )
 
     def __neg__(self):
         return Product([-1, self])
 
 
-class Product:
+class Product(_StructuralNode):
+    # The factors that take part in equality and the sign-normalized factor
+    # multiset used for sub-product checks are derived once per node.
+    __slots__ = ("factors", "_significant_factors", "_factor_multiset")
+    _transient_slots = _StructuralNode._transient_slots + (
+        "_significant_factors",
+        "_factor_multiset",
+    )
     __match_args__ = ("factors",)
     factors: list[Numerical]
 
     def __init__(self, factors: list[Numerical]):
-        self.factors = factors
+        _set_slot(self, "factors", factors)
 
     def __str__(self):
         return "".join(map(repr, self.factors))
@@ -498,9 +934,15 @@ class Product:
     def render_group(self):
         return f"{self}"
 
-    def __hash__(self):
-        factors = sorted(self.factors, key=numerical_sort_key)
-        return hash(tuple(factors))
+    __hash__ = _StructuralNode.__hash__
+
+    def _structural_hash(self):
+        # Order-independent: combine the (cached) child hashes in sorted order
+        # rather than sorting the children themselves by their string form.
+        return hash(tuple(sorted(map(hash, self.factors))))
+
+    def _fingerprint_parts(self):
+        return [b"Product", *map(fingerprint, self.factors)]
 
     def __mul__(self, other: Numerical):
         return product([other] + self.factors)
@@ -530,32 +972,17 @@ class Product:
         return self.__mul__(other)
 
     def __eq__(self, other: Numerical):
+        if self is other:
+            return True
+        return _structurally_equal(self, other)
+
+    def _equality_pairs(self, other):
         if isinstance(other, Product):
-            self_factors, other_factors = [], []
-            for factor in self.factors:
-                if isinstance(factor, Power) and (
-                    factor.exponent == 0 or factor.base == 1
-                ):
-                    pass
-                elif factor == 1:
-                    pass
-                else:
-                    self_factors.append(factor)
-            for factor in other.factors:
-                if isinstance(factor, Power) and (
-                    factor.exponent == 0 or factor.base == 1
-                ):
-                    pass
-                elif factor == 1:
-                    pass
-                else:
-                    other_factors.append(factor)
+            self_factors = self._get_significant_factors()
+            other_factors = other._get_significant_factors()
             if len(self_factors) != len(other_factors):
                 return False
-            for i in range(len(self_factors)):
-                if self_factors[i] != other_factors[i]:
-                    return False
-            return True
+            return list(zip(self_factors, other_factors))
         elif (
             len(self.factors) == 1
             and is_int_or_float(other)
@@ -581,50 +1008,57 @@ class Product:
 
     def __contains__(self, other: Numerical):
         if isinstance(other, Product) and len(other.factors) > 0:
-            other_factors = []
-            for factor in other.factors:
-                if isinstance(factor, Product):
-                    other_factors.extend(
-                        [
-                            (abs(factor) if is_int_or_float(factor) else factor)
-                            for factor in factor.factors
-                        ]
-                    )
-                elif isinstance(factor, Sum) and len(factor.terms) <= 1:
-                    other_factors.extend(
-                        [
-                            (abs(term) if is_int_or_float(term) else term)
-                            for term in factor.terms
-                        ]
-                    )
-                elif is_int_or_float(factor):
-                    other_factors.append(abs(factor))
+            # Determine if other is a subset of self
+            return _is_sub_multiset(
+                *other._get_factor_multiset(), *self._get_factor_multiset()
+            )
+        return False  # other in self.factors
+
+    def _get_significant_factors(self) -> list[Numerical]:
+        """Factors compared by ``==``: powers with exponent 0 or base 1 and factors equal to 1 are dropped."""
+
+        def compute():
+            significant = []
+            for factor in self.factors:
+                if isinstance(factor, Power) and (
+                    factor.exponent == 0 or factor.base == 1
+                ):
+                    pass
+                elif factor == 1:
+                    pass
                 else:
-                    other_factors.append(factor)
-            self_factors = []
+                    significant.append(factor)
+            return significant
+
+        return _cached_slot(self, "_significant_factors", compute)
+
+    def _get_factor_multiset(self) -> tuple[Counter, int]:
+        """Factors with nested products flattened and numbers made positive, counted."""
+
+        def compute():
+            factors = []
             for factor in self.factors:
                 if isinstance(factor, Product):
-                    self_factors.extend(
+                    factors.extend(
                         [
                             (abs(factor) if is_int_or_float(factor) else factor)
                             for factor in factor.factors
                         ]
                     )
                 elif isinstance(factor, Sum) and len(factor.terms) <= 1:
-                    self_factors.extend(
+                    factors.extend(
                         [
                             (abs(term) if is_int_or_float(term) else term)
                             for term in factor.terms
                         ]
                     )
                 elif is_int_or_float(factor):
-                    self_factors.append(abs(factor))
+                    factors.append(abs(factor))
                 else:
-                    self_factors.append(factor)
-            # Determine if other is a subset of self
-            c1, c2 = Counter(other_factors), Counter(self_factors)
-            return all(c1[x] <= c2[x] for x in c1)
-        return False  # other in self.factors
+                    factors.append(factor)
+            return Counter(factors), len(factors)
+
+        return _cached_slot(self, "_factor_multiset", compute)
 
     def __bool__(self):
         return True
@@ -633,18 +1067,24 @@ class Product:
         return Product(self.factors.copy() + [-1])
 
     def __len__(self):
-        total = 0
-        for factor in self.factors:
-            total += 1 if is_int_or_float(factor) else len(factor)
-        return total
+        return self._get_metadata().leaf_count
+
+    def _child_nodes(self):
+        return tuple(self.factors)
 
+    def _with_children(self, children):
+        return Product(list(children))
 
-class Sum:
+
+class Sum(_StructuralNode):
+    # The normalized term multiset used for sub-sum checks is derived once.
+    __slots__ = ("terms", "_term_multiset")
+    _transient_slots = _StructuralNode._transient_slots + ("_term_multiset",)
     __match_args__ = ("terms",)
     terms: list[Numerical]
 
     def __init__(self, terms: list[Numerical]):
-        self.terms = terms
+        _set_slot(self, "terms", terms)
 
     def __str__(self):
         return " + ".join(map(repr, self.terms))
@@ -655,9 +1095,13 @@ class Sum:
     def render_group(self):
         return f"({self})"
 
-    def __hash__(self):
-        terms = sorted(self.terms, key=numerical_sort_key)
-        return hash(tuple(terms))
+    __hash__ = _StructuralNode.__hash__
+
+    def _structural_hash(self):
+        return hash(tuple(sorted(map(hash, self.terms))))
+
+    def _fingerprint_parts(self):
+        return [b"Sum", *map(fingerprint, self.terms)]
 
     def __mul__(self, other: Numerical):
         return product([self, other])
@@ -687,13 +1131,15 @@ class Sum:
         return self.__mul__(other)
 
     def __eq__(self, other: Numerical):
+        if self is other:
+            return True
+        return _structurally_equal(self, other)
+
+    def _equality_pairs(self, other):
         if isinstance(other, Sum):
             if len(self.terms) != len(other.terms):
                 return False
-            for i in range(len(self.terms)):
-                if self.terms[i] != other.terms[i]:
-                    return False
-            return True
+            return list(zip(self.terms, other.terms))
         elif len(self.terms) == 1 and is_int_or_float(other) and self.terms[0] == other:
             return True
         return False
@@ -714,49 +1160,46 @@ class Sum:
         return (-self) + other
 
     def __contains__(self, other: Numerical):
-
         if isinstance(other, Sum) and len(other.terms) > 0:
             # Determine if other is a subset of self
-            other_terms = []
-            for term in other.terms:
-                if isinstance(term, Sum):
-                    other_terms.extend(term.terms)
-                elif isinstance(term, Product) and len(term.factors) <= 1:
-                    other_terms.extend(term.factors)
-                elif (
-                    isinstance(term, Product)
-                    and len(term.factors) == 2
-                    and -1 in term.factors
-                ):
-                    other_terms.append(product([term.factors[0], term.factors[1]]))
-                else:
-                    other_terms.append(term)
-            self_terms = []
+            return _is_sub_multiset(
+                *other._get_term_multiset(), *self._get_term_multiset()
+            )
+        return False  # other in self.terms
+
+    def _get_term_multiset(self) -> tuple[Counter, int]:
+        """Terms with nested sums and one-factor products flattened, counted."""
+
+        def compute():
+            terms = []
             for term in self.terms:
                 if isinstance(term, Sum):
-                    self_terms.extend(term.terms)
+                    terms.extend(term.terms)
                 elif isinstance(term, Product) and len(term.factors) <= 1:
-                    self_terms.extend(term.factors)
+                    terms.extend(term.factors)
                 elif (
                     isinstance(term, Product)
                     and len(term.factors) == 2
                     and -1 in term.factors
                 ):
-                    self_terms.append(product([term.factors[0], term.factors[1]]))
+                    terms.append(product([term.factors[0], term.factors[1]]))
                 else:
-                    self_terms.append(term)
-            c1, c2 = Counter(other_terms), Counter(self_terms)
-            return all(c1[x] <= c2[x] for x in c1)
-        return False  # other in self.terms
+                    terms.append(term)
+            return Counter(terms), len(terms)
+
+        return _cached_slot(self, "_term_multiset", compute)
 
     def __bool__(self):
         return True
 
     def __len__(self):
-        total = 0
-        for term in self.terms:
-            total += 1 if is_int_or_float(term) else len(term)
-        return total
+        return self._get_metadata().leaf_count
+
+    def _child_nodes(self):
+        return tuple(self.terms)
+
+    def _with_children(self, children):
+        return Sum(list(children))
 
 
 Numerical = int | float | Power | Product | Sum | FunctionCall | Derivative | Integral | Symbol
@@ -785,6 +1228,7 @@ class InEquality:
     __match_args__ = ("expression1", "expression2", "sign", "inclusive")
 
     def __init__(
+        self,
         expression1: Numerical,
         expression2: Numerical,
         sign: Union[Literal[-1], Literal[1]] = 1,
@@ -830,8 +1274,159 @@ class SystemOfEquations:
         return True
 
 
+class InternTable:
+    """Weak-valued table that shares structurally identical nodes.
+
+    Nodes are keyed by their canonical ``fingerprint``; an entry disappears as
+    soon as no expression references the node any more.
+    """
+
+    def __init__(self):
+        self._nodes = weakref.WeakValueDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def intern(self, node):
+        """Return the shared node structurally identical to ``node``."""
+        if not isinstance(node, _StructuralNode):
+            return node
+        key = node.fingerprint
+        existing = self._nodes.get(key)
+        if existing is not None:
+            self.hits += 1
+            return existing
+        self.misses += 1
+        self._nodes[key] = node
+        return node
+
+    def intern_tree(self, node):
+        """Intern ``node`` and, unless it is already shared, all of its subtrees."""
+        if not isinstance(node, _StructuralNode):
+            return node
+        existing = self._nodes.get(node.fingerprint)
+        if existing is not None:
+            self.hits += 1
+            return existing
+        # Swapping a child for a node with the same fingerprint is invisible to
+        # readers (same structure, hash and equality), so children are replaced
+        # in place.
+        for children in _child_lists(node):
+            for index, child in enumerate(children):
+                children[index] = self.intern_tree(child)
+        match node:
+            case Power():
+                _set_slot(node, "base", self.intern_tree(node.base))
+                _set_slot(node, "exponent", self.intern_tree(node.exponent))
+            case FunctionCall():
+                _set_slot(node, "function", self.intern(node.function))
+            case Derivative():
+                _set_slot(node, "expression", self.intern_tree(node.expression))
+            case Integral():
+                _set_slot(node, "expression", self.intern_tree(node.expression))
+                _set_slot(node, "variable", self.intern(node.variable))
+                _set_slot(node, "lower", self.intern_tree(node.lower))
+                _set_slot(node, "upper", self.intern_tree(node.upper))
+        return self.intern(node)
+
+    def clear(self):
+        self._nodes.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._nodes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+def _child_lists(node) -> list[list]:
+    match node:
+        case Product():
+            return [node.factors]
+        case Sum():
+            return [node.terms]
+        case FunctionCall():
+            return [
+                node.functional_arguments,
+                node.subscript_arguments,
+                node.superscript_arguments,
+            ]
+    return []
+
+
+_intern_table: Optional[InternTable] = None
+
+
+def enable_interning(table: Optional[InternTable] = None) -> InternTable:
+    """Make the constructor functions return shared nodes (per process)."""
+    global _intern_table
+    _intern_table = table if table is not None else InternTable()
+    return _intern_table
+
+
+def disable_interning() -> Optional[InternTable]:
+    global _intern_table
+    table, _intern_table = _intern_table, None
+    return table
+
+
+def current_intern_table() -> Optional[InternTable]:
+    return _intern_table
+
+
+@contextlib.contextmanager
+def interning(table: Optional[InternTable] = None):
+    """Scope an intern table to a block, e.g. one worker or one batch.
+
+    ``with interning() as table: ...`` enables a fresh table (or the one given)
+    and restores the previous interning state on exit.
+    """
+    global _intern_table
+    previous = _intern_table
+    _intern_table = table if table is not None else InternTable()
+    try:
+        yield _intern_table
+    finally:
+        _intern_table = previous
+
+
+def _intern(node):
+    if _intern_table is None:
+        return node
+    return _intern_table.intern(node)
+
+
 def symbol(name: str):
-    return Symbol(name)
+    return _intern(Symbol(name))
+
+
+def math_function(
+    name: str,
+    functional_parameters: int = 0,
+    subscript_parameters: int = 0,
+    superscript_parameters: int = 0,
+    functional_min_parameters: Optional[int] = None,
+    subscript_min_parameters: Optional[int] = None,
+    superscript_min_parameters: Optional[int] = None,
+):
+    return _intern(
+        MathFunction(
+            name,
+            functional_parameters,
+            subscript_parameters,
+            superscript_parameters,
+            functional_min_parameters,
+            subscript_min_parameters,
+            superscript_min_parameters,
+        )
+    )
 
 
 def equation(*expressions: Numerical):
@@ -848,112 +1443,239 @@ def power(base: Numerical, exponent: Numerical = 1):
     if exponent == 0:
         if base == 0:
             # Keep 0^0 explicit so evaluator can handle domain behavior consistently.
-            return Power(base, exponent)
+            return _intern(Power(base, exponent))
         return 1
     elif exponent == 1:
         return base
     elif isinstance(base, Power):
-        return Power(base.base, product([base.exponent, exponent]))
+        return _intern(Power(base.base, product([base.exponent, exponent])))
     else:
-        return Power(base, exponent)
+        return _intern(Power(base, exponent))
 
 
-def product(factors: list[Numerical]):
-    expanded_factors = []
-    coefficient = 1
-    for factor in factors:
-        match factor:
-            case int() | float():
-                coefficient *= factor
-                coefficient = _clean_numeric(coefficient)
-                if coefficient == 0:
-                    return 0
-            case Product():
-                expanded_factors.extend(factor.factors)
-            case _:
-                expanded_factors.append(factor)
+_EXACT_DENOMINATOR_LIMIT = 10**18
+_FLOAT_MAX = Fraction(sys.float_info.max)
+
+
+def _exact_to_float(exact: int | Fraction) -> float:
+    # Past float range the float arithmetic would have reached infinity.
+    try:
+        return float(exact)
+    except OverflowError:
+        return float("inf") if exact > 0 else float("-inf")
+
+
+class _ExactNumber:
+    """A running sum or product of int/float literals, rounded once at the end.
+
+    Floats are folded in as the ``Fraction`` of their shortest decimal form
+    (``0.1`` is exactly ``1/10``), so ``0.1 + 0.2 - 0.3`` is ``0`` and
+    ``value()`` applies ``_clean_numeric`` once instead of after every step.
+    An infinite or NaN float, or a denominator past ``_EXACT_DENOMINATOR_LIMIT``
+    (long float products), switches to plain float arithmetic so the cost of
+    each step stays constant. So does a float result leaving float range, which
+    continues from the signed infinity as float arithmetic would.
+    """
+
+    __slots__ = ("exact", "approximate", "has_float")
+
+    def __init__(self, start: int):
+        self.exact: int | Fraction = start
+        self.approximate: Optional[float] = None
+        self.has_float = False
+
+    def _operand(self, value):
+        if isinstance(value, float):
+            self.has_float = True
+            if self.approximate is None:
+                try:
+                    return Fraction(repr(value))
+                except ValueError:
+                    self.approximate = _exact_to_float(self.exact)
+        return value
+
+    def _bound(self):
+        exact = self.exact
+        if (
+            isinstance(exact, Fraction) and exact.denominator > _EXACT_DENOMINATOR_LIMIT
+        ) or (self.has_float and abs(exact) > _FLOAT_MAX):
+            self.approximate = _exact_to_float(exact)
+
+    def add(self, value: int | float):
+        operand = self._operand(value)
+        if self.approximate is None:
+            self.exact += operand
+            self._bound()
+        else:
+            self.approximate += value
+
+    def multiply(self, value: int | float):
+        operand = self._operand(value)
+        if self.approximate is None:
+            self.exact *= operand
+            self._bound()
+        else:
+            self.approximate *= value
+
+    def is_zero(self) -> bool:
+        if self.approximate is None:
+            return self.exact == 0
+        return self.approximate == 0
+
+    def value(self):
+        if self.approximate is not None:
+            return _clean_numeric(self.approximate)
+        if self.has_float:
+            return _clean_numeric(_exact_to_float(self.exact))
+        return self.exact
+
+
+class _ProductAccumulator:
+    """Single-pass state of ``product``: the coefficient and like-factor counts."""
+
+    __slots__ = ("coefficient", "powers", "sums", "others", "zero")
+
+    def __init__(self):
+        self.coefficient = _ExactNumber(1)
+        # Bases with their summed exponents, then sums and other nodes with
+        # repeat counts, each in first-seen order.
+        self.powers: dict = {}
+        self.sums: dict = {}
+        self.others: dict = {}
+        self.zero = False
+
+    def add(self, factor: Numerical):
+        if self.zero:
+            return
+        stack = [factor]
+        while stack:
+            factor = stack.pop()
+            match factor:
+                case int() | float():
+                    self.coefficient.multiply(factor)
+                    if self.coefficient.is_zero():
+                        self.zero = True
+                        return
+                case Product():
+                    stack.extend(reversed(factor.factors))
+                case Symbol():
+                    self.powers[factor] = self.powers.get(factor, 0) + 1
+                case Power():
+                    if factor.base in self.powers:
+                        self.powers[factor.base] += factor.exponent
+                    else:
+                        self.powers[factor.base] = factor.exponent
+                case Sum():
+                    self.sums[factor] = self.sums.get(factor, 0) + 1
+                case _:
+                    self.others[factor] = self.others.get(factor, 0) + 1
+
+    def result(self) -> Numerical:
+        if self.zero:
+            return 0
+        coefficient = self.coefficient.value()
+        if coefficient == 0:
+            return 0
+        if len(self.powers) + len(self.sums) + len(self.others) == 0:
+            return coefficient
+        new_factors = [coefficient] if coefficient != 1 else []
+        for base, exponent in self.powers.items():
+            new_factors.append(power(base, exponent))
+        for group in (self.sums, self.others):
+            for factor, count in group.items():
+                new_factors.append(power(factor, count))
+        if len(new_factors) == 1:
+            return new_factors[0]
+        return _intern(Product(new_factors))
 
-    powers = {}
-    sums = {}
-    function_calls = {}
-    for factor in expanded_factors:
-        match factor:
+
+class _SumAccumulator:
+    """Single-pass state of ``sum``: the numeric part and like-term counts."""
+
+    __slots__ = ("numerical", "counts")
+
+    def __init__(self):
+        self.numerical = _ExactNumber(0)
+        self.counts: dict = {}
+
+    def add(self, term: Numerical):
+        match term:
             case int() | float():
-                coefficient *= factor
-                coefficient = _clean_numeric(coefficient)
-                if coefficient == 0:
-                    return 0
-            case Symbol():
-                if factor in powers:
-                    powers[factor] += 1
-                else:
-                    powers[factor] = 1
-            case Power():
-                if factor.base in powers:
-                    powers[factor.base] += factor.exponent
-                else:
-                    powers[factor.base] = factor.exponent
+                self.numerical.add(term)
             case Sum():
-                if factor in sums:
-                    sums[factor] += 1
-                else:
-                    sums[factor] = 1
-            case FunctionCall():
-                if factor in function_calls:
-                    function_calls[factor] += 1
-                else:
-                    function_calls[factor] = 1
-
-    coefficient = _clean_numeric(coefficient)
-    if len(powers) + len(sums) + len(function_calls) == 0:
-        return coefficient
-    new_factors = [coefficient] if coefficient != 1 else []
-    for base, exponent in powers.items():
-        new_factors.append(power(base, exponent))
-    for sum, count in sums.items():
-        new_factors.append(power(sum, count))
-    for function_call, count in function_calls.items():
-        new_factors.append(power(function_call, count))
-    if len(new_factors) == 1:
-        return new_factors[0]
-    return Product(new_factors)
+                # Only one level is flattened; the inner terms (numbers
+                # included) are counted as they are.
+                for inner in term.terms:
+                    self.counts[inner] = self.counts.get(inner, 0) + 1
+            case _:
+                self.counts[term] = self.counts.get(term, 0) + 1
+
+    def result(self) -> Numerical:
+        numerical = self.numerical.value()
+        if not self.counts:
+            return numerical
+        new_terms = [numerical] if numerical != 0 else []
+        for term, count in self.counts.items():
+            if count == 1:
+                new_terms.append(term)
+            else:
+                new_terms.append(product([count, term]))
+        return _intern(Sum(new_terms))
+
+
+def product(factors: list[Numerical]):
+    accumulator = _ProductAccumulator()
+    for factor in factors:
+        accumulator.add(factor)
+        if accumulator.zero:
+            return 0
+    return accumulator.result()
 
 
 def sum(terms: list[Numerical] | Sum):
     # Just combine like terms
     if isinstance(terms, Sum):
         terms = terms.terms
-    expanded_terms = []
-    numerical = 0
+    accumulator = _SumAccumulator()
     for term in terms:
-        match term:
-            case int() | float():
-                numerical += term
-                numerical = _clean_numeric(numerical)
-            case Sum():
-                expanded_terms.extend(term.terms)
-            case _:
-                expanded_terms.append(term)
+        accumulator.add(term)
+    return accumulator.result()
 
-    if len(expanded_terms) == 0:
-        return _clean_numeric(numerical)
 
-    terms_count = {}
-    for term in expanded_terms:
-        if term in terms_count:
-            terms_count[term] += 1
-        else:
-            terms_count[term] = 1
+class ExpressionBuilder:
+    """Collects terms and factors one at a time and builds the expression once.
 
-    numerical = _clean_numeric(numerical)
-    new_terms = [numerical] if numerical != 0 else []
-    for term, count in terms_count.items():
-        if count == 1:
-            new_terms.append(term)
-        else:
-            new_terms.append(product([term] * count))
+    Repeated ``+`` re-flattens the growing sum on every call, which is quadratic
+    in the number of terms. ``add_term`` and ``mul_factor`` only update running
+    like-term counts, so ``build()`` of ``n`` items is linear and returns what
+    ``sum(terms)`` or ``product(factors)`` would. When both are used, the sum of
+    the terms is multiplied by the factors.
+    """
 
-    return Sum(new_terms)
+    __slots__ = ("_terms", "_factors")
+
+    def __init__(self):
+        self._terms: Optional[_SumAccumulator] = None
+        self._factors: Optional[_ProductAccumulator] = None
+
+    def add_term(self, term: Numerical) -> "ExpressionBuilder":
+        if self._terms is None:
+            self._terms = _SumAccumulator()
+        self._terms.add(term)
+        return self
+
+    def mul_factor(self, factor: Numerical) -> "ExpressionBuilder":
+        if self._factors is None:
+            self._factors = _ProductAccumulator()
+        self._factors.add(factor)
+        return self
+
+    def build(self) -> Numerical:
+        if self._factors is None:
+            return self._terms.result() if self._terms is not None else 0
+        if self._terms is None:
+            return self._factors.result()
+        return product([self._terms.result(), self._factors.result()])
 
 
 def fraction(numerator: Numerical, denominator: Numerical):
@@ -988,14 +1710,16 @@ def derivative(
     variable: Symbol | str | tuple[Symbol | str, int] | list[tuple[Symbol | str, int]],
     order: int = 1,
 ):
-    return Derivative(expression, _normalize_derivative_variables(variable, order))
+    return _intern(
+        Derivative(expression, _normalize_derivative_variables(variable, order))
+    )
 
 
 def partial_derivative(
     expression: Numerical,
     variables: list[tuple[Symbol | str, int]],
 ):
-    return Derivative(expression, _normalize_derivative_variables(variables))
+    return _intern(Derivative(expression, _normalize_derivative_variables(variables)))
 
 
 def integral(
@@ -1008,7 +1732,7 @@ def integral(
         variable = Symbol(variable)
     if not isinstance(variable, Symbol):
         raise TypeError("Integral variable must be Symbol or str.")
-    return Integral(expression, variable, lower, upper)
+    return _intern(Integral(expression, variable, lower, upper))
 
 
 def is_int_or_float(value):
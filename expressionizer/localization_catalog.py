@@ -58,7 +58,8 @@ def _extract_keys_from_file(path: Path) -> dict[str, str | None]:
             continue
 
         # _msg(context, "key", "default", ...)
-        if isinstance(node.func, ast.Name) and node.func.id == "_msg":
+        # _message(context, "key", "default", payload)
+        if isinstance(node.func, ast.Name) and node.func.id in ("_msg", "_message"):
             if len(node.args) >= 2:
                 key = _literal_string(node.args[1])
                 if key is not None:
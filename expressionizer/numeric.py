@@ -0,0 +1,497 @@
+"""Vectorized numeric evaluation of expression trees over NumPy arrays.
+
+``evaluate_numeric`` computes one expression for every element of its array
+substitutions at once, for plotting grids or checking many answers. It skips
+the step-by-step explanation: ``Derivative`` and ``Integral`` nodes are
+resolved once through the evaluator's native calculus rules, and the
+resulting tree is lowered to NumPy ufunc calls.
+
+Elements that cannot be computed are ``NaN`` in ``NumericResult.values`` and
+carry one of the ``NUMERIC_*`` codes in ``NumericResult.errors``; the code is
+the first failure met on the way up the tree.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from .evaluator import (
+    EvaluatorOptions,
+    _differentiate_once,
+    _integrate_once,
+    _substitute_symbol,
+)
+from .expression import (
+    Derivative,
+    FunctionCall,
+    Integral,
+    Numerical,
+    Power,
+    Product,
+    Sum,
+    Symbol,
+    _StructuralNode,
+)
+from .procedural import FUNCTIONS
+from .traversal import DESCEND, fold, rewrite
+
+NUMERIC_OK = 0
+NUMERIC_DOMAIN_ERROR = 1
+NUMERIC_DIVISION_BY_ZERO = 2
+NUMERIC_OVERFLOW = 3
+# A symbol without a substitution, a function without an implementation, or
+# a derivative or integral the native rules could not resolve.
+NUMERIC_UNRESOLVED = 4
+# The substituted value itself was ``NaN`` or infinite.
+NUMERIC_INVALID_INPUT = 5
+
+NUMERIC_ERROR_NAMES = {
+    NUMERIC_OK: "ok",
+    NUMERIC_DOMAIN_ERROR: "domain_error",
+    NUMERIC_DIVISION_BY_ZERO: "division_by_zero",
+    NUMERIC_OVERFLOW: "overflow",
+    NUMERIC_UNRESOLVED: "unresolved",
+    NUMERIC_INVALID_INPUT: "invalid_input",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class NumericResult:
+    """Values and per-element error codes of an ``evaluate_numeric`` call.
+
+    Both arrays have the broadcast shape of the substitutions; ``values`` is
+    ``NaN`` wherever ``errors`` is not ``NUMERIC_OK``.
+    """
+
+    values: np.ndarray
+    errors: np.ndarray
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self.errors == NUMERIC_OK
+
+    def error_counts(self) -> dict[str, int]:
+        codes, counts = np.unique(self.errors, return_counts=True)
+        return {
+            NUMERIC_ERROR_NAMES[int(code)]: int(count)
+            for code, count in zip(codes, counts)
+        }
+
+
+def _resolve_calculus(expression: Numerical) -> Numerical:
+    # Inner nodes are resolved first, so a derivative of an integral
+    # differentiates the antiderivative. Unresolved nodes stay in the tree.
+    def leave(_, node, __):
+        match node:
+            case Derivative():
+                result = node.expression
+                for variable, order in node.variables:
+                    for _ in range(order):
+                        result = _differentiate_once(result, variable)
+                return result
+            case Integral():
+                antiderivative = _integrate_once(node.expression, node.variable)
+                if isinstance(antiderivative, Integral):
+                    return node
+                if node.lower is None or node.upper is None:
+                    return antiderivative
+                return Sum(
+                    [
+                        _substitute_symbol(antiderivative, node.variable, node.upper),
+                        Product(
+                            [
+                                -1,
+                                _substitute_symbol(
+                                    antiderivative, node.variable, node.lower
+                                ),
+                            ]
+                        ),
+                    ]
+                )
+        return node
+
+    return rewrite(expression, leave=leave)
+
+
+def _flag(values, errors: np.ndarray, nan_code: int, inf_code) -> None:
+    # Marks the elements that became non-finite at this node. ``inf_code`` is
+    # a code, or a callable giving per-element codes for the infinite ones.
+    bad = ~np.isfinite(values)
+    if not bad.any():
+        return
+    fresh = np.broadcast_to(bad, errors.shape) & (errors == NUMERIC_OK)
+    if not fresh.any():
+        return
+    nan = np.broadcast_to(np.isnan(values), errors.shape)
+    errors[fresh & nan] = nan_code
+    infinite = fresh & ~nan
+    if infinite.any():
+        if callable(inf_code):
+            inf_code = np.broadcast_to(inf_code(), errors.shape)[infinite]
+        errors[infinite] = inf_code
+
+
+def _unresolved(env, errors):
+    errors[errors == NUMERIC_OK] = NUMERIC_UNRESOLVED
+    return np.float64(np.nan)
+
+
+def _zero_over(denominators, zero_code: int, other_code: int) -> Callable:
+    return lambda: np.where(denominators == 0, zero_code, other_code)
+
+
+def _log(args, subs, errors):
+    if not subs:
+        values = np.log(args[0])
+        _flag(values, errors, NUMERIC_DOMAIN_ERROR, NUMERIC_DOMAIN_ERROR)
+        return values
+    values = np.log(args[0]) / np.log(subs[0])
+    # ``math.log(x, 1)`` divides by ``log(1) == 0``.
+    _flag(
+        values,
+        errors,
+        NUMERIC_DOMAIN_ERROR,
+        _zero_over(subs[0] - 1, NUMERIC_DIVISION_BY_ZERO, NUMERIC_DOMAIN_ERROR),
+    )
+    return values
+
+
+def _reciprocal(ufunc) -> Callable:
+    def run(args, subs, errors):
+        denominator = ufunc(args[0])
+        values = 1 / denominator
+        _flag(
+            values,
+            errors,
+            NUMERIC_DOMAIN_ERROR,
+            NUMERIC_DIVISION_BY_ZERO,
+        )
+        return values
+
+    return run
+
+
+def _integer_pair(ufunc) -> Callable:
+    # ``math.gcd``/``math.lcm`` on truncated arguments; elements that do not
+    # fit in int64 are reported as overflow.
+    def run(args, subs, errors):
+        left, right = np.broadcast_arrays(*(np.trunc(np.real(a)) for a in args))
+        limit = 2.0**63
+        fits = (np.abs(left) < limit) & (np.abs(right) < limit)
+        values = ufunc(
+            np.where(fits, left, 0).astype(np.int64),
+            np.where(fits, right, 0).astype(np.int64),
+        ).astype(np.float64)
+        values = np.where(fits, values, np.inf)
+        _flag(values, errors, NUMERIC_DOMAIN_ERROR, NUMERIC_OVERFLOW)
+        return values
+
+    return run
+
+
+def _unary(ufunc, nan_code: int = NUMERIC_DOMAIN_ERROR, inf_code: int = NUMERIC_DOMAIN_ERROR) -> Callable:
+    def run(args, subs, errors):
+        values = ufunc(args[0])
+        _flag(values, errors, nan_code, inf_code)
+        return values
+
+    return run
+
+
+def _pow(args, subs, errors):
+    values = np.power(args[0], args[1])
+    # ``math.pow(0, -1)`` is a domain error, not a division by zero.
+    _flag(
+        values,
+        errors,
+        NUMERIC_DOMAIN_ERROR,
+        _zero_over(args[0], NUMERIC_DOMAIN_ERROR, NUMERIC_OVERFLOW),
+    )
+    return values
+
+
+def _root(args, subs, errors):
+    degree = subs[0] if subs else 2
+    values = np.power(args[0], 1 / np.asarray(degree, dtype=np.result_type(degree, 1.0)))
+    _flag(values, errors, NUMERIC_DOMAIN_ERROR, NUMERIC_DIVISION_BY_ZERO)
+    return values
+
+
+def _atan2(args, subs, errors):
+    values = np.arctan2(args[0], args[1])
+    _flag(values, errors, NUMERIC_DOMAIN_ERROR, NUMERIC_DOMAIN_ERROR)
+    return values
+
+
+# Vectorized equivalents of ``procedural.FUNCTIONS``, by name. Each takes the
+# evaluated functional and subscript arguments and the error array. Functions
+# without a ufunc counterpart (``factorial``, ``gamma``, ``erf``, ...) run
+# their scalar implementation element by element.
+_VECTORIZED: dict[str, Callable] = {
+    "sin": _unary(np.sin),
+    "cos": _unary(np.cos),
+    "tan": _unary(np.tan),
+    "asin": _unary(np.arcsin),
+    "acos": _unary(np.arccos),
+    "atan": _unary(np.arctan),
+    "atan2": _atan2,
+    "csc": _reciprocal(np.sin),
+    "sec": _reciprocal(np.cos),
+    "cot": _reciprocal(np.tan),
+    "sinh": _unary(np.sinh, inf_code=NUMERIC_OVERFLOW),
+    "cosh": _unary(np.cosh, inf_code=NUMERIC_OVERFLOW),
+    "tanh": _unary(np.tanh),
+    "asinh": _unary(np.arcsinh),
+    "acosh": _unary(np.arccosh),
+    "atanh": _unary(np.arctanh),
+    "log": _log,
+    "ln": _unary(np.log),
+    "log10": _unary(np.log10),
+    "log2": _unary(np.log2),
+    "log1p": _unary(np.log1p),
+    "exp": _unary(np.exp, inf_code=NUMERIC_OVERFLOW),
+    "expm1": _unary(np.expm1, inf_code=NUMERIC_OVERFLOW),
+    "pow": _pow,
+    "sqrt": _unary(np.sqrt),
+    "root": _root,
+    "ceil": _unary(np.ceil),
+    "floor": _unary(np.floor),
+    "trunc": _unary(np.trunc),
+    "abs": _unary(np.abs),
+    "gcd": _integer_pair(np.gcd),
+    "lcm": _integer_pair(np.lcm),
+}
+
+
+_STANDARD = {function.name: implementation for function, implementation in FUNCTIONS.items()}
+
+
+def _scalar_kernel(implementation: Callable, functional: int, subscript: int, complex_values: bool):
+    # One call of ``implementation`` per element, with exceptions turned
+    # into error codes the way ``evaluate`` turns them into domain errors.
+    convert = complex if complex_values else float
+
+    def call(*arguments):
+        arguments = [
+            int(value) if isinstance(value, float) and value.is_integer() else value
+            for value in arguments
+        ]
+        try:
+            value = convert(
+                implementation(
+                    arguments[:functional],
+                    arguments[functional : functional + subscript],
+                    arguments[functional + subscript :],
+                )
+            )
+        except ZeroDivisionError:
+            return np.nan, NUMERIC_DIVISION_BY_ZERO
+        except OverflowError:
+            return np.nan, NUMERIC_OVERFLOW
+        except (ValueError, TypeError, ArithmeticError):
+            return np.nan, NUMERIC_DOMAIN_ERROR
+        if value != value:
+            return np.nan, NUMERIC_DOMAIN_ERROR
+        if value in (float("inf"), float("-inf")):
+            return value, NUMERIC_OVERFLOW
+        return value, NUMERIC_OK
+
+    return call
+
+
+def _elementwise(implementation: Callable, call: FunctionCall, complex_values: bool) -> Callable:
+    functional = len(call.functional_arguments)
+    subscript = len(call.subscript_arguments)
+    arity = functional + subscript + len(call.superscript_arguments)
+    scalar = _scalar_kernel(implementation, functional, subscript, complex_values)
+    kernel = np.frompyfunc(scalar, arity, 2) if arity else None
+    dtype = np.complex128 if complex_values else np.float64
+
+    def run(arguments, errors):
+        values, codes = kernel(*arguments) if kernel is not None else scalar()
+        values = np.asarray(values).astype(dtype)
+        codes = np.broadcast_to(np.asarray(codes).astype(np.uint8), errors.shape)
+        fresh = (codes != NUMERIC_OK) & (errors == NUMERIC_OK)
+        errors[fresh] = codes[fresh]
+        return values
+
+    return run
+
+
+def _function_implementation(call: FunctionCall, substitutions: dict) -> Any:
+    # Same lookup order as ``evaluate``; calls to the standard functions are
+    # computed even when the substitutions do not list them.
+    function = call.function
+    if function in substitutions:
+        return substitutions[function]
+    if function.name in substitutions:
+        return substitutions[function.name]
+    if function in FUNCTIONS:
+        return FUNCTIONS[function]
+    return _STANDARD.get(function.name)
+
+
+def _compile(expression: Numerical, substitutions: dict, options: EvaluatorOptions, complex_values: bool) -> Callable:
+    # Lowers the tree to closures ``run(env, errors)`` that return arrays (or
+    # NumPy scalars for constant subtrees) broadcastable to ``errors.shape``.
+    literal_type = np.complex128 if complex_values else np.float64
+    zero_power_zero = options.zero_power_zero_policy
+
+    def enter(node):
+        if isinstance(node, (Derivative, Integral)):
+            return _unresolved
+        if isinstance(node, FunctionCall):
+            implementation = _function_implementation(node, substitutions)
+            if not callable(implementation):
+                return _unresolved
+        return DESCEND
+
+    def combine(node, kids):
+        match node:
+            case bool():
+                value = literal_type(int(node))
+                return lambda env, errors: value
+            case complex():
+                # Real runs keep the result only where it comes out real.
+                value = np.complex128(node)
+                return lambda env, errors: value
+            case int() | float():
+                try:
+                    value = literal_type(node)
+                except OverflowError:
+                    value = literal_type(np.inf if node > 0 else -np.inf)
+                return lambda env, errors: value
+            case Symbol():
+                name = node.name
+                if name not in substitutions:
+                    return _unresolved
+                return lambda env, errors: env[name]
+            case Sum():
+                return _reduction(np.add, kids)
+            case Product():
+                return _reduction(np.multiply, kids)
+            case Power():
+                return _power(kids[0], kids[1], zero_power_zero)
+            case FunctionCall():
+                return _function(node, kids, substitutions, complex_values)
+        return _unresolved
+
+    return fold(expression, combine, enter)
+
+
+def _reduction(ufunc, kids: list) -> Callable:
+    first, rest = kids[0], kids[1:]
+
+    def run(env, errors):
+        total = first(env, errors)
+        for kid in rest:
+            total = ufunc(total, kid(env, errors))
+        _flag(total, errors, NUMERIC_DOMAIN_ERROR, NUMERIC_OVERFLOW)
+        return total
+
+    return run
+
+
+def _power(base_fn: Callable, exponent_fn: Callable, zero_power_zero: str) -> Callable:
+    def run(env, errors):
+        base = base_fn(env, errors)
+        exponent = exponent_fn(env, errors)
+        values = np.power(base, exponent)
+        indeterminate = (base == 0) & (exponent == 0)
+        if np.any(indeterminate):
+            if zero_power_zero == "zero":
+                values = np.where(indeterminate, 0, values)
+            elif zero_power_zero != "one":
+                values = np.where(indeterminate, np.nan, values)
+        _flag(
+            values,
+            errors,
+            NUMERIC_DOMAIN_ERROR,
+            _zero_over(base, NUMERIC_DIVISION_BY_ZERO, NUMERIC_OVERFLOW),
+        )
+        return values
+
+    return run
+
+
+def _function(call: FunctionCall, kids: list, substitutions: dict, complex_values: bool) -> Callable:
+    implementation = _function_implementation(call, substitutions)
+    functional = len(call.functional_arguments)
+    subscript = len(call.subscript_arguments)
+    vectorized = _VECTORIZED.get(call.function.name)
+    if vectorized is not None and _STANDARD.get(call.function.name) is implementation:
+        functional_kids = kids[:functional]
+        subscript_kids = kids[functional : functional + subscript]
+
+        def run(env, errors):
+            args = [kid(env, errors) for kid in functional_kids]
+            subs = [kid(env, errors) for kid in subscript_kids]
+            return vectorized(args, subs, errors)
+
+        return run
+
+    elementwise = _elementwise(implementation, call, complex_values)
+
+    def run(env, errors):
+        return elementwise([kid(env, errors) for kid in kids], errors)
+
+    return run
+
+
+def _numeric_input(name: Any, value: Any) -> np.ndarray:
+    array = np.asarray(value)
+    if array.dtype == np.bool_ or not np.issubdtype(array.dtype, np.number):
+        raise TypeError(
+            f"Substitution for {name!r} must be numeric, got {array.dtype}."
+        )
+    if np.issubdtype(array.dtype, np.complexfloating):
+        return array.astype(np.complex128, copy=False)
+    return array.astype(np.float64, copy=False)
+
+
+def evaluate_numeric(
+    expression: Numerical,
+    substitutions: Optional[dict] = None,
+    options: Optional[EvaluatorOptions] = None,
+) -> NumericResult:
+    """Evaluate ``expression`` element-wise over array substitutions.
+
+    Symbol substitutions may be numbers, array-likes (broadcast against each
+    other) or expression nodes; function entries follow ``evaluate``'s
+    lookup. Of the options only ``zero_power_zero_policy`` applies. The
+    result is complex when any substituted value is complex.
+    """
+    substitutions = substitutions or {}
+    options = options or EvaluatorOptions()
+    for key, value in substitutions.items():
+        if isinstance(key, str) and isinstance(value, _StructuralNode):
+            expression = _substitute_symbol(expression, Symbol(key), value)
+    expression = _resolve_calculus(expression)
+
+    env = {
+        key: _numeric_input(key, value)
+        for key, value in substitutions.items()
+        if isinstance(key, str)
+        and not isinstance(value, _StructuralNode)
+        and not callable(value)
+    }
+    shape = np.broadcast_shapes(*(array.shape for array in env.values()))
+    complex_values = any(
+        np.issubdtype(array.dtype, np.complexfloating) for array in env.values()
+    )
+    errors = np.zeros(shape, dtype=np.uint8)
+    for array in env.values():
+        invalid = np.broadcast_to(~np.isfinite(array), shape)
+        errors[invalid] = NUMERIC_INVALID_INPUT
+
+    run = _compile(expression, substitutions, options, complex_values)
+    with np.errstate(all="ignore"):
+        result = run(env, errors)
+    dtype = np.complex128 if complex_values else np.float64
+    if not complex_values and np.iscomplexobj(result):
+        result = np.where(np.imag(result) == 0, np.real(result), np.nan)
+        _flag(result, errors, NUMERIC_DOMAIN_ERROR, NUMERIC_DOMAIN_ERROR)
+    values = np.array(np.broadcast_to(result, shape), dtype=dtype)
+    values[errors != NUMERIC_OK] = np.nan
+    return NumericResult(values, errors)
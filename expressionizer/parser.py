@@ -0,0 +1,610 @@
+"""Parse the plain-text grammar produced by ``render()`` back into trees.
+
+``render`` output is compact rather than unambiguous, so the parser follows
+the conventions ``render`` writes with:
+
+* Juxtaposition (``2x``, ``3(x + 1)``, ``x-3``) is a product and binds tighter
+  than ``^`` and ``/``: ``2x^2`` is ``(2x)^2`` and ``a/bc`` is ``a/(bc)``,
+  because ``render`` parenthesizes powers and quotients inside products.
+* Sums separate terms with `` + `` and `` - `` (spaces on both sides). A ``-``
+  written without a space before it starts a negative factor instead, so
+  ``x-3`` is the product of ``x`` and ``-3``.
+* ``sqrt(a)`` and ``root(a, n)`` are the powers ``a^(2^-1)`` and
+  ``a^(n^-1)``; ``d/dx^2,y(...)`` is a derivative; ``int(...) dx`` and
+  ``int_[a..b](...) dx`` are integrals (``∫`` forms from ``str()`` are read
+  too); ``{ a = b ; c = d }`` is a system.
+* Function names resolve against ``procedural.FUNCTIONS`` unless other
+  functions are given. Their arguments and ``_``/``^`` scripts are written
+  with ``str``, where ``^`` binds tighter than juxtaposition and a negative
+  term follows `` + ``.
+* Numbers written next to each other (``0.20.8``) are split into the literals
+  ``str`` produces for ints and floats. Symbol names containing ``^`` are only
+  recognized when listed in ``symbols``.
+
+Parsing aims to re-render faithfully, ``render(parse(render(e))) ==
+render(e)``, even where two trees share a rendering; the few renderings that
+``render`` simplifies on the way out (``2^-1·3^-1`` is printed as ``1/6``)
+cannot be recovered. Parsing uses ``trampoline``, so nesting depth is not
+limited by the recursion limit.
+"""
+
+import math
+import re
+from typing import Any, Iterable, Iterator, Literal, Optional
+
+from .expression import (
+    Derivative,
+    Equation,
+    FunctionCall,
+    InEquality,
+    Integral,
+    MathFunction,
+    Power,
+    Product,
+    Sum,
+    Symbol,
+    SystemOfEquations,
+    _intern,
+)
+from .traversal import trampoline
+
+# ``(kind, text, position, spaced)``; see ``Parser.tokenize``.
+Token = tuple[str, str, int, bool]
+
+DEFAULT_CONSTANTS = {"π": math.pi}
+
+_SUM_BP = 10
+_QUOTIENT_BP = 20
+_POWER_BP = 30
+_PRODUCT_BP = 40
+
+# Token kinds that can begin an operand, and so continue a product when they
+# directly follow one.
+_OPERAND_STARTS = frozenset(
+    ("number", "name", "function", "derivative", "integral", "∫", "(")
+)
+
+
+class ParseError(ValueError):
+    """Raised for text that is not in the rendered grammar."""
+
+    def __init__(self, message: str, text: str, position: int):
+        super().__init__(f"{message} at position {position}: {text!r}")
+        self.text = text
+        self.position = position
+
+
+_END = "end"
+_SYMBOL_PATTERN = r"[^\W\d_](?:_(?:[^\W\d_]|\d+))*"
+# ``render`` juxtaposes number literals (``0.20.8`` is ``0.2`` times ``0.8``),
+# so a run of digits and dots is split into the literals ``str`` produces.
+_LITERAL = re.compile(
+    r"(?:0|[1-9]\d*)(?:\.(?:0|\d*[1-9]))?"
+    r"|[1-9](?:\.\d*[1-9])?[eE][+-]\d+"
+)
+_PUNCTUATION = r"<=|>=|\.\.|[-+^/_()\[\]{},;=<>∫]"
+
+
+class Parser:
+    """Reusable parser; build one per function set and call ``parse`` per line."""
+
+    def __init__(
+        self,
+        functions: Optional[Iterable[MathFunction]] = None,
+        constants: Optional[dict[str, Any]] = None,
+        symbols: Iterable[str] = (),
+    ):
+        if functions is None:
+            from .procedural import FUNCTIONS
+
+            functions = FUNCTIONS.keys()
+        self.functions = {function.name: function for function in functions}
+        self.constants = dict(DEFAULT_CONSTANTS if constants is None else constants)
+        # ``sqrt`` and ``root`` are also written by ``render`` for powers, so
+        # they are recognized even when no such function is registered.
+        names = sorted({*self.functions, "sqrt", "root"}, key=len, reverse=True)
+        # Symbol names outside the usual ``x`` / ``x_i`` shape (such as ``w^n``)
+        # only read as one name when they are listed in ``symbols``.
+        known = sorted(
+            (name for name in set(symbols) if not re.fullmatch(_SYMBOL_PATTERN, name)),
+            key=len,
+            reverse=True,
+        )
+        known_pattern = "|".join(map(re.escape, known)) or r"(?!)"
+        self._pattern = re.compile(
+            r"(?P<space>\s+)"
+            r"|(?P<number>\d+(?:\.\d+)*(?:[eE][+-]\d+)?)"
+            r"|(?P<derivative>d/d(?=[^\W\d_]))"
+            r"|(?P<integral>int(?=[(_]))"
+            rf"|(?P<function>(?:{'|'.join(map(re.escape, names))})(?=[(_^]))"
+            rf"|(?P<known>{known_pattern})"
+            rf"|(?P<name>{_SYMBOL_PATTERN})"
+            rf"|(?P<punct>{_PUNCTUATION})"
+        )
+
+    def tokenize(self, text: str) -> list[Token]:
+        """Split ``text`` into ``(kind, text, position, spaced)`` tuples.
+
+        ``spaced`` records whitespace before the token, which separates the
+        binary `` - `` of a sum from the sign of a negative factor.
+        """
+        tokens: list[Token] = []
+        position = 0
+        spaced = False
+        match = self._pattern.match
+        while position < len(text):
+            found = match(text, position)
+            if found is None:
+                raise ParseError("Unexpected character", text, position)
+            kind = found.lastgroup
+            value = found.group()
+            if kind == "space":
+                spaced = True
+            elif kind == "number":
+                for start, end in _split_literals(text, found.start(), found.end()):
+                    tokens.append((kind, text[start:end], start, spaced))
+                    spaced = False
+            else:
+                if kind == "known":
+                    kind = "name"
+                if kind == "punct":
+                    kind = value
+                tokens.append((kind, value, position, spaced))
+                spaced = False
+            position = found.end()
+        tokens.append((_END, "", len(text), spaced))
+        return tokens
+
+    def parse(self, text: str) -> Any:
+        """Parse one expression, equation, inequality or ``{ ... ; ... }`` system."""
+        state = _State(self, text, self.tokenize(text))
+        result = trampoline(_statement_steps, state)
+        if state.peek()[0] != _END:
+            state.fail("Unexpected input")
+        return result
+
+    def parse_lines(
+        self,
+        lines: Iterable[str],
+        errors: Literal["raise", "none"] = "raise",
+    ) -> Iterator[Any]:
+        """Parse each non-blank line; with ``errors="none"`` bad lines give ``None``."""
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            if errors == "raise":
+                yield self.parse(line)
+                continue
+            try:
+                yield self.parse(line)
+            except (ParseError, ValueError):
+                yield None
+
+
+def _split_literals(text: str, start: int, end: int) -> list[tuple[int, int]]:
+    # ``splits[i]`` is where the literal starting at ``i`` ends, preferring the
+    # longest literal that still leaves a splittable remainder.
+    splits: dict[int, int] = {end: end}
+    for i in range(end - 1, start - 1, -1):
+        for j in range(end, i, -1):
+            if j in splits and _LITERAL.fullmatch(text, i, j):
+                splits[i] = j
+                break
+    if start not in splits:
+        raise ParseError("Malformed number", text, start)
+    pieces = []
+    while start < end:
+        pieces.append((start, splits[start]))
+        start = splits[start]
+    return pieces
+
+
+class _State:
+    __slots__ = (
+        "parser",
+        "text",
+        "tokens",
+        "index",
+        "negate_next",
+        "in_script",
+        "plain",
+        "rendered_groups",
+    )
+
+    def __init__(self, parser: Parser, text: str, tokens: list[Token]):
+        self.parser = parser
+        self.text = text
+        self.tokens = tokens
+        self.index = 0
+        # Set before a `` - `` term that starts with a number literal.
+        self.negate_next = False
+        # Set while reading a one-argument ``_x`` / ``^x`` script, which ends
+        # where the call's ``(`` follows at the top level.
+        self.in_script = False
+        # Set inside function arguments and scripts, which ``render`` writes
+        # with ``str``: there ``^`` binds tighter than juxtaposition.
+        self.plain = False
+        self.rendered_groups: Optional[dict[int, bool]] = None
+
+    def peek(self) -> Token:
+        return self.tokens[self.index]
+
+    def advance(self) -> Token:
+        token = self.tokens[self.index]
+        if token[0] != _END:
+            self.index += 1
+        return token
+
+    def expect(self, kind: str, text: Optional[str] = None) -> Token:
+        token = self.tokens[self.index]
+        if token[0] != kind or (text is not None and token[1] != text):
+            self.fail(f"Expected {text or kind!r}")
+        self.index += 1
+        return token
+
+    def fail(self, message: str):
+        raise ParseError(message, self.text, self.peek()[2])
+
+
+def _number(text: str, negative: bool = False):
+    value = float(text) if ("." in text or "e" in text or "E" in text) else int(text)
+    return -value if negative else value
+
+
+def _statement_steps(state: _State):
+    if state.peek()[0] == "{":
+        state.advance()
+        equations = [(yield _equation_steps, state)]
+        while state.peek()[0] == ";":
+            state.advance()
+            equations.append((yield _equation_steps, state))
+        state.expect("}")
+        return SystemOfEquations(equations)
+    return (yield _equation_steps, state)
+
+
+def _equation_steps(state: _State):
+    left = yield _expression_steps, state, 0
+    kind = state.peek()[0]
+    if kind == "=":
+        expressions = [left]
+        while state.peek()[0] == "=":
+            state.advance()
+            expressions.append((yield _expression_steps, state, 0))
+        return Equation(expressions)
+    if kind in ("<", ">", "<=", ">="):
+        state.advance()
+        right = yield _expression_steps, state, 0
+        return InEquality(left, right, 1 if kind[0] == ">" else -1, kind.endswith("="))
+    return left
+
+
+def _expression_steps(state: _State, min_bp: int):
+    if state.plain:
+        power_bp, product_bp = _PRODUCT_BP, _POWER_BP
+    else:
+        power_bp, product_bp = _POWER_BP, _PRODUCT_BP
+    left = yield _prefix_steps, state, min_bp
+    while True:
+        token = state.peek()
+        kind = token[0]
+        if kind == "+" or (kind == "-" and token[3]):
+            if _SUM_BP <= min_bp:
+                break
+            terms = [left]
+            while True:
+                kind = state.peek()[0]
+                if not (kind == "+" or (kind == "-" and state.peek()[3])):
+                    break
+                state.advance()
+                if kind == "-":
+                    terms.append((yield _negated_steps, state, _SUM_BP))
+                else:
+                    terms.append((yield _expression_steps, state, _SUM_BP))
+            left = _intern(Sum(terms))
+        elif kind == "/":
+            if _QUOTIENT_BP <= min_bp:
+                break
+            denominators = []
+            while state.peek()[0] == "/":
+                state.advance()
+                denominators.append((yield _expression_steps, state, _QUOTIENT_BP))
+            left = _quotient(left, denominators)
+        elif kind == "^":
+            if power_bp <= min_bp:
+                break
+            state.advance()
+            exponent = yield _expression_steps, state, power_bp - 1
+            left = _intern(Power(left, exponent))
+        elif kind in _OPERAND_STARTS or (kind == "-" and not token[3]):
+            if product_bp <= min_bp or (kind == "(" and state.in_script):
+                break
+            factors = [left]
+            while True:
+                token = state.peek()
+                if not (
+                    token[0] in _OPERAND_STARTS or (token[0] == "-" and not token[3])
+                ) or (token[0] == "(" and state.in_script):
+                    break
+                factors.append((yield _expression_steps, state, product_bp))
+            # A quotient written as a factor is parenthesized, so it cannot
+            # have come from a bare negative power (that would be part of the
+            # denominator); keep it as its own product.
+            left = _intern(
+                Product(
+                    [
+                        _intern(Product([factor])) if _is_denominator(factor) else factor
+                        for factor in factors
+                    ]
+                )
+            )
+        else:
+            break
+    return left
+
+
+def _negated_steps(state: _State, min_bp: int):
+    # ``render`` writes a term ``-t`` of a sum as `` - t``, so `` - 3x`` is
+    # ``(-3)x``: a leading number literal takes the sign. Any other operand
+    # is multiplied by -1.
+    if state.peek()[0] == "number":
+        state.negate_next = True
+        return (yield _expression_steps, state, min_bp)
+    operand = yield _expression_steps, state, min_bp
+    return _intern(Product([-1, operand]))
+
+
+def _prefix_steps(state: _State, min_bp: int):
+    token = state.advance()
+    kind = token[0]
+    if kind == "number":
+        negate, state.negate_next = state.negate_next, False
+        return _number(token[1], negate)
+    if kind == "-":
+        return (yield _negated_steps, state, max(min_bp, _SUM_BP))
+    if kind == "name":
+        constant = state.parser.constants.get(token[1])
+        if constant is not None:
+            return constant
+        return _intern(Symbol(token[1]))
+    if kind == "(":
+        return (yield _enclosed_steps, state, ")")
+    if kind == "function":
+        return (yield _function_steps, state, token[1])
+    if kind == "derivative":
+        return (yield _derivative_steps, state)
+    if kind == "integral" or kind == "∫":
+        return (yield _integral_steps, state, kind == "∫")
+    state.index -= 1
+    state.fail("Expected an expression")
+
+
+def _enclosed_steps(state: _State, close: str):
+    in_script, state.in_script = state.in_script, False
+    inner = yield _expression_steps, state, 0
+    state.expect(close)
+    state.in_script = in_script
+    return inner
+
+
+def _argument_list_steps(state: _State, close: str):
+    in_script, state.in_script = state.in_script, False
+    arguments = []
+    if state.peek()[0] != close:
+        arguments.append((yield _expression_steps, state, 0))
+        while state.peek()[0] == ",":
+            state.advance()
+            arguments.append((yield _expression_steps, state, 0))
+    state.expect(close)
+    state.in_script = in_script
+    return arguments
+
+
+def _script_steps(state: _State):
+    # ``_x`` / ``^x`` hold one argument; ``_{a, b}`` / ``^{a, b}`` hold several.
+    if state.peek()[0] == "{":
+        state.advance()
+        return (yield _argument_list_steps, state, "}")
+    in_script, state.in_script = state.in_script, True
+    argument = yield _expression_steps, state, 0
+    state.in_script = in_script
+    return [argument]
+
+
+def _function_steps(state: _State, name: str):
+    plain, state.plain = state.plain, True
+    subscript: list = []
+    superscript: list = []
+    if state.peek()[0] == "_":
+        state.advance()
+        subscript = yield _script_steps, state
+    if state.peek()[0] == "^":
+        state.advance()
+        superscript = yield _script_steps, state
+    state.expect("(")
+    function = state.parser.functions.get(name)
+    # ``sqrt(...)`` and ``root(..., n)`` are also how ``render`` writes roots,
+    # whose radicands use the full grammar rather than ``str``.
+    is_root = (
+        name in ("sqrt", "root")
+        and not subscript
+        and not superscript
+        and (function is None or _has_rendered_operator(state))
+    )
+    if is_root:
+        state.plain = False
+    arguments = yield _argument_list_steps, state, ")"
+    state.plain = plain
+    if is_root:
+        if name == "sqrt" and len(arguments) == 1:
+            return _intern(Power(arguments[0], _intern(Power(2, -1))))
+        if name == "root" and len(arguments) == 2:
+            return _intern(Power(arguments[0], _intern(Power(arguments[1], -1))))
+    if function is None:
+        state.fail(f"Unknown function {name!r}")
+    return _intern(FunctionCall(function, arguments, subscript, superscript))
+
+
+def _has_rendered_operator(state: _State) -> bool:
+    # Whether the call's arguments contain a quotient or a `` - `` term, which
+    # ``str`` never writes (it writes ``a + -b`` instead).
+    if state.rendered_groups is None:
+        state.rendered_groups = _rendered_groups(state.tokens)
+    return state.rendered_groups.get(state.index - 1, False)
+
+
+def _rendered_groups(tokens: list[Token]) -> dict[int, bool]:
+    # One pass over the tokens, so nested roots stay linear.
+    groups: dict[int, bool] = {}
+    open_groups: list[int] = []
+    previous = "("
+    for index, token in enumerate(tokens):
+        kind = token[0]
+        if kind == "(":
+            open_groups.append(index)
+            groups[index] = False
+        elif kind == ")" and open_groups:
+            closed = open_groups.pop()
+            if groups[closed] and open_groups:
+                groups[open_groups[-1]] = True
+        elif open_groups and (
+            kind == "/" or (kind == "-" and token[3] and previous != "+")
+        ):
+            groups[open_groups[-1]] = True
+        previous = kind
+    return groups
+
+
+def _derivative_steps(state: _State):
+    variables = []
+    while True:
+        variable = state.expect("name")
+        order = 1
+        if state.peek()[0] == "^":
+            state.advance()
+            order = _number(state.expect("number")[1])
+        variables.append((_intern(Symbol(variable[1])), order))
+        if state.peek()[0] != ",":
+            break
+        state.advance()
+    state.expect("(")
+    body = yield _enclosed_steps, state, ")"
+    return _intern(Derivative(body, variables))
+
+
+def _integral_steps(state: _State, unicode_form: bool):
+    lower = upper = None
+    if unicode_form:
+        if state.peek()[0] == "_":
+            state.advance()
+            state.expect("{")
+            lower = yield _expression_steps, state, 0
+            state.expect("}")
+            state.expect("^")
+            state.expect("{")
+            upper = yield _expression_steps, state, 0
+            state.expect("}")
+    elif state.peek()[0] == "_":
+        state.advance()
+        state.expect("[")
+        lower = yield _expression_steps, state, 0
+        state.expect("..")
+        upper = yield _expression_steps, state, 0
+        state.expect("]")
+    state.expect("(")
+    integrand = yield _enclosed_steps, state, ")"
+    state.expect("name", "d")
+    variable = state.expect("name")
+    return _intern(Integral(integrand, _intern(Symbol(variable[1])), lower, upper))
+
+
+def _quotient(numerator: Any, denominators: list) -> Any:
+    # ``render`` writes products with negative powers as ``numerator/denominator``
+    # and a lone negative power as ``1/base``.
+    if type(numerator) is int and numerator == 1 and len(denominators) == 1:
+        return _reciprocal(denominators[0])
+    if isinstance(numerator, Product) and not any(
+        _is_denominator(factor) for factor in numerator.factors
+    ):
+        factors = list(numerator.factors)
+    else:
+        factors = [numerator]
+    for denominator in denominators:
+        parts = denominator.factors if isinstance(denominator, Product) else [denominator]
+        factors.extend(_reciprocal(part) for part in parts)
+    return _intern(Product(factors))
+
+
+def _is_denominator(value: Any) -> bool:
+    return (
+        isinstance(value, Power)
+        and type(value.exponent) in (int, float)
+        and value.exponent < 0
+    )
+
+
+def _reciprocal(value: Any) -> Any:
+    if (
+        isinstance(value, Power)
+        and type(value.exponent) in (int, float)
+        and value.exponent > 0
+        and value.exponent != 1
+    ):
+        return _intern(Power(value.base, -value.exponent))
+    return _intern(Power(value, -1))
+
+
+_default_parser: Optional[Parser] = None
+
+
+def _parser_for(functions, constants, symbols=()) -> Parser:
+    global _default_parser
+    if functions is None and constants is None and not symbols:
+        if _default_parser is None:
+            _default_parser = Parser()
+        return _default_parser
+    return Parser(functions, constants, symbols)
+
+
+def tokenize(text: str, functions: Optional[Iterable[MathFunction]] = None) -> list[Token]:
+    return _parser_for(functions, None).tokenize(text)
+
+
+def parse(
+    text: str,
+    functions: Optional[Iterable[MathFunction]] = None,
+    constants: Optional[dict[str, Any]] = None,
+    symbols: Iterable[str] = (),
+) -> Any:
+    """Parse ``render()`` output back into an expression tree.
+
+    ``functions`` replaces ``procedural.FUNCTIONS`` for name resolution and
+    ``constants`` replaces ``{"π": math.pi}`` (pass ``{}`` to read ``π`` as a
+    symbol). ``symbols`` lists symbol names such as ``w^n`` that would
+    otherwise read as an operation.
+    """
+    return _parser_for(functions, constants, symbols).parse(text)
+
+
+def parse_lines(
+    lines: Iterable[str],
+    functions: Optional[Iterable[MathFunction]] = None,
+    constants: Optional[dict[str, Any]] = None,
+    errors: Literal["raise", "none"] = "raise",
+    symbols: Iterable[str] = (),
+) -> Iterator[Any]:
+    """Parse line-delimited ``render()`` output, skipping blank lines."""
+    return _parser_for(functions, constants, symbols).parse_lines(lines, errors)
+
+
+def parse_file(
+    path: str,
+    functions: Optional[Iterable[MathFunction]] = None,
+    constants: Optional[dict[str, Any]] = None,
+    errors: Literal["raise", "none"] = "raise",
+    symbols: Iterable[str] = (),
+) -> list[Any]:
+    """Parse a UTF-8 file holding one rendered expression per line."""
+    with open(path, encoding="utf-8") as handle:
+        return list(parse_lines(handle, functions, constants, errors, symbols))
@@ -0,0 +1,440 @@
+"""Sparse multivariate polynomials over expression symbols.
+
+A ``Polynomial`` stores one coefficient per monomial, keyed by the tuple of
+exponents of its ``symbols`` (sorted by name). Adding two polynomials is a
+dictionary merge and multiplying them touches each pair of monomials once, so
+expanding and collecting like terms never rebuilds intermediate trees.
+
+Coefficients stay ints or ``Fraction``s as long as the input is exact (``2^-1``
+becomes ``Fraction(1, 2)``); float literals are kept as floats, so converting a
+tree and back is lossless. Exponents may be negative, which also covers
+Laurent polynomials such as ``x + 1/x``.
+"""
+
+from fractions import Fraction
+from typing import Any, Iterable, Optional, Union
+
+from .expression import (
+    Numerical,
+    Power,
+    Product,
+    Sum,
+    Symbol,
+    _StructuralNode,
+    _intern,
+)
+from .traversal import DESCEND, children, fold, iter_preorder
+
+Coefficient = Union[int, Fraction, float]
+Monomial = tuple[int, ...]
+
+
+class Polynomial:
+    """Immutable sparse polynomial; build one with ``to_polynomial``."""
+
+    __slots__ = ("symbols", "terms")
+
+    def __init__(
+        self,
+        terms: Optional[dict[Monomial, Coefficient]] = None,
+        symbols: Iterable[Symbol] = (),
+    ):
+        self.symbols: tuple[Symbol, ...] = tuple(symbols)
+        self.terms: dict[Monomial, Coefficient] = {
+            monomial: coefficient
+            for monomial, coefficient in (terms or {}).items()
+            if coefficient != 0
+        }
+
+    @classmethod
+    def _make(cls, symbols: tuple[Symbol, ...], terms: dict) -> "Polynomial":
+        polynomial = cls.__new__(cls)
+        polynomial.symbols = symbols
+        polynomial.terms = terms
+        return polynomial
+
+    @classmethod
+    def constant(cls, value: Coefficient, symbols: Iterable[Symbol] = ()) -> "Polynomial":
+        symbols = tuple(symbols)
+        return cls({(0,) * len(symbols): value}, symbols)
+
+    @classmethod
+    def symbol(cls, symbol: Symbol, symbols: Iterable[Symbol] = ()) -> "Polynomial":
+        symbols = tuple(symbols) or (symbol,)
+        if symbol not in symbols:
+            raise ValueError(f"{symbol} is not one of the polynomial's symbols.")
+        return cls({tuple(int(s == symbol) for s in symbols): 1}, symbols)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __bool__(self):
+        return bool(self.terms)
+
+    def __repr__(self):
+        return f"Polynomial({self.to_expression()!r})"
+
+    def __eq__(self, other):
+        if isinstance(other, (int, float, Fraction)):
+            other = Polynomial.constant(other, self.symbols)
+        if not isinstance(other, Polynomial):
+            return NotImplemented
+        left, right = _aligned(self, other)
+        return left.terms == right.terms
+
+    __hash__ = None
+
+    def __neg__(self):
+        return Polynomial._make(
+            self.symbols, {monomial: -value for monomial, value in self.terms.items()}
+        )
+
+    def __add__(self, other):
+        if isinstance(other, (int, float, Fraction)):
+            other = Polynomial.constant(other, self.symbols)
+        if not isinstance(other, Polynomial):
+            return NotImplemented
+        left, right = _aligned(self, other)
+        terms = dict(left.terms)
+        for monomial, value in right.terms.items():
+            total = terms.get(monomial, 0) + value
+            if total == 0:
+                terms.pop(monomial, None)
+            else:
+                terms[monomial] = total
+        return Polynomial._make(left.symbols, terms)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, (int, float, Fraction)):
+            other = Polynomial.constant(other, self.symbols)
+        if not isinstance(other, Polynomial):
+            return NotImplemented
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return (-self) + other
+
+    def __mul__(self, other):
+        if isinstance(other, (int, float, Fraction)):
+            if other == 0:
+                return Polynomial._make(self.symbols, {})
+            return Polynomial._make(
+                self.symbols,
+                {monomial: value * other for monomial, value in self.terms.items()},
+            )
+        if not isinstance(other, Polynomial):
+            return NotImplemented
+        left, right = _aligned(self, other)
+        terms: dict[Monomial, Coefficient] = {}
+        for left_monomial, left_value in left.terms.items():
+            for right_monomial, right_value in right.terms.items():
+                monomial = tuple(a + b for a, b in zip(left_monomial, right_monomial))
+                total = terms.get(monomial, 0) + left_value * right_value
+                if total == 0:
+                    terms.pop(monomial, None)
+                else:
+                    terms[monomial] = total
+        return Polynomial._make(left.symbols, terms)
+
+    __rmul__ = __mul__
+
+    def __pow__(self, exponent: int):
+        if not isinstance(exponent, int):
+            return NotImplemented
+        if exponent < 0:
+            return self.inverse() ** -exponent
+        result = Polynomial.constant(1, self.symbols)
+        base = self
+        while exponent:
+            if exponent & 1:
+                result = result * base
+            exponent >>= 1
+            if exponent:
+                base = base * base
+        return result
+
+    def inverse(self) -> "Polynomial":
+        """``1/self`` for a single nonzero monomial; other polynomials raise ``ValueError``."""
+        if len(self.terms) != 1:
+            raise ValueError("Only a single monomial has a polynomial inverse.")
+        ((monomial, value),) = self.terms.items()
+        inverse = Fraction(1, value) if isinstance(value, (int, Fraction)) else 1 / value
+        if isinstance(inverse, Fraction) and inverse.denominator == 1:
+            inverse = inverse.numerator
+        return Polynomial._make(self.symbols, {tuple(-e for e in monomial): inverse})
+
+    def is_constant(self) -> bool:
+        return all(not any(monomial) for monomial in self.terms)
+
+    def degree(self, symbol: Optional[Symbol | str] = None) -> int:
+        """Highest exponent of ``symbol``, or the total degree; ``0`` for zero."""
+        if symbol is None:
+            return max((builtin_sum(monomial) for monomial in self.terms), default=0)
+        index = self._index(symbol)
+        if index is None:
+            return 0
+        return max((monomial[index] for monomial in self.terms), default=0)
+
+    def min_degree(self, symbol: Symbol | str) -> int:
+        """Lowest exponent of ``symbol`` (negative for Laurent terms)."""
+        index = self._index(symbol)
+        if index is None:
+            return 0
+        return min((monomial[index] for monomial in self.terms), default=0)
+
+    def coefficients(self, symbol: Symbol | str) -> dict[int, Coefficient]:
+        """Coefficients by exponent of a polynomial in ``symbol`` alone."""
+        index = self._index(symbol)
+        output: dict[int, Coefficient] = {}
+        for monomial, value in self.terms.items():
+            if any(e for i, e in enumerate(monomial) if i != index):
+                raise ValueError(f"Polynomial is not univariate in {symbol}.")
+            output[monomial[index] if index is not None else 0] = value
+        return output
+
+    def to_expression(self) -> Numerical:
+        """The polynomial as a ``Sum`` of monomials, highest degree first.
+
+        Non-integer ``Fraction`` coefficients become ``numerator·denominator^-1``
+        so the tree holds only ints and floats.
+        """
+        ordered = sorted(
+            self.terms.items(),
+            key=lambda item: (builtin_sum(item[0]), item[0]),
+            reverse=True,
+        )
+        terms = [self._monomial_expression(monomial, value) for monomial, value in ordered]
+        if not terms:
+            return 0
+        if len(terms) == 1:
+            return terms[0]
+        return _intern(Sum(terms))
+
+    def _monomial_expression(self, monomial: Monomial, value: Coefficient) -> Numerical:
+        factors: list[Any] = []
+        if isinstance(value, Fraction):
+            if value.numerator != 1:
+                factors.append(value.numerator)
+            if value.denominator != 1:
+                factors.append(_intern(Power(value.denominator, -1)))
+        elif value != 1 or not any(monomial):
+            factors.append(value)
+        for symbol, exponent in zip(self.symbols, monomial):
+            if exponent == 1:
+                factors.append(symbol)
+            elif exponent != 0:
+                factors.append(_intern(Power(symbol, exponent)))
+        if not factors:
+            return 1
+        if len(factors) == 1:
+            return factors[0]
+        return _intern(Product(factors))
+
+    def _index(self, symbol: Symbol | str) -> Optional[int]:
+        name = symbol.name if isinstance(symbol, Symbol) else symbol
+        for index, candidate in enumerate(self.symbols):
+            if candidate.name == name:
+                return index
+        return None
+
+
+builtin_sum = sum
+
+
+def _aligned(left: Polynomial, right: Polynomial) -> tuple[Polynomial, Polynomial]:
+    if left.symbols == right.symbols:
+        return left, right
+    symbols = tuple(sorted({*left.symbols, *right.symbols}, key=lambda s: s.name))
+    return _reindexed(left, symbols), _reindexed(right, symbols)
+
+
+def _reindexed(polynomial: Polynomial, symbols: tuple[Symbol, ...]) -> Polynomial:
+    if polynomial.symbols == symbols:
+        return polynomial
+    positions = [symbols.index(symbol) for symbol in polynomial.symbols]
+    terms = {}
+    for monomial, value in polynomial.terms.items():
+        exponents = [0] * len(symbols)
+        for position, exponent in zip(positions, monomial):
+            exponents[position] = exponent
+        terms[tuple(exponents)] = value
+    return Polynomial._make(symbols, terms)
+
+
+def _integer_exponent(exponent: Any) -> Optional[int]:
+    if isinstance(exponent, bool):
+        return None
+    if isinstance(exponent, int):
+        return exponent
+    if isinstance(exponent, float) and exponent.is_integer():
+        return int(exponent)
+    return None
+
+
+class _Converter:
+    """``fold`` callbacks turning a tree into a ``Polynomial`` (or ``None``)."""
+
+    __slots__ = ("symbols", "min_degree", "max_degree")
+
+    def __init__(self, symbols: tuple[Symbol, ...], min_degree, max_degree):
+        self.symbols = symbols
+        self.min_degree = min_degree
+        self.max_degree = max_degree
+
+    def enter(self, node):
+        # ``x^0`` is 1 whatever ``x`` is.
+        if isinstance(node, Power) and _integer_exponent(node.exponent) == 0:
+            return Polynomial.constant(1, self.symbols)
+        if isinstance(node, (Sum, Product, Power, Symbol)):
+            return DESCEND
+        if isinstance(node, (int, float, Fraction)) and not isinstance(node, bool):
+            return Polynomial.constant(node, self.symbols)
+        return None
+
+    def combine(self, node, values):
+        if any(value is None for value in values):
+            return None
+        match node:
+            case Symbol():
+                if node not in self.symbols:
+                    return None
+                return self._bounded(Polynomial.symbol(node, self.symbols))
+            case Sum():
+                result = Polynomial._make(self.symbols, {})
+                for value in values:
+                    result = result + value
+                return result
+            case Product():
+                result = Polynomial.constant(1, self.symbols)
+                for value in values:
+                    result = self._bounded(result * value)
+                    if result is None:
+                        return None
+                return result
+            case Power():
+                return self._power(values[0], _integer_exponent(node.exponent))
+        return None
+
+    def _power(self, base: Polynomial, exponent: Optional[int]) -> Optional[Polynomial]:
+        if exponent is None:
+            return None
+        if exponent < 0:
+            if len(base) != 1:
+                return None
+            base = base.inverse()
+            exponent = -exponent
+        try:
+            if self.min_degree is None and self.max_degree is None:
+                return base**exponent
+            result = Polynomial.constant(1, self.symbols)
+            for _ in range(exponent):
+                result = self._bounded(result * base)
+                if result is None:
+                    return None
+            return result
+        except (OverflowError, ZeroDivisionError):
+            return None
+
+    def _bounded(self, polynomial: Optional[Polynomial]) -> Optional[Polynomial]:
+        if polynomial is None:
+            return None
+        low, high = self.min_degree, self.max_degree
+        for monomial in polynomial.terms:
+            for exponent in monomial:
+                if (low is not None and exponent < low) or (
+                    high is not None and exponent > high
+                ):
+                    return None
+        return polynomial
+
+
+def _sorted_symbols(symbols: Iterable[Symbol]) -> tuple[Symbol, ...]:
+    return tuple(sorted(set(symbols), key=lambda s: s.name))
+
+
+def to_polynomial(
+    expression: Numerical,
+    symbols: Optional[Iterable[Symbol | str]] = None,
+    min_degree: Optional[int] = 0,
+    max_degree: Optional[int] = None,
+) -> Optional[Polynomial]:
+    """Convert a Sum/Product/Power tree over numbers and symbols, or return ``None``.
+
+    ``symbols`` restricts which symbols may appear. Powers need integer
+    exponents; a negative exponent is accepted when its base is a single
+    monomial. ``min_degree`` / ``max_degree`` bound each symbol's exponent in
+    every intermediate product, so conversion stops early instead of expanding
+    something like ``(x + 1)^1000`` when only low degrees are wanted.
+    """
+    present = (
+        expression.free_symbols if isinstance(expression, _StructuralNode) else ()
+    )
+    if symbols is not None:
+        # Other symbols make the conversion fail where they are met, which
+        # still lets ``y^0`` through.
+        allowed = {s.name if isinstance(s, Symbol) else s for s in symbols}
+        present = [symbol for symbol in present if symbol.name in allowed]
+    converter = _Converter(_sorted_symbols(present), min_degree, max_degree)
+    return fold(expression, converter.combine, converter.enter)
+
+
+def expand(expression: Numerical) -> Numerical:
+    """Multiply out and collect the polynomial parts of ``expression``.
+
+    Every maximal subtree that ``to_polynomial`` accepts is replaced by its
+    expanded form; other nodes (function calls, calculus, symbolic exponents)
+    are kept with their arguments expanded. The tree is walked once.
+    """
+    converter = _Converter(
+        _sorted_symbols(
+            node for node in iter_preorder(expression) if isinstance(node, Symbol)
+        ),
+        None,
+        None,
+    )
+
+    def enter(node):
+        polynomial = converter.enter(node)
+        if polynomial is DESCEND:
+            return DESCEND
+        if polynomial is None and isinstance(node, _StructuralNode) and children(node):
+            return DESCEND
+        return polynomial, node
+
+    def combine(node, values):
+        polynomials = [value[0] for value in values]
+        polynomial = converter.combine(node, polynomials)
+        if polynomial is not None:
+            return polynomial, node
+        if isinstance(node, (Sum, Product)):
+            # Collect the polynomial terms (or factors) into one and keep the
+            # others as they are.
+            others = [value[1] for value in values if value[0] is None]
+            if isinstance(node, Sum):
+                collected = Polynomial._make(converter.symbols, {})
+                for part in polynomials:
+                    if part is not None:
+                        collected = collected + part
+                expanded = collected.to_expression()
+                leading = list(expanded.terms) if isinstance(expanded, Sum) else [expanded]
+                items = [term for term in leading if term != 0 or not others] + others
+                return None, items[0] if len(items) == 1 else _intern(Sum(items))
+            collected = Polynomial.constant(1, converter.symbols)
+            for part in polynomials:
+                if part is not None:
+                    collected = collected * part
+            if not collected:
+                return None, 0
+            items = ([] if collected == 1 else [collected.to_expression()]) + others
+            return None, items[0] if len(items) == 1 else _intern(Product(items))
+        return None, node._with_children(
+            [
+                part.to_expression() if part is not None else value[1]
+                for part, value in zip(polynomials, values)
+            ]
+        )
+
+    polynomial, rebuilt = fold(expression, combine, enter)
+    return polynomial.to_expression() if polynomial is not None else rebuilt
@@ -767,7 +767,7 @@ def generate_random_expression(
 
     elif expr_type == "power":
         base = generate_random_expression(**recursive_args)
-        evaluated_base, _ = evaluate(base, error_on_invalid_snap=False)
+        evaluated_base, _ = evaluate(base, error_on_invalid_snap=False, explain=False)
         exponent_args = recursive_args.copy()
         if isinstance(evaluated_base, (int, float)):
             if evaluated_base < 0:
@@ -800,7 +800,9 @@ def generate_random_expression(
             )
         else:
             exponent = generate_random_expression(**exponent_args)
-        evaluated_exponent, _ = evaluate(exponent, error_on_invalid_snap=False)
+        evaluated_exponent, _ = evaluate(
+            exponent, error_on_invalid_snap=False, explain=False
+        )
         if isinstance(evaluated_exponent, (int, float)):
             if generation_profile == "stress":
                 exponent_cap = 12 + int(round(24 * complexity))
@@ -127,12 +127,14 @@ def _build_eval_options(payload: dict[str, Any]) -> EvaluatorOptions:
             step_heading_template=step_heading_template,
         )
         options.explanation_profile = explanation_profile
-        return options
-    return EvaluatorOptions(
-        wording_style=wording_style,
-        wording_options=WordingOptions(step_heading_template=step_heading_template),
-        explanation_profile=explanation_profile,
-    )
+    else:
+        options = EvaluatorOptions(
+            wording_style=wording_style,
+            wording_options=WordingOptions(step_heading_template=step_heading_template),
+            explanation_profile=explanation_profile,
+        )
+    options.deadline_seconds = payload.get("eval_deadline_seconds")
+    return options
 
 
 def _worker(payload: dict[str, Any], output_queue: Any):
@@ -479,6 +481,13 @@ def main():
         default=10.0,
         help="Per-case timeout; case is treated as hang after this limit.",
     )
+    parser.add_argument(
+        "--eval-deadline-seconds",
+        type=float,
+        default=None,
+        help="In-process evaluator deadline (EvaluatorOptions.deadline_seconds); "
+        "cases over it finish as partial instead of hanging.",
+    )
     parser.add_argument(
         "--max-depth",
         type=int,
@@ -686,6 +695,7 @@ def main():
             "unsolvable_probability": args.unsolvable_probability,
             "hard_problem_probability": args.hard_problem_probability,
             "wording_style": args.wording_style,
+            "eval_deadline_seconds": args.eval_deadline_seconds,
             "compact_explanations": args.compact_explanations,
             "step_heading_template": args.step_heading_template,
             "locale": args.locale,
@@ -2,6 +2,7 @@ import math
 from numbers import Real
 from .expression import *
 from .number_format import to_trimmed_decimal_string
+from .traversal import trampoline
 
 
 @dataclass
@@ -61,31 +62,30 @@ def _split_signed_term(term):
 
 def _render_sum_with_signs(
     terms: list[Numerical],
-    renderer,
+    render_request,
     group: bool = False,
     apply_group_fn=None,
     paren_group: bool = False,
     square_group: bool = False,
     curly_group: bool = False,
 ):
+    # Generator step: ``render_request(term)`` builds the ``trampoline`` request
+    # that renders one term.
     flattened_terms = []
-
-    def _flatten(term):
+    pending = list(reversed(terms))
+    while pending:
+        term = pending.pop()
         if isinstance(term, Sum):
-            for nested in term.terms:
-                _flatten(nested)
+            pending.extend(reversed(term.terms))
         else:
             flattened_terms.append(term)
 
-    for term in terms:
-        _flatten(term)
-
     if len(flattened_terms) == 0:
         rendered = "0"
     else:
         parts: list[str] = []
         for index, term in enumerate(flattened_terms):
-            rendered_term = renderer(term)
+            rendered_term = yield render_request(term)
             is_negative = rendered_term.startswith("-")
             if is_negative:
                 abs_rendered = rendered_term[1:].lstrip()
@@ -94,7 +94,12 @@ def _render_sum_with_signs(
                 # a literal leading '-' for a negative term representation.
                 structural_negative, abs_term = _split_signed_term(term)
                 is_negative = structural_negative
-                abs_rendered = renderer(abs_term)
+                # A term that is not negative is its own absolute value, so its
+                # rendering is reused; re-rendering nested sums is exponential.
+                if structural_negative:
+                    abs_rendered = yield render_request(abs_term)
+                else:
+                    abs_rendered = rendered_term
             if index == 0:
                 parts.append(("-" if is_negative else "") + abs_rendered)
             else:
@@ -107,7 +112,20 @@ def _render_sum_with_signs(
     return rendered
 
 
+def _inequality_operator(inequality: InEquality, latex: bool = False) -> str:
+    if inequality.inclusive:
+        if latex:
+            return "\\geq" if inequality.sign > 0 else "\\leq"
+        return ">=" if inequality.sign > 0 else "<="
+    return ">" if inequality.sign > 0 else "<"
+
+
 def render(expression: Union[Numerical, Equation, InEquality, SystemOfEquations], group=False):
+    return trampoline(_render_steps, expression, group)
+
+
+def _render_steps(expression, group=False):
+    # Generator form of ``render``, driven by ``trampoline``.
     match expression:
         case int() | float():
             if expression == math.pi:
@@ -117,7 +135,8 @@ def render(expression: Union[Numerical, Equation, InEquality, SystemOfEquations]
             isinstance(expression.exponent, int)
             or isinstance(expression.exponent, float)
         ) and exponent < 0:
-            output = f"1/{render(power(base, -exponent), True)}"
+            denominator = yield _render_steps, power(base, -exponent), True
+            output = f"1/{denominator}"
             if group:
                 return "(" + output + ")"
             else:
@@ -130,14 +149,16 @@ def render(expression: Union[Numerical, Equation, InEquality, SystemOfEquations]
             # Root
             root = base ** (-exponent)
             if root == 2:
-                return f"sqrt({render(value)})"
+                radicand = yield _render_steps, value, False
+                return f"sqrt({radicand})"
             else:
-                return f"root({render(value, True)}, {root})"
+                radicand = yield _render_steps, value, True
+                return f"root({radicand}, {root})"
 
         case Power():
-            output = (
-                f"{render(expression.base, True)}^{render(expression.exponent, True)}"
-            )
+            rendered_base = yield _render_steps, expression.base, True
+            rendered_exponent = yield _render_steps, expression.exponent, True
+            output = f"{rendered_base}^{rendered_exponent}"
             if group:
                 return apply_group(output, True)
             else:
@@ -154,20 +175,25 @@ def render(expression: Union[Numerical, Equation, InEquality, SystemOfEquations]
                     case _:
                         positive_exponents.append(factor)
             if len(negative_exponents) > 0:
-                output = f"{render(product(positive_exponents), True)}/{render(product(negative_exponents), True)}"
+                numerator = yield _render_steps, product(positive_exponents), True
+                denominator = yield _render_steps, product(negative_exponents), True
+                output = f"{numerator}/{denominator}"
                 if group:
                     return "(" + output + ")"
                 else:
                     return output
             else:
-                return "".join(
-                    map(lambda factor: render(factor, True), expression.factors)
-                )
+                rendered_factors = []
+                for factor in expression.factors:
+                    rendered_factors.append((yield _render_steps, factor, True))
+                return "".join(rendered_factors)
         case Sum():
-            return _render_sum_with_signs(
-                expression.terms,
-                renderer=lambda term: render(term),
-                group=group,
+            return (
+                yield from _render_sum_with_signs(
+                    expression.terms,
+                    render_request=lambda term: (_render_steps, term, False),
+                    group=group,
+                )
             )
         case FunctionCall():
             if len(expression.subscript_arguments) == 0:
@@ -194,28 +220,38 @@ def render(expression: Union[Numerical, Equation, InEquality, SystemOfEquations]
         case Derivative():
             parts = []
             for variable, order in expression.variables:
+                rendered_variable = yield _render_steps, variable, False
                 if order == 1:
-                    parts.append(render(variable))
+                    parts.append(rendered_variable)
                 else:
-                    parts.append(f"{render(variable)}^{order}")
-            return f"d/d{','.join(parts)}({render(expression.expression)})"
+                    parts.append(f"{rendered_variable}^{order}")
+            body = yield _render_steps, expression.expression, False
+            return f"d/d{','.join(parts)}({body})"
         case Integral():
             if expression.lower is None or expression.upper is None:
-                return (
-                    f"int({render(expression.expression)}) d{render(expression.variable)}"
-                )
-            return (
-                f"int_[{render(expression.lower)}..{render(expression.upper)}]"
-                + f"({render(expression.expression)}) d{render(expression.variable)}"
-            )
+                integrand = yield _render_steps, expression.expression, False
+                variable = yield _render_steps, expression.variable, False
+                return f"int({integrand}) d{variable}"
+            lower = yield _render_steps, expression.lower, False
+            upper = yield _render_steps, expression.upper, False
+            integrand = yield _render_steps, expression.expression, False
+            variable = yield _render_steps, expression.variable, False
+            return f"int_[{lower}..{upper}]" + f"({integrand}) d{variable}"
         case Symbol():
             return expression.name
         case Equation():
-            return " = ".join(map(render, expression.expressions))
+            rendered_expressions = []
+            for item in expression.expressions:
+                rendered_expressions.append((yield _render_steps, item, False))
+            return " = ".join(rendered_expressions)
         case InEquality():
-            return f"{render(expression.expression1)} {expression.sign} {render(expression.expression2)}"
+            left = yield _render_steps, expression.expression1, False
+            right = yield _render_steps, expression.expression2, False
+            return f"{left} {_inequality_operator(expression)} {right}"
         case SystemOfEquations():
-            rendered_equations = [render(eq) for eq in expression.equations]
+            rendered_equations = []
+            for eq in expression.equations:
+                rendered_equations.append((yield _render_steps, eq, False))
             return "{ " + " ; ".join(rendered_equations) + " }"
 
 
@@ -226,10 +262,29 @@ def render_latex(
     square_group=False,
     curly_group=False,
 ):
-    def _render_or_fallback(term):
-        rendered = render_latex(term, renderOptions)
-        return rendered if rendered is not None else str(term)
+    return trampoline(
+        _render_latex_steps,
+        expression,
+        renderOptions,
+        paren_group,
+        square_group,
+        curly_group,
+    )
+
+
+def _render_latex_or_fallback(term, renderOptions):
+    rendered = yield _render_latex_steps, term, renderOptions
+    return rendered if rendered is not None else str(term)
+
 
+def _render_latex_steps(
+    expression,
+    renderOptions: LaTeXRenderOptions,
+    paren_group=False,
+    square_group=False,
+    curly_group=False,
+):
+    # Generator form of ``render_latex``, driven by ``trampoline``.
     match expression:
         case int() | float():
             if expression == math.pi:
@@ -245,15 +300,26 @@ def render_latex(
             or isinstance(expression.exponent, float)
         ) and exponent < 0 and renderOptions.negative_exponent_as_fraction:
             if renderOptions.fraction_as_inline:
+                denominator = yield (
+                    _render_latex_steps,
+                    power(base, -exponent),
+                    renderOptions,
+                    True,
+                )
                 return apply_group(
-                    f"1/{render_latex(power(base, -exponent), renderOptions, True)}",
+                    f"1/{denominator}",
                     paren_group,
                     square_group,
                     curly_group,
                 )
             else:
+                denominator = yield (
+                    _render_latex_steps,
+                    power(base, -exponent),
+                    renderOptions,
+                )
                 return apply_group(
-                    f"\\frac{{1}}{{{render_latex(power(base, -exponent), renderOptions)}}}",
+                    f"\\frac{{1}}{{{denominator}}}",
                     paren_group,
                     square_group,
                     curly_group,
@@ -268,31 +334,62 @@ def render_latex(
                 root = base ** (-exponent)
             except OverflowError:
                 # Fallback to generic power rendering when root degree is too large.
+                rendered_value = yield _render_latex_steps, value, renderOptions, True
+                rendered_base = yield _render_latex_steps, base, renderOptions, True
+                rendered_degree = yield (
+                    _render_latex_steps,
+                    -exponent,
+                    renderOptions,
+                    True,
+                )
                 return apply_group(
-                    f"{render_latex(value, renderOptions, True)}^{{({render_latex(base, renderOptions, True)})^{{{render_latex(-exponent, renderOptions, True)}}}}}",
+                    f"{rendered_value}^{{({rendered_base})^{{{rendered_degree}}}}}",
                     paren_group and renderOptions.group_exponentiation,
                     square_group and renderOptions.group_exponentiation,
                     curly_group and renderOptions.group_exponentiation,
                 )
+            radicand = yield _render_latex_steps, value, renderOptions
             if root == 2:
-                return f"\\sqrt{{{render_latex(value, renderOptions)}}}"
+                return f"\\sqrt{{{radicand}}}"
             else:
-                return f"\\sqrt[{root}]{{{render_latex(value, renderOptions)}}}"
+                return f"\\sqrt[{root}]{{{radicand}}}"
 
         case Power() if (
             isinstance(expression.exponent, int)
             or isinstance(expression.exponent, float)
             and renderOptions.compact_exponents
         ):
+            rendered_base = yield (
+                _render_latex_steps,
+                expression.base,
+                renderOptions,
+                True,
+            )
+            rendered_exponent = yield (
+                _render_latex_steps,
+                expression.exponent,
+                renderOptions,
+            )
             return apply_group(
-                f"{render_latex(expression.base, renderOptions, True)}^{render_latex(expression.exponent, renderOptions)}",
+                f"{rendered_base}^{rendered_exponent}",
                 paren_group and renderOptions.group_exponentiation,
                 square_group and renderOptions.group_exponentiation,
                 curly_group and renderOptions.group_exponentiation,
             )
         case Power():
+            rendered_base = yield (
+                _render_latex_steps,
+                expression.base,
+                renderOptions,
+                True,
+            )
+            rendered_exponent = yield (
+                _render_latex_steps,
+                expression.exponent,
+                renderOptions,
+            )
             return apply_group(
-                f"{render_latex(expression.base, renderOptions, True)}^{{{render_latex(expression.exponent, renderOptions)}}}",
+                f"{rendered_base}^{{{rendered_exponent}}}",
                 paren_group and renderOptions.group_exponentiation,
                 square_group and renderOptions.group_exponentiation,
                 curly_group and renderOptions.group_exponentiation,
@@ -310,14 +407,36 @@ def render_latex(
                         positive_exponents.append(factor)
             if len(negative_exponents) > 0:
                 if renderOptions.fraction_as_inline:
+                    numerator = yield (
+                        _render_latex_steps,
+                        product(positive_exponents),
+                        renderOptions,
+                        True,
+                    )
+                    denominator = yield (
+                        _render_latex_steps,
+                        product(negative_exponents),
+                        renderOptions,
+                        True,
+                    )
                     return apply_group(
-                        f"{render_latex(product(positive_exponents), renderOptions, True)}/{render_latex(product(negative_exponents), renderOptions, True)}",
+                        f"{numerator}/{denominator}",
                         paren_group,
                         square_group,
                         curly_group,
                     )
+                numerator = yield (
+                    _render_latex_steps,
+                    product(positive_exponents),
+                    renderOptions,
+                )
+                denominator = yield (
+                    _render_latex_steps,
+                    product(negative_exponents),
+                    renderOptions,
+                )
                 return apply_group(
-                    f"\\frac{{{render_latex(product(positive_exponents), renderOptions)}}}{{{render_latex(product(negative_exponents), renderOptions)}}}",
+                    f"\\frac{{{numerator}}}{{{denominator}}}",
                     paren_group,
                     square_group,
                     curly_group,
@@ -327,7 +446,12 @@ def render_latex(
                 prev = None
                 prev_rendered = None
                 for i, factor in enumerate(expression.factors):
-                    rendered_factor = render_latex(factor, renderOptions, True)
+                    rendered_factor = yield (
+                        _render_latex_steps,
+                        factor,
+                        renderOptions,
+                        True,
+                    )
 
                     if i > 0:
                         can_use_implicit = (
@@ -354,44 +478,51 @@ def render_latex(
                     prev = factor
                 return result
         case Sum():
-            return _render_sum_with_signs(
-                expression.terms,
-                renderer=lambda term: _render_or_fallback(term),
-                apply_group_fn=apply_group,
-                paren_group=paren_group,
-                square_group=square_group,
-                curly_group=curly_group,
+            return (
+                yield from _render_sum_with_signs(
+                    expression.terms,
+                    render_request=lambda term: (
+                        _render_latex_or_fallback,
+                        term,
+                        renderOptions,
+                    ),
+                    apply_group_fn=apply_group,
+                    paren_group=paren_group,
+                    square_group=square_group,
+                    curly_group=curly_group,
+                )
             )
         case FunctionCall():
+            rendered_subscripts = []
+            for term in expression.subscript_arguments:
+                rendered_subscripts.append(
+                    (yield _render_latex_steps, term, renderOptions)
+                )
+            rendered_superscripts = []
+            for term in expression.superscript_arguments:
+                rendered_superscripts.append(
+                    (yield _render_latex_steps, term, renderOptions)
+                )
+            rendered_arguments = []
+            for term in expression.functional_arguments:
+                rendered_arguments.append(
+                    (yield _render_latex_steps, term, renderOptions)
+                )
+
             if len(expression.subscript_arguments) == 0:
                 subscript = ""
             elif len(expression.subscript_arguments) == 1:
-                subscript = "_" + ", ".join(
-                    map(
-                        lambda term: render_latex(term, renderOptions),
-                        expression.subscript_arguments,
-                    )
-                )
+                subscript = "_" + ", ".join(rendered_subscripts)
             else:
-                subscript = f"_{{{', '.join(map(lambda term: render_latex(term, renderOptions), expression.subscript_arguments))}}}"
+                subscript = f"_{{{', '.join(rendered_subscripts)}}}"
 
             if len(expression.superscript_arguments) == 0:
                 superscript = ""
             elif len(expression.superscript_arguments) == 1:
-                superscript = "^" + ", ".join(
-                    map(
-                        lambda term: render_latex(term, renderOptions),
-                        expression.superscript_arguments,
-                    )
-                )
+                superscript = "^" + ", ".join(rendered_superscripts)
             else:
-                superscript = f"^{{{', '.join(map(lambda term: render_latex(term, renderOptions), expression.superscript_arguments))}}}"
-            arguments = ", ".join(
-                map(
-                    lambda term: render_latex(term, renderOptions),
-                    expression.functional_arguments,
-                )
-            )
+                superscript = f"^{{{', '.join(rendered_superscripts)}}}"
+            arguments = ", ".join(rendered_arguments)
             if (
                 len(expression.functional_arguments) == 1
                 and not renderOptions.group_on_one_argument_function
@@ -412,21 +543,20 @@ def render_latex(
             return output
         case Derivative():
             total_order = sum(order for _, order in expression.variables)
-            den = " ".join(
-                [
-                    (
-                        f"d{render_latex(variable, renderOptions)}"
-                        if order == 1
-                        else f"d{render_latex(variable, renderOptions)}^{{{order}}}"
-                    )
-                    for variable, order in expression.variables
-                ]
-            )
+            pieces = []
+            for variable, order in expression.variables:
+                rendered_variable = yield _render_latex_steps, variable, renderOptions
+                pieces.append(
+                    f"d{rendered_variable}"
+                    if order == 1
+                    else f"d{rendered_variable}^{{{order}}}"
+                )
+            den = " ".join(pieces)
             if total_order == 1:
                 num = "d"
             else:
                 num = f"d^{{{total_order}}}"
-            body = render_latex(expression.expression, renderOptions)
+            body = yield _render_latex_steps, expression.expression, renderOptions
             return apply_group(
                 f"\\frac{{{num}}}{{{den}}}{body}",
                 paren_group,
@@ -434,28 +564,32 @@ def render_latex(
                 curly_group,
             )
         case Integral():
-            integrand = render_latex(expression.expression, renderOptions)
-            variable = render_latex(expression.variable, renderOptions)
+            integrand = yield _render_latex_steps, expression.expression, renderOptions
+            variable = yield _render_latex_steps, expression.variable, renderOptions
             if expression.lower is None or expression.upper is None:
                 output = f"\\int {integrand} \\, d{variable}"
             else:
-                lower = render_latex(expression.lower, renderOptions)
-                upper = render_latex(expression.upper, renderOptions)
+                lower = yield _render_latex_steps, expression.lower, renderOptions
+                upper = yield _render_latex_steps, expression.upper, renderOptions
                 output = f"\\int_{{{lower}}}^{{{upper}}} {integrand} \\, d{variable}"
             return apply_group(output, paren_group, square_group, curly_group)
         case Symbol():
             return expression.name
         case Equation():
-            return " = ".join(
-                map(
-                    lambda term: render_latex(term, renderOptions),
-                    expression.expressions,
+            rendered_expressions = []
+            for term in expression.expressions:
+                rendered_expressions.append(
+                    (yield _render_latex_steps, term, renderOptions)
                 )
-            )
+            return " = ".join(rendered_expressions)
         case InEquality():
-            return f"{render_latex(expression.expression1, renderOptions)} {expression.sign} {render_latex(expression.expression2, renderOptions)}"
+            left = yield _render_latex_steps, expression.expression1, renderOptions
+            right = yield _render_latex_steps, expression.expression2, renderOptions
+            return f"{left} {_inequality_operator(expression, latex=True)} {right}"
         case SystemOfEquations():
-            rows = [render_latex(eq, renderOptions) for eq in expression.equations]
+            rows = []
+            for eq in expression.equations:
+                rows.append((yield _render_latex_steps, eq, renderOptions))
             return "\\left\\{\\begin{array}{l}" + " \\\\ ".join(rows) + "\\end{array}\\right."
         case _:
             return apply_group(
@@ -0,0 +1,332 @@
+"""Cross-call cache of evaluation and equation-solving results.
+
+Services that answer the same problem many times can route their calls
+through a ``ResultCache``: the first call evaluates (or solves) and renders as
+usual, and later calls with the same expression, substitutions, options and
+explanation profile return the stored result and ``render_document()``
+payload without evaluating again.
+
+Entries are keyed by the expression's structural fingerprint and canonical
+forms of the substitutions, the options and the explanation profile.
+Substitutions are normalized so that only what changes the output changes
+the key: the order of substituted values (which the explanation lists)
+counts, the order of function entries does not. Substitution and option
+values that are neither numbers nor expression nodes (such as the callables
+in ``procedural.FUNCTIONS``) are keyed by identity; the entry keeps them
+alive so their ids cannot be reused while it exists.
+"""
+
+import dataclasses
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable, Optional, Union
+
+from .evaluator import EvaluatorOptions, evaluate
+from .expression import (
+    Equation,
+    Numerical,
+    Symbol,
+    _StructuralNode,
+    _atom_fingerprint,
+    fingerprint,
+)
+from .solve_equation import EquationSolution, EquationWordingOptions, solve_equation
+
+
+@dataclass(frozen=True, slots=True)
+class CachedResult:
+    """What a cached call returns.
+
+    ``document`` is a fresh copy of the ``render_document()`` payload on
+    every call; ``cached`` tells whether the entry already existed.
+    """
+
+    result: Union[Numerical, EquationSolution]
+    document: dict[str, Any]
+    solve_status: str
+    reason_code: Optional[str]
+    is_approximate: bool
+    coverage_tags: tuple[str, ...]
+    cached: bool
+
+
+class _Entry:
+    # ``payload`` is the UTF-8 JSON of the document; ``pinned`` holds the
+    # values keyed by identity.
+    __slots__ = (
+        "result",
+        "payload",
+        "solve_status",
+        "reason_code",
+        "is_approximate",
+        "coverage_tags",
+        "size",
+        "pinned",
+    )
+
+    def __init__(
+        self,
+        result,
+        payload: bytes,
+        solve_status: str,
+        reason_code: Optional[str],
+        is_approximate: bool,
+        coverage_tags: tuple[str, ...],
+        pinned: list,
+    ):
+        self.result = result
+        self.payload = payload
+        self.solve_status = solve_status
+        self.reason_code = reason_code
+        self.is_approximate = is_approximate
+        self.coverage_tags = coverage_tags
+        self.size = len(payload)
+        self.pinned = pinned
+
+
+_field_names: dict[type, tuple[str, ...]] = {}
+
+
+def _canonical(value: Any, pinned: list) -> Hashable:
+    # Type-aware hashable form of a key component: ``2`` and ``2.0`` differ,
+    # dict order does not matter, and anything else is keyed by identity.
+    if value is None or isinstance(value, (bool, int, float, complex, str)):
+        return _atom_fingerprint(value)
+    if isinstance(value, _StructuralNode):
+        return fingerprint(value)
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(_canonical(item, pinned) for item in value))
+    if isinstance(value, dict):
+        return (
+            "dict",
+            frozenset(
+                (_canonical(key, pinned), _canonical(item, pinned))
+                for key, item in value.items()
+            ),
+        )
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return (type(value), _dataclass_values(value, pinned))
+    pinned.append(value)
+    return ("id", id(value))
+
+
+def _dataclass_values(value: Any, pinned: list, skip: str = "") -> tuple:
+    names = _field_names.get(type(value))
+    if names is None:
+        names = _field_names[type(value)] = tuple(
+            field.name for field in dataclasses.fields(value)
+        )
+    return tuple(
+        _canonical(getattr(value, name), pinned) for name in names if name != skip
+    )
+
+
+def _substitutions_key(substitutions: dict, pinned: list) -> tuple:
+    # Values substituted into the expression are listed in the explanation in
+    # dict order, so their order is part of the key; the order of the other
+    # entries (functions looked up by name) is not.
+    shown = []
+    others = []
+    for key, value in substitutions.items():
+        pair = (_canonical(key, pinned), _canonical(value, pinned))
+        if isinstance(value, (int, float, complex, _StructuralNode)):
+            shown.append(pair)
+        else:
+            others.append(pair)
+    return (tuple(shown), frozenset(others))
+
+
+def _options_key(options: Any, pinned: list) -> tuple:
+    # The profile is keyed on its own.
+    return (type(options), _dataclass_values(options, pinned, skip="explanation_profile"))
+
+
+def _expression_key(expression: Any) -> Hashable:
+    if isinstance(expression, Equation):
+        return ("Equation", tuple(fingerprint(side) for side in expression.expressions))
+    return fingerprint(expression)
+
+
+class ResultCache:
+    """Least-recently-used cache for ``evaluate`` and ``solve_equation`` calls.
+
+    At most ``max_entries`` entries are kept and, when ``max_bytes`` is set,
+    their UTF-8 encoded documents add up to at most ``max_bytes``; the least
+    recently used entries are evicted first. Evaluations with a
+    ``trace_hook`` are never cached, since the hook must see every rewrite,
+    and neither are evaluations cut short by ``deadline_seconds``, since
+    another run may get further.
+    """
+
+    def __init__(self, max_entries: Optional[int] = 1024, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    def evaluate(
+        self,
+        expression: Numerical,
+        substitutions: Optional[dict] = None,
+        error_on_invalid_snap: bool = True,
+        options: Optional[EvaluatorOptions] = None,
+    ) -> CachedResult:
+        """``evaluate(...)`` followed by ``context.render_document()``, cached."""
+        substitutions = substitutions or {}
+        options = options or EvaluatorOptions()
+        if options.trace_hook is not None:
+            result, context = evaluate(
+                expression, substitutions, error_on_invalid_snap, options
+            )
+            document = context.render_document()
+            return self._result(self._entry_from(result, context, document, []), False, document)
+        pinned = []
+        key = (
+            b"evaluate",
+            _expression_key(expression),
+            _substitutions_key(substitutions, pinned),
+            _options_key(options, pinned),
+            _canonical(options.explanation_profile, pinned),
+            error_on_invalid_snap,
+        )
+        entry = self._lookup(key)
+        if entry is not None:
+            return self._result(entry, True)
+        result, context = evaluate(expression, substitutions, error_on_invalid_snap, options)
+        document = context.render_document()
+        entry = self._entry_from(result, context, document, pinned)
+        if context.reason_code != "deadline_exceeded":
+            entry = self._store(key, entry)
+        return self._result(entry, False, document)
+
+    def solve_equation(
+        self,
+        eq: Equation,
+        variable: Optional[Union[Symbol, str]] = None,
+        wording_options: Optional[EquationWordingOptions] = None,
+    ) -> CachedResult:
+        """``solve_equation(...)`` followed by ``context.render_document()``, cached."""
+        pinned = []
+        if isinstance(variable, Symbol):
+            variable = variable.name
+        key = (
+            b"solve_equation",
+            _expression_key(eq),
+            _canonical(variable, pinned),
+            # ``None`` words step headings differently from default options.
+            _options_key(wording_options, pinned) if wording_options is not None else None,
+            _canonical(
+                wording_options.explanation_profile if wording_options is not None else None,
+                pinned,
+            ),
+        )
+        entry = self._lookup(key)
+        if entry is not None:
+            return self._result(entry, True)
+        solution, context = solve_equation(eq, variable, wording_options)
+        document = context.render_document()
+        entry = _Entry(
+            solution,
+            json.dumps(document, ensure_ascii=False).encode("utf-8"),
+            context.solve_status,
+            context.reason_code,
+            False,
+            (),
+            pinned,
+        )
+        return self._result(self._store(key, entry), False, document)
+
+    def invalidate(self, expression: Optional[Any] = None) -> int:
+        """Drop every entry, or only those for ``expression``; returns how many."""
+        if expression is None:
+            keys = list(self._entries)
+        else:
+            target = _expression_key(expression)
+            keys = [key for key in self._entries if key[1] == target]
+        for key in keys:
+            self._bytes -= self._entries.pop(key).size
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+    def _lookup(self, key: tuple) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    @staticmethod
+    def _entry_from(result, context, document: dict, pinned: list) -> _Entry:
+        return _Entry(
+            result,
+            json.dumps(document, ensure_ascii=False).encode("utf-8"),
+            context.solve_status,
+            context.reason_code,
+            context.is_approximate,
+            tuple(sorted(context.coverage_tags)),
+            pinned,
+        )
+
+    def _store(self, key: tuple, entry: _Entry) -> _Entry:
+        if self.max_bytes is not None and entry.size > self.max_bytes:
+            return entry
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+        return entry
+
+    @staticmethod
+    def _result(entry: _Entry, cached: bool, document: Optional[dict] = None) -> CachedResult:
+        # ``document`` is the one just rendered on a miss; hits decode a copy.
+        result = entry.result
+        if isinstance(result, EquationSolution):
+            result = EquationSolution(dict(result.values), result.status, result.reason_code)
+        return CachedResult(
+            result,
+            document if document is not None else json.loads(entry.payload),
+            entry.solve_status,
+            entry.reason_code,
+            entry.is_approximate,
+            entry.coverage_tags,
+            cached,
+        )
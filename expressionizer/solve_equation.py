@@ -21,6 +21,7 @@ from .expression import (
     product,
     sum as expr_sum,
 )
+from .polynomial import to_polynomial
 from .render import render_latex
 from .localization import ExplanationProfile, Localizer
 
@@ -174,16 +175,6 @@ class _LinearForm:
     constant: float
 
 
-@dataclass
-class _PolynomialForm:
-    coefficients: dict[int, float]
-
-
-@dataclass
-class _LaurentForm:
-    coefficients: dict[int, float]
-
-
 def _clean_number(value: float):
     if abs(value) < 1e-12:
         return 0
@@ -365,168 +356,23 @@ def _build_rhs_for_variable(form: _LinearForm, variable_name: str):
     return product([numerator, power(denominator, -1)])
 
 
-def _poly_add(left: _PolynomialForm, right: _PolynomialForm) -> _PolynomialForm:
-    output = dict(left.coefficients)
-    for degree, value in right.coefficients.items():
-        output[degree] = output.get(degree, 0.0) + value
-        if abs(output[degree]) < 1e-12:
-            del output[degree]
-    return _PolynomialForm(output)
-
-
-def _poly_scale(poly: _PolynomialForm, scalar: float) -> _PolynomialForm:
-    return _PolynomialForm(
-        {
-            degree: coefficient * scalar
-            for degree, coefficient in poly.coefficients.items()
-        }
-    )
-
-
-def _laurent_add(left: _LaurentForm, right: _LaurentForm) -> _LaurentForm:
-    output = dict(left.coefficients)
-    for degree, value in right.coefficients.items():
-        output[degree] = output.get(degree, 0.0) + value
-        if abs(output[degree]) < 1e-12:
-            del output[degree]
-    return _LaurentForm(output)
-
-
-def _laurent_mul(left: _LaurentForm, right: _LaurentForm) -> tuple[bool, _LaurentForm]:
-    output: dict[int, float] = {}
-    for d_left, v_left in left.coefficients.items():
-        for d_right, v_right in right.coefficients.items():
-            degree = d_left + d_right
-            if degree < -1 or degree > 2:
-                return False, _LaurentForm({})
-            output[degree] = output.get(degree, 0.0) + (v_left * v_right)
-    output = {degree: value for degree, value in output.items() if abs(value) >= 1e-12}
-    return True, _LaurentForm(output)
-
-
-def _laurent_scale(form: _LaurentForm, scalar: float) -> _LaurentForm:
-    return _LaurentForm(
-        {
-            degree: coefficient * scalar
-            for degree, coefficient in form.coefficients.items()
-        }
-    )
-
-
-def _laurent_from_expr(expr, variable_name: str) -> tuple[bool, _LaurentForm]:
-    if is_int_or_float(expr):
-        return True, _LaurentForm({0: float(expr)})
-    if isinstance(expr, Symbol):
-        if expr.name != variable_name:
-            return False, _LaurentForm({})
-        return True, _LaurentForm({1: 1.0})
-    if isinstance(expr, Sum):
-        result = _LaurentForm({})
-        for term in expr.terms:
-            ok, part = _laurent_from_expr(term, variable_name)
-            if not ok:
-                return False, _LaurentForm({})
-            result = _laurent_add(result, part)
-        return True, result
-    if isinstance(expr, Product):
-        result = _LaurentForm({0: 1.0})
-        for factor in expr.factors:
-            ok, part = _laurent_from_expr(factor, variable_name)
-            if not ok:
-                return False, _LaurentForm({})
-            ok, result = _laurent_mul(result, part)
-            if not ok:
-                return False, _LaurentForm({})
-        return True, result
-    if isinstance(expr, Power):
-        if not is_int_or_float(expr.exponent):
-            return False, _LaurentForm({})
-        exponent = float(expr.exponent)
-        if abs(exponent - round(exponent)) > 1e-12:
-            return False, _LaurentForm({})
-        exponent_int = int(round(exponent))
-        if exponent_int == -1:
-            if isinstance(expr.base, Symbol) and expr.base.name == variable_name:
-                return True, _LaurentForm({-1: 1.0})
-            return False, _LaurentForm({})
-        if exponent_int < 0 or exponent_int > 2:
-            return False, _LaurentForm({})
-        if exponent_int == 0:
-            return True, _LaurentForm({0: 1.0})
-        ok, base = _laurent_from_expr(expr.base, variable_name)
-        if not ok:
-            return False, _LaurentForm({})
-        result = _LaurentForm({0: 1.0})
-        for _ in range(exponent_int):
-            ok, result = _laurent_mul(result, base)
-            if not ok:
-                return False, _LaurentForm({})
-        return True, result
-    if isinstance(expr, (FunctionCall, Integral)):
-        return False, _LaurentForm({})
-    return False, _LaurentForm({})
-
-
-def _poly_mul(left: _PolynomialForm, right: _PolynomialForm) -> tuple[bool, _PolynomialForm]:
-    output: dict[int, float] = {}
-    for d_left, v_left in left.coefficients.items():
-        for d_right, v_right in right.coefficients.items():
-            degree = d_left + d_right
-            if degree > 2:
-                return False, _PolynomialForm({})
-            output[degree] = output.get(degree, 0.0) + (v_left * v_right)
-    output = {degree: value for degree, value in output.items() if abs(value) >= 1e-12}
-    return True, _PolynomialForm(output)
+def _polynomial_coefficients(
+    eq: Equation, variable_name: str, min_degree: int
+) -> Optional[dict[int, float]]:
+    """``lhs - rhs`` as a polynomial in one variable, by degree.
 
-
-def _poly_from_expr(expr, variable_name: str) -> tuple[bool, _PolynomialForm]:
-    if is_int_or_float(expr):
-        return True, _PolynomialForm({0: float(expr)})
-    if isinstance(expr, Symbol):
-        if expr.name == variable_name:
-            return True, _PolynomialForm({1: 1.0})
-        return False, _PolynomialForm({})
-    if isinstance(expr, Sum):
-        result = _PolynomialForm({})
-        for term in expr.terms:
-            ok, poly = _poly_from_expr(term, variable_name)
-            if not ok:
-                return False, _PolynomialForm({})
-            result = _poly_add(result, poly)
-        return True, result
-    if isinstance(expr, Product):
-        result = _PolynomialForm({0: 1.0})
-        for factor in expr.factors:
-            ok, poly = _poly_from_expr(factor, variable_name)
-            if not ok:
-                return False, _PolynomialForm({})
-            ok, result = _poly_mul(result, poly)
-            if not ok:
-                return False, _PolynomialForm({})
-        return True, result
-    if isinstance(expr, Power):
-        if not is_int_or_float(expr.exponent):
-            return False, _PolynomialForm({})
-        exponent = float(expr.exponent)
-        if abs(exponent - round(exponent)) > 1e-12:
-            return False, _PolynomialForm({})
-        exponent_int = int(round(exponent))
-        if exponent_int < 0 or exponent_int > 2:
-            return False, _PolynomialForm({})
-        if exponent_int == 0:
-            return True, _PolynomialForm({0: 1.0})
-        ok, base_poly = _poly_from_expr(expr.base, variable_name)
-        if not ok:
-            return False, _PolynomialForm({})
-        result = _PolynomialForm({0: 1.0})
-        for _ in range(exponent_int):
-            ok, result = _poly_mul(result, base_poly)
-            if not ok:
-                return False, _PolynomialForm({})
-        return True, result
-    if isinstance(expr, (FunctionCall, Integral)):
-        return False, _PolynomialForm({})
-    return False, _PolynomialForm({})
+    Degrees are bounded to ``min_degree..2`` while converting; coefficients
+    below ``1e-12`` are dropped.
+    """
+    lhs = to_polynomial(eq.expressions[0], [variable_name], min_degree, 2)
+    rhs = to_polynomial(eq.expressions[1], [variable_name], min_degree, 2)
+    if lhs is None or rhs is None:
+        return None
+    return {
+        degree: float(value)
+        for degree, value in (lhs - rhs).coefficients(variable_name).items()
+        if abs(value) >= 1e-12
+    }
 
 
 def _solve_quadratic_native(
@@ -535,20 +381,13 @@ def _solve_quadratic_native(
     context: EquationSolveContext,
     wording_options: Optional[EquationWordingOptions] = None,
 ) -> Optional[EquationSolution]:
-    lhs_poly_ok, lhs_poly = _poly_from_expr(eq.expressions[0], variable_name)
-    rhs_poly_ok, rhs_poly = _poly_from_expr(eq.expressions[1], variable_name)
-    if not lhs_poly_ok or not rhs_poly_ok:
-        return None
-
-    combined = _poly_add(lhs_poly, _poly_scale(rhs_poly, -1.0))
-    if any(degree > 2 for degree in combined.coefficients):
-        return None
-    if 2 not in combined.coefficients:
+    coefficients = _polynomial_coefficients(eq, variable_name, 0)
+    if coefficients is None or 2 not in coefficients:
         return None
 
-    a = combined.coefficients.get(2, 0.0)
-    b = combined.coefficients.get(1, 0.0)
-    c = combined.coefficients.get(0, 0.0)
+    a = coefficients.get(2, 0.0)
+    b = coefficients.get(1, 0.0)
+    c = coefficients.get(0, 0.0)
     if abs(a) < 1e-12:
         return None
 
@@ -640,21 +479,19 @@ def _solve_rational_native(
     context: EquationSolveContext,
     wording_options: Optional[EquationWordingOptions] = None,
 ) -> Optional[EquationSolution]:
-    lhs_ok, lhs = _laurent_from_expr(eq.expressions[0], variable_name)
-    rhs_ok, rhs = _laurent_from_expr(eq.expressions[1], variable_name)
-    if not lhs_ok or not rhs_ok:
+    coefficients = _polynomial_coefficients(eq, variable_name, -1)
+    if coefficients is None:
         return None
 
-    combined = _laurent_add(lhs, _laurent_scale(rhs, -1.0))
-    if not combined.coefficients:
+    if not coefficients:
         context.set_status("partial", "infinite_solutions")
         context.add_step(
             _msg(context, "equation.rational.identity_domain", "$$ \\text{identity on domain} $$")
         )
         return EquationSolution({}, context.solve_status, context.reason_code)
 
-    min_degree = min(combined.coefficients)
-    max_degree = max(combined.coefficients)
+    min_degree = min(coefficients)
+    max_degree = max(coefficients)
     if min_degree != -1 or max_degree > 1:
         return None
 
@@ -677,7 +514,7 @@ def _solve_rational_native(
     )
 
     shifted: dict[int, float] = {}
-    for degree, coefficient in combined.coefficients.items():
+    for degree, coefficient in coefficients.items():
         shifted_degree = degree + 1
         shifted[shifted_degree] = shifted.get(shifted_degree, 0.0) + coefficient
 
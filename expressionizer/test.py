@@ -1,13 +1,31 @@
+import builtins
 from math import cos, exp, isclose, log, log10, pi, sin, sqrt, tan
 import random
+import sys
 
+import numpy as np
+
+from . import evaluator as evaluator_module
 from .evaluator import (
+    SNAPSHOT_CHECKPOINT_INTERVAL,
+    SNAPSHOT_MEMO_SIZE,
     CalculatorModeOptions,
+    CallSite,
     EvaluatorContext,
+    LazyMessage,
     EvaluatorOptions,
+    NullEvaluatorContext,
+    Snapshot,
+    TextSnapshot,
     WordingOptions,
+    compact_evaluator_options,
     evaluate,
+    contains,
+    prepare,
     evaluate_expression,
+    replace_sub,
+    replace_sub_at,
+    wording,
 )
 from .localization import (
     ExplanationProfile,
@@ -15,6 +33,7 @@ from .localization import (
     supported_profile_presets,
 )
 from .expression import *
+from .dag import SubtreeIndex, to_dag
 from .equation_generation import generate_random_equation_problem
 from .language_packs import (
     get_builtin_messages,
@@ -24,10 +43,36 @@ from .language_packs import (
     validate_pack_placeholders,
 )
 from .localization_catalog import collect_catalog, validate_locale_packs
-from .render import render_latex
+from .numeric import (
+    NUMERIC_DIVISION_BY_ZERO,
+    NUMERIC_DOMAIN_ERROR,
+    NUMERIC_INVALID_INPUT,
+    NUMERIC_OK,
+    NUMERIC_OVERFLOW,
+    NUMERIC_UNRESOLVED,
+    evaluate_numeric,
+)
+from .render import render, render_latex
+from .result_cache import ResultCache
 from .procedural import FUNCTIONS, ExpressionContext, generate_random_expression, seed_generation
 from .solve_equation import EquationWordingOptions, solve_equation, solve_system
-from .validation import validate_equation_solution, validate_system_solution
+from .traversal import (
+    DESCEND,
+    SKIP,
+    fold,
+    iter_postorder,
+    iter_preorder,
+    node_at,
+    replace_at,
+    rewrite,
+    trampoline,
+    visit,
+)
+from .validation import (
+    validate_equation_solution,
+    validate_reasoning_steps,
+    validate_system_solution,
+)
 
 
 def _is_numeric(x):
@@ -450,6 +495,12 @@ def run_options_tests():
 
     catalog = collect_catalog()
     tests.append(("localization catalog has many keys", catalog.get("total_keys", 0) >= 80))
+    tests.append(
+        (
+            "localization catalog finds keys passed to _message",
+            any(entry["key"] == "calculator.fallback" for entry in catalog["keys"]),
+        )
+    )
     catalog_validation_errors = validate_locale_packs()
     tests.append(("catalog-driven locale validation", len(catalog_validation_errors) == 0))
     presets = supported_profile_presets()
@@ -1082,91 +1133,1856 @@ def run_equation_procedural_tests():
     return tests
 
 
-if __name__ == "__main__":
-    total, failures = run_evaluate_tests()
-    option_results = run_options_tests()
-    calculus_quality_results = run_calculus_quality_tests()
-    calculus_rule_results = run_calculus_rule_coverage_tests()
-    explanation_quality_results = run_explanation_quality_tests()
-    fuzz_results = run_procedural_fuzz_tests()
-    profile_results = run_procedural_profile_tests()
-    solvability_mode_results = run_procedural_solvability_mode_tests()
-    equation_solver_results = run_equation_solver_tests()
-    equation_procedural_results = run_equation_procedural_tests()
+def run_expression_structure_tests():
+    import pickle
 
-    print("Expressionizer test suite")
-    print("=" * 26)
-    print(f"Core evaluate tests: {total - len(failures)}/{total} passed")
+    tests = []
+    x, y = Symbol("x"), Symbol("y")
+    left = Sum([Product([2, x]), Power(y, 2), 3])
+    right = Sum([3, Power(y, 2), Product([x, 2])])
+    tests.append(("structural hash is order independent", hash(left) == hash(right)))
+    tests.append(("structural hash is cached", left._hash is not None and hash(left) == left._hash))
+    tests.append(("fingerprint is order sensitive", left.fingerprint != right.fingerprint))
+    tests.append(
+        (
+            "fingerprint matches rebuilt tree",
+            Sum([Product([2, x]), Power(y, 2), 3]).fingerprint == left.fingerprint,
+        )
+    )
+    tests.append(
+        (
+            "fingerprint distinguishes int and float",
+            fingerprint(Power(x, 2)) != fingerprint(Power(x, 2.0)),
+        )
+    )
+    restored = pickle.loads(pickle.dumps(left))
+    tests.append(("pickled nodes drop cached hashes", not hasattr(restored, "_hash")))
+    tests.append(("pickled nodes keep equality and hash", restored == left and hash(restored) == hash(left)))
+
+    with interning() as table:
+        first = sum([product([2, symbol("x")]), power(symbol("y"), 2)])
+        second = sum([product([2, symbol("x")]), power(symbol("y"), 2)])
+        tests.append(("interning shares identical subtrees", first is second))
+        tests.append(("interning shares math functions", math_function("cos", 1) is math_function("cos", 1)))
+        stats = table.stats()
+        tests.append(("interning records hit statistics", stats["hits"] > 0 and 0 < stats["hit_rate"] < 1))
+        raw = Sum([Product([2, Symbol("x")]), Power(Symbol("y"), 2)])
+        shared = table.intern_tree(raw)
+        tests.append(("intern_tree reuses existing tree", shared is first))
+        size_before = len(table)
+        del first, second, shared
+        tests.append(("intern table entries are weak", len(table) < size_before))
+    tests.append(("interning scope restores previous state", current_intern_table() is None))
+    tests.append(("constructors allocate when interning is off", symbol("x") is not symbol("x")))
+
+    node = Power(x, 3)
+    try:
+        node.exponent = 4
+        immutable = False
+    except AttributeError:
+        immutable = node.exponent == 3
+    tests.append(("nodes are immutable", immutable))
+    tests.append(("nodes use slots", not hasattr(node, "__dict__")))
+    match Product([2, node]):
+        case Product([coefficient, Power(base, exponent)]):
+            matched = coefficient == 2 and base == x and exponent == 3
+        case _:
+            matched = False
+    tests.append(("slotted nodes keep match args", matched))
+    _, context = evaluate(product([2, x]), {"x": 4})
+    snapshot = context.snapshots[-1]
+    try:
+        snapshot.full_tree = 0
+        snapshot_immutable = False
+    except AttributeError:
+        snapshot_immutable = not hasattr(snapshot, "__dict__")
+    tests.append(("snapshots are immutable slots", snapshot_immutable))
 
-    if failures:
-        print("\nFailures:")
-        for i, name, expr_latex, got, expected in failures:
-            print(f"- [{i}] {name}")
-            print(f"  expr: {expr_latex}")
-            print(f"  got: {got}")
-            print(f"  expected: {expected}")
-    else:
-        print("No core failures.")
+    calculus = Sum(
+        [
+            Product([2, x]),
+            Integral(Power(x, y), x, 0, x),
+            Derivative(Power(y, 2), [(y, 1)]),
+        ]
+    )
+    tests.append(("metadata free symbols", calculus.free_symbols == {x, y}))
+    tests.append(
+        (
+            "metadata binds integration variable",
+            Integral(Power(x, y), x, 0, x).free_symbols == {y},
+        )
+    )
+    tests.append(("metadata node count and depth", (calculus.node_count, calculus.depth) == (16, 4)))
+    tests.append(("metadata calculus flag", calculus.contains_calculus and not Product([2, x]).contains_calculus))
+    tests.append(("len counts leaves", len(calculus) == 10 and len(Power(Sum([x, 1]), 2)) == 3))
+    deep = x
+    for _ in range(5000):
+        deep = Sum([deep, 1])
+    tests.append(("metadata handles deep trees", deep.depth == 5001 and x in deep.free_symbols))
 
-    passed_options = sum(1 for _, ok in option_results if ok)
-    print(
-        f"Option policy tests: {passed_options}/{len(option_results)} passed"
+    from .validation import _complexity_info
+
+    many_numbers = Sum([Product([index + 2, 3, x]) for index in range(200)])
+    tests.append(
+        (
+            "validation size limit skips numbers as before",
+            _complexity_info(many_numbers) == {"ok": True, "nodes": 202}
+            and _complexity_info(deep)["reason"] == "expression_too_large",
+        )
     )
-    for name, ok in option_results:
-        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
 
-    passed_calculus = sum(1 for _, ok in calculus_quality_results if ok)
-    print(
-        f"Calculus quality tests: {passed_calculus}/{len(calculus_quality_results)} passed"
+    from .evaluator import _remove_sub_multiset
+
+    z = Symbol("z")
+    padded = Product([x, 1, Power(y, 0), z])
+    tests.append(
+        (
+            "product equality ignores unit factors",
+            padded == Product([x, z]) and padded != Product([z, x]),
+        )
     )
-    for name, ok in calculus_quality_results:
-        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+    tests.append(
+        (
+            "sub-product check is sign normalized",
+            Product([2, x]) in Product([-2, z, x]) and Product([3, x]) not in Product([2, x]),
+        )
+    )
+    tests.append(
+        (
+            "sub-sum check counts multiplicity",
+            Sum([x, y]) in Sum([y, z, x]) and Sum([x, x]) not in Sum([x, y]),
+        )
+    )
+    tests.append(
+        (
+            "sub-multiset removal matches one-factor products",
+            _remove_sub_multiset([Product([4]), x], [4]) == ([x], True)
+            and _remove_sub_multiset([x, y, x], [x, z]) == ([y, x], False),
+        )
+    )
+    return tests
 
-    passed_calculus_rules = sum(1 for _, ok in calculus_rule_results if ok)
-    print(
-        f"Calculus rule coverage tests: {passed_calculus_rules}/{len(calculus_rule_results)} passed"
+
+def run_traversal_tests():
+    from .evaluator import contains, replace_sub, replace_symbols
+
+    tests = []
+    x, y = Symbol("x"), Symbol("y")
+    tree = Sum([Product([2, x]), Power(y, 2), Integral(x, x, 0, y)])
+    tests.append(
+        (
+            "preorder visits parents first",
+            [type(node).__name__ for node in iter_preorder(tree)][:4]
+            == ["Sum", "Product", "int", "Symbol"],
+        )
     )
-    for name, ok in calculus_rule_results:
-        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+    tests.append(
+        (
+            "postorder visits parents last",
+            list(iter_postorder(tree))[-1] is tree
+            and list(iter_postorder(Power(x, 2))) == [x, 2, Power(x, 2)],
+        )
+    )
+    entered = []
+    visit(tree, enter=lambda node: SKIP if isinstance(node, Integral) else entered.append(node))
+    tests.append(("visit skips subtrees", x in entered and 0 not in entered))
+    tests.append(
+        (
+            "fold counts leaves",
+            fold(tree, lambda node, values: builtins.sum(values) if values else 1) == len(tree),
+        )
+    )
+    rebuilt = rewrite(tree, enter=lambda node, _: 3 if node == y else DESCEND)
+    tests.append(
+        (
+            "rewrite replaces and shares unchanged subtrees",
+            rebuilt == Sum([Product([2, x]), Power(3, 2), Integral(x, x, 0, 3)])
+            and rebuilt.terms[0] is tree.terms[0],
+        )
+    )
+    tests.append(("rewrite keeps untouched trees", rewrite(tree) is tree))
 
-    passed_explanation = sum(1 for _, ok in explanation_quality_results if ok)
-    print(
-        f"Explanation quality tests: {passed_explanation}/{len(explanation_quality_results)} passed"
+    def factorial_steps(n):
+        if n <= 1:
+            return 1
+        return n * (yield factorial_steps, n - 1)
+
+    tests.append(("trampoline runs deep generator recursion", trampoline(factorial_steps, 3000) > 0))
+
+    def failing_steps(n):
+        if n == 0:
+            raise ValueError("bottom")
+        if n == 1:
+            try:
+                yield failing_steps, 0
+            except ValueError:
+                return "caught"
+        return (yield failing_steps, n - 1)
+
+    try:
+        trampoline(failing_steps, 0)
+        uncaught = False
+    except ValueError:
+        uncaught = True
+    tests.append(
+        (
+            "trampoline delivers exceptions to callers",
+            trampoline(failing_steps, 5) == "caught" and uncaught,
+        )
     )
-    for name, ok in explanation_quality_results:
-        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
 
-    passed_fuzz = sum(1 for _, ok in fuzz_results if ok)
-    print(f"Procedural fuzz tests: {passed_fuzz}/{len(fuzz_results)} passed")
-    for name, ok in fuzz_results:
-        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+    bound = Sum([Derivative(Power(x, 2), [(x, 1)]), Integral(x, x, 0, x), y])
+    substituted = replace_symbols(bound, EvaluatorContext(bound, {"x": 5, "y": 7}))
+    tests.append(
+        (
+            "replace_symbols respects bound variables",
+            substituted == Sum([Derivative(Power(x, 2), [(x, 1)]), Integral(x, x, 0, 5), 7]),
+        )
+    )
 
-    passed_profiles = sum(1 for _, ok in profile_results if ok)
-    print(f"Procedural profile tests: {passed_profiles}/{len(profile_results)} passed")
-    for name, ok in profile_results:
-        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+    depth = 5000
+    chain = x
+    for _ in range(depth):
+        chain = Sum([Product([2, chain]), -1])
+    replaced = replace_sub(chain, x, y)
+    tests.append(
+        (
+            "deep chains render and rewrite without recursion",
+            render(chain).count("x") == 1
+            and render_latex(chain).count("x") == 1
+            and contains(chain, x) is True
+            and y in replaced.free_symbols
+            and replaced != chain
+            and replace_sub(chain, Symbol("z"), y) is chain,
+        )
+    )
+    chain = x
+    for _ in range(150):
+        chain = Sum([Product([2, chain]), -1])
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(150)
+    try:
+        result, _ = evaluate(chain, {"x": 1}, error_on_invalid_snap=False)
+    except RecursionError:
+        result = None
+    finally:
+        sys.setrecursionlimit(limit)
+    tests.append(("evaluation depth is not bounded by the recursion limit", result == 1))
+    return tests
 
-    passed_solvability = sum(1 for _, ok in solvability_mode_results if ok)
-    print(
-        "Procedural solvability-mode tests: "
-        + f"{passed_solvability}/{len(solvability_mode_results)} passed"
+
+def run_dag_tests():
+    tests = []
+    x = Symbol("x")
+    repeated = Power(Sum([x, 3]), 2)
+    tree = Sum([Product([repeated, 2]), repeated, Product([repeated, repeated])])
+    dag = to_dag(tree)
+    shared_id = dag.id_of(repeated)
+    tests.append(
+        (
+            "to_dag keeps one entry per distinct subtree",
+            len(dag) == 8 and dag.stats()["tree_nodes"] == tree.node_count,
+        )
     )
-    for name, ok in solvability_mode_results:
-        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+    tests.append(
+        (
+            "to_dag counts references to shared subtrees",
+            dag.refcounts[shared_id] == 4
+            and dag.refcounts[dag.root] == 1
+            and dag.shared_fingerprints() == {repeated.fingerprint},
+        )
+    )
+    rebuilt = dag.to_tree()
+    tests.append(
+        (
+            "to_tree rebuilds with shared nodes",
+            rebuilt == tree
+            and rebuilt.terms[1] is rebuilt.terms[2].factors[0]
+            and rebuilt.terms[2].factors[0] is rebuilt.terms[2].factors[1],
+        )
+    )
+    tests.append(("to_dag keeps 2 and 2.0 apart", len(to_dag(Sum([2, 2.0]))) == 3))
 
-    passed_equation_solver = sum(1 for _, ok in equation_solver_results if ok)
-    print(
-        f"Equation solver tests: {passed_equation_solver}/{len(equation_solver_results)} passed"
+    plain_result, plain_context = evaluate(tree, {"x": 4}, error_on_invalid_snap=False)
+    shared_result, shared_context = evaluate(
+        tree,
+        {"x": 4},
+        options=EvaluatorOptions(share_common_subexpressions=True),
+    )
+    tests.append(
+        (
+            "shared evaluation matches plain evaluation",
+            shared_result == plain_result == 2548
+            and shared_context.solve_status == plain_context.solve_status
+            and shared_context.error_count == 0,
+        )
+    )
+    tests.append(
+        (
+            "shared evaluation explains reuse",
+            "shared_subexpression_reuse" in shared_context.coverage_tags
+            and "already computed above" in shared_context.render(),
+        )
+    )
+    _, quiet_context = evaluate(
+        tree,
+        {"x": 4},
+        options=EvaluatorOptions(
+            share_common_subexpressions=True,
+            explain_shared_subexpressions=False,
+        ),
+    )
+    tests.append(
+        (
+            "reuse explanation can be turned off",
+            "already computed above" not in quiet_context.render()
+            and quiet_context.current_tree == 2548,
+        )
     )
-    for name, ok in equation_solver_results:
-        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
 
-    passed_equation_procedural = sum(1 for _, ok in equation_procedural_results if ok)
-    print(
-        "Equation procedural tests: "
-        + f"{passed_equation_procedural}/{len(equation_procedural_results)} passed"
+    y = Symbol("y")
+    body = Power(Sum([y, 1]), 2)
+    calculus_tree = Sum([Derivative(Product([body, x]), [(x, 1)]), body])
+    plain_result, plain_context = evaluate(calculus_tree, {"y": 2})
+    shared_result, shared_context = evaluate(
+        calculus_tree,
+        {"y": 2},
+        options=EvaluatorOptions(share_common_subexpressions=True),
     )
-    for name, ok in equation_procedural_results:
+    tests.append(
+        (
+            "derivative bodies share results with the outer evaluation",
+            shared_result == plain_result == 18
+            and len(shared_context.shared_results) == 1
+            and "shared_subexpression_reuse" in shared_context.coverage_tags
+            and len(shared_context.snapshots) < len(plain_context.snapshots),
+        )
+    )
+    inner = shared_context.inner_context(body, {})
+    tests.append(
+        (
+            "shared results are keyed by substitution scope",
+            inner.shared_results is shared_context.shared_results
+            and inner.substitution_scope != shared_context.substitution_scope
+            and shared_context.inner_context(body, {"y": 2}).substitution_scope
+            == shared_context.substitution_scope
+            and EvaluatorContext(body, {"y": 2.0}).substitution_scope
+            != shared_context.substitution_scope,
+        )
+    )
+    return tests
+
+
+def run_codec_tests():
+    import io
+
+    from . import codec
+
+    tests = []
+    x, y = Symbol("x"), Symbol("y")
+    sin = math_function("sin", 1)
+    values = [
+        Sum([Product([3, Power(x, 2)]), -7, 2.5, Power(x, -0.25)]),
+        FunctionCall(sin, [Sum([x, 2**70])]),
+        Derivative(Power(x, 3), [(x, 2), (y, 1)]),
+        Integral(Product([x, y]), x, -1, Power(2, 0.5)),
+        Integral(x, x),
+    ]
+    tests.append(
+        (
+            "codec round-trips expression nodes",
+            all(
+                fingerprint(codec.loads(codec.dumps(value))) == fingerprint(value)
+                for value in values
+            ),
+        )
+    )
+    system = codec.loads(
+        codec.dumps(SystemOfEquations([Equation([x, 1]), Equation([Product([2, y]), x])]))
+    )
+    inequality = codec.loads(codec.dumps(InEquality(x, Sum([y, 1]), -1, True)))
+    tests.append(
+        (
+            "codec round-trips equations, inequalities and systems",
+            isinstance(system, SystemOfEquations)
+            and [list(map(fingerprint, eq.expressions)) for eq in system.equations]
+            == [[fingerprint(x), fingerprint(1)], [fingerprint(Product([2, y])), fingerprint(x)]]
+            and (inequality.sign, inequality.inclusive) == (-1, True)
+            and fingerprint(inequality.expression2) == fingerprint(Sum([y, 1])),
+        )
+    )
+    seed_generation(808)
+    corpus = [
+        generate_random_expression(max_depth=4, allow_calculus=True, complexity=0.5, context=ExpressionContext())
+        for _ in range(60)
+    ]
+    buffer = io.BytesIO()
+    writer = codec.ExpressionWriter(buffer)
+    writer.write_all(corpus)
+    stream_size = len(buffer.getvalue())
+    buffer.seek(0)
+    restored = list(codec.ExpressionReader(buffer))
+    tests.append(
+        (
+            "codec streams many trees with shared tables",
+            list(map(fingerprint, restored)) == list(map(fingerprint, corpus))
+            and stream_size < builtins.sum(len(codec.dumps(expr)) for expr in corpus),
+        )
+    )
+    chain = x
+    for _ in range(5000):
+        chain = Sum([Product([2, chain]), -1])
+    tests.append(
+        (
+            "codec handles deep trees",
+            fingerprint(codec.loads(codec.dumps(chain))) == fingerprint(chain),
+        )
+    )
+    payload = codec.dumps(values[0])
+    rejected = []
+    bad_string = codec.dumps(Symbol("xyz")).replace(b"xyz", b"\xffxy")
+    for corrupt in (
+        payload[:-3],
+        codec.MAGIC + bytes([codec.VERSION + 1]) + payload[4:],
+        b"pickle",
+        bad_string,
+    ):
+        try:
+            codec.loads(corrupt)
+            rejected.append(False)
+        except codec.CodecError:
+            rejected.append(True)
+    tests.append(
+        ("codec rejects truncated, newer, foreign and non-UTF-8 payloads", all(rejected))
+    )
+    return tests
+
+
+def run_parser_tests():
+    import os
+    import tempfile
+
+    from . import parser
+
+    tests = []
+    corpus = []
+    for profile, calculus in (("realistic", False), ("realistic", True), ("stress", True)):
+        seed_generation(909)
+        corpus.extend(
+            generate_random_expression(
+                max_depth=4,
+                allow_calculus=calculus,
+                complexity=0.5,
+                generation_profile=profile,
+                context=ExpressionContext(),
+            )
+            for _ in range(150)
+        )
+    matched = 0
+    failed = 0
+    for expr in corpus:
+        text = render(expr)
+        names = {node.name for node in iter_preorder(expr) if isinstance(node, Symbol)}
+        try:
+            matched += render(parser.parse(text, symbols=names)) == text
+        except parser.ParseError:
+            failed += 1
+    # A handful of renderings are simplified by ``render`` itself and can not
+    # be read back exactly; everything must still parse.
+    tests.append(
+        (
+            "parser round-trips render() output",
+            failed == 0 and matched >= 0.99 * len(corpus),
+        )
+    )
+    x, y = Symbol("x"), Symbol("y")
+    sine = parser.parse("sin(x)").function
+    cases = {
+        "2x^2": Power(Product([2, x]), 2),
+        "x-3": Product([x, -3]),
+        "x - 3y": Sum([x, Product([-3, y])]),
+        "1/(x^2)": Power(x, -2),
+        "sqrt(x - 1)": Power(Sum([x, -1]), Power(2, -1)),
+        "root(x - 1, 3)": Power(Sum([x, -1]), Power(3, -1)),
+        "d/dx^2,y(xy)": Derivative(Product([x, y]), [(x, 2), (y, 1)]),
+        "int_[0..1](x) dx": Integral(x, x, 0, 1),
+        "sin(x^2y)": FunctionCall(sine, [Product([Power(x, 2), y])]),
+        "0.20.8": Product([0.2, 0.8]),
+    }
+    tests.append(
+        (
+            "parser reads render() conventions",
+            all(
+                fingerprint(parser.parse(text)) == fingerprint(expected)
+                for text, expected in cases.items()
+            ),
+        )
+    )
+    system = parser.parse("{ x + y = 3 ; x = 2y }")
+    inequality = parser.parse("2x >= y")
+    tests.append(
+        (
+            "parser reads equations, inequalities and systems",
+            isinstance(system, SystemOfEquations)
+            and len(system.equations) == 2
+            and isinstance(inequality, InEquality)
+            and (inequality.sign, inequality.inclusive) == (1, True)
+            and render(inequality) == "2x >= y",
+        )
+    )
+    lines = [render(expr) for expr in corpus[:40]]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "corpus.txt")
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write("\n".join(lines + ["", "x + + y"]) + "\n")
+        from_file = parser.parse_file(path, errors="none")
+    tests.append(
+        (
+            "parser reads line-delimited files",
+            len(from_file) == len(lines) + 1
+            and from_file[-1] is None
+            and [render(expr) for expr in from_file[:5]] == lines[:5],
+        )
+    )
+    nested = "(" * 5000 + "x" + " + 1)" * 5000
+    tests.append(("parser handles deep nesting", parser.parse(nested).depth > 5000))
+    rejected = []
+    for text in ("x +", "x = ", "(x", "x $ y", "sin_2"):
+        try:
+            parser.parse(text)
+            rejected.append(False)
+        except parser.ParseError:
+            rejected.append(True)
+    tests.append(("parser rejects malformed input", all(rejected)))
+    return tests
+
+
+def run_polynomial_tests():
+    from fractions import Fraction
+
+    from .polynomial import Polynomial, expand, to_polynomial
+
+    tests = []
+    x, y = Symbol("x"), Symbol("y")
+    cube = to_polynomial(Power(Sum([x, 1]), 3))
+    tests.append(
+        (
+            "polynomial expands powers of sums",
+            cube.coefficients("x") == {3: 1, 2: 3, 1: 3, 0: 1}
+            and cube.degree() == 3,
+        )
+    )
+    mixed = to_polynomial(Sum([Product([Power(2, -1), x]), Product([x, y]), -3, 1.5]))
+    tests.append(
+        (
+            "polynomial keeps exact and float coefficients",
+            mixed.terms == {(1, 0): Fraction(1, 2), (1, 1): 1, (0, 0): -1.5}
+            and to_polynomial(mixed.to_expression()) == mixed
+            and isinstance(mixed.to_expression().terms[-1], float),
+        )
+    )
+    tests.append(
+        (
+            "polynomial arithmetic aligns symbols",
+            to_polynomial(x) * to_polynomial(y) - to_polynomial(Product([y, x])) == 0
+            and (to_polynomial(Sum([x, y])) ** 2).degree("y") == 2
+            and to_polynomial(Product([2, x])).inverse().terms == {(-1,): Fraction(1, 2)},
+        )
+    )
+    tests.append(
+        (
+            "polynomial conversion rejects non-polynomials and honors bounds",
+            to_polynomial(FunctionCall(math_function("sin", 1), [x])) is None
+            and to_polynomial(Power(x, y)) is None
+            and to_polynomial(Power(x, 0.5)) is None
+            and to_polynomial(Power(x, -1)) is None
+            and to_polynomial(Power(x, -1), min_degree=-1) is not None
+            and to_polynomial(Power(Sum([x, 1]), 1000), max_degree=2) is None
+            and to_polynomial(Sum([x, y]), symbols=["x"]) is None
+            and to_polynomial(Sum([x, Power(y, 0)]), symbols=["x"]) == Polynomial(
+                {(1,): 1, (0,): 1}, (x,)
+            ),
+        )
+    )
+    sine = math_function("sin", 1)
+    expanded = expand(
+        Sum(
+            [
+                Product([2, x]),
+                Product([3, x]),
+                FunctionCall(sine, [Product([Sum([x, 1]), Sum([x, -1])])]),
+            ]
+        )
+    )
+    tests.append(
+        (
+            "polynomial expand collects like terms around other nodes",
+            render(expanded) == "5x + sin(x^2 + -1)",
+        )
+    )
+    rational, _ = solve_equation(
+        Equation([Power(Product([2, x]), -1), Power(3, 2)]), variable="x"
+    )
+    tests.append(
+        (
+            "solve_equation reads monomial denominators and constant powers",
+            rational.status == "exact"
+            and isclose(rational.values["x"], 1 / 18),
+        )
+    )
+    return tests
+
+
+def run_builder_tests():
+    tests = []
+    x, y = Symbol("x"), Symbol("y")
+    terms = [Product([i % 7 + 1, Power(x, i % 5)]) for i in range(40)] + [3, 0.5, y, y]
+    builder = ExpressionBuilder()
+    for term in terms:
+        builder.add_term(term)
+    tests.append(
+        (
+            "ExpressionBuilder.add_term builds what sum() builds",
+            fingerprint(builder.build()) == fingerprint(sum(terms)),
+        )
+    )
+    factors = [2, x, Power(x, 2), y, Sum([x, 1]), Sum([x, 1]), 0.25]
+    builder = ExpressionBuilder()
+    for factor in factors:
+        builder.mul_factor(factor)
+    tests.append(
+        (
+            "ExpressionBuilder.mul_factor builds what product() builds",
+            fingerprint(builder.build()) == fingerprint(product(factors))
+            and render(builder.build()) == "0.5(x^3)y((x + 1)^2)",
+        )
+    )
+    tests.append(
+        (
+            "sum() counts repeated terms as a coefficient",
+            render(sum([x, x])) == "2x" and render(sum([y, Product([3, x]), Product([3, x])])) == "y + 6x",
+        )
+    )
+    tests.append(
+        (
+            "sum() and product() round numeric parts once",
+            sum([0.1, 0.2, -0.3]) == 0
+            and sum([0.1, 0.2]) == 0.3
+            and product([0.1, 0.2, 3]) == 0.06
+            and product([0.5, 4]) == 2
+            and type(product([0.5, 4])) is int
+            and product([3, x, 0]) == 0,
+        )
+    )
+    derivative_factor = Derivative(x, [(x, 1)])
+    tests.append(
+        (
+            "product() keeps calculus factors",
+            fingerprint(product([x, derivative_factor]))
+            == fingerprint(Product([x, derivative_factor])),
+        )
+    )
+    overflowed, overflow_context = evaluate(Product([x, 1e200, 1e200]))
+    tests.append(
+        (
+            "sum() and product() overflow to infinity like float arithmetic",
+            product([1e200, 1e200]) == float("inf")
+            and sum([-1e308, -1e308]) == float("-inf")
+            and np.isnan(product([1e200, 1e200, 0.0]))
+            and render(Product([1e200, x]) * 1e200) == "infx"
+            and render(overflowed) == "infx"
+            and overflow_context.solve_status == "exact",
+        )
+    )
+    builder = ExpressionBuilder()
+    for i in range(20000):
+        builder.add_term(Product([i + 1, Power(x, i)]))
+    tests.append(
+        (
+            "ExpressionBuilder builds a 20k-term sum",
+            len(builder.build().terms) == 20000,
+        )
+    )
+    return tests
+
+
+def run_snap_tests():
+    tests = []
+    x, y = Symbol("x"), Symbol("y")
+    tree = Sum([Power(Sum([x, 1]), 2), Product([3, Sum([x, 1])]), y])
+    path = (1, 1)
+    replaced = replace_at(tree, path, 5)
+    tests.append(
+        (
+            "replace_at rebuilds only the path's ancestors",
+            node_at(tree, path) == Sum([x, 1])
+            and node_at(replaced, path) == 5
+            and replaced.terms[0] is tree.terms[0]
+            and replaced.terms[2] is tree.terms[2]
+            and node_at(tree, (7,)) is None,
+        )
+    )
+    tests.append(
+        (
+            "replace_sub_at stays inside the addressed subtree",
+            replace_sub_at(tree, (1,), Sum([x, 1]), y)
+            == Sum([Power(Sum([x, 1]), 2), Product([3, y]), y])
+            and replace_sub_at(tree, (2,), x, y) is None,
+        )
+    )
+
+    context = EvaluatorContext(tree)
+    context.snap(Sum([x, 1]), 4, path=(0, 0))
+    tests.append(
+        (
+            "snap with a path rewrites one occurrence",
+            context.current_tree == Sum([Power(4, 2), Product([3, Sum([x, 1])]), y])
+            and context.snapshots[-1].path == (0, 0),
+        )
+    )
+    context = EvaluatorContext(tree)
+    context.snap(Sum([x, 1]), 4)
+    tests.append(
+        (
+            "snap without a path still replaces every occurrence",
+            context.current_tree == Sum([Power(4, 2), Product([3, 4]), y])
+            and context.snapshots[-1].path is None,
+        )
+    )
+
+    repeated = Sum([Product([2, 3]), Power(Product([2, 3]), 2)])
+    result, context = evaluate(repeated)
+    tests.append(
+        (
+            "evaluation rewrites duplicate subtrees one at a time",
+            result == 42
+            and context.error_count == 0
+            and any(
+                getattr(snapshot, "path", None) is not None
+                for snapshot in context.snapshots
+            ),
+        )
+    )
+    nested = Sum([Sum([5.08, Sum([27, 3])]), Product([2, Sum([x, 1])])])
+    result, context = evaluate(nested, {"x": 2})
+    report = validate_reasoning_steps(context, result)
+    tests.append(
+        (
+            "validation replays path-addressed snapshots",
+            result == 41.08 and report["valid"] and not report["notes"],
+        )
+    )
+
+    # Path-addressed snaps must render exactly like the whole-tree search.
+    _, nested_context = evaluate(Sum([3, Sum([29, 15])]))
+    _, terms_context = evaluate(Sum([Sum([x, 1]), Sum([Sum([x, 2]), 3])]))
+    _, cubic_context = evaluate(Product([Sum([x, 1]), Sum([x, 2]), Sum([x, 3])]))
+    cubic = cubic_context.render()
+    tests.append(
+        (
+            "path-addressed snaps keep the whole-tree traces",
+            nested_context.render()
+            == "## 1\n$$ 3 + 29 + 15 \\\\\n= 3 + 29 + 15 \\\\\n= 44 + 3 $$\n\n\n"
+            "## 2\n$$ 3 + 29 + 15 \\\\\n= 44 + 3 \\\\\n= 47 $$\n"
+            and terms_context.render()
+            == "## 1\n$$ x + 1 + x + 2 + 3 \\\\\n= x + 1 + x + 2 + 3 \\\\\n"
+            "= x + 1 + x + 2 + 3 \\\\\n= 5 + x + 1 + x $$\n\n\n"
+            "## 2\n$$ x + 1 + x + 2 + 3 \\\\\n= 5 + x + 1 + x \\\\\n= 6 + x + x $$\n\n\n"
+            "## 3\n$$ 5 + x + 1 + x \\\\\n= 6 + x + x \\\\\n= 6 + 2x $$\n"
+            and cubic[cubic.index("## 7") :]
+            == "## 7\n$$ x^3 + 5x^2 + 6x + x^2 + 3x + 2x + 6 \\\\\n"
+            "= 6 + x^2 + 5x + x^3 + 5x^2 + 6x \\\\\n= 6 + x^3 + 6x^2 + 11x $$\n"
+            and "## 8" not in cubic,
+        )
+    )
+    return tests
+
+
+def run_index_tests():
+    tests = []
+    x, y = Symbol("x"), Symbol("y")
+    inner = Sum([x, 1])
+    tree = Sum([Power(inner, 2), Product([3, inner]), y])
+    index = SubtreeIndex(tree)
+    tests.append(
+        (
+            "subtree index counts every occurrence",
+            index.occurrences(inner) == 2
+            and index.occurrences(x) == 2
+            and index.occurrences(Sum([y, 1])) == 0
+            and index.nodes == tree.node_count,
+        )
+    )
+    visited = index.visited
+    rewritten = replace_at(tree, (1, 1), y)
+    index.update(rewritten)
+    tests.append(
+        (
+            "subtree index update skips shared subtrees",
+            index.occurrences(inner) == 1
+            and index.occurrences(y) == 2
+            and index.visited - visited < tree.node_count,
+        )
+    )
+    rewritten = replace_sub(rewritten, x, Product([2, y]))
+    index.update(rewritten)
+    fresh = SubtreeIndex(rewritten)
+    tests.append(
+        (
+            "subtree index matches a fresh index after any rewrite",
+            index.counts == fresh.counts and index.nodes == fresh.nodes,
+        )
+    )
+
+    context = EvaluatorContext(tree)
+    targets = [inner, -inner, Product([3, inner]), Sum([y, Power(inner, 2)]), Sum([x, 2]), 3]
+    tests.append(
+        (
+            "context occurrences agree with contains",
+            all(
+                (context.occurrences(target) > 0) == (contains(tree, target) > 0)
+                for target in targets
+            )
+            and context.index_stats()["hits"] > 0
+            and context.index_stats()["misses"] > 0,
+        )
+    )
+
+    _, context = evaluate(Sum([Product([12, 13]), Power(Sum([x, 2]), 2)]), {"x": 3})
+    first = context.render()
+    misses = context.index_stats()["render_misses"]
+    document = context.render_document()
+    stats = context.index_stats()
+    tests.append(
+        (
+            "render reuses containment results across calls",
+            context.render() == first
+            and document["steps"]
+            and stats["render_misses"] == misses
+            and stats["render_hits"] > 0,
+        )
+    )
+    return tests
+
+
+def run_block_tests():
+    tests = []
+    x = Symbol("x")
+    left, right = Product([2, 3]), Product([4, x])
+    context = EvaluatorContext(Sum([left, right]))
+    context.snap(x, 5)
+    no_log = context.rewrites == []
+    context = EvaluatorContext(Sum([left, right]))
+    with context.block([left, Sum([left, 1])]) as block:
+        context.snap(left, 6)
+        tests.append(
+            (
+                "block trees see rewrites made while they are open",
+                no_log
+                and len(context.rewrites) == 1
+                and block.trees == [6, Sum([6, 1])]
+                and context.current_tree == Sum([6, right]),
+            )
+        )
+
+    context = EvaluatorContext(Sum([left, right]))
+    context.focus_stack.append([(1,), 0])
+    with context.block([right, left]) as scoped:
+        context.snap(left, 6, path=(0,))
+        context.snap(x, 5)
+    context.focus_stack.pop()
+    context.snap(Product([4, 5]), 20)
+    tests.append(
+        (
+            "block trees skip rewrites outside their scope or after exit",
+            scoped.trees == [Product([4, 5]), left]
+            and context.current_tree == Sum([6, 20]),
+        )
+    )
+
+    y = Symbol("y")
+    context = EvaluatorContext(Sum([left, right, y]))
+    seen = []
+    with context.block([left, right]) as block:
+        for tree in block:
+            seen.append(tree)
+            if len(seen) == 1:
+                context.snap(x, 5)
+        block[0] = Product([2, y])
+        context.snap(left, 6)
+        kept = block[0]
+        context.snap(y, 7)
+    tests.append(
+        (
+            "block iteration resolves each tree when it is reached",
+            seen == [left, Product([4, 5])]
+            and kept == Product([2, y])
+            and block[0] == Product([2, 7])
+            and len(block) == 2
+            and Product([4, 5]) in block,
+        )
+    )
+
+    depth = 40
+    floor = next(function for function in FUNCTIONS if function.name == "floor")
+    expression = Sum([x, 0.5])
+    for _ in range(depth):
+        expression = Sum([FunctionCall(floor, [expression]), 1.5])
+    result, context = evaluate(expression, {"x": 2, **FUNCTIONS})
+    tests.append(
+        (
+            "nested calls evaluate with one rewrite entry per snap",
+            result == depth + 2.5
+            and context.error_count == 0
+            and context.blocks == []
+            and len(context.rewrites) <= len(context.snapshots),
+        )
+    )
+    return tests
+
+
+def run_trace_tests():
+    tests = []
+    x = Symbol("x")
+    tree = Sum([Product([index + 2, Power(x, index + 1)]) for index in range(150)])
+    context = EvaluatorContext(tree)
+    expected = []
+    for index in range(150):
+        context.snap(Power(x, index + 1), 3 ** (index + 1), path=(index, 1))
+        expected.append(context.current_tree)
+        if index == 99:
+            # A tree set from outside the trace starts a new checkpoint.
+            context.current_tree = Sum(list(context.current_tree.terms))
+    recorded = context.snapshots[1:]
+    tests.append(
+        (
+            "delta snapshots replay the trees snap produced",
+            len(recorded) == len(expected)
+            and all(
+                snapshot.full_tree == tree and render_latex(snapshot.full_tree) == render_latex(tree)
+                for snapshot, tree in zip(reversed(recorded), reversed(expected))
+            )
+            and recorded[100].previous_tree == expected[99],
+        )
+    )
+    memoized = [
+        snapshot for snapshot in context.snapshots[1:] if snapshot._full_tree is not None
+    ]
+    longest = chain = 0
+    for snapshot in context.snapshots[1:]:
+        chain = chain + 1 if snapshot._previous_tree is None else 0
+        longest = max(longest, chain)
+    tests.append(
+        (
+            "delta snapshots keep bounded memos and checkpoints",
+            len(memoized) <= SNAPSHOT_MEMO_SIZE
+            and longest <= SNAPSHOT_CHECKPOINT_INTERVAL
+            and builtins.sum(
+                1 for snapshot in context.snapshots if snapshot._previous_tree is not None
+            )
+            == 3,
+        )
+    )
+
+    expression = Sum(
+        [Product([Sum([index, x]), Power(Sum([x, index % 3]), 2)]) for index in range(12)]
+    )
+    result, context = evaluate(expression, {"x": 2})
+    report = validate_reasoning_steps(context, result)
+    memo_size = evaluator_module.SNAPSHOT_MEMO_SIZE
+    evaluator_module.SNAPSHOT_MEMO_SIZE = 1_000_000
+    try:
+        _, memoized_context = evaluate(expression, {"x": 2})
+    finally:
+        evaluator_module.SNAPSHOT_MEMO_SIZE = memo_size
+    tests.append(
+        (
+            "delta snapshots render and validate like memoized ones",
+            len(context.snapshots) > 2 * SNAPSHOT_MEMO_SIZE
+            and context.render() == memoized_context.render()
+            and context.render_document() == memoized_context.render_document()
+            and report == validate_reasoning_steps(memoized_context, result)
+            and not report["failures"],
+        )
+    )
+
+    calls = []
+    options = EvaluatorOptions(trace_hook=lambda *call: calls.append(call))
+    result, context = evaluate(expression, {"x": 2}, options=options)
+    rewrites = [
+        (snapshot.original, snapshot.portion)
+        for snapshot in context.snapshots[1:]
+        if isinstance(snapshot, Snapshot)
+    ]
+    traced = [(original, simplified) for _, original, simplified, _ in calls]
+    timestamps = [timestamp for *_, timestamp in calls]
+    tests.append(
+        (
+            "trace hook sees every rewrite with its call site",
+            EvaluatorOptions().trace_hook is None
+            and context.render() == memoized_context.render()
+            and all(rewrite in traced for rewrite in rewrites)
+            and timestamps == sorted(timestamps)
+            and all(
+                isinstance(site, CallSite)
+                and site.filename == evaluator_module.__file__
+                and site.function not in ("snap", "replace")
+                for site, *_ in calls
+            ),
+        )
+    )
+
+    snapshot = Snapshot(Sum([x, 1]), 3, Product([2, Sum([x, 1])]), 6)
+    tests.append(
+        (
+            "snapshots built directly keep both trees",
+            snapshot.previous_tree == Product([2, Sum([x, 1])])
+            and snapshot.full_tree == 6
+            and snapshot == 6,
+        )
+    )
+    return tests
+
+
+def run_answer_tests():
+    tests = []
+    x, y = Symbol("x"), Symbol("y")
+    by_name = {function.name: function for function in FUNCTIONS}
+    cases = [
+        (Sum([Product([1234, 5678]), 98765.4321, Power(2, 0.5)]), {}),
+        (Power(Sum([Product([3, x]), 4]), Sum([y, 0.5])), {"x": 2, "y": 1}),
+        (Sum([Power(0, Sum([x, -2])), 7]), {"x": 2}),
+        (FunctionCall(by_name["ln"], [Sum([x, -5])]), {"x": 2}),
+        (Sum([Integral(Power(x, 2), x, 0, y), Derivative(Power(x, 3), [(x, 1)])]), {}),
+        (Product([0.000123456789, 987654.321]), {}),
+    ]
+    same = True
+    silent = True
+    for expression, substitutions in cases:
+        substitutions = {**substitutions, **FUNCTIONS}
+        for options in (EvaluatorOptions(), compact_evaluator_options()):
+            result, context = evaluate(
+                expression, substitutions, error_on_invalid_snap=False, options=options
+            )
+            answer, null_context = evaluate(
+                expression,
+                substitutions,
+                error_on_invalid_snap=False,
+                options=options,
+                explain=False,
+            )
+            same = same and (
+                repr(answer) == repr(result)
+                and null_context.solve_status == context.solve_status
+                and null_context.reason_code == context.reason_code
+                and null_context.is_approximate == context.is_approximate
+            )
+            silent = silent and (
+                isinstance(null_context, NullEvaluatorContext)
+                and len(null_context.snapshots) == 1
+                and null_context.explanation_events == []
+            )
+    tests.append(("explain=False returns the same result and status", same))
+    tests.append(("explain=False records no steps or events", silent))
+
+    context = NullEvaluatorContext(Sum([x, 1]))
+    context.snap(x, 2, "never formatted {snapshot")
+    context.snap("Some text")
+    tests.append(
+        (
+            "null context ignores snaps and wording",
+            context.current_tree == Sum([x, 1])
+            and len(context.snapshots) == 1
+            and wording(context, "addition_carry_suffix", "carry {carry}", carry=1) == "",
+        )
+    )
+    return tests
+
+
+def _pending_wording(context):
+    pending = 0
+    for snapshot in context.snapshots:
+        if snapshot._localizer is None:
+            continue
+        if isinstance(snapshot, TextSnapshot):
+            pending += snapshot._rendered is None
+        elif snapshot._explanation:
+            pending += snapshot._text is None
+    return pending
+
+
+def run_wording_tests():
+    tests = []
+    x, y = Symbol("x"), Symbol("y")
+    by_name = {function.name: function for function in FUNCTIONS}
+    cases = [
+        (Sum([Product([1234, 5678]), 98765.4321]), {}),
+        (Product([0.000123456789, 987654.321]), {}),
+        (Sum([Power(-1, 7), Power(2, 200), Product([3, x])]), {"x": 2}),
+        (FunctionCall(by_name["ln"], [Sum([x, -5])]), {"x": 2}),
+        (Sum([Integral(Power(x, 2), x, 0, y), Derivative(Power(x, 3), [(x, 1)])]), {"y": 2}),
+    ]
+    deferred = True
+    same = True
+    for expression, substitutions in cases:
+        substitutions = {**substitutions, **FUNCTIONS}
+        for locale in ("en", "es"):
+            for style in ("verbose", "concise"):
+                options = [
+                    EvaluatorOptions(
+                        wording_style=style,
+                        overflow_policy="infinity",
+                        explanation_profile=build_explanation_profile(
+                            locale=locale, collect_diagnostics=collect
+                        ),
+                    )
+                    for collect in (False, True)
+                ]
+                _, lazy = evaluate(
+                    expression, substitutions, error_on_invalid_snap=False, options=options[0]
+                )
+                _, eager = evaluate(
+                    expression, substitutions, error_on_invalid_snap=False, options=options[1]
+                )
+                deferred = deferred and (
+                    lazy.defer_wording
+                    and not eager.defer_wording
+                    and _pending_wording(lazy) > 0
+                    and _pending_wording(eager) == 0
+                )
+                same = same and lazy.render() == eager.render()
+                deferred = deferred and _pending_wording(lazy) == 0
+    tests.append(("wording is formatted only when the trace is rendered", deferred))
+    tests.append(("lazy wording renders the same text as eager wording", same))
+
+    context = EvaluatorContext(Sum([x, 1]))
+    rendered = []
+    original = evaluator_module.render_latex
+
+    def counting_render_latex(expression):
+        rendered.append(expression)
+        return original(expression)
+
+    evaluator_module.render_latex = counting_render_latex
+    try:
+        message = wording(
+            context,
+            "overflow_symbolic",
+            "Keep ${expression}$ symbolic.",
+            expression=evaluator_module._Latex(Power(x, 2)),
+        )
+        context.snap(x, 2, "Replace ${original}$ by ${simplified}$.")
+        before = len(rendered)
+        text = str(message)
+        explanation = context.snapshots[-1].explanation
+    finally:
+        evaluator_module.render_latex = original
+    tests.append(
+        (
+            "trees in wording and explanations are rendered on demand",
+            isinstance(message, LazyMessage)
+            and before == 0
+            and text == "Keep $x^2$ symbolic."
+            and explanation == "Replace $x$ by $2$."
+            and len(rendered) == 3,
+        )
+    )
+    return tests
+
+
+def run_profile_render_tests():
+    tests = []
+    x, y = Symbol("x"), Symbol("y")
+    by_name = {function.name: function for function in FUNCTIONS}
+    cases = [
+        (Sum([Product([1234, 5678]), 98765.4321, Power(2, 300)]), {}),
+        (Power(Sum([Product([3, x]), 4]), Sum([y, 0.5])), {"x": 2, "y": 1}),
+        (FunctionCall(by_name["ln"], [Sum([x, -5])]), {"x": 2}),
+        (Sum([Integral(Power(x, 2), x, 0, y), Derivative(Power(x, 3), [(x, 1)])]), {"y": 2}),
+    ]
+    profiles = [
+        build_explanation_profile(locale=locale, style_type=style_type)
+        for locale in supported_locales()
+        for style_type in supported_style_types()
+    ]
+    profiles.append(
+        build_explanation_profile(
+            locale="es",
+            message_overrides={"render.newline": "\n\n"},
+            exact_text_overrides={"Approximate $2^{300}$.": "~"},
+            collect_diagnostics=True,
+        )
+    )
+    same = True
+    for expression, substitutions in cases:
+        substitutions = {**substitutions, **FUNCTIONS}
+        for make_options in (EvaluatorOptions, compact_evaluator_options):
+            _, context = evaluate(
+                expression, substitutions, error_on_invalid_snap=False, options=make_options()
+            )
+            for profile in profiles:
+                options = make_options()
+                options.explanation_profile = profile
+                _, expected = evaluate(
+                    expression, substitutions, error_on_invalid_snap=False, options=options
+                )
+                same = same and (
+                    context.render(profile=profile) == expected.render()
+                    and context.render_document(profile=profile) == expected.render_document()
+                )
+    tests.append(("render(profile=...) matches evaluating under the profile", same))
+
+    spanish = build_explanation_profile(
+        locale="es", exact_text_overrides={"Other text": "Same text"}
+    )
+    contexts = [
+        EvaluatorContext(Sum([x, 1]), options=EvaluatorOptions(explanation_profile=profile))
+        for profile in (None, spanish)
+    ]
+    for context in contexts:
+        context.snap("Same text")
+        context.snap("Other text")
+    own = contexts[0].render()
+    tests.append(
+        (
+            "profile render drops text that repeats once localized",
+            contexts[0].render(profile=spanish) == contexts[1].render()
+            and "Other text" not in contexts[1].render()
+            and contexts[0].render() == own
+            and "Other text" in own,
+        )
+    )
+    return tests
+
+
+def run_result_cache_tests():
+    tests = []
+    x, y = Symbol("x"), Symbol("y")
+    expression = Sum([Product([1234, 5678]), Power(x, 2), y])
+    cache = ResultCache()
+    first = cache.evaluate(expression, {"x": 3, "y": 0.5, **FUNCTIONS}, error_on_invalid_snap=False)
+    reordered = {**dict(reversed(FUNCTIONS.items())), "x": 3, "y": 0.5}
+    second = cache.evaluate(expression, reordered, error_on_invalid_snap=False)
+    result, context = evaluate(expression, reordered, error_on_invalid_snap=False)
+    second.document["steps"].clear()
+    third = cache.evaluate(expression, reordered, error_on_invalid_snap=False)
+    tests.append(
+        (
+            "cached evaluate returns the evaluation's result and document",
+            not first.cached
+            and second.cached
+            and third.cached
+            and repr(second.result) == repr(result)
+            and third.document == context.render_document()
+            and second.solve_status == context.solve_status
+            and second.coverage_tags == tuple(sorted(context.coverage_tags))
+            and cache.stats()["hits"] == 2
+            and cache.stats()["misses"] == 1,
+        )
+    )
+
+    spanish = EvaluatorOptions(explanation_profile=build_explanation_profile(locale="es"))
+    keyed = [
+        cache.evaluate(expression, {"y": 0.5, "x": 3}, error_on_invalid_snap=False),
+        cache.evaluate(expression, {"x": 3.0, "y": 0.5}, error_on_invalid_snap=False),
+        cache.evaluate(expression, {"x": 3, "y": 0.5}, error_on_invalid_snap=False),
+        cache.evaluate(expression, {"x": 3, "y": 0.5}, False, spanish),
+        cache.evaluate(expression, {"x": 3, "y": 0.5}, False, compact_evaluator_options()),
+    ]
+    calls = []
+    hooked = EvaluatorOptions(trace_hook=lambda *args: calls.append(args))
+    for _ in range(2):
+        cache.evaluate(expression, {"x": 3, "y": 0.5}, False, hooked)
+    tests.append(
+        (
+            "values, substitutions, options and profiles are keyed apart",
+            not any(result.cached for result in keyed)
+            and len(cache) == 6
+            and len(calls) > 0
+            and len(calls) % 2 == 0
+            and cache.stats()["misses"] == 6,
+        )
+    )
+
+    equation_ = Equation([Sum([Product([2, x]), 3]), 7])
+    solved = [
+        cache.solve_equation(equation_, "x"),
+        cache.solve_equation(equation_, x),
+        cache.solve_equation(equation_, x, EquationWordingOptions()),
+    ]
+    solved[1].result.values.clear()
+    solution, equation_context = solve_equation(equation_, x, EquationWordingOptions())
+    again = cache.solve_equation(equation_, x)
+    tests.append(
+        (
+            "cached solve_equation returns the solution and document",
+            [result.cached for result in solved] == [False, True, False]
+            and again.result.values == {"x": 2}
+            and solved[2].document == equation_context.render_document()
+            and cache.invalidate(equation_) == 2
+            and not cache.solve_equation(equation_, x).cached,
+        )
+    )
+
+    small = ResultCache(max_entries=2)
+    for value in (1, 2, 1, 3):
+        small.evaluate(Sum([x, 10]), {"x": value})
+    survivors = [small.evaluate(Sum([x, 10]), {"x": value}).cached for value in (1, 3, 2)]
+    sized = ResultCache(max_entries=None, max_bytes=1)
+    sized.evaluate(Sum([x, 10]), {"x": 1})
+    bounded = ResultCache(max_entries=None)
+    bounded.evaluate(Sum([x, 10]), {"x": 1})
+    bounded.max_bytes = bounded.bytes * 2
+    for value in (2, 3, 4):
+        bounded.evaluate(Sum([x, 10]), {"x": value})
+    tests.append(
+        (
+            "entries are evicted least recently used within both bounds",
+            survivors == [True, True, False]
+            and small.evictions == 2
+            and len(sized) == 0
+            and 0 < bounded.bytes <= bounded.max_bytes
+            and bounded.evictions == 2
+            and bounded.invalidate() == 2
+            and bounded.bytes == 0,
+        )
+    )
+    return tests
+
+
+def run_prepared_tests():
+    tests = []
+    x, y, t = Symbol("x"), Symbol("y"), Symbol("t")
+    expression = Sum(
+        [
+            Product([x, Derivative(Product([Power(t, 3), Sum([t, 4])]), [(t, 1)])]),
+            Product([y, Integral(Product([2, t]), t, 0, 1)]),
+            Derivative(Product([Power(t, 2), y]), [(t, 1)]),
+        ]
+    )
+
+    def outcome(result, context):
+        return (
+            repr(result),
+            context.solve_status,
+            context.reason_code,
+            sorted(context.coverage_tags),
+            context.render(),
+            context.render_document(),
+            [repr(event) for event in context.explanation_events],
+        )
+
+    prepared = prepare(expression)
+    substitution_sets = [{"x": 2, "y": 3}, {"x": 5, "y": 1.5, **FUNCTIONS}, {"x": 2, "y": 3}]
+    same = all(
+        outcome(*prepared.evaluate(substitutions))
+        == outcome(*evaluate(expression, substitutions))
+        for substitutions in substitution_sets
+    )
+    quiet_result, quiet_context = prepared.evaluate({"x": 4, "y": 2}, explain=False)
+    plain_result, plain_context = evaluate(expression, {"x": 4, "y": 2}, explain=False)
+    tests.append(
+        (
+            "prepared evaluation matches evaluate across substitution sets",
+            same
+            and repr(quiet_result) == repr(plain_result)
+            and quiet_context.solve_status == plain_context.solve_status
+            and prepared.hits > 0
+            and prepared.stats()["replays"] < prepared.misses + 1,
+        )
+    )
+
+    bound = Sum([x, Integral(Product([3, Power(t, 2)]), t, 0, 2)])
+    prepared_bound = prepare(bound, compact_evaluator_options())
+    keyed = all(
+        outcome(*prepared_bound.evaluate(substitutions))
+        == outcome(*evaluate(bound, substitutions, options=compact_evaluator_options()))
+        for substitutions in ({"x": 1}, {"x": 1, "t": 5}, {"x": 1, "t": 5.0}, {"x": 2})
+    )
+    tests.append(
+        (
+            "replays are keyed by the values of the subtree's symbols",
+            keyed and len(prepared_bound.replays) == 3,
+        )
+    )
+
+    f = MathFunction("f", 1)
+    calls = Sum([x, FunctionCall(f, [Sum([2, 3])]), FunctionCall(f, [Sum([4, 5])])])
+    prepared_calls = prepare(calls)
+
+    def triple(arguments, subscripts, superscripts):
+        return 3 * arguments[0]
+
+    def double(arguments, subscripts, superscripts):
+        # Evaluates the same prepared expression with another function.
+        prepared_calls.evaluate({"x": 1, f: triple})
+        return 2 * arguments[0]
+
+    reentrant, _ = prepared_calls.evaluate({"x": 1, f: double})
+    tests.append(
+        (
+            "a nested prepared evaluation does not change the outer replay keys",
+            reentrant == 29 and prepared_calls.evaluate({"x": 1, f: triple})[0] == 43,
+        )
+    )
+
+    shared_options = EvaluatorOptions(share_common_subexpressions=True)
+    prepared_shared = prepare(expression, shared_options)
+    tests.append(
+        (
+            "replays are off when subexpressions are shared",
+            not prepared_shared.symbol_names
+            and outcome(*prepared_shared.evaluate({"x": 2, "y": 3}))
+            == outcome(*evaluate(expression, {"x": 2, "y": 3}, options=shared_options)),
+        )
+    )
+    return tests
+
+
+def run_numeric_tests():
+    tests = []
+    x, y, t = Symbol("x"), Symbol("y"), Symbol("t")
+    by_name = {function.name: function for function in FUNCTIONS}
+    expression = Sum(
+        [
+            Product([3, Power(x, 2), y]),
+            FunctionCall(by_name["sin"], [Product([2, x])]),
+            Power(Sum([y, -1]), -1),
+            Derivative(Product([Power(x, 3), FunctionCall(by_name["exp"], [x])]), [(x, 1)]),
+            Integral(Product([y, t]), t, 0, x),
+            FunctionCall(by_name["erf"], [x]),
+        ]
+    )
+    xs = np.array([-1.5, -0.25, 0.0, 0.5, 2.0])
+    ys = np.array([0.5, 2.0, 3.0, -1.0, 4.0])
+    numeric = evaluate_numeric(expression, {"x": xs, "y": ys})
+    matches = numeric.errors.shape == (5,) and not numeric.errors.any()
+    for index in range(5):
+        result, _ = evaluate(
+            expression,
+            {"x": float(xs[index]), "y": float(ys[index]), **FUNCTIONS},
+            error_on_invalid_snap=False,
+            options=EvaluatorOptions(max_precision=15),
+            explain=False,
+        )
+        matches = matches and isclose(result, numeric.values[index], rel_tol=1e-9, abs_tol=1e-9)
+    tests.append(("numeric values match scalar evaluate, calculus included", bool(matches)))
+
+    cases = Sum(
+        [
+            FunctionCall(by_name["ln"], [x]),
+            Power(x, -1),
+            FunctionCall(by_name["exp"], [Product([x, 1000])]),
+        ]
+    )
+    coded = evaluate_numeric(cases, {"x": np.array([-1.0, 0.0, 1.0, 2.0, np.nan])})
+    tests.append(
+        (
+            "numeric domain errors are NaN with per-element codes",
+            coded.errors.tolist()
+            == [
+                NUMERIC_DOMAIN_ERROR,
+                NUMERIC_DOMAIN_ERROR,
+                NUMERIC_OVERFLOW,
+                NUMERIC_OVERFLOW,
+                NUMERIC_INVALID_INPUT,
+            ]
+            and bool(np.isnan(coded.values).all())
+            and evaluate_numeric(Power(x, -1), {"x": np.array([0.0, 2.0])}).errors.tolist()
+            == [NUMERIC_DIVISION_BY_ZERO, NUMERIC_OK]
+            and evaluate_numeric(Sum([x, y]), {"x": xs}).error_counts() == {"unresolved": 5},
+        )
+    )
+
+    grid = evaluate_numeric(Power(x, y), {"x": np.array([[0.0], [2.0]]), "y": np.array([0.0, 3.0])})
+    one = evaluate_numeric(
+        Power(x, y),
+        {"x": np.array([[0.0], [2.0]]), "y": np.array([0.0, 3.0])},
+        EvaluatorOptions(zero_power_zero_policy="one"),
+    )
+    tests.append(
+        (
+            "numeric substitutions broadcast and follow the 0^0 policy",
+            grid.values.shape == (2, 2)
+            and grid.errors.tolist() == [[NUMERIC_DOMAIN_ERROR, 0], [0, 0]]
+            and one.values.tolist() == [[1.0, 0.0], [1.0, 8.0]],
+        )
+    )
+
+    imaginary = evaluate_numeric(Sum([x, 1j]), {"x": xs})
+    squared = evaluate_numeric(Product([x, Power(1j, 2)]), {"x": xs})
+    tests.append(
+        (
+            "complex literals over real inputs keep only real results",
+            (imaginary.errors == NUMERIC_DOMAIN_ERROR).all()
+            and not squared.errors.any()
+            and squared.values.dtype == np.float64
+            and np.allclose(squared.values, -xs),
+        )
+    )
+    return tests
+
+
+def run_budget_tests():
+    tests = []
+    x = Symbol("x")
+    expression = Sum(
+        [
+            Power(Sum([x, 1, Product([2, x])]), 3),
+            Product([98765.4321, 1234.5678, 31.5]),
+            Derivative(Product([Power(x, 3), Sum([x, 4])]), [(x, 1)]),
+        ]
+    )
+    substitutions = {"x": 3}
+
+    def run(explain=True, **budgets):
+        return evaluate(
+            expression,
+            substitutions,
+            error_on_invalid_snap=False,
+            options=EvaluatorOptions(**budgets),
+            explain=explain,
+        )
+
+    result, context = run(max_snapshots=4)
+    tests.append(
+        (
+            "snapshot budget stops with a partial result",
+            context.solve_status == "partial"
+            and context.reason_code == "snapshot_budget_exceeded"
+            and len([step for step in context.snapshots if isinstance(step, Snapshot)])
+            == 5
+            and "budget" in context.render()
+            and isinstance(result, Sum),
+        )
+    )
+
+    statuses = set()
+    for explain in (True, False):
+        _, small = run(explain, max_tree_nodes=5)
+        _, late = run(explain, deadline_seconds=0)
+        statuses.add((small.solve_status, small.reason_code, late.solve_status, late.reason_code))
+    tests.append(
+        (
+            "tree node and deadline budgets report their own reason codes",
+            statuses
+            == {("partial", "tree_node_budget_exceeded", "partial", "deadline_exceeded")},
+        )
+    )
+
+    mismatches = []
+    for budgets in [{"max_snapshots": count} for count in range(12)] + [
+        {"max_tree_nodes": count} for count in (8, 12, 20)
+    ]:
+        outcomes = []
+        for explain in (True, False):
+            result, context = run(explain, **budgets)
+            outcomes.append((repr(result), context.solve_status, context.reason_code))
+        if outcomes[0] != outcomes[1]:
+            mismatches.append((budgets, outcomes))
+    tests.append(
+        (
+            "budgets stop explain=False at the same step with the same result",
+            not mismatches,
+        )
+    )
+
+    cache = ResultCache()
+    cache.evaluate(expression, substitutions, False, EvaluatorOptions(deadline_seconds=0))
+    generous = run(max_snapshots=10_000, max_tree_nodes=10_000, deadline_seconds=60)
+    unbounded = run()
+    tests.append(
+        (
+            "generous budgets change nothing and deadline results are not cached",
+            repr(generous[0]) == repr(unbounded[0])
+            and generous[1].render() == unbounded[1].render()
+            and generous[1].solve_status == unbounded[1].solve_status
+            and len(cache) == 0,
+        )
+    )
+    return tests
+
+
+def run_distribution_tests():
+    from .polynomial import to_polynomial
+
+    tests = []
+    x, y = Symbol("x"), Symbol("y")
+    binomials = Product([Sum([x, index + 1]) for index in range(5)])
+    expected = to_polynomial(binomials)
+    first_result, first_context = evaluate(binomials, {})
+    pairwise_result, pairwise_context = evaluate(
+        binomials, {}, options=EvaluatorOptions(product_distribution="pairwise")
+    )
+    tests.append(
+        (
+            "pairwise distribution matches and keeps the trace short",
+            to_polynomial(first_result) == expected
+            and to_polynomial(pairwise_result) == expected
+            and len(pairwise_context.snapshots) * 3 < len(first_context.snapshots),
+        )
+    )
+
+    _, pair_context = evaluate(
+        Product([Sum([x, 1]), Sum([x, 2])]),
+        {},
+        options=EvaluatorOptions(product_distribution="pairwise"),
+    )
+    pair_lines = [line.strip(" $\\") for line in pair_context.render().splitlines()]
+    tests.append(
+        (
+            "pairwise distribution of the last pair yields the sum without brackets",
+            "= x^2 + 2x + x + 2" in pair_lines
+            and not any(
+                line.startswith("= (") and line.endswith(")")
+                and line.count("(") == 1
+                for line in pair_lines
+            ),
+        )
+    )
+
+    mixed = Product([2, Sum([x, 1]), Sum([y, 2, x]), Sum([x, 3])])
+    compact_result, compact_context = evaluate(
+        mixed,
+        {},
+        options=EvaluatorOptions(product_distribution="pairwise", max_distribution_nodes=20),
+    )
+    _, substituted_context = evaluate(
+        mixed, {"x": 2, "y": 5}, options=EvaluatorOptions(max_distribution_nodes=5)
+    )
+    tests.append(
+        (
+            "distributions over the node ceiling are expanded in one compact step",
+            to_polynomial(compact_result) == to_polynomial(mixed)
+            and "product_distribution_compact" in compact_context.coverage_tags
+            and "collect like terms in one step" in compact_context.render()
+            and "product_distribution_compact" not in substituted_context.coverage_tags,
+        )
+    )
+
+    calls = Product(
+        [
+            Sum([FunctionCall(MathFunction("sin", 1), [x]), 1]),
+            Sum([FunctionCall(MathFunction("cos", 1), [x]), 2]),
+        ]
+    )
+    capped, capped_context = evaluate(
+        calls,
+        {},
+        options=EvaluatorOptions(product_distribution="pairwise", max_distribution_nodes=3),
+    )
+    tests.append(
+        (
+            "non-polynomial products are distributed past the ceiling",
+            isinstance(capped, Sum)
+            and len(capped.terms) == 4
+            and "product_distribution_compact" not in capped_context.coverage_tags,
+        )
+    )
+    return tests
+
+
+if __name__ == "__main__":
+    total, failures = run_evaluate_tests()
+    option_results = run_options_tests()
+    calculus_quality_results = run_calculus_quality_tests()
+    calculus_rule_results = run_calculus_rule_coverage_tests()
+    explanation_quality_results = run_explanation_quality_tests()
+    fuzz_results = run_procedural_fuzz_tests()
+    profile_results = run_procedural_profile_tests()
+    solvability_mode_results = run_procedural_solvability_mode_tests()
+    equation_solver_results = run_equation_solver_tests()
+    equation_procedural_results = run_equation_procedural_tests()
+    structure_results = run_expression_structure_tests()
+    traversal_results = run_traversal_tests()
+    dag_results = run_dag_tests()
+    codec_results = run_codec_tests()
+    parser_results = run_parser_tests()
+    polynomial_results = run_polynomial_tests()
+    builder_results = run_builder_tests()
+    snap_results = run_snap_tests()
+    index_results = run_index_tests()
+    block_results = run_block_tests()
+    trace_results = run_trace_tests()
+    answer_results = run_answer_tests()
+    wording_results = run_wording_tests()
+    profile_render_results = run_profile_render_tests()
+    result_cache_results = run_result_cache_tests()
+    prepared_results = run_prepared_tests()
+    numeric_results = run_numeric_tests()
+    budget_results = run_budget_tests()
+    distribution_results = run_distribution_tests()
+
+    print("Expressionizer test suite")
+    print("=" * 26)
+    print(f"Core evaluate tests: {total - len(failures)}/{total} passed")
+
+    if failures:
+        print("\nFailures:")
+        for i, name, expr_latex, got, expected in failures:
+            print(f"- [{i}] {name}")
+            print(f"  expr: {expr_latex}")
+            print(f"  got: {got}")
+            print(f"  expected: {expected}")
+    else:
+        print("No core failures.")
+
+    passed_options = sum(1 for _, ok in option_results if ok)
+    print(
+        f"Option policy tests: {passed_options}/{len(option_results)} passed"
+    )
+    for name, ok in option_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_calculus = sum(1 for _, ok in calculus_quality_results if ok)
+    print(
+        f"Calculus quality tests: {passed_calculus}/{len(calculus_quality_results)} passed"
+    )
+    for name, ok in calculus_quality_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_calculus_rules = sum(1 for _, ok in calculus_rule_results if ok)
+    print(
+        f"Calculus rule coverage tests: {passed_calculus_rules}/{len(calculus_rule_results)} passed"
+    )
+    for name, ok in calculus_rule_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_explanation = sum(1 for _, ok in explanation_quality_results if ok)
+    print(
+        f"Explanation quality tests: {passed_explanation}/{len(explanation_quality_results)} passed"
+    )
+    for name, ok in explanation_quality_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_fuzz = sum(1 for _, ok in fuzz_results if ok)
+    print(f"Procedural fuzz tests: {passed_fuzz}/{len(fuzz_results)} passed")
+    for name, ok in fuzz_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_profiles = sum(1 for _, ok in profile_results if ok)
+    print(f"Procedural profile tests: {passed_profiles}/{len(profile_results)} passed")
+    for name, ok in profile_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_solvability = sum(1 for _, ok in solvability_mode_results if ok)
+    print(
+        "Procedural solvability-mode tests: "
+        + f"{passed_solvability}/{len(solvability_mode_results)} passed"
+    )
+    for name, ok in solvability_mode_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_equation_solver = sum(1 for _, ok in equation_solver_results if ok)
+    print(
+        f"Equation solver tests: {passed_equation_solver}/{len(equation_solver_results)} passed"
+    )
+    for name, ok in equation_solver_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_equation_procedural = sum(1 for _, ok in equation_procedural_results if ok)
+    print(
+        "Equation procedural tests: "
+        + f"{passed_equation_procedural}/{len(equation_procedural_results)} passed"
+    )
+    for name, ok in equation_procedural_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_structure = sum(1 for _, ok in structure_results if ok)
+    print(
+        f"Expression structure tests: {passed_structure}/{len(structure_results)} passed"
+    )
+    for name, ok in structure_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_traversal = sum(1 for _, ok in traversal_results if ok)
+    print(f"Traversal tests: {passed_traversal}/{len(traversal_results)} passed")
+    for name, ok in traversal_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_dag = sum(1 for _, ok in dag_results if ok)
+    print(f"DAG tests: {passed_dag}/{len(dag_results)} passed")
+    for name, ok in dag_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_codec = sum(1 for _, ok in codec_results if ok)
+    print(f"Codec tests: {passed_codec}/{len(codec_results)} passed")
+    for name, ok in codec_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_parser = sum(1 for _, ok in parser_results if ok)
+    print(f"Parser tests: {passed_parser}/{len(parser_results)} passed")
+    for name, ok in parser_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_polynomial = sum(1 for _, ok in polynomial_results if ok)
+    print(f"Polynomial tests: {passed_polynomial}/{len(polynomial_results)} passed")
+    for name, ok in polynomial_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_builder = sum(1 for _, ok in builder_results if ok)
+    print(f"Builder tests: {passed_builder}/{len(builder_results)} passed")
+    for name, ok in builder_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_snap = sum(1 for _, ok in snap_results if ok)
+    print(f"Snap tests: {passed_snap}/{len(snap_results)} passed")
+    for name, ok in snap_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_index = sum(1 for _, ok in index_results if ok)
+    print(f"Index tests: {passed_index}/{len(index_results)} passed")
+    for name, ok in index_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_block = sum(1 for _, ok in block_results if ok)
+    print(f"Block tests: {passed_block}/{len(block_results)} passed")
+    for name, ok in block_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_trace = sum(1 for _, ok in trace_results if ok)
+    print(f"Trace tests: {passed_trace}/{len(trace_results)} passed")
+    for name, ok in trace_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_answer = sum(1 for _, ok in answer_results if ok)
+    print(f"Answer tests: {passed_answer}/{len(answer_results)} passed")
+    for name, ok in answer_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_wording = sum(1 for _, ok in wording_results if ok)
+    print(f"Wording tests: {passed_wording}/{len(wording_results)} passed")
+    for name, ok in wording_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_profile_render = sum(1 for _, ok in profile_render_results if ok)
+    print(f"Profile render tests: {passed_profile_render}/{len(profile_render_results)} passed")
+    for name, ok in profile_render_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_result_cache = sum(1 for _, ok in result_cache_results if ok)
+    print(f"Result cache tests: {passed_result_cache}/{len(result_cache_results)} passed")
+    for name, ok in result_cache_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_prepared = sum(1 for _, ok in prepared_results if ok)
+    print(f"Prepared tests: {passed_prepared}/{len(prepared_results)} passed")
+    for name, ok in prepared_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_numeric = sum(1 for _, ok in numeric_results if ok)
+    print(f"Numeric tests: {passed_numeric}/{len(numeric_results)} passed")
+    for name, ok in numeric_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_budget = sum(1 for _, ok in budget_results if ok)
+    print(f"Budget tests: {passed_budget}/{len(budget_results)} passed")
+    for name, ok in budget_results:
+        print(f"- {name}: {'PASS' if ok else 'FAIL'}")
+
+    passed_distribution = sum(1 for _, ok in distribution_results if ok)
+    print(f"Distribution tests: {passed_distribution}/{len(distribution_results)} passed")
+    for name, ok in distribution_results:
         print(f"- {name}: {'PASS' if ok else 'FAIL'}")
 
     if (
@@ -1180,5 +2996,24 @@ if __name__ == "__main__":
         or passed_solvability != len(solvability_mode_results)
         or passed_equation_solver != len(equation_solver_results)
         or passed_equation_procedural != len(equation_procedural_results)
+        or passed_structure != len(structure_results)
+        or passed_traversal != len(traversal_results)
+        or passed_dag != len(dag_results)
+        or passed_codec != len(codec_results)
+        or passed_parser != len(parser_results)
+        or passed_polynomial != len(polynomial_results)
+        or passed_builder != len(builder_results)
+        or passed_snap != len(snap_results)
+        or passed_index != len(index_results)
+        or passed_block != len(block_results)
+        or passed_trace != len(trace_results)
+        or passed_answer != len(answer_results)
+        or passed_wording != len(wording_results)
+        or passed_profile_render != len(profile_render_results)
+        or passed_result_cache != len(result_cache_results)
+        or passed_prepared != len(prepared_results)
+        or passed_numeric != len(numeric_results)
+        or passed_budget != len(budget_results)
+        or passed_distribution != len(distribution_results)
     ):
         raise SystemExit(1)
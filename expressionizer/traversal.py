@@ -0,0 +1,253 @@
+"""Explicit-stack traversal and rewriting of expression trees.
+
+Every walker here keeps its own stack instead of recursing, so trees far deeper
+than Python's recursion limit can be visited, folded and rebuilt. Recursive
+algorithms that are easier to read top-down (the evaluator and the renderers)
+are written as generators and driven by ``trampoline``.
+"""
+
+from typing import Any, Callable, Iterator, Optional
+
+from .expression import Numerical, _StructuralNode
+
+
+class _Marker:
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+# Returned by an ``enter`` callback of ``fold``/``rewrite`` to continue into the
+# node's children instead of replacing the node outright.
+DESCEND = _Marker("DESCEND")
+# Returned by ``visit``'s ``enter`` callback to skip a subtree, or by
+# ``rewrite``'s ``child_scope`` callback to keep a child unchanged.
+SKIP = _Marker("SKIP")
+_PENDING = _Marker("_PENDING")
+
+
+def children(node: Any) -> tuple:
+    """Direct subexpressions of ``node`` in rendering order; atoms have none."""
+    if isinstance(node, _StructuralNode):
+        return node._child_nodes()
+    return ()
+
+
+def node_at(expression: Numerical, path: tuple[int, ...]) -> Any:
+    """The node reached from ``expression`` by following child indices in
+    ``path``, or ``None`` when the path does not exist in this tree."""
+    node = expression
+    for index in path:
+        kids = children(node)
+        if index >= len(kids):
+            return None
+        node = kids[index]
+    return node
+
+
+def replace_at(
+    expression: Numerical, path: tuple[int, ...], replacement: Any
+) -> Any:
+    """Rebuild only the ancestors of the node at ``path`` around ``replacement``.
+
+    Everything off the path is shared with ``expression``, so the cost is
+    proportional to the depth of the path and the fan-out along it.
+    """
+    ancestors = []
+    node = expression
+    for index in path:
+        ancestors.append((node, index))
+        node = children(node)[index]
+    if node is replacement:
+        return expression
+    for parent, index in reversed(ancestors):
+        kids = list(children(parent))
+        kids[index] = replacement
+        replacement = parent._with_children(kids)
+    return replacement
+
+
+def iter_preorder(expression: Numerical) -> Iterator[Numerical]:
+    """Yield every node, parents before children, left to right."""
+    stack = [expression]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(children(node)))
+
+
+def iter_postorder(expression: Numerical) -> Iterator[Numerical]:
+    """Yield every node, children before parents, left to right."""
+    stack = [(expression, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            yield node
+            continue
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(children(node)))
+
+
+def visit(
+    expression: Numerical,
+    enter: Optional[Callable[[Any], Any]] = None,
+    leave: Optional[Callable[[Any], Any]] = None,
+) -> None:
+    """Call ``enter`` before and ``leave`` after each node's children.
+
+    When ``enter`` returns ``SKIP`` the node's children are not visited and
+    ``leave`` is not called for it.
+    """
+    stack = [(expression, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            leave(node)
+            continue
+        if enter is not None and enter(node) is SKIP:
+            continue
+        if leave is not None:
+            stack.append((node, True))
+        stack.extend((child, False) for child in reversed(children(node)))
+
+
+def fold(
+    expression: Numerical,
+    combine: Callable[[Any, list], Any],
+    enter: Optional[Callable[[Any], Any]] = None,
+) -> Any:
+    """Reduce a tree bottom-up.
+
+    ``combine(node, values)`` receives the results for the node's children (an
+    empty list for leaves). ``enter(node)`` may short-circuit a subtree by
+    returning its result directly; returning ``DESCEND`` folds it normally.
+    """
+    stack: list[tuple[Any, tuple, list]] = []
+    result = _fold_enter(expression, combine, enter, stack)
+    while stack:
+        node, kids, values = stack[-1]
+        if result is not _PENDING:
+            values.append(result)
+        if len(values) < len(kids):
+            result = _fold_enter(kids[len(values)], combine, enter, stack)
+            continue
+        stack.pop()
+        result = combine(node, values)
+    return result
+
+
+def _fold_enter(node, combine, enter, stack):
+    if enter is not None:
+        result = enter(node)
+        if result is not DESCEND:
+            return result
+    kids = children(node)
+    if kids:
+        stack.append((node, kids, []))
+        return _PENDING
+    return combine(node, [])
+
+
+def rewrite(
+    expression: Numerical,
+    enter: Optional[Callable[[Any, Any], Any]] = None,
+    leave: Optional[Callable[[Any, Any, Any], Any]] = None,
+    scope: Any = None,
+    child_scope: Optional[Callable[[Any, int, Any], Any]] = None,
+) -> Any:
+    """Rebuild a tree bottom-up, sharing every subtree that did not change.
+
+    * ``enter(node, scope)`` returns a replacement for the whole subtree, or
+      ``DESCEND`` to rewrite its children first.
+    * ``child_scope(node, index, scope)`` gives the scope for the child at
+      ``index`` (in ``children`` order), or ``SKIP`` to keep that child as is.
+      Without it every child inherits its parent's scope.
+    * ``leave(original, rebuilt, scope)`` returns the node's result. ``rebuilt``
+      is ``original`` itself when no child changed, otherwise a node of the
+      same type built from the new children.
+    """
+    stack: list[tuple[Any, Any, tuple, list]] = []
+    result = _rewrite_enter(expression, scope, enter, leave, stack)
+    while stack:
+        node, node_scope, kids, rebuilt = stack[-1]
+        if result is not _PENDING:
+            rebuilt.append(result)
+        result = _PENDING
+        while len(rebuilt) < len(kids):
+            index = len(rebuilt)
+            inner_scope = (
+                node_scope
+                if child_scope is None
+                else child_scope(node, index, node_scope)
+            )
+            if inner_scope is SKIP:
+                rebuilt.append(kids[index])
+                continue
+            result = _rewrite_enter(kids[index], inner_scope, enter, leave, stack)
+            break
+        else:
+            stack.pop()
+            if all(new is old for new, old in zip(rebuilt, kids)):
+                new_node = node
+            else:
+                new_node = node._with_children(rebuilt)
+            result = new_node if leave is None else leave(node, new_node, node_scope)
+    return result
+
+
+def _rewrite_enter(node, scope, enter, leave, stack):
+    if enter is not None:
+        result = enter(node, scope)
+        if result is not DESCEND:
+            return result
+    kids = children(node)
+    if kids:
+        stack.append((node, scope, kids, []))
+        return _PENDING
+    return node if leave is None else leave(node, node, scope)
+
+
+def trampoline(step: Callable[..., Any], *args: Any) -> Any:
+    """Run a generator-based recursive function on an explicit stack.
+
+    ``step(*args)`` must return a generator. Inside it, a recursive call is
+    written ``value = yield (other_step, *other_args)``; the driver runs that
+    generator to completion and sends its return value back. Exceptions
+    propagate to the requesting generator exactly as they would through normal
+    calls, so ``with`` blocks and ``try`` handlers behave the same.
+    """
+    stack = [step(*args)]
+    value = None
+    error: Optional[BaseException] = None
+    while True:
+        generator = stack[-1]
+        try:
+            if error is None:
+                request = generator.send(value)
+            else:
+                pending_error, error = error, None
+                request = generator.throw(pending_error)
+        except StopIteration as stop:
+            stack.pop()
+            if not stack:
+                return stop.value
+            value = stop.value
+            continue
+        except BaseException as exc:
+            stack.pop()
+            if not stack:
+                raise
+            error = exc
+            continue
+        try:
+            child = request[0](*request[1:])
+        except BaseException as exc:
+            # Raised while building the step: the requester sees it too.
+            error = exc
+            continue
+        stack.append(child)
+        value = None
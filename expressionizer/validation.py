@@ -2,7 +2,7 @@ import math
 import itertools
 from typing import Any
 
-from .evaluator import contains, replace_sub
+from .evaluator import contains, replace_sub, replace_sub_at
 from .expression import (
     Derivative,
     Equation,
@@ -442,7 +442,16 @@ def validate_reasoning_steps(eval_context: Any, expected_result: Any) -> dict[st
                 )
             continue
 
-        if contains(snap.previous_tree, snap.original) <= 0:
+        path = getattr(snap, "path", None)
+        if path is not None:
+            replayed = replace_sub_at(
+                snap.previous_tree, path, snap.original, snap.portion
+            )
+        elif contains(snap.previous_tree, snap.original) > 0:
+            replayed = replace_sub(snap.previous_tree, snap.original, snap.portion)
+        else:
+            replayed = None
+        if replayed is None:
             failures.append(
                 {
                     "index": index,
@@ -451,7 +460,6 @@ def validate_reasoning_steps(eval_context: Any, expected_result: Any) -> dict[st
             )
             continue
 
-        replayed = replace_sub(snap.previous_tree, snap.original, snap.portion)
         if replayed != snap.full_tree:
             equivalence = compare_with_sympy(replayed, snap.full_tree)
             if equivalence.get("status") == "equivalent":